@@ -31,16 +31,29 @@ class AccountingDB( DB ):
     self.dbBucketsLength = {}
     self.__keysCache = {}
     maxParallelInsertions = self.getCSOption( "ParallelRecordInsertions", 10 )
+    self.__bulkInsertion = self.getCSOption( "BulkRecordInsertion", True )
+    self.__bulkRowsPerQuery = self.getCSOption( "BulkRowsPerQuery", 1000 )
     self.__threadPool = ThreadPool( 1, maxParallelInsertions )
     self.__threadPool.daemonize()
+    #Read only instances do not compact
+    self.__compactionPool = None
+    if not readOnly:
+      self.__compactionPool = ThreadPool( 1, self.getCSOption( "CompactionWorkers", 2 ) )
     self.catalogTableName = _getTableName( "catalog", "Types" )
+    self.watermarksTableName = _getTableName( "catalog", "CompactionWatermarks" )
     self._createTables( { self.catalogTableName : { 'Fields' : { 'name' : "VARCHAR(64) UNIQUE NOT NULL",
                                                           'keyFields' : "VARCHAR(256) NOT NULL",
                                                           'valueFields' : "VARCHAR(256) NOT NULL",
                                                           'bucketsLength' : "VARCHAR(256) NOT NULL",
                                                        },
                                              'PrimaryKey' : 'name'
-                                           }
+                                           },
+                          self.watermarksTableName : { 'Fields' : { 'name' : "VARCHAR(64) NOT NULL",
+                                                                    'bucketLength' : "MEDIUMINT UNSIGNED NOT NULL",
+                                                                    'watermark' : "INT UNSIGNED NOT NULL"
+                                                                  },
+                                                       'UniqueIndexes' : { 'typeBucket' : [ 'name', 'bucketLength' ] }
+                                                     }
                         }
                       )
     self.__loadCatalogFromDB()
@@ -59,6 +72,11 @@ class AccountingDB( DB ):
                                "Accounting",
                                "seconds",
                                gMonitor.OP_MEAN )
+    gMonitor.registerActivity( "compactedbuckets",
+                               "Buckets compacted",
+                               "Accounting",
+                               "buckets",
+                               gMonitor.OP_ACUM )
 
     self.__compactTime = datetime.time( hour = 2,
                                         minute = random.randint( 0, 59 ),
@@ -85,6 +103,13 @@ class AccountingDB( DB ):
 
   def __periodicAutoCompactDB( self ):
     while self.autoCompact:
+      #Compaction goes in slices, so it can also run every CompactionPeriod seconds
+      compactionPeriod = self.getCSOption( "CompactionPeriod", 0 )
+      if compactionPeriod > 0:
+        self.log.info( "Next db compaction will be in %s secs" % compactionPeriod )
+        time.sleep( compactionPeriod )
+        self.compactBuckets()
+        continue
       nct = Time.dateTime()
       if nct.hour >= self.__compactTime.hour:
         nct = nct + datetime.timedelta( days = 1 )
@@ -109,6 +134,12 @@ class AccountingDB( DB ):
     #Load the files
     for pythonClassName in sorted( objectsLoaded ):
       typeClass = objectsLoaded[ pythonClassName ]
+      #Rollups are defined as <RollupName> = <key1>, <key2> in Rollups/<TypeName>
+      retVal = gConfig.getOptionsDict( "%s/Rollups/%s" % ( self.cs_path, pythonClassName ) )
+      if retVal[ 'OK' ]:
+        rollupsDef = retVal[ 'Value' ]
+      else:
+        rollupsDef = {}
       for setup in setupsList:
         typeName = "%s_%s" % ( setup, pythonClassName )
 
@@ -131,7 +162,7 @@ class AccountingDB( DB ):
             self.log.error( "Accountable fields have changed for type %s" % typeName )
         #Try to re register to check all the tables are there
         retVal = self.registerType( typeName, definitionKeyFields,
-                                    definitionAccountingFields, bucketsLength )
+                                    definitionAccountingFields, bucketsLength, rollupsDef )
         if not retVal[ 'OK' ]:
           self.log.error( "Can't register type %s:%s" % ( typeName, retVal[ 'Message' ] ) )
         #If it has been properly registered, update info
@@ -257,7 +288,8 @@ class AccountingDB( DB ):
     """
     self.log.verbose( "Adding to catalog type %s" % typeName, "with length %s" % str( bucketsLength ) )
     self.dbCatalog[ typeName ] = { 'keys' : keyFields , 'values' : valueFields,
-                                   'typeFields' : [], 'bucketFields' : [], 'dataTimespan' : 0 }
+                                   'typeFields' : [], 'bucketFields' : [], 'dataTimespan' : 0,
+                                   'rollups' : {} }
     self.dbCatalog[ typeName ][ 'typeFields' ].extend( keyFields )
     self.dbCatalog[ typeName ][ 'typeFields' ].extend( valueFields )
     self.dbCatalog[ typeName ][ 'bucketFields' ] = list( self.dbCatalog[ typeName ][ 'typeFields' ] )
@@ -285,9 +317,11 @@ class AccountingDB( DB ):
     return self.regenerateBuckets( typeName )
 
   @gSynchro
-  def registerType( self, name, definitionKeyFields, definitionAccountingFields, bucketsLength ):
+  def registerType( self, name, definitionKeyFields, definitionAccountingFields, bucketsLength, rollupsDef = False ):
     """
     Register a new type
+    If rollupsDef is a dict ( rollup name -> key fields ), the rollup tables of the type are
+    synchronized with it. Otherwise the rollups already defined are kept.
     """
     gMonitor.registerActivity( "registerwaiting:%s" % name,
                                "Records waiting for insertion for %s" % " ".join( name.split( "_" ) ),
@@ -299,6 +333,11 @@ class AccountingDB( DB ):
                                "Accounting",
                                "entries",
                                gMonitor.OP_ACUM )
+    gMonitor.registerActivity( "insertionrate:%s" % name,
+                               "Records inserted per second for %s" % " ".join( name.split( "_" ) ),
+                               "Accounting",
+                               "records",
+                               gMonitor.OP_RATE )
 
     result = self.__loadTablesCreated()
     if not result[ 'OK' ]:
@@ -387,6 +426,8 @@ class AccountingDB( DB ):
           pass
       else:
         self.log.notice( "ReadOnly mode: %s is OK" % name )
+        if type( rollupsDef ) == types.DictType and name in self.dbCatalog:
+          self.__registerRollups( name, rollupsDef, tablesInThere )
       return S_OK( not updateDBCatalog )
 
     if tables:
@@ -401,9 +442,181 @@ class AccountingDB( DB ):
                          [ 'name', 'keyFields', 'valueFields', 'bucketsLength' ],
                          [ name, ",".join( keyFieldsList ), ",".join( valueFieldsList ), bucketsEncoding ] )
       self.__addToCatalog( name, keyFieldsList, valueFieldsList, bucketsLength )
+    if type( rollupsDef ) == types.DictType:
+      self.__registerRollups( name, rollupsDef, tablesInThere )
     self.log.info( "Registered type %s" % name )
     return S_OK( True )
 
+  def __registerRollups( self, typeName, rollupsDef, tablesInThere ):
+    """
+    Synchronize the rollup tables of a type with its definition
+     - rollupsDef -> dict of rollup name -> key fields ( list or comma separated string )
+    Rollups are bucket tables with only a subset of the keys. New ones are filled from the
+    buckets and the ones no longer defined are dropped.
+    """
+    keyFields = self.dbCatalog[ typeName ][ 'keys' ]
+    rollups = {}
+    for rollupName in rollupsDef:
+      rollupKeys = rollupsDef[ rollupName ]
+      if type( rollupKeys ) in types.StringTypes:
+        rollupKeys = List.fromChar( rollupKeys, "," )
+      if not rollupName.isalnum():
+        self.log.error( "Invalid rollup name", "%s for %s" % ( rollupName, typeName ) )
+        continue
+      missing = [ key for key in rollupKeys if key not in keyFields ]
+      if missing or not rollupKeys:
+        self.log.error( "Invalid rollup keys", "%s for %s: %s" % ( rollupName, typeName, ", ".join( missing ) ) )
+        continue
+      if len( rollupKeys ) == len( keyFields ):
+        self.log.warn( "Rollup %s of %s has all the keys of the type, ignoring it" % ( rollupName, typeName ) )
+        continue
+      #Keep the order of the type keys
+      rollups[ rollupName ] = [ key for key in keyFields if key in rollupKeys ]
+
+    usableRollups = {}
+    for rollupName in rollups:
+      rollupKeys = rollups[ rollupName ]
+      tableName = _getTableName( "rollup", typeName, rollupName )
+      if tableName in tablesInThere:
+        result = self._query( "SHOW COLUMNS FROM `%s`" % tableName )
+        if not result[ 'OK' ]:
+          self.log.error( "Can't check rollup table %s: %s" % ( tableName, result[ 'Message' ] ) )
+          continue
+        tableKeys = [ row[0] for row in result[ 'Value' ] if row[0] in keyFields ]
+        if sorted( tableKeys ) == sorted( rollupKeys ):
+          usableRollups[ rollupName ] = rollupKeys
+          continue
+        if self.__readOnly:
+          self.log.notice( "ReadOnly mode: Rollup %s of %s has changed, not using it" % ( rollupName, typeName ) )
+          continue
+        self.log.info( "Keys of rollup %s of %s have changed, rebuilding it" % ( rollupName, typeName ) )
+        result = self._update( "DROP TABLE `%s`" % tableName )
+        if not result[ 'OK' ]:
+          self.log.error( "Can't drop rollup table %s: %s" % ( tableName, result[ 'Message' ] ) )
+          continue
+      elif self.__readOnly:
+        self.log.notice( "ReadOnly mode: Skipping creation of rollup %s of %s" % ( rollupName, typeName ) )
+        continue
+      result = self._createTables( { tableName : self.__getRollupTableDefinition( typeName, rollupKeys ) } )
+      if not result[ 'OK' ]:
+        self.log.error( "Can't create rollup table %s: %s" % ( tableName, result[ 'Message' ] ) )
+        continue
+      self.dbCatalog[ typeName ][ 'rollups' ][ rollupName ] = rollupKeys
+      result = self.__aggregateRollup( typeName, rollupName )
+      if not result[ 'OK' ]:
+        self.log.error( "Can't fill rollup table %s: %s" % ( tableName, result[ 'Message' ] ) )
+        del( self.dbCatalog[ typeName ][ 'rollups' ][ rollupName ] )
+        continue
+      usableRollups[ rollupName ] = rollupKeys
+    self.dbCatalog[ typeName ][ 'rollups' ] = usableRollups
+
+    if self.__readOnly:
+      return S_OK()
+    #Drop the tables of rollups no longer defined. Rollup names have no _ so the tables
+    #of types sharing the prefix are not touched
+    tablePrefix = "%s_" % _getTableName( "rollup", typeName )
+    for tableName in tablesInThere:
+      if tableName.find( tablePrefix ) != 0:
+        continue
+      rollupName = tableName[ len( tablePrefix ): ]
+      if rollupName.find( "_" ) > -1 or rollupName in rollups:
+        continue
+      self.log.info( "Rollup %s of %s is no longer defined, dropping it" % ( rollupName, typeName ) )
+      result = self._update( "DROP TABLE `%s`" % tableName )
+      if not result[ 'OK' ]:
+        self.log.error( "Can't drop rollup table %s: %s" % ( tableName, result[ 'Message' ] ) )
+    return S_OK()
+
+  def __getRollupTableDefinition( self, typeName, rollupKeys ):
+    """
+    Get the definition of a rollup table, the same as the bucket one for a subset of keys
+    """
+    fieldsDict = {}
+    indexes = { 'startTimeIndex' : [ 'startTime' ], 'bucketLengthIndex' : [ 'bucketLength' ] }
+    uniqueIndexFields = []
+    for key in rollupKeys:
+      fieldsDict[ key ] = "INTEGER NOT NULL"
+      indexes[ "%sIndex" % key ] = [ key ]
+      uniqueIndexFields.append( key )
+    for value in self.dbCatalog[ typeName ][ 'values' ]:
+      fieldsDict[ value ] = "DECIMAL(30,10) NOT NULL"
+    fieldsDict[ 'entriesInBucket' ] = "DECIMAL(30,10) NOT NULL"
+    fieldsDict[ 'startTime' ] = "INT UNSIGNED NOT NULL"
+    fieldsDict[ 'bucketLength' ] = "MEDIUMINT UNSIGNED NOT NULL"
+    uniqueIndexFields.extend( [ 'startTime', 'bucketLength' ] )
+    return { 'Fields' : fieldsDict,
+             'Indexes' : indexes,
+             'UniqueIndexes' : { 'UniqueConstraint' : uniqueIndexFields } }
+
+  def __aggregateRollup( self, typeName, rollupName, sqlCond = "", connObj = False ):
+    """
+    Calculate the rollup buckets from the buckets of the type matching sqlCond
+    Rollup buckets already there are replaced
+    """
+    bucketTableName = _getTableName( "bucket", typeName )
+    rollupKeys = self.dbCatalog[ typeName ][ 'rollups' ][ rollupName ]
+    sumFields = self.dbCatalog[ typeName ][ 'values' ] + [ 'entriesInBucket' ]
+    sqlFields = [ "`%s`" % field for field in rollupKeys + sumFields + [ 'startTime', 'bucketLength' ] ]
+    sqlSelectList = [ "`%s`.`%s`" % ( bucketTableName, key ) for key in rollupKeys ]
+    sqlSelectList.extend( [ "SUM( `%s`.`%s` )" % ( bucketTableName, field ) for field in sumFields ] )
+    sqlSelectList.extend( [ "`%s`.`startTime`" % bucketTableName, "`%s`.`bucketLength`" % bucketTableName ] )
+    sqlGroupList = [ "`%s`.`%s`" % ( bucketTableName, field ) for field in [ 'startTime', 'bucketLength' ] + rollupKeys ]
+    cmd = "INSERT INTO `%s` ( %s )" % ( _getTableName( "rollup", typeName, rollupName ), ", ".join( sqlFields ) )
+    cmd += " SELECT %s FROM `%s`" % ( ", ".join( sqlSelectList ), bucketTableName )
+    if sqlCond:
+      cmd += " WHERE %s" % sqlCond
+    cmd += " GROUP BY %s" % ", ".join( sqlGroupList )
+    cmd += " ON DUPLICATE KEY UPDATE %s" % ", ".join( [ "`%s`=VALUES(`%s`)" % ( field, field ) for field in sumFields ] )
+    return self._update( cmd, conn = connObj )
+
+  def __replaceRollup( self, typeName, rollupName, deleteCond = "", sqlCond = "" ):
+    """
+    Delete the rollup buckets matching deleteCond and aggregate again the buckets of the type
+    matching sqlCond, in the same transaction so the readers never see the rollup range empty
+    """
+    retVal = self._getConnection()
+    if not retVal[ 'OK' ]:
+      return retVal
+    connObj = retVal[ 'Value' ]
+    try:
+      retVal = self.__startTransaction( connObj )
+      if not retVal[ 'OK' ]:
+        return retVal
+      cmd = "DELETE FROM `%s`" % _getTableName( "rollup", typeName, rollupName )
+      if deleteCond:
+        cmd += " WHERE %s" % deleteCond
+      retVal = self._update( cmd, conn = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+      retVal = self.__aggregateRollup( typeName, rollupName, sqlCond, connObj = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+      return self.__commitTransaction( connObj )
+    finally:
+      connObj.close()
+
+  def regenerateRollups( self, typeName, rollupName = False ):
+    """
+    Recalculate the rollups of a type ( or only rollupName ) from its buckets
+    """
+    if self.__readOnly:
+      return S_ERROR( "ReadOnly mode enabled. No modification allowed" )
+    if typeName not in self.dbCatalog:
+      return S_ERROR( "Type %s does not exist" % typeName )
+    rollupsList = self.dbCatalog[ typeName ][ 'rollups' ].keys()
+    if rollupName:
+      if rollupName not in rollupsList:
+        return S_ERROR( "Type %s does not have rollup %s" % ( typeName, rollupName ) )
+      rollupsList = [ rollupName ]
+    for rollupName in rollupsList:
+      self.log.info( "[ROLLUP] Regenerating rollup %s for %s" % ( rollupName, typeName ) )
+      retVal = self.__replaceRollup( typeName, rollupName )
+      if not retVal[ 'OK' ]:
+        return retVal
+    return S_OK()
+
   def getRegisteredTypes( self ):
     """
     Get list of registered types
@@ -471,6 +684,8 @@ class AccountingDB( DB ):
     tablesToDelete = []
     for keyField in self.dbCatalog[ typeName ][ 'keys' ]:
       tablesToDelete.append( "`%s`" % _getTableName( "key", typeName, keyField ) )
+    for rollupName in self.dbCatalog[ typeName ][ 'rollups' ]:
+      tablesToDelete.insert( 0, "`%s`" % _getTableName( "rollup", typeName, rollupName ) )
     tablesToDelete.insert( 0, "`%s`" % _getTableName( "type", typeName ) )
     tablesToDelete.insert( 0, "`%s`" % _getTableName( "bucket", typeName ) )
     tablesToDelete.insert( 0, "`%s`" % _getTableName( "in", typeName ) )
@@ -478,6 +693,7 @@ class AccountingDB( DB ):
     if not retVal[ 'OK' ]:
       return retVal
     retVal = self._update( "DELETE FROM `%s` WHERE name='%s'" % ( _getTableName( "catalog", "Types" ), typeName ) )
+    self.__resetCompactionWatermarks( typeName )
     del( self.dbCatalog[ typeName ] )
     return S_OK()
 
@@ -626,6 +842,8 @@ class AccountingDB( DB ):
     Do the real insert and delete from the in buffer table
     """
     self.log.verbose( "Received bundle to process", "of %s elements" % len( recordTuples ) )
+    if self.__bulkInsertion and not self.__oldBucketMethod:
+      recordTuples = self.__bulkInsertFromINTable( recordTuples )
     for record in recordTuples:
       iD, typeName, startTime, endTime, valuesList, insertionEpoch = record
       result = self.insertRecordDirectly( typeName, startTime, endTime, valuesList )
@@ -638,19 +856,103 @@ class AccountingDB( DB ):
         self.log.error( "Can't delete row from the IN table", result[ 'Message' ] )
       gMonitor.addMark( "insertiontime", Time.toEpoch() - insertionEpoch )
 
+  def __bulkInsertFromINTable( self, recordTuples ):
+    """
+    Insert the records in bundles per type and delete them from the in buffer table
+    Returns the records of the types that could not be inserted in bulk
+    """
+    recordsByType = {}
+    for record in recordTuples:
+      typeName = record[1]
+      if typeName not in recordsByType:
+        recordsByType[ typeName ] = []
+      recordsByType[ typeName ].append( record )
+    failedRecords = []
+    for typeName in recordsByType:
+      typeRecords = recordsByType[ typeName ]
+      result = self.insertRecordBundleDirectly( typeName, [ record[2:5] for record in typeRecords ] )
+      if not result[ 'OK' ]:
+        self.log.warn( "Bulk insertion failed, inserting records one by one", "for %s: %s" % ( typeName, result[ 'Message' ] ) )
+        failedRecords.extend( typeRecords )
+        continue
+      idList = [ str( record[0] ) for record in typeRecords ]
+      result = self._update( "DELETE FROM `%s` WHERE id in (%s)" % ( _getTableName( "in", typeName ), ", ".join( idList ) ) )
+      if not result[ 'OK' ]:
+        self.log.error( "Can't delete rows from the IN table", result[ 'Message' ] )
+      now = Time.toEpoch()
+      for record in typeRecords:
+        gMonitor.addMark( "insertiontime", now - record[5] )
+    return failedRecords
 
-  def insertRecordDirectly( self, typeName, startTime, endTime, valuesList ):
+  def insertRecordBundleDirectly( self, typeName, recordsList ):
     """
-    Add an entry to the type contents
+    Add a bundle of ( startTime, endTime, valuesList ) records of a type. The buckets of the
+    records are merged in memory and written with multi-row upserts in one transaction
     """
     if self.__readOnly:
       return S_ERROR( "ReadOnly mode enabled. No modification allowed" )
-    gMonitor.addMark( "registeradded", 1 )
-    gMonitor.addMark( "registeradded:%s" % typeName, 1 )
-    self.log.info( "Adding record", "for type %s\n [%s -> %s]" % ( typeName, Time.fromEpoch( startTime ), Time.fromEpoch( endTime ) ) )
     if not typeName in self.dbCatalog:
       return S_ERROR( "Type %s has not been defined in the db" % typeName )
-    #Discover key indexes
+    if not recordsList:
+      return S_OK( 0 )
+    insertionStart = time.time()
+    typeRows = []
+    for startTime, endTime, valuesList in recordsList:
+      retVal = self.__getKeyIds( typeName, valuesList )
+      if not retVal[ 'OK' ]:
+        return retVal
+      typeRows.append( retVal[ 'Value' ] + [ startTime, endTime ] )
+    bucketTables = self.__getBucketTables( typeName )
+    mergedBuckets = self.__mergeInBuckets( typeName, typeRows, bucketTables )
+    retVal = self._getConnection()
+    if not retVal[ 'OK' ]:
+      return retVal
+    connObj = retVal[ 'Value' ]
+    try:
+      for i in range( max( 1, self.__deadLockRetries ) ):
+        retVal = self.__writeRecordBundle( typeName, typeRows, bucketTables, mergedBuckets, connObj )
+        #A dead lock rolls back the whole transaction, so it can only be restarted from the beginning
+        if retVal[ 'OK' ] or retVal[ 'Message' ].find( "try restarting transaction" ) == -1:
+          break
+      if not retVal[ 'OK' ]:
+        return retVal
+    finally:
+      connObj.close()
+    numRecords = len( recordsList )
+    gMonitor.addMark( "registeradded", numRecords )
+    gMonitor.addMark( "registeradded:%s" % typeName, numRecords )
+    gMonitor.addMark( "insertionrate:%s" % typeName, numRecords )
+    self.log.info( "Added records in bulk", "%s records for type %s in %.2f secs, %s bucket rows" % ( 
+                                                                  numRecords,
+                                                                  typeName,
+                                                                  time.time() - insertionStart,
+                                                                  sum( [ len( mergedBuckets[ tN ] ) for tN in mergedBuckets ] ) ) )
+    return S_OK( numRecords )
+
+  def __writeRecordBundle( self, typeName, typeRows, bucketTables, mergedBuckets, connObj ):
+    """
+    Write the type rows and the merged buckets of a bundle in one transaction
+    """
+    retVal = self.__startTransaction( connObj )
+    if not retVal[ 'OK' ]:
+      return retVal
+    retVal = self.__insertRows( _getTableName( "type", typeName ), self.dbCatalog[ typeName ][ 'typeFields' ],
+                                typeRows, connObj = connObj )
+    if not retVal[ 'OK' ]:
+      self.__rollbackTransaction( connObj )
+      return retVal
+    for bucketTable in bucketTables:
+      retVal = self.__writeMergedBuckets( typeName, bucketTable, mergedBuckets[ bucketTable[0] ], connObj = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+    return self.__commitTransaction( connObj )
+
+  def __getKeyIds( self, typeName, valuesList ):
+    """
+    Get a copy of valuesList with the key values replaced by their ids
+    """
+    valuesList = list( valuesList )
     for keyPos in range( len( self.dbCatalog[ typeName ][ 'keys' ] ) ):
       keyName = self.dbCatalog[ typeName ][ 'keys' ][ keyPos ]
       keyValue = valuesList[ keyPos ]
@@ -659,6 +961,93 @@ class AccountingDB( DB ):
         return retVal
       self.log.verbose( "Value %s for key %s has id %s" % ( keyValue, keyName, retVal[ 'Value' ] ) )
       valuesList[ keyPos ] = retVal[ 'Value' ]
+    return S_OK( valuesList )
+
+  def __mergeInBuckets( self, typeName, typeRows, bucketTables, withEntries = False ):
+    """
+    Split the records in buckets adding up the ones that fall in the same bucket
+    If withEntries is set, the entries of each row come after its values, otherwise they are 1
+    Returns { tableName : { ( startTime, bucketLength, key ids.. ) : [ values.., entriesInBucket ] } }
+    """
+    numKeys = len( self.dbCatalog[ typeName ][ 'keys' ] )
+    numValues = len( self.dbCatalog[ typeName ][ 'values' ] )
+    if withEntries:
+      numValues += 1
+    mergedBuckets = dict( [ ( bucketTable[0], {} ) for bucketTable in bucketTables ] )
+    for row in typeRows:
+      keyValues = row[ :numKeys ]
+      values = [ float( value ) for value in row[ numKeys : numKeys + numValues ] ]
+      if not withEntries:
+        #One more value to count the entries in the buckets
+        values.append( 1.0 )
+      for bucketStartTime, proportion, bucketLength in self.calculateBuckets( typeName, row[-2], row[-1] ):
+        for tableName, keyFields, keyPositions in bucketTables:
+          bucketKey = tuple( [ bucketStartTime, bucketLength ] + [ keyValues[ iPos ] for iPos in keyPositions ] )
+          tableBuckets = mergedBuckets[ tableName ]
+          if bucketKey not in tableBuckets:
+            tableBuckets[ bucketKey ] = [ 0.0 ] * len( values )
+          bucketValues = tableBuckets[ bucketKey ]
+          for iPos in range( len( values ) ):
+            bucketValues[ iPos ] += values[ iPos ] * proportion
+    return mergedBuckets
+
+  def __insertRows( self, tableName, fields, rows, connObj = False ):
+    """
+    Insert rows with multi-row INSERTs of up to BulkRowsPerQuery rows
+    """
+    sqlRows = []
+    for row in rows:
+      retVal = self._escapeValues( row )
+      if not retVal[ 'OK' ]:
+        return retVal
+      sqlRows.append( "( %s )" % ", ".join( retVal[ 'Value' ] ) )
+    cmd = "INSERT INTO `%s` ( %s ) VALUES " % ( tableName, ", ".join( [ "`%s`" % field for field in fields ] ) )
+    for iPos in range( 0, len( sqlRows ), self.__bulkRowsPerQuery ):
+      retVal = self._update( cmd + ", ".join( sqlRows[ iPos : iPos + self.__bulkRowsPerQuery ] ), conn = connObj )
+      if not retVal[ 'OK' ]:
+        return retVal
+    return S_OK()
+
+  def __writeMergedBuckets( self, typeName, bucketTable, mergedBuckets, connObj = False ):
+    """
+    Add the merged buckets to a bucket table with multi-row INSERT ... ON DUPLICATE KEY UPDATE
+    """
+    tableName, keyFields = bucketTable[:2]
+    valueFields = self.dbCatalog[ typeName ][ 'values' ] + [ 'entriesInBucket' ]
+    sqlFields = [ "`%s`" % field for field in [ 'startTime', 'bucketLength' ] + keyFields + valueFields ]
+    sqlUpData = [ "`%s`=`%s`+VALUES(`%s`)" % ( field, field, field ) for field in valueFields ]
+    #Always the same order to avoid dead locks between concurrent insertions
+    sqlRows = []
+    for bucketKey in sorted( mergedBuckets ):
+      sqlRows.append( "( %s )" % ", ".join( [ str( value ) for value in bucketKey ] +
+                                            [ repr( value ) for value in mergedBuckets[ bucketKey ] ] ) )
+    for iPos in range( 0, len( sqlRows ), self.__bulkRowsPerQuery ):
+      cmd = "INSERT INTO `%s` ( %s ) VALUES %s ON DUPLICATE KEY UPDATE %s" % ( tableName,
+                                                                             ", ".join( sqlFields ),
+                                                                             ", ".join( sqlRows[ iPos : iPos + self.__bulkRowsPerQuery ] ),
+                                                                             ", ".join( sqlUpData ) )
+      #Not retried here, a dead lock has rolled back the transaction the buckets are written in
+      result = self._update( cmd, conn = connObj )
+      if not result[ 'OK' ]:
+        return S_ERROR( "Cannot update buckets: %s" % result[ 'Message' ] )
+    return S_OK()
+
+  def insertRecordDirectly( self, typeName, startTime, endTime, valuesList ):
+    """
+    Add an entry to the type contents
+    """
+    if self.__readOnly:
+      return S_ERROR( "ReadOnly mode enabled. No modification allowed" )
+    gMonitor.addMark( "registeradded", 1 )
+    gMonitor.addMark( "registeradded:%s" % typeName, 1 )
+    self.log.info( "Adding record", "for type %s\n [%s -> %s]" % ( typeName, Time.fromEpoch( startTime ), Time.fromEpoch( endTime ) ) )
+    if not typeName in self.dbCatalog:
+      return S_ERROR( "Type %s has not been defined in the db" % typeName )
+    #Discover key indexes
+    retVal = self.__getKeyIds( typeName, valuesList )
+    if not retVal[ 'OK' ]:
+      return retVal
+    valuesList = retVal[ 'Value' ]
     insertList = list( valuesList )
     insertList.append( startTime )
     insertList.append( endTime )
@@ -753,10 +1142,28 @@ class AccountingDB( DB ):
       return retVal
     return S_OK( numInsertions )
 
-  def __splitInBuckets( self, typeName, startTime, endTime, valuesList, connObj = False ):
+  def __getBucketTables( self, typeName, withRollups = True ):
+    """
+    Get the tables to write the buckets of a type to, as a list of
+    ( tableName, key fields, positions of the key fields in the type keys )
+    The first one is always the bucket table
+    """
+    keyFields = self.dbCatalog[ typeName ][ 'keys' ]
+    bucketTables = [ ( _getTableName( "bucket", typeName ), keyFields, range( len( keyFields ) ) ) ]
+    if withRollups:
+      for rollupName, rollupKeys in self.dbCatalog[ typeName ][ 'rollups' ].items():
+        bucketTables.append( ( _getTableName( "rollup", typeName, rollupName ),
+                               rollupKeys,
+                               [ keyFields.index( key ) for key in rollupKeys ] ) )
+    return bucketTables
+
+  def __splitInBuckets( self, typeName, startTime, endTime, valuesList, connObj = False, bucketTables = False ):
     """
     Bucketize a record
+    By default the record is added to the bucket table and to the rollups of the type
     """
+    if not bucketTables:
+      bucketTables = self.__getBucketTables( typeName )
     #Calculate amount of buckets
     buckets = self.calculateBuckets( typeName, startTime, endTime )
     #Separate key values from normal values
@@ -768,6 +1175,12 @@ class AccountingDB( DB ):
       bucketStartTime = bucketInfo[0]
       bucketProportion = bucketInfo[1]
       bucketLength = bucketInfo[2]
+      #Rollups first, the old bucket method jumps to the next bucket once done
+      for bucketTable in bucketTables[ 1: ]:
+        result = self.__writeBucket( typeName, bucketStartTime, bucketLength, keyValues,
+                                     valuesList, bucketProportion, connObj = connObj, bucketTable = bucketTable )
+        if not result[ 'OK' ]:
+          return result
       if not self.__oldBucketMethod:
         result = self.__writeBucket( typeName, bucketStartTime, bucketLength, keyValues,
                                      valuesList, bucketProportion, connObj = connObj )
@@ -819,38 +1232,43 @@ class AccountingDB( DB ):
       bucketStartTime = bucketInfo[0]
       bucketProportion = bucketInfo[1]
       bucketLength = bucketInfo[2]
-      for i in range( max( 1, self.__deadLockRetries ) ):
-        retVal = self.__extractFromBucket( typeName,
-                                           bucketStartTime,
-                                           bucketLength,
-                                           keyValues,
-                                           valuesList, bucketProportion * numInsertions, connObj = connObj )
-        if not retVal[ 'OK' ]:
-          #If failed because of dead lock try restarting
-          if retVal[ 'Message' ].find( "try restarting transaction" ):
-            continue
-          return retVal
-        #If OK, break loop
-        if retVal[ 'OK' ]:
-          break
+      for bucketTable in self.__getBucketTables( typeName ):
+        for i in range( max( 1, self.__deadLockRetries ) ):
+          retVal = self.__extractFromBucket( typeName,
+                                             bucketStartTime,
+                                             bucketLength,
+                                             keyValues,
+                                             valuesList, bucketProportion * numInsertions, connObj = connObj,
+                                             bucketTable = bucketTable )
+          if not retVal[ 'OK' ]:
+            #If failed because of dead lock try restarting
+            if retVal[ 'Message' ].find( "try restarting transaction" ):
+              continue
+            return retVal
+          #If OK, break loop
+          if retVal[ 'OK' ]:
+            break
     return S_OK()
 
   def getBucketsDef( self, typeName ):
     return self.dbBucketsLength[ typeName ]
 
-  def __generateSQLConditionForKeys( self, typeName, keyValues ):
+  def __generateSQLConditionForKeys( self, typeName, keyValues, bucketTable = False ):
     """
     Generate sql condition for buckets, values are indexes to real values
     """
+    if not bucketTable:
+      bucketTable = self.__getBucketTables( typeName, withRollups = False )[0]
+    tableName, keyFields, keyPositions = bucketTable
     realCondList = []
-    for keyPos in range( len( self.dbCatalog[ typeName ][ 'keys' ] ) ):
-      keyField = self.dbCatalog[ typeName ][ 'keys' ][ keyPos ]
-      keyValue = keyValues[ keyPos ]
+    for iPos in range( len( keyFields ) ):
+      keyField = keyFields[ iPos ]
+      keyValue = keyValues[ keyPositions[ iPos ] ]
       retVal = self._escapeString( keyValue )
       if not retVal[ 'OK' ]:
         return retVal
       keyValue = retVal[ 'Value' ]
-      realCondList.append( "`%s`.`%s` = %s" % ( _getTableName( "bucket", typeName ), keyField, keyValue ) )
+      realCondList.append( "`%s`.`%s` = %s" % ( tableName, keyField, keyValue ) )
     return " AND ".join( realCondList )
 
   def __getBucketFromDB( self, typeName, startTime, bucketLength, keyValues, connObj = False ):
@@ -871,11 +1289,14 @@ class AccountingDB( DB ):
     cmd += self.__generateSQLConditionForKeys( typeName, keyValues )
     return self._query( cmd, conn = connObj )
 
-  def __extractFromBucket( self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj = False ):
+  def __extractFromBucket( self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj = False,
+                           bucketTable = False ):
     """
     Update a bucket when coming from the raw insert
     """
-    tableName = _getTableName( "bucket", typeName )
+    if not bucketTable:
+      bucketTable = self.__getBucketTables( typeName, withRollups = False )[0]
+    tableName = bucketTable[0]
     cmd = "UPDATE `%s` SET " % tableName
     sqlValList = []
     for pos in range( len( self.dbCatalog[ typeName ][ 'values' ] ) ):
@@ -893,21 +1314,24 @@ class AccountingDB( DB ):
                                                                             startTime,
                                                                             tableName,
                                                                             bucketLength )
-    cmd += self.__generateSQLConditionForKeys( typeName, keyValues )
+    cmd += self.__generateSQLConditionForKeys( typeName, keyValues, bucketTable )
     return self._update( cmd, conn = connObj )
 
 
-  def __writeBucket( self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj = False ):
+  def __writeBucket( self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj = False,
+                     bucketTable = False ):
     """ Insert or update a bucket
     """
-    tableName = _getTableName( "bucket", typeName )
+    if not bucketTable:
+      bucketTable = self.__getBucketTables( typeName, withRollups = False )[0]
+    tableName, keyFields, keyPositions = bucketTable
     #INSERT PART OF THE QUERY
     sqlFields = [ '`startTime`', '`bucketLength`', '`entriesInBucket`' ]
     sqlValues = [ startTime, bucketLength, "(%s*%s)" % ( bucketValues[-1], proportion )]
     sqlUpData = [ "`entriesInBucket`=`entriesInBucket`+(%s*%s)" % ( bucketValues[-1], proportion ) ]
-    for keyPos in range( len( self.dbCatalog[ typeName ][ 'keys' ] ) ):
-      sqlFields.append( "`%s`" % self.dbCatalog[ typeName ][ 'keys' ][ keyPos ] )
-      sqlValues.append( keyValues[ keyPos ] )
+    for iPos in range( len( keyFields ) ):
+      sqlFields.append( "`%s`" % keyFields[ iPos ] )
+      sqlValues.append( keyValues[ keyPositions[ iPos ] ] )
     for valPos in range( len( self.dbCatalog[ typeName ][ 'values' ] ) ):
       valueField = "`%s`" % self.dbCatalog[ typeName ][ 'values' ][ valPos ]
       value = bucketValues[ valPos ]
@@ -915,7 +1339,7 @@ class AccountingDB( DB ):
       sqlFields.append( valueField )
       sqlValues.append( "(%s*%s)" % ( bucketValues[ valPos ], proportion ) )
 
-    cmd = "INSERT INTO `%s` ( %s ) " % ( _getTableName( "bucket", typeName ), ", ".join( sqlFields ) )
+    cmd = "INSERT INTO `%s` ( %s ) " % ( tableName, ", ".join( sqlFields ) )
     cmd += "VALUES ( %s ) " % ", ".join( [ str( val ) for val in sqlValues ] )
     cmd += "ON DUPLICATE KEY UPDATE %s" % ", ".join( sqlUpData )
 
@@ -1041,9 +1465,7 @@ class AccountingDB( DB ):
     retVal = self.__checkIncomingFieldsForQuery( typeName, selectFields, condDict, groupFields, orderFields, "bucket" )
     if not retVal[ 'OK' ]:
       return retVal
-    nowEpoch = Time.toEpoch( Time.dateTime () )
-    bucketTimeLength = self.calculateBucketLengthForTime( typeName, nowEpoch , startTime )
-    startTime = startTime - startTime % bucketTimeLength
+    startTime = self.__alignToBucket( typeName, startTime )
     result = self.__queryType( typeName,
                              startTime,
                              endTime,
@@ -1056,11 +1478,58 @@ class AccountingDB( DB ):
     gMonitor.addMark( "querytime", Time.toEpoch() - startQueryEpoch )
     return result
 
+  def __alignToBucket( self, typeName, epoch ):
+    nowEpoch = Time.toEpoch( Time.dateTime () )
+    bucketTimeLength = self.calculateBucketLengthForTime( typeName, nowEpoch , epoch )
+    return epoch - epoch % bucketTimeLength
+
+  def __bucketQueryLimit( self, typeName, epoch ):
+    #HACK because MySQL and UNIX do not start epoch at the same time
+    epoch = epoch + 3600
+    return self.calculateBuckets( typeName, epoch, epoch )[0][0]
+
+  def getBucketedQueryLimits( self, typeName, startTime, endTime ):
+    """
+    Get the first and last bucket startTime ( both included ) retrieveBucketedData
+    will return data for
+    """
+    if typeName not in self.dbCatalog:
+      return S_ERROR( "Type %s is not defined" % typeName )
+    startTime = self.__alignToBucket( typeName, startTime )
+    return S_OK( ( self.__bucketQueryLimit( typeName, startTime ), self.__bucketQueryLimit( typeName, endTime ) ) )
+
+  def __getRollupForQuery( self, typeName, fieldsList ):
+    """
+    Get the rollup with less keys having all the key fields in fieldsList
+    Returns None if there is none
+    """
+    typeKeys = self.dbCatalog[ typeName ][ 'keys' ]
+    usedKeys = [ field for field in fieldsList if field in typeKeys ]
+    bestRollup = None
+    for rollupName, rollupKeys in self.dbCatalog[ typeName ][ 'rollups' ].items():
+      for key in usedKeys:
+        if key not in rollupKeys:
+          break
+      else:
+        if bestRollup is None or len( rollupKeys ) < len( self.dbCatalog[ typeName ][ 'rollups' ][ bestRollup ] ):
+          bestRollup = rollupName
+    return bestRollup
+
   def __queryType( self, typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields, tableType, connObj = False ):
     """
     Execute a query over a main table
+    Bucket queries are done over the smallest rollup having all the keys needed, if any
     """
     tableName = _getTableName( tableType, typeName )
+    if tableType == "bucket":
+      queryFields = list( selectFields[1] ) + list( condDict )
+      for preGenFields in ( groupFields, orderFields ):
+        if preGenFields:
+          queryFields.extend( preGenFields[1] )
+      rollupName = self.__getRollupForQuery( typeName, queryFields )
+      if rollupName:
+        self.log.verbose( "Using rollup %s for the query" % rollupName )
+        tableName = _getTableName( "rollup", typeName, rollupName )
     cmd = "SELECT"
     sqlLinkList = []
     #Check if groupFields and orderFields are in ( "%s", ( field1, ) ) form
@@ -1101,15 +1570,12 @@ class AccountingDB( DB ):
     sqlTimeCond = []
     if startTime:
       if tableType == 'bucket':
-        #HACK because MySQL and UNIX do not start epoch at the same time
-        startTime = startTime + 3600
-        startTime = self.calculateBuckets( typeName, startTime, startTime )[0][0]
+        startTime = self.__bucketQueryLimit( typeName, startTime )
       sqlTimeCond.append( "`%s`.`startTime` >= %s" % ( tableName, startTime ) )
     if endTime:
       if tableType == "bucket":
         endTimeSQLVar = "startTime"
-        endTime = endTime + 3600
-        endTime = self.calculateBuckets( typeName, endTime, endTime )[0][0]
+        endTime = self.__bucketQueryLimit( typeName, endTime )
       else:
         endTimeSQLVar = "endTime"
       sqlTimeCond.append( "`%s`.`%s` <= %s" % ( tableName, endTimeSQLVar, endTime ) )
@@ -1172,20 +1638,15 @@ class AccountingDB( DB ):
       self.__doingCompaction = True
     finally:
       gSynchro.unlock()
-    slow = True
+    compactionStart = time.time()
     for typeName in self.dbCatalog:
       if typeFilter and typeName.find( typeFilter ) == -1:
         self.log.info( "[COMPACT] Skipping %s" % typeName )
         continue
-      if self.dbCatalog[ typeName ][ 'dataTimespan' ] > 0:
-        self.log.info( "[COMPACT] Deleting records older that timespan for type %s" % typeName )
-        self.__deleteRecordsOlderThanDataTimespan( typeName )
-      self.log.info( "[COMPACT] Compacting %s" % typeName )
-      if slow:
-        self.__slowCompactBucketsForType( typeName )
-      else:
-        self.__compactBucketsForType( typeName )
-    self.log.info( "[COMPACT] Compaction finished" )
+      self.__compactionPool.generateJobAndQueueIt( self.__compactType, args = ( typeName, ) )
+    #Types are compacted in parallel by the workers of the compaction pool
+    self.__compactionPool.processAllResults()
+    self.log.info( "[COMPACT] Compaction finished (took %.2f secs)" % ( time.time() - compactionStart ) )
     self.__lastCompactionEpoch = int( Time.toEpoch() )
     gSynchro.lock()
     try:
@@ -1195,188 +1656,187 @@ class AccountingDB( DB ):
       gSynchro.unlock()
     return S_OK()
 
-  def __selectForCompactBuckets( self, typeName, timeLimit, bucketLength, nextBucketLength, connObj = False ):
+  def __compactType( self, typeName ):
     """
-    Nasty SQL query to get ideal buckets using grouping by date calculations and adding value contents
+    Delete the records out of the timespan of a type and compact its buckets
     """
-    tableName = _getTableName( "bucket", typeName )
-    selectSQL = "SELECT "
-    sqlSelectList = []
-    for field in self.dbCatalog[ typeName ][ 'keys' ]:
-      sqlSelectList.append( "`%s`.`%s`" % ( tableName, field ) )
-    for field in self.dbCatalog[ typeName ][ 'values' ]:
-      sqlSelectList.append( "SUM( `%s`.`%s` )" % ( tableName, field ) )
-    sqlSelectList.append( "SUM( `%s`.`entriesInBucket` )" % ( tableName ) )
-    sqlSelectList.append( "MIN( `%s`.`startTime` )" % tableName )
-    sqlSelectList.append( "MAX( `%s`.`startTime` )" % tableName )
-    selectSQL += ", ".join( sqlSelectList )
-    selectSQL += " FROM `%s`" % tableName
-    selectSQL += " WHERE `%s`.`startTime` < '%s' AND" % ( tableName, timeLimit )
-    selectSQL += " `%s`.`bucketLength` = %s" % ( tableName, bucketLength )
-    #MAGIC bucketing
-    sqlGroupList = [ _bucketizeDataField( "`%s`.`startTime`" % tableName, nextBucketLength ) ]
-    for field in self.dbCatalog[ typeName ][ 'keys' ]:
-      sqlGroupList.append( "`%s`.`%s`" % ( tableName, field ) )
-    selectSQL += " GROUP BY %s" % ", ".join( sqlGroupList )
-    return self._query( selectSQL, conn = connObj )
+    try:
+      if self.dbCatalog[ typeName ][ 'dataTimespan' ] > 0:
+        self.log.info( "[COMPACT] Deleting records older that timespan for type %s" % typeName )
+        self.__deleteRecordsOlderThanDataTimespan( typeName )
+      self.log.info( "[COMPACT] Compacting %s" % typeName )
+      result = self.__slicedCompactBucketsForType( typeName )
+      if not result[ 'OK' ]:
+        self.log.error( "[COMPACT] Compaction of %s failed: %s" % ( typeName, result[ 'Message' ] ) )
+    except Exception, e:
+      self.log.exception( "[COMPACT] Compaction of %s failed" % typeName, str( e ) )
 
-  def __deleteForCompactBuckets( self, typeName, timeLimit, bucketLength, connObj = False ):
+  def __getCompactionWatermark( self, typeName, bucketLength, timeLimit ):
     """
-    Delete compacted buckets
+    Get the time up to which the buckets of a length are already compacted. If there
+    is no watermark, start from the oldest bucket of that length
     """
+    retVal = self._query( "SELECT `watermark` FROM `%s` WHERE `name`='%s' AND `bucketLength`=%d" % ( self.watermarksTableName,
+                                                                                                   typeName, bucketLength ) )
+    if not retVal[ 'OK' ]:
+      return retVal
+    if retVal[ 'Value' ]:
+      return S_OK( int( retVal[ 'Value' ][0][0] ) )
     tableName = _getTableName( "bucket", typeName )
-    deleteSQL = "DELETE FROM `%s` WHERE " % tableName
-    deleteSQL += "`%s`.`startTime` < '%s' AND " % ( tableName, timeLimit )
-    deleteSQL += "`%s`.`bucketLength` = %s" % ( tableName, bucketLength )
-    return self._update( deleteSQL, conn = connObj )
-
-  def __compactBucketsForType( self, typeName ):
-    """
-    Compact all buckets for a given type
-    """
-    nowEpoch = Time.toEpoch()
-    #retVal = self.__startTransaction( connObj )
-    #if not retVal[ 'OK' ]:
-    #  return retVal
-    for bPos in range( len( self.dbBucketsLength[ typeName ] ) - 1 ):
-      self.log.info( "[COMPACT] Query %d of %d" % ( bPos + 1, len( self.dbBucketsLength[ typeName ] ) - 1 ) )
+    retVal = self._query( "SELECT MIN( `startTime` ) FROM `%s` WHERE `bucketLength`=%d AND `startTime` < %d" % ( tableName,
+                                                                                                            bucketLength,
+                                                                                                            timeLimit ) )
+    if not retVal[ 'OK' ]:
+      return retVal
+    firstTime = retVal[ 'Value' ][0][0]
+    if firstTime is None:
+      return S_OK( timeLimit )
+    return S_OK( int( firstTime ) )
+
+  def __setCompactionWatermark( self, typeName, bucketLength, watermark ):
+    return self._update( "INSERT INTO `%s` ( `name`, `bucketLength`, `watermark` ) VALUES ( '%s', %d, %d ) ON DUPLICATE KEY UPDATE `watermark`=VALUES(`watermark`)" % ( 
+                                                                          self.watermarksTableName, typeName, bucketLength, watermark ) )
+
+  def __resetCompactionWatermarks( self, typeName ):
+    return self._update( "DELETE FROM `%s` WHERE `name`='%s'" % ( self.watermarksTableName, typeName ) )
+
+  def __slicedCompactBucketsForType( self, typeName ):
+    """
+    Compact the buckets of a type in slices of CompactionSliceLength seconds. Each slice is
+    moved to the bigger buckets in its own transaction and then the watermark is stored, so an
+    interrupted compaction resumes from the last slice done
+    """
+    nowEpoch = int( Time.toEpoch() )
+    sliceLength = self.getCSOption( "CompactionSliceLength", 86400 )
+    sliceDelay = self.getCSOption( "CompactionSliceDelay", 0.5 )
+    #Rollups are compacted from the bucket table once it is done
+    bucketTables = self.__getBucketTables( typeName, withRollups = False )
+    numLevels = len( self.dbBucketsLength[ typeName ] ) - 1
+    for bPos in range( numLevels ):
       secondsLimit = self.dbBucketsLength[ typeName ][ bPos ][0]
       bucketLength = self.dbBucketsLength[ typeName ][ bPos ][1]
       timeLimit = ( nowEpoch - nowEpoch % bucketLength ) - secondsLimit
-      nextBucketLength = self.dbBucketsLength[ typeName ][ bPos + 1 ][1]
-      self.log.info( "[COMPACT] Compacting data newer that %s with bucket size %s" % ( Time.fromEpoch( timeLimit ), bucketLength ) )
-      #Retrieve the data
-      retVal = self.__selectForCompactBuckets( typeName, timeLimit, bucketLength, nextBucketLength )
+      retVal = self.__getCompactionWatermark( typeName, bucketLength, timeLimit )
       if not retVal[ 'OK' ]:
-        #self.__rollbackTransaction( connObj )
         return retVal
-      bucketsData = retVal[ 'Value' ]
-      self.log.info( "[COMPACT] Got %d records to compact" % len( bucketsData ) )
-      if len( bucketsData ) == 0:
-        continue
-      retVal = self.__deleteForCompactBuckets( typeName, timeLimit, bucketLength )
-      if not retVal[ 'OK' ]:
-        #self.__rollbackTransaction( connObj )
-        return retVal
-      self.log.info( "[COMPACT] Compacting %s records %s seconds size for %s" % ( len( bucketsData ), bucketLength, typeName ) )
-      #Add data
-      for record in bucketsData:
-        startTime = record[-2]
-        endTime = record[-1]
-        valuesList = record[:-2]
-        retVal = self.__splitInBuckets( typeName, startTime, endTime, valuesList )
+      sliceStart = retVal[ 'Value' ]
+      sliceStart -= sliceStart % bucketLength
+      bucketSliceLength = max( bucketLength, sliceLength - sliceLength % bucketLength )
+      numSlices = max( 0, ( timeLimit - sliceStart + bucketSliceLength - 1 ) / bucketSliceLength )
+      self.log.info( "[COMPACT] %s: compacting buckets of %s secs from %s to %s in %s slices" % ( typeName, bucketLength,
+                                                                                                 Time.fromEpoch( sliceStart ),
+                                                                                                 Time.fromEpoch( timeLimit ),
+                                                                                                 numSlices ) )
+      levelStart = time.time()
+      totalCompacted = 0
+      for iSlice in range( numSlices ):
+        sliceEnd = min( timeLimit, sliceStart + bucketSliceLength )
+        roundStart = time.time()
+        retVal = self.__compactSlice( typeName, bucketTables, bucketLength, sliceStart, sliceEnd )
         if not retVal[ 'OK' ]:
-          #self.__rollbackTransaction( connObj )
-          self.log.error( "[COMPACT] Error while compacting data for record in %s: %s" % ( typeName, retVal[ 'Value' ] ) )
-      self.log.info( "[COMPACT] Finished compaction %d of %d" % ( bPos, len( self.dbBucketsLength[ typeName ] ) - 1 ) )
-    #return self.__commitTransaction( connObj )
+          self.log.error( "[COMPACT] %s: can't compact slice %s -> %s: %s" % ( typeName, Time.fromEpoch( sliceStart ),
+                                                                            Time.fromEpoch( sliceEnd ), retVal[ 'Message' ] ) )
+          return retVal
+        numBuckets, numCompacted = retVal[ 'Value' ]
+        retVal = self.__setCompactionWatermark( typeName, bucketLength, sliceEnd )
+        if not retVal[ 'OK' ]:
+          return retVal
+        totalCompacted += numCompacted
+        gMonitor.addMark( "compactedbuckets", numCompacted )
+        elapsedTime = max( time.time() - roundStart, 0.001 )
+        self.log.info( "[COMPACT] %s: slice %d of %d, %d buckets into %d (took %.2f secs, %.1f buckets/sec)" % ( typeName,
+                                                                                                             iSlice + 1, numSlices,
+                                                                                                             numCompacted, numBuckets,
+                                                                                                             elapsedTime,
+                                                                                                             numCompacted / elapsedTime ) )
+        sliceStart = sliceEnd
+        #Give some room to the insertions
+        if sliceDelay and numCompacted:
+          time.sleep( sliceDelay )
+      self.__compactRollups( typeName, timeLimit, bucketLength )
+      elapsedTime = max( time.time() - levelStart, 0.001 )
+      self.log.info( "[COMPACT] %s: finished compaction %d of %d, %d buckets (took %.2f secs, %.1f buckets/sec)" % ( typeName,
+                                                                                                                  bPos + 1, numLevels,
+                                                                                                                  totalCompacted,
+                                                                                                                  elapsedTime,
+                                                                                                                  totalCompacted / elapsedTime ) )
     return S_OK()
 
-  def __slowCompactBucketsForType( self, typeName ):
+  def __compactSlice( self, typeName, bucketTables, bucketLength, sliceStart, sliceEnd ):
     """
-    Compact all buckets for a given type
+    Move the buckets of length bucketLength starting in [ sliceStart, sliceEnd ) to the buckets they should be in
+    Returns the number of buckets written and the number of buckets compacted
     """
-    nowEpoch = Time.toEpoch()
-    for bPos in range( len( self.dbBucketsLength[ typeName ] ) - 1 ):
-      self.log.info( "[COMPACT] Query %d of %d" % ( bPos, len( self.dbBucketsLength[ typeName ] ) - 1 ) )
-      secondsLimit = self.dbBucketsLength[ typeName ][ bPos ][0]
-      bucketLength = self.dbBucketsLength[ typeName ][ bPos ][1]
-      timeLimit = ( nowEpoch - nowEpoch % bucketLength ) - secondsLimit
-      nextBucketLength = self.dbBucketsLength[ typeName ][ bPos + 1 ][1]
-      self.log.info( "[COMPACT] Compacting data newer that %s with bucket size %s for %s" % ( Time.fromEpoch( timeLimit ), bucketLength, typeName ) )
-      querySize = 10000
-      previousRecordsSelected = querySize
-      totalCompacted = 0
-      while previousRecordsSelected == querySize:
-        #Retrieve the data
-        self.log.info( "[COMPACT] Retrieving buckets to compact newer that %s with size %s" % ( Time.fromEpoch( timeLimit ),
-                                                                                                       bucketLength ) )
-        roundStartTime = time.time()
-        result = self.__selectIndividualForCompactBuckets( typeName, timeLimit, bucketLength,
-                                                           nextBucketLength, querySize )
-        if not result[ 'OK' ]:
-          #self.__rollbackTransaction( connObj )
-          return result
-        bucketsData = result[ 'Value' ]
-        previousRecordsSelected = len( bucketsData )
-        selectEndTime = time.time()
-        self.log.info( "[COMPACT] Got %d buckets (%d done) (took %.2f secs)" % ( previousRecordsSelected,
-                                                                                 totalCompacted,
-                                                                                 selectEndTime - roundStartTime ) )
-        if len( bucketsData ) == 0:
-          break
-
-        result = self.__deleteIndividualForCompactBuckets( typeName, bucketsData )
-        if not result[ 'OK' ]:
-          #self.__rollbackTransaction( connObj )
-          return result
-        bucketsData = result[ 'Value' ]
-        deleteEndTime = time.time()
-        self.log.info( "[COMPACT] Deleted %s out-of-bounds buckets (took %.2f secs)" % ( len( bucketsData ),
-                                                                                         deleteEndTime - selectEndTime ) )
-        #Add data
-        for record in bucketsData:
-          startTime = record[-2]
-          endTime = record[-2] + record[-1]
-          valuesList = record[:-2]
-          retVal = self.__splitInBuckets( typeName, startTime, endTime, valuesList )
-          if not retVal[ 'OK' ]:
-            self.log.error( "[COMPACT] Error while compacting data for buckets in %s: %s" % ( typeName, retVal[ 'Value' ] ) )
-        totalCompacted += len( bucketsData )
-        insertElapsedTime = time.time() - deleteEndTime
-        self.log.info( "[COMPACT] Records compacted (took %.2f secs, %.2f secs/bucket)" % ( insertElapsedTime,
-                                                                                            insertElapsedTime / len( bucketsData ) ) )
-      self.log.info( "[COMPACT] Finised compaction %d of %d" % ( bPos, len( self.dbBucketsLength[ typeName ] ) - 1 ) )
-    #return self.__commitTransaction( connObj )
-    return S_OK()
+    tableName = bucketTables[0][0]
+    sqlFields = self.dbCatalog[ typeName ][ 'keys' ] + self.dbCatalog[ typeName ][ 'values' ] + [ 'entriesInBucket',
+                                                                                                 'startTime',
+                                                                                                 'bucketLength' ]
+    sqlCond = "`%s`.`startTime` >= %d AND `%s`.`startTime` < %d AND `%s`.`bucketLength` = %d" % ( tableName, sliceStart,
+                                                                                                 tableName, sliceEnd,
+                                                                                                 tableName, bucketLength )
+    retVal = self._getConnection()
+    if not retVal[ 'OK' ]:
+      return retVal
+    connObj = retVal[ 'Value' ]
+    try:
+      retVal = self.__startTransaction( connObj )
+      if not retVal[ 'OK' ]:
+        return retVal
+      retVal = self._query( "SELECT %s FROM `%s` WHERE %s FOR UPDATE" % ( ", ".join( [ "`%s`.`%s`" % ( tableName, field ) for field in sqlFields ] ),
+                                                                          tableName, sqlCond ), conn = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+      #Rows are converted to records spanning the bucket they come from
+      records = [ list( row[:-1] ) + [ row[-2] + row[-1] ] for row in retVal[ 'Value' ] ]
+      if not records:
+        self.__rollbackTransaction( connObj )
+        return S_OK( ( 0, 0 ) )
+      mergedBuckets = self.__mergeInBuckets( typeName, records, bucketTables, withEntries = True )[ tableName ]
+      retVal = self._update( "DELETE FROM `%s` WHERE %s" % ( tableName, sqlCond ), conn = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+      retVal = self.__writeMergedBuckets( typeName, bucketTables[0], mergedBuckets, connObj = connObj )
+      if not retVal[ 'OK' ]:
+        self.__rollbackTransaction( connObj )
+        return retVal
+      retVal = self.__commitTransaction( connObj )
+      if not retVal[ 'OK' ]:
+        return retVal
+    finally:
+      connObj.close()
+    return S_OK( ( len( mergedBuckets ), len( records ) ) )
 
-  def __selectIndividualForCompactBuckets( self, typeName, timeLimit, bucketLength, nextBucketLength, querySize, connObj = False ):
+  def __compactRollups( self, typeName, timeLimit, bucketLength ):
     """
-    Nasty SQL query to get ideal buckets using grouping by date calculations and adding value contents
+    Apply to the rollups of a type the compaction of the buckets older than timeLimit with
+    length bucketLength. Compacted rollup buckets are deleted and the bigger ones they went
+    to are aggregated again from the bucket table, as well as the buckets of that length
+    which are still there, like the ones inserted while the compaction was running
     """
-    tableName = _getTableName( "bucket", typeName )
-    selectSQL = "SELECT "
-    sqlSelectList = []
-    for field in self.dbCatalog[ typeName ][ 'keys' ]:
-      sqlSelectList.append( "`%s`.`%s`" % ( tableName, field ) )
-    for field in self.dbCatalog[ typeName ][ 'values' ]:
-      sqlSelectList.append( "`%s`.`%s`" % ( tableName, field ) )
-    sqlSelectList.append( "`%s`.`entriesInBucket`" % ( tableName ) )
-    sqlSelectList.append( "`%s`.`startTime`" % tableName )
-    sqlSelectList.append( "`%s`.bucketLength" % ( tableName ) )
-    selectSQL += ", ".join( sqlSelectList )
-    selectSQL += " FROM `%s`" % tableName
-    selectSQL += " WHERE `%s`.`startTime` < '%s' AND" % ( tableName, timeLimit )
-    selectSQL += " `%s`.`bucketLength` = %s" % ( tableName, bucketLength )
-    #MAGIC bucketing
-    selectSQL += " LIMIT %d" % querySize
-    return self._query( selectSQL, conn = connObj )
-
-  def __deleteIndividualForCompactBuckets( self, typeName, bucketsData, connObj = False ):
-    """
-    Delete compacted buckets
-    """
-    tableName = _getTableName( "bucket", typeName )
-    keyFields = self.dbCatalog[ typeName ][ 'keys' ]
-    deleteQueryLimit = 50
-    deletedBuckets = []
-    for bLimit in range( 0, len( bucketsData ) , deleteQueryLimit ):
-      delCondsSQL = []
-      for record in bucketsData[ bLimit : bLimit + deleteQueryLimit ]:
-        condSQL = []
-        for iPos in range( len( keyFields ) ):
-          field = keyFields[ iPos ]
-          condSQL.append( "`%s`.`%s` = %s" % ( tableName, field, record[ iPos ] ) )
-        condSQL.append( "`%s`.`startTime` = %d" % ( tableName, record[-2] ) )
-        condSQL.append( "`%s`.`bucketLength` = %d" % ( tableName, record[-1] ) )
-        delCondsSQL.append( "(%s)" % " AND ".join( condSQL ) )
-      delSQL = "DELETE FROM `%s` WHERE %s" % ( tableName, " OR ".join( delCondsSQL ) )
-      result = self._update( delSQL, conn = connObj )
-      if not result[ 'OK' ]:
-        self.log.error( "Cannot delete individual records for compaction", result[ 'Message' ] )
-      else:
-        deletedBuckets.extend( bucketsData[ bLimit : bLimit + deleteQueryLimit ] )
-    return S_OK( deletedBuckets )
+    largestBucketLength = max( [ bucketDef[1] for bucketDef in self.dbBucketsLength[ typeName ] ] )
+    for rollupName in self.dbCatalog[ typeName ][ 'rollups' ]:
+      tableName = _getTableName( "rollup", typeName, rollupName )
+      sqlCond = "`%s`.`startTime` < %d AND `%s`.`bucketLength` = %d" % ( tableName, timeLimit, tableName, bucketLength )
+      retVal = self._query( "SELECT MIN( `%s`.`startTime` ) FROM `%s` WHERE %s" % ( tableName, tableName, sqlCond ) )
+      if not retVal[ 'OK' ]:
+        self.log.error( "[COMPACT] Can't compact rollup %s of %s: %s" % ( rollupName, typeName, retVal[ 'Message' ] ) )
+        continue
+      firstTime = retVal[ 'Value' ][0][0]
+      if firstTime is None:
+        continue
+      firstTime = int( firstTime )
+      firstTime -= firstTime % largestBucketLength
+      bucketTableName = _getTableName( "bucket", typeName )
+      bucketCond = "`%s`.`startTime` >= %d AND `%s`.`startTime` < %d AND `%s`.`bucketLength` >= %d" % ( bucketTableName, firstTime,
+                                                                                                    bucketTableName, timeLimit,
+                                                                                                    bucketTableName, bucketLength )
+      retVal = self.__replaceRollup( typeName, rollupName, sqlCond, bucketCond )
+      if not retVal[ 'OK' ]:
+        self.log.error( "[COMPACT] Can't compact rollup %s of %s: %s" % ( rollupName, typeName, retVal[ 'Message' ] ) )
+        continue
+      self.log.info( "[COMPACT] Compacted rollup %s of %s" % ( rollupName, typeName ) )
 
   def __deleteRecordsOlderThanDataTimespan( self, typeName ):
     """
@@ -1386,8 +1846,11 @@ class AccountingDB( DB ):
     dataTimespan = self.dbCatalog[ typeName ][ 'dataTimespan' ]
     if dataTimespan < 86400 * 30:
       return
-    for table, field in ( ( _getTableName( "type", typeName ), 'endTime' ),
-                          ( _getTableName( "bucket", typeName ), 'startTime + bucketLength' ) ):
+    tablesToClean = [ ( _getTableName( "type", typeName ), 'endTime' ),
+                      ( _getTableName( "bucket", typeName ), 'startTime + bucketLength' ) ]
+    for rollupName in self.dbCatalog[ typeName ][ 'rollups' ]:
+      tablesToClean.append( ( _getTableName( "rollup", typeName, rollupName ), 'startTime + bucketLength' ) )
+    for table, field in tablesToClean:
       self.log.info( "[COMPACT] Deleting old records for table %s" % table )
       deleteLimit = 10000
       deleted = deleteLimit
@@ -1419,6 +1882,12 @@ class AccountingDB( DB ):
     retVal = self._update( "DELETE FROM `%s`" % _getTableName( "bucket", typeName ) )
     if not retVal[ 'OK' ]:
       return retVal
+    #The new buckets are not compacted
+    retVal = self.__resetCompactionWatermarks( typeName )
+    if not retVal[ 'OK' ]:
+      return retVal
+    #Rollups are regenerated from the buckets at the end
+    bucketTables = self.__getBucketTables( typeName, withRollups = False )
     #Generate the common part of the query
     #SELECT fields
     startTimeTableField = "`%s`.startTime" % rawTableName
@@ -1513,7 +1982,7 @@ class AccountingDB( DB ):
         startT = entry[0]
         endT = entry[1]
         values = entry[2:]
-        retVal = self.__splitInBuckets( typeName, startT, endT, values )
+        retVal = self.__splitInBuckets( typeName, startT, endT, values, bucketTables = bucketTables )
         if not retVal[ 'OK' ]:
           #self.__rollbackTransaction( connObj )
           return retVal
@@ -1528,7 +1997,7 @@ class AccountingDB( DB ):
                                                                                                             blockAvg, queryAvg,
                                                                                                             expectedEnd ) )
     #return self.__commitTransaction( connObj )
-    return S_OK()
+    return self.regenerateRollups( typeName )
 
 
   def __startTransaction( self, connObj ):
@@ -1549,7 +2018,7 @@ def _getTableName( tableType, typeName, keyName = None ):
   """
   if not keyName:
     return "ac_%s_%s" % ( tableType, typeName )
-  elif tableType == "key" :
+  elif tableType in ( "key", "rollup" ):
     return "ac_%s_%s_%s" % ( tableType, typeName, keyName )
   else:
     raise Exception( "Call to _getTableName with tableType as key but with no keyName" )
@@ -0,0 +1,241 @@
+# $HeadURL$
+""" Tests for the rollups of the AccountingDB. The SQL executed is recorded instead
+    of being sent to MySQL
+"""
+__RCSID__ = "$Id$"
+
+import time
+import unittest
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.AccountingSystem.DB.AccountingDB import AccountingDB
+
+TYPE_NAME = "Test_Job"
+
+class FakeAccountingDB( AccountingDB ):
+  """ AccountingDB without connection, returning self.results to the queries
+  """
+
+  def __init__( self ):
+    self.log = FakeLog()
+    self.maxBucketTime = 604800
+    self._AccountingDB__readOnly = False
+    self._AccountingDB__oldBucketMethod = False
+    self._AccountingDB__deadLockRetries = 2
+    self._AccountingDB__lastCompactionEpoch = 0
+    self._AccountingDB__keysCache = {}
+    self._AccountingDB__bulkRowsPerQuery = 1000
+    self.watermarksTableName = "ac_catalog_CompactionWatermarks"
+    self.dbCatalog = {}
+    self.dbBucketsLength = {}
+    self.executed = []
+    self.results = {}
+    self.updateErrors = {}
+    self.createdTables = {}
+
+  def _query( self, cmd, conn = False ):
+    self.executed.append( cmd )
+    for prefix in self.results:
+      if cmd.find( prefix ) == 0:
+        return S_OK( self.results[ prefix ] )
+    return S_OK( [] )
+
+  def getCSOption( self, optionName, defaultValue = None ):
+    return { 'CompactionSliceDelay' : 0 }.get( optionName, defaultValue )
+
+  def _update( self, cmd, conn = False ):
+    self.executed.append( cmd )
+    for prefix in self.updateErrors:
+      if cmd.find( prefix ) == 0 and self.updateErrors[ prefix ]:
+        return S_ERROR( self.updateErrors[ prefix ].pop( 0 ) )
+    return S_OK( 1 )
+
+  def _escapeString( self, value ):
+    return S_OK( "'%s'" % value )
+
+  def _escapeValues( self, values ):
+    return S_OK( [ "'%s'" % value for value in values ] )
+
+  def _getConnection( self ):
+    return S_OK( FakeConnection() )
+
+  def _createTables( self, tables ):
+    self.createdTables.update( tables )
+    return S_OK()
+
+class FakeConnection:
+
+  def close( self ):
+    pass
+
+class FakeLog:
+
+  def __getattr__( self, name ):
+    return lambda *args, **kwargs: None
+
+class RollupsTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.db = FakeAccountingDB()
+    self.db._AccountingDB__addToCatalog( TYPE_NAME, [ 'User', 'Site', 'JobType' ],
+                                         [ 'CPUTime', 'ExecTime' ], [ ( 86400 * 8, 3600 ), ( 15552000, 86400 ) ] )
+    self.db._AccountingDB__registerRollups( TYPE_NAME, { 'BySite' : 'Site',
+                                                         'BySiteType' : 'JobType, Site' }, [] )
+    self.db.executed = []
+
+  def test_register( self ):
+    self.assertEqual( self.db.dbCatalog[ TYPE_NAME ][ 'rollups' ], { 'BySite' : [ 'Site' ],
+                                                                     'BySiteType' : [ 'Site', 'JobType' ] } )
+    table = self.db.createdTables[ 'ac_rollup_Test_Job_BySite' ]
+    self.assertEqual( table[ 'UniqueIndexes' ][ 'UniqueConstraint' ], [ 'Site', 'startTime', 'bucketLength' ] )
+    self.assert_( 'User' not in table[ 'Fields' ] )
+    #Stale rollups are dropped, tables of other types with the same prefix are not
+    db = FakeAccountingDB()
+    db.dbCatalog[ TYPE_NAME ] = self.db.dbCatalog[ TYPE_NAME ]
+    db.results[ 'SHOW COLUMNS' ] = [ ( 'Site', ), ( 'CPUTime', ), ( 'startTime', ) ]
+    db._AccountingDB__registerRollups( TYPE_NAME, { 'BySite' : 'Site' },
+                                       [ 'ac_rollup_Test_Job_BySite', 'ac_rollup_Test_Job_ByUser',
+                                         'ac_rollup_Test_Job_Step_BySite' ] )
+    self.assertEqual( db.dbCatalog[ TYPE_NAME ][ 'rollups' ], { 'BySite' : [ 'Site' ] } )
+    self.assertEqual( db.createdTables, {} )
+    self.assertEqual( [ cmd for cmd in db.executed if cmd.find( "DROP" ) == 0 ],
+                      [ "DROP TABLE `ac_rollup_Test_Job_ByUser`" ] )
+
+  def test_write( self ):
+    startTime = int( time.time() ) - int( time.time() ) % 3600 - 7200
+    result = self.db._AccountingDB__splitInBuckets( TYPE_NAME, startTime, startTime, [ 1, 2, 3, 10, 20, 1 ] )
+    self.assert_( result[ 'OK' ] )
+    inserts = {}
+    for cmd in self.db.executed:
+      inserts[ cmd.split( "`" )[1] ] = cmd
+    self.assertEqual( sorted( inserts ), [ 'ac_bucket_Test_Job', 'ac_rollup_Test_Job_BySite', 'ac_rollup_Test_Job_BySiteType' ] )
+    self.assert_( inserts[ 'ac_rollup_Test_Job_BySite' ].find( "VALUES ( %s, 3600, (1*1), 2, (10*1), (20*1) )" % startTime ) > -1 )
+    #Deletions are applied to the rollups too
+    self.db.executed = []
+    result = self.db._AccountingDB__deleteFromBuckets( TYPE_NAME, startTime, startTime, [ 1, 2, 3, 10, 20, 1 ], 1 )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( len( self.db.executed ), 3 )
+    self.assert_( " ".join( self.db.executed ).find( "`ac_rollup_Test_Job_BySiteType`.`JobType` = '3'" ) > -1 )
+
+  def test_query( self ):
+    #Grouping by site can be done with the smallest rollup
+    self.db.retrieveBucketedData( TYPE_NAME, 0, 86400, [ "%s, SUM(%s)", [ 'Site', 'CPUTime' ] ], {},
+                                  [ "%s", [ 'Site' ] ], False )
+    self.assert_( self.db.executed[-1].find( "FROM `ac_rollup_Test_Job_BySite`" ) > -1 )
+    self.db.retrieveBucketedData( TYPE_NAME, 0, 86400, [ "%s, SUM(%s)", [ 'Site', 'CPUTime' ] ], { 'JobType' : [ 'MC' ] },
+                                  [ "%s", [ 'Site' ] ], False )
+    self.assert_( self.db.executed[-1].find( "FROM `ac_rollup_Test_Job_BySiteType`" ) > -1 )
+    #User is in no rollup
+    self.db.retrieveBucketedData( TYPE_NAME, 0, 86400, [ "%s, SUM(%s)", [ 'Site', 'CPUTime' ] ], { 'User' : [ 'someone' ] },
+                                  [ "%s", [ 'Site' ] ], False )
+    self.assert_( self.db.executed[-1].find( "FROM `ac_bucket_Test_Job`" ) > -1 )
+    self.assert_( self.db.executed[-1].find( "rollup" ) == -1 )
+
+  def test_compact( self ):
+    self.db.results[ 'SELECT MIN' ] = [ ( 90000, ) ]
+    self.db._AccountingDB__compactRollups( TYPE_NAME, 200000, 3600 )
+    rollupCmds = [ cmd for cmd in self.db.executed if cmd.find( "ac_rollup_Test_Job_BySite`" ) > -1 ]
+    self.assertEqual( len( rollupCmds ), 3 )
+    self.assert_( rollupCmds[1].find( "DELETE" ) == 0 )
+    self.assert_( rollupCmds[2].find( "`ac_bucket_Test_Job`.`startTime` >= 86400 AND" ) > -1 )
+    #Buckets of the compacted length left below the limit are not lost
+    self.assert_( rollupCmds[2].find( "`ac_bucket_Test_Job`.`bucketLength` >= 3600" ) > -1 )
+    self.assert_( rollupCmds[2].find( "ON DUPLICATE KEY UPDATE `CPUTime`=VALUES(`CPUTime`)" ) > -1 )
+    #The deletion and the aggregation go in the same transaction
+    deletePos = self.db.executed.index( rollupCmds[1] )
+    self.assertEqual( self.db.executed[ deletePos - 1 : deletePos + 3 ], [ "START TRANSACTION", rollupCmds[1],
+                                                                             rollupCmds[2], "COMMIT" ] )
+
+  def test_regenerate( self ):
+    self.db.updateErrors[ 'INSERT INTO `ac_rollup_Test_Job_BySite`' ] = [ "Lost connection" ]
+    result = self.db.regenerateRollups( TYPE_NAME, 'BySite' )
+    self.failIf( result[ 'OK' ] )
+    self.assertEqual( self.db.executed, [ "START TRANSACTION", "DELETE FROM `ac_rollup_Test_Job_BySite`",
+                                          self.db.executed[2], "ROLLBACK" ] )
+    self.db.executed = []
+    result = self.db.regenerateRollups( TYPE_NAME, 'BySite' )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( self.db.executed[-1], "COMMIT" )
+
+  def test_bulkInsertion( self ):
+    for keyName, keyIds in ( ( 'User', { 'u1' : 1, 'u2' : 2 } ), ( 'Site', { 'S1' : 5 } ), ( 'JobType', { 'MC' : 7 } ) ):
+      self.db._AccountingDB__keysCache.setdefault( TYPE_NAME, {} )[ keyName ] = keyIds
+    startTime = int( time.time() ) - int( time.time() ) % 3600 - 7200
+    records = [ ( startTime, startTime + 600, [ 'u1', 'S1', 'MC', 10, 20 ] ),
+                ( startTime + 600, startTime + 1200, [ 'u1', 'S1', 'MC', 5, 5 ] ),
+                ( startTime, startTime + 3600, [ 'u2', 'S1', 'MC', 1, 1 ] ) ]
+    result = self.db.insertRecordBundleDirectly( TYPE_NAME, records )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'Value' ], 3 )
+    #The key values of the caller are not replaced
+    self.assertEqual( records[0][2][0], 'u1' )
+    inserts = {}
+    for cmd in self.db.executed:
+      if cmd.find( "INSERT" ) == 0:
+        inserts[ cmd.split( "`" )[1] ] = cmd
+    self.assertEqual( self.db.executed[0], "START TRANSACTION" )
+    self.assertEqual( self.db.executed[-1], "COMMIT" )
+    self.assertEqual( len( inserts ), 4 )
+    #One row per record in the type table
+    self.assertEqual( inserts[ 'ac_type_Test_Job' ].count( "( '" ), 3 )
+    #Records in the same bucket are merged
+    bucketCmd = inserts[ 'ac_bucket_Test_Job' ]
+    self.assert_( bucketCmd.find( "( %s, 3600, 1, 5, 7, 15.0, 25.0, 2.0 )" % startTime ) > -1 )
+    self.assert_( bucketCmd.find( "( %s, 3600, 2, 5, 7, 1.0, 1.0, 1.0 )" % startTime ) > -1 )
+    self.assert_( bucketCmd.find( "ON DUPLICATE KEY UPDATE `CPUTime`=`CPUTime`+VALUES(`CPUTime`)" ) > -1 )
+    self.assertEqual( inserts[ 'ac_rollup_Test_Job_BySite' ].count( "( %s" % startTime ), 1 )
+    self.assert_( inserts[ 'ac_rollup_Test_Job_BySite' ].find( "( %s, 3600, 5, 16.0, 26.0, 3.0 )" % startTime ) > -1 )
+
+  def test_bulkInsertionDeadLock( self ):
+    for keyName, keyIds in ( ( 'User', { 'u1' : 1 } ), ( 'Site', { 'S1' : 5 } ), ( 'JobType', { 'MC' : 7 } ) ):
+      self.db._AccountingDB__keysCache.setdefault( TYPE_NAME, {} )[ keyName ] = keyIds
+    startTime = int( time.time() ) - int( time.time() ) % 3600 - 7200
+    records = [ ( startTime, startTime + 600, [ 'u1', 'S1', 'MC', 10, 20 ] ) ]
+    deadLock = "Deadlock found when trying to get lock; try restarting transaction"
+    #The transaction rolled back by the dead lock is restarted from the type rows
+    self.db.updateErrors[ 'INSERT INTO `ac_bucket_Test_Job`' ] = [ deadLock ]
+    result = self.db.insertRecordBundleDirectly( TYPE_NAME, records )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( self.db.executed.count( "START TRANSACTION" ), 2 )
+    self.assertEqual( len( [ cmd for cmd in self.db.executed if cmd.find( "INSERT INTO `ac_type_Test_Job`" ) == 0 ] ), 2 )
+    self.assertEqual( self.db.executed.count( "COMMIT" ), 1 )
+    #Once the retries are exhausted the error goes back to the caller, nothing is committed
+    self.db.executed = []
+    self.db.updateErrors[ 'INSERT INTO `ac_bucket_Test_Job`' ] = [ deadLock, deadLock ]
+    result = self.db.insertRecordBundleDirectly( TYPE_NAME, records )
+    self.failIf( result[ 'OK' ] )
+    self.assertEqual( self.db.executed.count( "COMMIT" ), 0 )
+    self.assertEqual( self.db.executed.count( "ROLLBACK" ), 2 )
+
+  def test_slicedCompaction( self ):
+    now = int( time.time() )
+    timeLimit = now - now % 3600 - 86400 * 8
+    firstTime = timeLimit - 86400 * 2 - 7200
+    self.db.results[ 'SELECT `watermark`' ] = []
+    self.db.results[ 'SELECT MIN( `startTime` ) FROM `ac_bucket' ] = [ ( firstTime, ) ]
+    self.db.results[ 'SELECT MIN( `ac_rollup' ] = [ ( None, ) ]
+    self.db.results[ 'SELECT `ac_bucket_Test_Job`' ] = [ ( 1, 2, 3, 10, 20, 2, firstTime, 3600 ),
+                                                         ( 1, 2, 3, 5, 5, 1, firstTime + 3600, 3600 ) ]
+    result = self.db._AccountingDB__slicedCompactBucketsForType( TYPE_NAME )
+    self.assert_( result[ 'OK' ] )
+    watermarks = [ cmd for cmd in self.db.executed if cmd.find( "INSERT INTO `ac_catalog_CompactionWatermarks`" ) == 0 ]
+    self.assertEqual( len( watermarks ), 3 )
+    self.assert_( watermarks[-1].find( "'%s', 3600, %d )" % ( TYPE_NAME, timeLimit ) ) > -1 )
+    #Each slice goes in its own transaction
+    deletes = [ cmd for cmd in self.db.executed if cmd.find( "DELETE FROM `ac_bucket_Test_Job`" ) == 0 ]
+    self.assertEqual( len( deletes ), 3 )
+    self.assert_( deletes[0].find( "`startTime` >= %d AND `ac_bucket_Test_Job`.`startTime` < %d" % ( firstTime,
+                                                                                                    firstTime + 86400 ) ) > -1 )
+    self.assertEqual( self.db.executed.count( "COMMIT" ), 3 )
+    inserts = [ cmd for cmd in self.db.executed if cmd.find( "INSERT INTO `ac_bucket_Test_Job`" ) == 0 ]
+    self.assert_( inserts[0].find( "( %d, 86400, 1, 2, 3, 15.0, 25.0, 3.0 )" % ( firstTime - firstTime % 86400 ) ) > -1 )
+    #A stored watermark is where the next compaction starts
+    self.db.executed = []
+    self.db.results[ 'SELECT `watermark`' ] = [ ( timeLimit - 3600, ) ]
+    result = self.db._AccountingDB__slicedCompactBucketsForType( TYPE_NAME )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( len( [ cmd for cmd in self.db.executed if cmd.find( "DELETE FROM `ac_bucket_Test_Job`" ) == 0 ] ), 1 )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( RollupsTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
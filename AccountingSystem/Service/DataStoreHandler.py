@@ -78,6 +78,24 @@ class DataStoreHandler( RequestHandler ):
       return S_ERROR( "Error while recalculating buckets for type:\n %s" % "\n ".join( errorsList ) )
     return S_OK()
 
+  types_regenerateRollups = [ types.StringType ]
+  def export_regenerateRollups( self, typeName, rollupName = False ):
+    """
+      Recalculate the rollups of a type from its buckets. (Only for all powerful admins)
+    """
+    retVal = gConfig.getSections( "/DIRAC/Setups" )
+    if not retVal[ 'OK' ]:
+      return retVal
+    errorsList = []
+    for setup in retVal[ 'Value' ]:
+      setupTypeName = "%s_%s" % ( setup, typeName )
+      retVal = gAccountingDB.regenerateRollups( setupTypeName, rollupName )
+      if not retVal[ 'OK' ]:
+        errorsList.append( retVal[ 'Message' ] )
+    if errorsList:
+      return S_ERROR( "Error while recalculating rollups for type:\n %s" % "\n ".join( errorsList ) )
+    return S_OK()
+
   types_getRegisteredTypes = []
   def export_getRegisteredTypes( self ):
     """
@@ -42,6 +42,9 @@ def initializeReportGeneratorHandler( serviceInfo ):
     gLogger.fatal( "Can't write to %s" % dataPath )
     return S_ERROR( "Data location is not writable" )
   gDataCache.setGraphsLocation( dataPath )
+  gDataCache.setCacheLimits( gConfig.getValue( "%s/DataCacheSizeMiB" % reportSection, 128 ) * 1048576,
+                             gConfig.getValue( "%s/PlotCacheSizeMiB" % reportSection, 512 ) * 1048576,
+                             gConfig.getValue( "%s/TimedRowsCacheSizeMiB" % reportSection, 128 ) * 1048576 )
   gMonitor.registerActivity( "plotsDrawn", "Drawn plot images", "Accounting reports", "plots", gMonitor.OP_SUM )
   gMonitor.registerActivity( "reportsRequested", "Generated reports", "Accounting reports", "reports", gMonitor.OP_SUM )
   return S_OK()
@@ -169,6 +172,14 @@ class ReportGeneratorHandler( RequestHandler ):
       return retVal
     return policyFilter.filterListingValues( credDict, retVal[ 'Value' ] )
 
+  types_getCacheStats = []
+  def export_getCacheStats( self ):
+    """
+    Get the hits, misses, coalesced requests and size of the report data, plot
+    and historical rows caches
+    """
+    return gDataCache.getStats()
+
   def __generatePlotFromFileId( self, fileId ):
     result = extractRequestFromFileId( fileId )
     if not result[ 'OK' ]:
@@ -42,6 +42,18 @@ class DBUtils:
     connObj = retVal[ 'Value' ]
     return self._acDB.retrieveBucketedData( typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields, connObj = connObj )
 
+  def _getBucketedQueryLimits( self, typeName, startTime, endTime ):
+    """
+    Get the startTime of the first and last buckets _retrieveBucketedData returns
+    for a time span
+    """
+    typeName = "%s_%s" % ( self._setup, typeName )
+    return self._acDB.getBucketedQueryLimits( typeName, startTime, endTime )
+
+  def _getBucketsDef( self, typeName ):
+    typeName = "%s_%s" % ( self._setup, typeName )
+    return self._acDB.getBucketsDef( typeName )
+
   def _getUniqueValues( self, typeName, startTime, endTime, condDict, fieldList ):
     stringList = [ "%s" for field in fieldList ]
     return self._retrieveBucketedData( typeName,
@@ -3,11 +3,198 @@ __RCSID__ = "$Id$"
 
 import os
 import os.path
+import sys
 import time
+import types
 import threading
 
 from DIRAC import S_OK, S_ERROR, gLogger, rootPath, gConfig
-from DIRAC.Core.Utilities.DictCache import DictCache
+
+
+def _estimateSize( obj ):
+  """
+  Rough estimation of the memory used by a report, walking containers
+  """
+  size = sys.getsizeof( obj )
+  if type( obj ) == types.DictType:
+    for key in obj:
+      size += _estimateSize( key ) + _estimateSize( obj[ key ] )
+  elif type( obj ) in ( types.ListType, types.TupleType ):
+    for item in obj:
+      size += _estimateSize( item )
+  return size
+
+
+class ReportCache:
+  """
+  LRU cache of generated reports, bounded by the size of its contents.
+  Concurrent requests for a report being generated wait for it instead of
+  generating it again.
+  """
+
+  def __init__( self, lifeTime, maxBytes = 0, deleteFunction = False, sizeFunction = _estimateSize ):
+    self.__lifeTime = lifeTime
+    self.__maxBytes = maxBytes
+    self.__deleteFunction = deleteFunction
+    self.__sizeFunction = sizeFunction
+    self.__lock = threading.Lock()
+    # key -> [ expiration, last access, size, value ]
+    self.__entries = {}
+    self.__running = {}
+    self.__totalBytes = 0
+    self.__accessCounter = 0
+    self.__stats = { 'hits' : 0, 'misses' : 0, 'coalesced' : 0, 'evicted' : 0 }
+
+  def setMaxBytes( self, maxBytes ):
+    self.__lock.acquire()
+    try:
+      self.__maxBytes = maxBytes
+      self.__makeRoom( 0 )
+    finally:
+      self.__lock.release()
+
+  def get( self, key, generateFunc ):
+    """
+    Get the value for key, calling generateFunc() to get it if not cached.
+    Only successful results are kept.
+    """
+    self.__lock.acquire()
+    try:
+      entry = self.__entries.get( key )
+      if entry and entry[0] > time.time():
+        self.__accessCounter += 1
+        entry[1] = self.__accessCounter
+        self.__stats[ 'hits' ] += 1
+        return S_OK( entry[3] )
+      if entry:
+        self.__remove( key )
+      flight = self.__running.get( key )
+      owner = flight is None
+      if owner:
+        flight = { 'event' : threading.Event(), 'result' : None }
+        self.__running[ key ] = flight
+        self.__stats[ 'misses' ] += 1
+      else:
+        self.__stats[ 'coalesced' ] += 1
+    finally:
+      self.__lock.release()
+
+    if not owner:
+      flight[ 'event' ].wait()
+      return flight[ 'result' ]
+
+    result = None
+    try:
+      try:
+        result = generateFunc()
+      except Exception, e:
+        gLogger.exception( "Exception while generating report" )
+        result = S_ERROR( "Exception while generating report: %s" % str( e ) )
+    finally:
+      flight[ 'result' ] = result
+      self.__lock.acquire()
+      try:
+        del( self.__running[ key ] )
+        if result and result[ 'OK' ]:
+          self.__store( key, result[ 'Value' ] )
+      finally:
+        self.__lock.release()
+      flight[ 'event' ].set()
+    return result
+
+  def getCached( self, key ):
+    """
+    Get the value for key if it is cached, None otherwise
+    """
+    self.__lock.acquire()
+    try:
+      entry = self.__entries.get( key )
+      if entry and entry[0] > time.time():
+        self.__accessCounter += 1
+        entry[1] = self.__accessCounter
+        self.__stats[ 'hits' ] += 1
+        return entry[3]
+      if entry:
+        self.__remove( key )
+      self.__stats[ 'misses' ] += 1
+      return None
+    finally:
+      self.__lock.release()
+
+  def store( self, key, value ):
+    """
+    Cache a value, replacing the previous one for key
+    """
+    self.__lock.acquire()
+    try:
+      if key in self.__entries:
+        self.__remove( key )
+      self.__store( key, value )
+    finally:
+      self.__lock.release()
+
+  def __store( self, key, value ):
+    try:
+      size = self.__sizeFunction( value )
+    except Exception, e:
+      gLogger.warn( "Cannot evaluate size of cached report", str( e ) )
+      size = 0
+    if self.__maxBytes and size > self.__maxBytes:
+      gLogger.verbose( "Report too big to be cached", "(%s bytes)" % size )
+      if self.__deleteFunction:
+        self.__deleteFunction( value )
+      return
+    self.__makeRoom( size )
+    self.__accessCounter += 1
+    self.__entries[ key ] = [ time.time() + self.__lifeTime, self.__accessCounter, size, value ]
+    self.__totalBytes += size
+
+  def __makeRoom( self, size ):
+    if not self.__maxBytes or self.__totalBytes + size <= self.__maxBytes:
+      return
+    self.__purgeExpired()
+    if self.__totalBytes + size <= self.__maxBytes:
+      return
+    lruKeys = [ ( self.__entries[ key ][1], key ) for key in self.__entries ]
+    lruKeys.sort()
+    for _access, key in lruKeys:
+      if self.__totalBytes + size <= self.__maxBytes:
+        break
+      self.__remove( key )
+      self.__stats[ 'evicted' ] += 1
+
+  def __remove( self, key ):
+    entry = self.__entries.pop( key )
+    self.__totalBytes -= entry[2]
+    if self.__deleteFunction:
+      self.__deleteFunction( entry[3] )
+
+  def __purgeExpired( self ):
+    now = time.time()
+    for key in [ key for key in self.__entries if self.__entries[ key ][0] <= now ]:
+      self.__remove( key )
+
+  def purgeExpired( self ):
+    self.__lock.acquire()
+    try:
+      self.__purgeExpired()
+    finally:
+      self.__lock.release()
+
+  def getStats( self ):
+    """
+    Hits, misses, coalesced requests and evictions since the start plus
+    the number of entries and their size
+    """
+    self.__lock.acquire()
+    try:
+      stats = dict( self.__stats )
+      stats[ 'entries' ] = len( self.__entries )
+      stats[ 'bytes' ] = self.__totalBytes
+      stats[ 'maxBytes' ] = self.__maxBytes
+      return stats
+    finally:
+      self.__lock.release()
 
 
 class DataCache:
@@ -19,10 +206,14 @@ class DataCache:
     self.purgeThread = threading.Thread( target = self.purgeExpired )
     self.purgeThread.setDaemon( 1 )
     self.purgeThread.start()
-    self.__dataCache = DictCache()
-    self.__graphCache = DictCache( deleteFunction = self._deleteGraph )
     self.__dataLifeTime = 600
     self.__graphLifeTime = 3600
+    self.__dataCache = ReportCache( self.__dataLifeTime, 128 * 1048576 )
+    self.__graphCache = ReportCache( self.__graphLifeTime, 512 * 1048576,
+                                     deleteFunction = self._deleteGraph, sizeFunction = self._getGraphSize )
+    # Rows of buckets that will not change anymore, see BaseReporter._getTimedData
+    self.__timedRowsLifeTime = 86400
+    self.__timedRowsCache = ReportCache( self.__timedRowsLifeTime, 128 * 1048576 )
 
   def setGraphsLocation( self, graphsDir ):
     self.graphsLocation = graphsDir
@@ -32,31 +223,51 @@ class DataCache:
         gLogger.verbose( "Purging %s" % graphLocation )
         os.unlink( graphLocation )
 
+  def setCacheLimits( self, maxDataBytes, maxGraphBytes, maxTimedRowsBytes = False ):
+    """
+    Set the max size of the cached report data ( in memory ) and plots ( on disk )
+    """
+    self.__dataCache.setMaxBytes( maxDataBytes )
+    self.__graphCache.setMaxBytes( maxGraphBytes )
+    if maxTimedRowsBytes:
+      self.__timedRowsCache.setMaxBytes( maxTimedRowsBytes )
+
+  def getStats( self ):
+    return S_OK( { 'data' : self.__dataCache.getStats(),
+                   'plots' : self.__graphCache.getStats(),
+                   'timedRows' : self.__timedRowsCache.getStats() } )
+
+  def getTimedRows( self, rowsKey ):
+    """
+    Get the cached rows for a timed query, None if there are none
+    """
+    return self.__timedRowsCache.getCached( rowsKey )
+
+  def setTimedRows( self, rowsKey, rowsDict ):
+    """
+    Keep the rows of a timed query. rowsDict is { 'from', 'to', 'rows' }
+    with the rows of buckets starting in [ from, to )
+    """
+    self.__timedRowsCache.store( rowsKey, rowsDict )
+
   def purgeExpired( self ):
     while self.alive:
       time.sleep( 600 )
       self.__graphCache.purgeExpired()
       self.__dataCache.purgeExpired()
+      self.__timedRowsCache.purgeExpired()
 
   def getReportData( self, reportRequest, reportHash, dataFunc ):
     """
     Get report data from cache if exists, else generate it
     """
-    reportData = self.__dataCache.get( reportHash )
-    if reportData == False:
-      retVal = dataFunc( reportRequest )
-      if not retVal[ 'OK' ]:
-        return retVal
-      reportData = retVal[ 'Value' ]
-      self.__dataCache.add( reportHash, self.__dataLifeTime, reportData )
-    return S_OK( reportData )
+    return self.__dataCache.get( reportHash, lambda: dataFunc( reportRequest ) )
 
   def getReportPlot( self, reportRequest, reportHash, reportData, plotFunc ):
     """
     Get report data from cache if exists, else generate it
     """
-    plotDict = self.__graphCache.get( reportHash )
-    if plotDict == False:
+    def generatePlot():
       basePlotFileName = "%s/%s" % ( self.graphsLocation, reportHash )
       retVal = plotFunc( reportRequest, reportData, basePlotFileName )
       if not retVal[ 'OK' ]:
@@ -66,8 +277,13 @@ class DataCache:
         plotDict[ 'plot' ] = "%s.png" % reportHash
       if plotDict[ 'thumbnail' ]:
         plotDict[ 'thumbnail' ] = "%s.thb.png" % reportHash
-      self.__graphCache.add( reportHash, self.__graphLifeTime, plotDict )
-    return S_OK( plotDict )
+      return S_OK( plotDict )
+
+    retVal = self.__graphCache.get( reportHash, generatePlot )
+    if not retVal[ 'OK' ]:
+      return retVal
+    # Callers add things to the dict, do not let them touch the cached one
+    return S_OK( dict( retVal[ 'Value' ] ) )
 
   def getPlotData( self, plotFileName ):
     filename = "%s/%s" % ( self.graphsLocation, plotFileName )
@@ -79,6 +295,15 @@ class DataCache:
       return S_ERROR( "Can't open file %s: %s" % ( plotFileName, str( e ) ) )
     return S_OK( data )
 
+  def _getGraphSize( self, plotDict ):
+    size = 0
+    for key in ( 'plot', 'thumbnail' ):
+      if plotDict.get( key ):
+        fPath = os.path.join( self.graphsLocation, str( plotDict[ key ] ) )
+        if os.path.isfile( fPath ):
+          size += os.path.getsize( fPath )
+    return size
+
   def _deleteGraph( self, plotDict ):
     try:
       for key in plotDict:
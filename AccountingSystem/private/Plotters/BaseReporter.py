@@ -2,6 +2,7 @@ import time, copy, types
 from DIRAC import S_OK, S_ERROR, gLogger
 from DIRAC.AccountingSystem.private.DBUtils import DBUtils
 from DIRAC.AccountingSystem.private.DataCache import gDataCache
+from DIRAC.AccountingSystem.private import TimedMatrix
 from DIRAC.Core.Utilities import Time
 from DIRAC.AccountingSystem.private.Plots import generateNoDataPlot, generateTimedStackedBarPlot, generateQualityPlot, generateCumulativePlot, generatePiePlot, generateStackedLinePlot
 
@@ -130,6 +131,19 @@ class BaseReporter( DBUtils ):
 ###
 
   def _getTimedData( self, startTime, endTime, selectFields, preCondDict, groupingFields, metadataDict ):
+    """
+    Get the timed data as { group : { epoch : [ field1, field2... ] } }
+    """
+    retVal = self._getTimedMatrix( startTime, endTime, selectFields, preCondDict, groupingFields, metadataDict )
+    if not retVal[ 'OK' ]:
+      return retVal
+    dataMatrix, coarsestGranularity = retVal[ 'Value' ]
+    return S_OK( ( dataMatrix.toDict( fieldsAsList = True ), coarsestGranularity ) )
+
+  def _getTimedMatrix( self, startTime, endTime, selectFields, preCondDict, groupingFields, metadataDict ):
+    """
+    Get the timed data as a TimedMatrix of groups x time bins x fields
+    """
     condDict = {}
     #Check params
     if not self._PARAM_CHECK_FOR_NONE in metadataDict:
@@ -145,32 +159,97 @@ class BaseReporter( DBUtils ):
       if keyword in preCondDict:
         condDict[ keyword ] = preCondDict[ keyword ]
     #Query!
-    timeGrouping = ( "%%s, %s" % groupingFields[0], [ 'startTime' ] + groupingFields[1] )
-    retVal = self._retrieveBucketedData( self._typeName,
-                                          startTime,
-                                          endTime,
-                                          selectFields,
-                                          condDict,
-                                          timeGrouping,
-                                          ( '%s', [ 'startTime' ] )
-                                          )
+    retVal = self.__retrieveTimedRows( startTime, endTime, selectFields, condDict, groupingFields )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict = self._groupByField( 0, retVal[ 'Value' ] )
     coarsestGranularity = self._getBucketLengthForTime( self._typeName, startTime )
-    #Transform!
-    for keyField in dataDict:
-      if metadataDict[ self._PARAM_CHECK_FOR_NONE ]:
-        dataDict[ keyField ] = self._convertNoneToZero( dataDict[ keyField ] )
-      if metadataDict[ self._PARAM_CONVERT_TO_GRANULARITY ] == "average":
-        dataDict[ keyField ] = self._averageToGranularity( coarsestGranularity, dataDict[ keyField ] )
-      if metadataDict[ self._PARAM_CONVERT_TO_GRANULARITY ] == "sum":
-        dataDict[ keyField ] = self._sumToGranularity( coarsestGranularity, dataDict[ keyField ] )
-      if self._PARAM_CONSOLIDATION_FUNCTION in metadataDict:
-        dataDict[ keyField ] = self._executeConsolidation( metadataDict[ self._PARAM_CONSOLIDATION_FUNCTION ], dataDict[ keyField ] )
+    #Transform! None values are always taken as 0
+    dataMatrix = TimedMatrix.fromBucketRows( retVal[ 'Value' ], coarsestGranularity,
+                                             average = metadataDict[ self._PARAM_CONVERT_TO_GRANULARITY ] == "average" )
+    if self._PARAM_CONSOLIDATION_FUNCTION in metadataDict:
+      functor = metadataDict[ self._PARAM_CONSOLIDATION_FUNCTION ]
+      functorCode = getattr( functor, 'im_func', None )
+      if functorCode is BaseReporter._averageConsolidation.im_func:
+        dataMatrix.consolidate( TimedMatrix.averageConsolidation )
+      elif functorCode is BaseReporter._efficiencyConsolidation.im_func:
+        dataMatrix.consolidate( TimedMatrix.efficiencyConsolidation )
+      else:
+        dataMatrix.consolidateByBin( functor )
     if metadataDict[ self._PARAM_CALCULATE_PROPORTIONAL_GAUGES ]:
-      dataDict = self._calculateProportionalGauges( dataDict )
-    return S_OK( ( dataDict, coarsestGranularity ) )
+      dataMatrix.calculateProportionalGauges()
+    return S_OK( ( dataMatrix, coarsestGranularity ) )
+
+  def __queryTimedRows( self, startTime, endTime, selectFields, condDict, groupingFields ):
+    timeGrouping = ( "%%s, %s" % groupingFields[0], [ 'startTime' ] + list( groupingFields[1] ) )
+    return self._retrieveBucketedData( self._typeName,
+                                       startTime,
+                                       endTime,
+                                       ( selectFields[0], list( selectFields[1] ) ),
+                                       dict( condDict ),
+                                       timeGrouping,
+                                       ( '%s', [ 'startTime' ] )
+                                       )
+
+  def __retrieveTimedRows( self, startTime, endTime, selectFields, condDict, groupingFields ):
+    """
+    Get one row per bucket and group: ( grouping value, bucket startTime, ... )
+    Buckets older than the first range of the type have been compacted and do not
+    change anymore. Their rows are kept in the data cache, so only the recent
+    buckets are asked to the DB
+    """
+    if not startTime or not endTime or 'startTime' not in selectFields[1]:
+      return self.__queryTimedRows( startTime, endTime, selectFields, condDict, groupingFields )
+    retVal = self._getBucketedQueryLimits( self._typeName, startTime, endTime )
+    if not retVal[ 'OK' ]:
+      return retVal
+    firstBucket, lastBucket = retVal[ 'Value' ]
+    # Buckets older than the first range are compacted into the longer buckets of the next
+    # ranges, which must not start before the end of the cached rows
+    bucketsDef = self._getBucketsDef( self._typeName )
+    stableLimit = int( Time.toEpoch() ) - bucketsDef[0][0]
+    stableLimit -= stableLimit % max( [ bucketLength for _timeLimit, bucketLength in bucketsDef ] )
+    condItems = [ ( key, condDict[ key ] ) for key in condDict ]
+    condItems.sort()
+    rowsKey = ( self._setup, self._typeName, repr( selectFields ), repr( condItems ), repr( groupingFields ) )
+
+    rows = []
+    cachedRows = []
+    rowsFrom = firstBucket
+    newFrom = firstBucket
+    queryFrom = startTime
+    cached = gDataCache.getTimedRows( rowsKey )
+    if cached and cached[ 'from' ] <= firstBucket < cached[ 'to' ]:
+      rows = [ row for row in cached[ 'rows' ] if firstBucket <= row[1] <= lastBucket ]
+      if lastBucket < cached[ 'to' ]:
+        return S_OK( rows )
+      cachedRows = cached[ 'rows' ]
+      rowsFrom = cached[ 'from' ]
+      newFrom = cached[ 'to' ]
+      # Ask only from the end of the cached rows, the DB aligns the time to the buckets
+      queryFrom = cached[ 'to' ]
+      while self._getBucketedQueryLimits( self._typeName, queryFrom, endTime )[ 'Value' ][0] > cached[ 'to' ]:
+        queryFrom -= self._getBucketLengthForTime( self._typeName, queryFrom )
+    retVal = self.__queryTimedRows( queryFrom, endTime, selectFields, condDict, groupingFields )
+    if not retVal[ 'OK' ]:
+      return retVal
+    queriedRows = [ tuple( row ) for row in retVal[ 'Value' ] ]
+    # Rows are ( group, startTime, bucketLength, ... ), a bucket compacted after the rows were
+    # cached can still overlap them, the cached rows are then replaced from its start
+    overlapping = [ row[1] for row in queriedRows if row[1] < newFrom < row[1] + row[2] ]
+    if overlapping:
+      newFrom = min( overlapping )
+      cachedRows = [ row for row in cachedRows if row[1] < newFrom ]
+      rows = [ row for row in rows if row[1] < newFrom ]
+    newRows = [ row for row in queriedRows if row[1] >= newFrom ]
+    rows.extend( [ row for row in newRows if row[1] >= firstBucket ] )
+
+    # All rows of buckets starting before rowsTo are known and will not change
+    rowsTo = min( stableLimit, lastBucket + 1 )
+    if rowsTo > newFrom:
+      gDataCache.setTimedRows( rowsKey, { 'from' : rowsFrom,
+                                          'to' : rowsTo,
+                                          'rows' : cachedRows + [ row for row in newRows if row[1] < rowsTo ] } )
+    return S_OK( rows )
 
   def _executeConsolidation( self, functor, dataDict ):
     for timeKey in dataDict:
@@ -221,6 +300,10 @@ class BaseReporter( DBUtils ):
     return self._findUnitMagic( dataDict, maxValue, unit, self._UNITS )
 
   def _findUnitMagic( self, reportDataDict, maxValue, unit, selectedUnits ):
+    """
+    Scale the data to the most readable unit. reportDataDict can be a dict or a TimedMatrix,
+    the data returned is of the same kind
+    """
     if unit not in selectedUnits:
       raise AttributeError( "%s is not a known rate unit" % unit )
     baseUnitData = selectedUnits[ unit ][ 0 ]
@@ -235,6 +318,14 @@ class BaseReporter( DBUtils ):
           break
       unitData = selectedUnits[ unit ][ unitIndex ]
     #Apply divFactor to all units
+    if isinstance( reportDataDict, TimedMatrix.TimedMatrix ):
+      graphDataDict = reportDataDict.copy()
+      maxValue = graphDataDict.divide( unitData[1] )
+      if unitData == baseUnitData:
+        reportDataDict = graphDataDict
+      else:
+        reportDataDict.divide( baseUnitData[1] )
+      return reportDataDict, graphDataDict, maxValue, unitData[0]
     graphDataDict, maxValue = self._divideByFactor( copy.deepcopy( reportDataDict ), unitData[1] )
     if unitData == baseUnitData:
       reportDataDict = graphDataDict
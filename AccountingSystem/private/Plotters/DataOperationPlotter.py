@@ -26,24 +26,25 @@ class DataOperationPlotter( BaseReporter ):
                        'TransferOK', 'TransferTotal', 'TransferOK',
                       ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    strippedData = self.stripDataField( dataDict, togetherFieldsToPlot[1] )
-    if strippedData:
-      dataDict[ togetherFieldsToPlot[0] ] = strippedData[0]
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "files" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    fieldId = togetherFieldsToPlot[1]
+    #The other field is plotted as a single group
+    remainingMatrix = dataMatrix.getField( 1 - fieldId ).sumGroups( togetherFieldsToPlot[0] )
+    dataMatrix = dataMatrix.getField( fieldId ).addGroups( remainingMatrix )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "files" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotSuceededTransfers( self, reportRequest, plotInfo, filename ):
@@ -66,27 +67,7 @@ class DataOperationPlotter( BaseReporter ):
                                     'TransferOK', 'TransferTotal'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                { 'checkNone' : True,
-                                  'convertToGranularity' : 'sum',
-                                  'calculateProportionalGauges' : False,
-                                  'consolidationFunction' : self._efficiencyConsolidation } )
-    if not retVal[ 'OK' ]:
-      return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    if len( dataDict ) > 1:
-      #Get the total for the plot
-      selectFields = ( "'Total', %s, %s, SUM(%s),SUM(%s)",
-                       [ 'startTime', 'bucketLength',
-                         'TransferOK', 'TransferTotal'
-                       ]
-                     )
-      retVal = self._getTimedData( reportRequest[ 'startTime' ],
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
                                   reportRequest[ 'endTime' ],
                                   selectFields,
                                   reportRequest[ 'condDict' ],
@@ -95,13 +76,30 @@ class DataOperationPlotter( BaseReporter ):
                                     'convertToGranularity' : 'sum',
                                     'calculateProportionalGauges' : False,
                                     'consolidationFunction' : self._efficiencyConsolidation } )
+    if not retVal[ 'OK' ]:
+      return retVal
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    if len( dataMatrix.groups ) > 1:
+      #Get the total for the plot
+      selectFields = ( "'Total', %s, %s, SUM(%s),SUM(%s)",
+                       [ 'startTime', 'bucketLength',
+                         'TransferOK', 'TransferTotal'
+                       ]
+                     )
+      retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                    reportRequest[ 'endTime' ],
+                                    selectFields,
+                                    reportRequest[ 'condDict' ],
+                                    reportRequest[ 'groupingFields' ],
+                                    { 'checkNone' : True,
+                                      'convertToGranularity' : 'sum',
+                                      'calculateProportionalGauges' : False,
+                                      'consolidationFunction' : self._efficiencyConsolidation } )
       if not retVal[ 'OK' ]:
         return retVal
-      totalDict = retVal[ 'Value' ][0]
-      self.stripDataField( totalDict, 0 )
-      for key in totalDict:
-        dataDict[ key ] = totalDict[ key ]
-    return S_OK( { 'data' : dataDict, 'granularity' : granularity } )
+      dataMatrix.addGroups( retVal[ 'Value' ][0].getField( 0 ) )
+    return S_OK( { 'data' : dataMatrix.toDict(), 'granularity' : granularity } )
 
   def _plotQuality( self, reportRequest, plotInfo, filename ):
     metadata = { 'title' : 'Transfer quality by %s' % reportRequest[ 'grouping' ] ,
@@ -116,22 +114,22 @@ class DataOperationPlotter( BaseReporter ):
                                     'TransferSize'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "bytes" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "bytes" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotTransferedData( self, reportRequest, plotInfo, filename ):
@@ -149,22 +147,22 @@ class DataOperationPlotter( BaseReporter ):
                        'TransferSize'
                       ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "bytes" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "bytes" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotThroughput( self, reportRequest, plotInfo, filename ):
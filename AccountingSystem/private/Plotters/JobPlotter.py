@@ -25,20 +25,20 @@ class JobPlotter( BaseReporter ):
                                    ]
                    )
 
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                { 'checkNone' : True,
-                                  'convertToGranularity' : 'sum',
-                                  'calculateProportionalGauges' : False,
-                                  'consolidationFunction' : self._efficiencyConsolidation } )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  { 'checkNone' : True,
+                                    'convertToGranularity' : 'sum',
+                                    'calculateProportionalGauges' : False,
+                                    'consolidationFunction' : self._efficiencyConsolidation } )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    if len( dataDict ) > 1:
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    if len( dataMatrix.groups ) > 1:
       #Get the total for the plot
       selectFields = ( "'Total', %s, %s, SUM(%s),SUM(%s)",
                         [ 'startTime', 'bucketLength',
@@ -46,22 +46,19 @@ class JobPlotter( BaseReporter ):
                         ]
                      )
 
-      retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                  reportRequest[ 'endTime' ],
-                                  selectFields,
-                                  reportRequest[ 'condDict' ],
-                                  reportRequest[ 'groupingFields' ],
-                                  { 'scheckNone' : True,
-                                  'convertToGranularity' : 'sum',
-                                  'calculateProportionalGauges' : False,
-                                  'consolidationFunction' : self._efficiencyConsolidation  } )
+      retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                    reportRequest[ 'endTime' ],
+                                    selectFields,
+                                    reportRequest[ 'condDict' ],
+                                    reportRequest[ 'groupingFields' ],
+                                    { 'scheckNone' : True,
+                                    'convertToGranularity' : 'sum',
+                                    'calculateProportionalGauges' : False,
+                                    'consolidationFunction' : self._efficiencyConsolidation  } )
       if not retVal[ 'OK' ]:
         return retVal
-      totalDict = retVal[ 'Value' ][0]
-      self.stripDataField( totalDict, 0 )
-      for key in totalDict:
-        dataDict[ key ] = totalDict[ key ]
-    return S_OK( { 'data' : dataDict, 'granularity' : granularity } )
+      dataMatrix.addGroups( retVal[ 'Value' ][0].getField( 0 ) )
+    return S_OK( { 'data' : dataMatrix.toDict(), 'granularity' : granularity } )
 
   def _plotCPUEfficiency( self, reportRequest, plotInfo, filename ):
     metadata = { 'title' : 'Job CPU efficiency by %s' % reportRequest[ 'grouping' ],
@@ -77,22 +74,22 @@ class JobPlotter( BaseReporter ):
                                     'CPUTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "time" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "time" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotCPUUsed( self, reportRequest, plotInfo, filename ):
@@ -111,22 +108,22 @@ class JobPlotter( BaseReporter ):
                                     'CPUTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "time" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "time" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
 
@@ -145,22 +142,22 @@ class JobPlotter( BaseReporter ):
                                     'NormCPUTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "cpupower" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "cpupower" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotNormCPUUsed( self, reportRequest, plotInfo, filename ):
@@ -179,22 +176,22 @@ class JobPlotter( BaseReporter ):
                                     'NormCPUTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "cpupower" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "cpupower" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
 
@@ -213,22 +210,22 @@ class JobPlotter( BaseReporter ):
                                     'ExecTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "time" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "time" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotWallTime( self, reportRequest, plotInfo, filename ):
@@ -247,22 +244,22 @@ class JobPlotter( BaseReporter ):
                                     'ExecTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotRunningJobs( self, reportRequest, plotInfo, filename ):
@@ -308,22 +305,22 @@ class JobPlotter( BaseReporter ):
                                     'ExecTime'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "time" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "time" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotAccumulatedWallTime( self, reportRequest, plotInfo, filename ):
@@ -371,22 +368,22 @@ class JobPlotter( BaseReporter ):
                                     'entriesInBucket'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotCumulativeNumberOfJobs( self, reportRequest, plotInfo, filename ):
@@ -406,22 +403,22 @@ class JobPlotter( BaseReporter ):
                                     'entriesInBucket'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotNumberOfJobs( self, reportRequest, plotInfo, filename ):
@@ -466,22 +463,22 @@ class JobPlotter( BaseReporter ):
     selectFields = ( self._getSelectStringForGrouping( reportRequest[ 'groupingFields' ] ) + ", %s, %s, SUM((%s)/(%s))/SUM(%s)",
                      reportRequest[ 'groupingFields' ][1] + [ 'startTime', 'bucketLength', 'InputDataSize', 'CPUTime', 'entriesInBucket' ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "bytes" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "bytes" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotProcessingBandwidth( self, reportRequest, plotInfo, filename ):
@@ -520,22 +517,22 @@ class JobPlotter( BaseReporter ):
     selectFields = ( self._getSelectStringForGrouping( reportRequest[ 'groupingFields' ] ) + ", %s, %s, SUM(%s)",
                      reportRequest[ 'groupingFields' ][1] + [ 'startTime', 'bucketLength', fieldTuple[0] ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "bytes" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "bytes" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotInputSandboxSize( self, reportRequest, plotInfo, filename ):
@@ -589,22 +586,22 @@ class JobPlotter( BaseReporter ):
     selectFields = ( self._getSelectStringForGrouping( reportRequest[ 'groupingFields' ] ) + ", %s, %s, SUM(%s)",
                      reportRequest[ 'groupingFields' ][1] + [ 'startTime', 'bucketLength', fieldTuple[0] ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "bytes" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "bytes" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotCumulativeInputSandboxSize( self, reportRequest, plotInfo, filename ):
@@ -646,22 +643,22 @@ class JobPlotter( BaseReporter ):
     selectFields = ( self._getSelectStringForGrouping( reportRequest[ 'groupingFields' ] ) + ", %s, %s, SUM(%s)",
                      reportRequest[ 'groupingFields' ][1] + [ 'startTime', 'bucketLength', fieldTuple[0] ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "files" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "files" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotInputDataFiles( self, reportRequest, plotInfo, filename ):
@@ -14,22 +14,22 @@ class PilotPlotter( BaseReporter ):
                                     'Jobs'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotCumulativeNumberOfJobs( self, reportRequest, plotInfo, filename ):
@@ -47,22 +47,22 @@ class PilotPlotter( BaseReporter ):
                                     'Jobs'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotNumberOfJobs( self, reportRequest, plotInfo, filename ):
@@ -79,22 +79,22 @@ class PilotPlotter( BaseReporter ):
                                     'entriesInBucket'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    dataDict = self._accumulate( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableUnit( dataDict,
-                                                                              self._getAccumulationMaxValue( dataDict ),
-                                                                              "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    dataMatrix.accumulate( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableUnit( dataMatrix,
+                                                                          dataMatrix.getAccumulationMaxValue(),
+                                                                          "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotCumulativeNumberOfPilots( self, reportRequest, plotInfo, filename ):
@@ -112,22 +112,22 @@ class PilotPlotter( BaseReporter ):
                                     'entriesInBucket'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                {} )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  {} )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict, maxValue = self._divideByFactor( dataDict, granularity )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    baseDataDict, graphDataDict, maxValue, unitName = self._findSuitableRateUnit( dataDict,
-                                                                                  self._getAccumulationMaxValue( dataDict ),
-                                                                                  "jobs" )
-    return S_OK( { 'data' : baseDataDict, 'graphDataDict' : graphDataDict,
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.divide( granularity )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    baseMatrix, graphMatrix, maxValue, unitName = self._findSuitableRateUnit( dataMatrix,
+                                                                              dataMatrix.getAccumulationMaxValue(),
+                                                                              "jobs" )
+    return S_OK( { 'data' : baseMatrix.toDict(), 'graphDataDict' : graphMatrix.toDict(),
                    'granularity' : granularity, 'unit' : unitName } )
 
   def _plotNumberOfPilots( self, reportRequest, plotInfo, filename ):
@@ -144,20 +144,20 @@ class PilotPlotter( BaseReporter ):
                                     'Jobs', 'entriesInBucket'
                                    ]
                    )
-    retVal = self._getTimedData( reportRequest[ 'startTime' ],
-                                reportRequest[ 'endTime' ],
-                                selectFields,
-                                reportRequest[ 'condDict' ],
-                                reportRequest[ 'groupingFields' ],
-                                { 'checkNone' : True,
-                                  'convertToGranularity' : 'sum',
-                                  'calculateProportionalGauges' : True } )
+    retVal = self._getTimedMatrix( reportRequest[ 'startTime' ],
+                                  reportRequest[ 'endTime' ],
+                                  selectFields,
+                                  reportRequest[ 'condDict' ],
+                                  reportRequest[ 'groupingFields' ],
+                                  { 'checkNone' : True,
+                                    'convertToGranularity' : 'sum',
+                                    'calculateProportionalGauges' : True } )
     if not retVal[ 'OK' ]:
       return retVal
-    dataDict, granularity = retVal[ 'Value' ]
-    self.stripDataField( dataDict, 0 )
-    dataDict = self._fillWithZero( granularity, reportRequest[ 'startTime' ], reportRequest[ 'endTime' ], dataDict )
-    return S_OK( { 'data' : dataDict, 'granularity' : granularity } )
+    dataMatrix, granularity = retVal[ 'Value' ]
+    dataMatrix = dataMatrix.getField( 0 )
+    dataMatrix.fillWithZero( reportRequest[ 'startTime' ], reportRequest[ 'endTime' ] )
+    return S_OK( { 'data' : dataMatrix.toDict(), 'granularity' : granularity } )
 
   def _plotJobsPerPilot( self, reportRequest, plotInfo, filename ):
     metadata = { 'title' : 'Jobs per pilot by %s' % reportRequest[ 'grouping' ],
@@ -0,0 +1,267 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""
+  TimedMatrix keeps the data of a timed report as a group x time x field array,
+  so unit scaling, rates, accumulations and filling of missing buckets are done
+  with numpy operations instead of walking nested dicts. Reports convert it to
+  the usual { group : { epoch : value } } dict once they are done with it.
+"""
+
+import numpy
+
+class TimedMatrix:
+
+  def __init__( self, groups, firstEpoch, granularity, values, present ):
+    """
+     - groups -> list of group names, one per row of values
+     - firstEpoch -> epoch of the first time bin, aligned to granularity
+     - values -> array of shape ( groups, time bins, fields ), 0 where there is no data
+     - present -> boolean array of shape ( groups, time bins ), True where there is data
+    """
+    self.groups = list( groups )
+    self.firstEpoch = firstEpoch
+    self.granularity = granularity
+    self.values = values
+    self.present = present
+
+  def getNumBins( self ):
+    return self.values.shape[1]
+
+  def getNumFields( self ):
+    return self.values.shape[2]
+
+  def getTimes( self ):
+    return self.firstEpoch + self.granularity * numpy.arange( self.getNumBins(), dtype = numpy.int64 )
+
+  def copy( self ):
+    return TimedMatrix( self.groups, self.firstEpoch, self.granularity, self.values.copy(), self.present.copy() )
+
+  def getField( self, fieldId ):
+    """
+    Get a matrix with only one of the fields
+    """
+    values = self.values[ :, :, fieldId:fieldId + 1 ].copy()
+    if not values.shape[2]:
+      #There was no data to know the fields from
+      values = numpy.zeros( values.shape[:2] + ( 1, ) )
+    return TimedMatrix( self.groups, self.firstEpoch, self.granularity, values, self.present.copy() )
+
+  def sumGroups( self, groupName ):
+    """
+    Get a matrix with a single group adding all the groups
+    """
+    return TimedMatrix( [ groupName ], self.firstEpoch, self.granularity,
+                        self.values.sum( axis = 0 )[ numpy.newaxis ], self.present.any( axis = 0 )[ numpy.newaxis ] )
+
+  def addGroups( self, matrix ):
+    """
+    Add the groups of another matrix with the same granularity. Groups already
+    there are replaced
+    """
+    if not self.groups:
+      matrix = matrix.copy()
+      self.firstEpoch = matrix.firstEpoch
+      self.values = matrix.values
+      self.present = matrix.present
+      self.groups = matrix.groups
+      return self
+    matrix = matrix.copy()
+    if matrix.getNumBins():
+      times = matrix.getTimes()
+      self.extendTo( times[0], times[-1] )
+    if self.getNumBins():
+      matrix.extendTo( self.firstEpoch, self.getTimes()[-1] )
+    keep = [ iPos for iPos in range( len( self.groups ) ) if self.groups[ iPos ] not in matrix.groups ]
+    self.groups = [ self.groups[ iPos ] for iPos in keep ] + matrix.groups
+    self.values = numpy.concatenate( ( self.values[ keep ], matrix.values ) )
+    self.present = numpy.concatenate( ( self.present[ keep ], matrix.present ) )
+    return self
+
+  def extendTo( self, fromEpoch, toEpoch ):
+    """
+    Make the time axis cover from fromEpoch to toEpoch ( both aligned to the granularity )
+    """
+    if not self.getNumBins():
+      numBins = ( toEpoch - fromEpoch ) / self.granularity + 1
+      self.firstEpoch = fromEpoch
+      self.values = numpy.zeros( ( len( self.groups ), numBins, self.getNumFields() ) )
+      self.present = numpy.zeros( ( len( self.groups ), numBins ), dtype = bool )
+      return self
+    lastEpoch = self.firstEpoch + ( self.getNumBins() - 1 ) * self.granularity
+    before = max( 0, ( self.firstEpoch - fromEpoch ) / self.granularity )
+    after = max( 0, ( toEpoch - lastEpoch ) / self.granularity )
+    if before or after:
+      padding = ( ( 0, 0 ), ( before, after ) )
+      self.values = numpy.pad( self.values, padding + ( ( 0, 0 ), ), 'constant' )
+      self.present = numpy.pad( self.present, padding, 'constant' )
+      self.firstEpoch -= before * self.granularity
+    return self
+
+  def __getRangeSlice( self, startEpoch, endEpoch ):
+    """
+    Extend the matrix to the bins in [ startEpoch, endEpoch ) and get their slice
+    """
+    startBin = startEpoch - startEpoch % self.granularity
+    lastBin = endEpoch - 1 - ( endEpoch - 1 ) % self.granularity
+    if lastBin < startBin:
+      return slice( 0, 0 )
+    self.extendTo( startBin, lastBin )
+    firstPos = ( startBin - self.firstEpoch ) / self.granularity
+    return slice( firstPos, firstPos + ( lastBin - startBin ) / self.granularity + 1 )
+
+  def fillWithZero( self, startEpoch, endEpoch ):
+    """
+    Add empty bins for the missing buckets between startEpoch and endEpoch
+    """
+    if not self.groups:
+      return self
+    timeSlice = self.__getRangeSlice( startEpoch, endEpoch )
+    self.present[ :, timeSlice ] = True
+    return self
+
+  def accumulate( self, startEpoch, endEpoch ):
+    """
+    Accumulate the values of the buckets between startEpoch and endEpoch
+    """
+    if not self.groups:
+      return self
+    timeSlice = self.__getRangeSlice( startEpoch, endEpoch )
+    self.values[ :, timeSlice ] = numpy.cumsum( self.values[ :, timeSlice ], axis = 1 )
+    self.present[ :, timeSlice ] = True
+    return self
+
+  def divide( self, factor ):
+    """
+    Divide all the values by factor and return the maximum value
+    """
+    self.values /= float( factor )
+    return self.getMaxValue()
+
+  def getMaxValue( self ):
+    """
+    Maximum value of all the bins with data, 0 if there is none
+    """
+    if not self.present.any():
+      return 0.0
+    return max( 0.0, float( self.values[ self.present ].max() ) )
+
+  def getAccumulationMaxValue( self ):
+    """
+    Sum of the values of all groups in the last bin with data
+    """
+    binsWithData = numpy.nonzero( self.present.any( axis = 0 ) )[0]
+    if not len( binsWithData ):
+      return 0
+    lastBin = binsWithData[-1]
+    return float( self.values[ self.present[ :, lastBin ], lastBin, 0 ].sum() )
+
+  def consolidate( self, function ):
+    """
+    Replace the fields of each bin by function( field1, field2, ... ). The function
+    gets arrays with all the bins
+    """
+    if not self.getNumBins():
+      return self.__setEmptyValues()
+    fields = [ self.values[ :, :, iField ] for iField in range( self.getNumFields() ) ]
+    self.values = numpy.where( self.present, function( *fields ), 0.0 )[ :, :, numpy.newaxis ]
+    return self
+
+  def consolidateByBin( self, function ):
+    """
+    Replace the fields of each bin by function( field1, field2, ... ) called once per bin
+    """
+    consolidated = numpy.zeros( self.present.shape )
+    for iGroup, iBin in zip( *numpy.nonzero( self.present ) ):
+      consolidated[ iGroup, iBin ] = function( *self.values[ iGroup, iBin ].tolist() )
+    self.values = consolidated[ :, :, numpy.newaxis ]
+    return self
+
+  def calculateProportionalGauges( self ):
+    """
+    Replace the ( field1, field2 ) of each bin by its field1 / field2 gauge weighted
+    with the totals of all groups
+    """
+    if not self.getNumBins():
+      return self.__setEmptyValues()
+    if self.getNumFields() < 2:
+      raise Exception( "Proportional gauges need at least two fields" )
+    first = numpy.where( self.present, self.values[ :, :, 0 ], 0.0 )
+    second = numpy.where( self.present, self.values[ :, :, 1 ], 0.0 )
+    ratios = first / numpy.where( second == 0, 1, second )
+    firstSums = first.sum( axis = 0 )
+    secondSums = second.sum( axis = 0 )
+    ratioSums = ratios.sum( axis = 0 )
+    totalRatio = firstSums / numpy.where( secondSums == 0, 1, secondSums )
+    factors = numpy.where( firstSums == 0, 0.0, totalRatio / numpy.where( ratioSums == 0, 1, ratioSums ) )
+    self.values = ( ratios * factors )[ :, :, numpy.newaxis ]
+    return self
+
+  def __setEmptyValues( self ):
+    self.values = numpy.zeros( ( len( self.groups ), 0, 1 ) )
+    return self
+
+  def toDict( self, fieldsAsList = False ):
+    """
+    Get the data as { group : { epoch : value } }. If there is more than one field
+    or fieldsAsList is set, values are lists with all the fields
+    """
+    times = self.getTimes()
+    asList = fieldsAsList or self.getNumFields() > 1
+    dataDict = {}
+    for iGroup in range( len( self.groups ) ):
+      mask = self.present[ iGroup ]
+      groupValues = self.values[ iGroup ][ mask ]
+      if not asList:
+        groupValues = groupValues[ :, 0 ]
+      dataDict[ self.groups[ iGroup ] ] = dict( zip( times[ mask ].tolist(), groupValues.tolist() ) )
+    return dataDict
+
+def fromBucketRows( rows, granularity, average = False ):
+  """
+  Build a matrix from ( group, startTime, bucketLength, field1, field2... ) rows,
+  spreading the buckets over bins of granularity seconds. None values count as 0.
+  With average the bins get the weighted mean of the buckets, otherwise their sum
+  """
+  if not rows:
+    return TimedMatrix( [], 0, granularity, numpy.zeros( ( 0, 0, 0 ) ), numpy.zeros( ( 0, 0 ), dtype = bool ) )
+  columns = numpy.array( rows, dtype = object )
+  groups, groupIndexes = numpy.unique( columns[ :, 0 ], return_inverse = True )
+  startTimes = columns[ :, 1 ].astype( numpy.int64 )
+  lengths = columns[ :, 2 ].astype( numpy.int64 )
+  data = columns[ :, 3: ]
+  data[ numpy.equal( data, None ) ] = 0
+  data = data.astype( float )
+
+  #Split each bucket in the bins it overlaps
+  endTimes = startTimes + lengths
+  firstBins = startTimes - startTimes % granularity
+  lastBins = numpy.where( lengths > 0, ( endTimes - 1 ) - ( endTimes - 1 ) % granularity, firstBins )
+  numBins = ( lastBins - firstBins ) / granularity + 1
+  rowIndexes = numpy.repeat( numpy.arange( len( rows ) ), numBins )
+  offsets = numpy.arange( numBins.sum() ) - numpy.repeat( numpy.cumsum( numBins ) - numBins, numBins )
+  binStarts = firstBins[ rowIndexes ] + offsets * granularity
+  overlaps = numpy.minimum( binStarts + granularity, endTimes[ rowIndexes ] ) - \
+             numpy.maximum( binStarts, startTimes[ rowIndexes ] )
+  rowLengths = lengths[ rowIndexes ]
+  proportions = numpy.where( rowLengths > 0, overlaps / numpy.where( rowLengths > 0, rowLengths, 1 ).astype( float ), 1.0 )
+
+  firstEpoch = int( binStarts.min() )
+  numTimeBins = int( ( binStarts.max() - firstEpoch ) / granularity + 1 )
+  cells = groupIndexes[ rowIndexes ] * numTimeBins + ( binStarts - firstEpoch ) / granularity
+  numCells = len( groups ) * numTimeBins
+  weights = numpy.bincount( cells, weights = proportions, minlength = numCells )
+  values = numpy.zeros( ( numCells, data.shape[1] ) )
+  for iField in range( data.shape[1] ):
+    values[ :, iField ] = numpy.bincount( cells, weights = data[ rowIndexes, iField ] * proportions, minlength = numCells )
+  present = numpy.bincount( cells, minlength = numCells ) > 0
+  if average:
+    values /= numpy.where( present, weights, 1 )[ :, numpy.newaxis ]
+  return TimedMatrix( groups.tolist(), firstEpoch, granularity,
+                      values.reshape( len( groups ), numTimeBins, data.shape[1] ),
+                      present.reshape( len( groups ), numTimeBins ) )
+
+def averageConsolidation( total, count ):
+  return numpy.where( count == 0, 0.0, total / numpy.where( count == 0, 1, count ).astype( float ) )
+
+def efficiencyConsolidation( total, count ):
+  return averageConsolidation( total, count ) * 100.0
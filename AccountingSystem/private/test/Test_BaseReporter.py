@@ -0,0 +1,140 @@
+""" Tests of the reuse of historical rows in the timed reports
+"""
+import unittest
+
+from DIRAC import S_OK
+from DIRAC.Core.Utilities import Time
+from DIRAC.AccountingSystem.private.Plotters.BaseReporter import BaseReporter
+
+class FakeAccountingDB:
+  """ One hour buckets, the first range is 8 days
+  """
+
+  def __init__( self ):
+    self.queries = []
+
+  def _getConnection( self ):
+    return S_OK( None )
+
+  def getBucketsDef( self, typeName ):
+    return [ ( 86400 * 8, 3600 ), ( 86400 * 365, 3600 ) ]
+
+  def calculateBucketLengthForTime( self, typeName, now, when ):
+    return 3600
+
+  def getBucketedQueryLimits( self, typeName, startTime, endTime ):
+    startTime = startTime - startTime % 3600 + 3600
+    endTime = endTime + 3600
+    return S_OK( ( startTime, endTime - endTime % 3600 ) )
+
+  def retrieveBucketedData( self, typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields, connObj = False ):
+    self.queries.append( ( startTime, endTime ) )
+    first, last = self.getBucketedQueryLimits( typeName, startTime, endTime )[ 'Value' ]
+    rows = []
+    for bucket in range( first, last + 1, 3600 ):
+      for group in ( 'A', 'B' ):
+        rows.append( ( group, bucket, 3600, 1.0 ) )
+    return S_OK( rows )
+
+class FakeCompactedDB( FakeAccountingDB ):
+  """ Hours older than compactLimit are merged in day buckets
+  """
+
+  def __init__( self, compactLimit ):
+    FakeAccountingDB.__init__( self )
+    self.compactLimit = compactLimit
+    self.bucketsDef = [ ( 86400 * 8, 3600 ), ( 86400 * 365, 86400 ) ]
+
+  def getBucketsDef( self, typeName ):
+    return self.bucketsDef
+
+  def calculateBucketLengthForTime( self, typeName, now, when ):
+    return self.bucketsDef[ int( when < now - self.bucketsDef[0][0] ) ][1]
+
+  def retrieveBucketedData( self, typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields, connObj = False ):
+    self.queries.append( ( startTime, endTime ) )
+    first, last = self.getBucketedQueryLimits( typeName, startTime, endTime )[ 'Value' ]
+    rows = []
+    day = first + ( 86400 - first % 86400 ) % 86400
+    while day < self.compactLimit:
+      hours = ( min( day + 86400, self.compactLimit ) - day ) / 3600
+      for group in ( 'A', 'B' ):
+        rows.append( ( group, day, 86400, float( hours ) ) )
+      day += 86400
+    for bucket in range( max( first, self.compactLimit ), last + 1, 3600 ):
+      for group in ( 'A', 'B' ):
+        rows.append( ( group, bucket, 3600, 1.0 ) )
+    return S_OK( rows )
+
+class FakeReporter( BaseReporter ):
+  _typeName = "Fake"
+  _typeKeyFields = [ 'Site' ]
+
+class TimedRowsTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.db = FakeAccountingDB()
+    self.reporter = FakeReporter( self.db, "Test" )
+    self.selectFields = ( "%s, %s, %s, SUM(%s)", [ 'Site', 'startTime', 'bucketLength', 'CPUTime' ] )
+    self.now = int( Time.toEpoch() )
+
+  def __getData( self, startTime, endTime, condDict = {} ):
+    result = self.reporter._getTimedData( startTime, endTime, self.selectFields, condDict,
+                                          ( "%s", [ 'Site' ] ), {} )
+    self.assert_( result[ 'OK' ] )
+    return result[ 'Value' ][0]
+
+  def testReuseHistoricalRows( self ):
+    startTime = self.now - 86400 * 20
+    first = self.__getData( startTime, self.now )
+    self.assertEqual( len( self.db.queries ), 1 )
+    # A later refresh only asks for the last days
+    later = self.__getData( startTime + 7200, self.now + 600 )
+    self.assertEqual( len( self.db.queries ), 2 )
+    self.assert_( self.db.queries[1][0] >= self.now - 86400 * 8 - 3 * 3600 )
+    # And gets the same as asking the DB
+    direct = FakeReporter( FakeAccountingDB(), "Test" )._getTimedData( startTime + 7200, self.now + 600,
+                                                                       self.selectFields, {},
+                                                                       ( "%s", [ 'Site' ] ), {} )
+    self.assertEqual( later, direct[ 'Value' ][0] )
+    self.assertEqual( sorted( first ), [ 'A', 'B' ] )
+
+  def testHistoricalOnly( self ):
+    startTime = self.now - 86400 * 30
+    self.__getData( startTime, self.now - 86400 * 15 )
+    self.__getData( startTime, self.now - 86400 * 15 )
+    self.assertEqual( len( self.db.queries ), 1 )
+
+  def testConditionsNotMixed( self ):
+    startTime = self.now - 86400 * 30
+    self.__getData( startTime, self.now - 86400 * 15, { 'Site' : [ 'S1' ] } )
+    self.__getData( startTime, self.now - 86400 * 15, { 'Site' : [ 'S2' ] } )
+    self.assertEqual( len( self.db.queries ), 2 )
+
+  def __compactAndCompare( self, db, reporter, setup ):
+    startTime = self.now - 86400 * 20
+    # Compaction runs and merges the hours of the next days
+    db.compactLimit += 86400 * 2
+    later = reporter._getTimedData( startTime, self.now, self.selectFields, {}, ( "%s", [ 'Site' ] ), {} )
+    direct = FakeReporter( db, setup + "Direct" )._getTimedData( startTime, self.now, self.selectFields, {},
+                                                                 ( "%s", [ 'Site' ] ), {} )
+    self.assertEqual( later[ 'Value' ][0], direct[ 'Value' ][0] )
+
+  def testCompactionAfterCaching( self ):
+    db = FakeCompactedDB( self.now - self.now % 3600 - 86400 * 9 )
+    reporter = FakeReporter( db, "Compaction" )
+    reporter._getTimedData( self.now - 86400 * 20, self.now, self.selectFields, {}, ( "%s", [ 'Site' ] ), {} )
+    self.__compactAndCompare( db, reporter, "Compaction" )
+
+  def testOverlappingCompactedBucket( self ):
+    # Rows cached up to an hour, before the day buckets were defined
+    db = FakeCompactedDB( self.now - self.now % 3600 - 86400 * 9 )
+    db.bucketsDef = [ ( 86400 * 8, 3600 ), ( 86400 * 365, 3600 ) ]
+    reporter = FakeReporter( db, "Overlapping" )
+    reporter._getTimedData( self.now - 86400 * 20, self.now, self.selectFields, {}, ( "%s", [ 'Site' ] ), {} )
+    db.bucketsDef = [ ( 86400 * 8, 3600 ), ( 86400 * 365, 86400 ) ]
+    self.__compactAndCompare( db, reporter, "Overlapping" )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( TimedRowsTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
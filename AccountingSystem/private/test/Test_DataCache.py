@@ -0,0 +1,72 @@
+""" Tests of the report cache of the accounting reports
+"""
+import threading
+import time
+import unittest
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.AccountingSystem.private.DataCache import ReportCache
+
+class ReportCacheTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.calls = []
+
+  def __generator( self, value, delay = 0 ):
+    def generate():
+      self.calls.append( value )
+      time.sleep( delay )
+      return S_OK( value )
+    return generate
+
+  def testHitAndMiss( self ):
+    cache = ReportCache( 600 )
+    self.assertEqual( cache.get( 'a', self.__generator( 'A' ) )[ 'Value' ], 'A' )
+    self.assertEqual( cache.get( 'a', self.__generator( 'B' ) )[ 'Value' ], 'A' )
+    self.assertEqual( self.calls, [ 'A' ] )
+    stats = cache.getStats()
+    self.assertEqual( ( stats[ 'hits' ], stats[ 'misses' ] ), ( 1, 1 ) )
+
+  def testErrorsNotCached( self ):
+    cache = ReportCache( 600 )
+    self.failIf( cache.get( 'a', lambda: S_ERROR( 'Oops' ) )[ 'OK' ] )
+    self.assertEqual( cache.get( 'a', self.__generator( 'A' ) )[ 'Value' ], 'A' )
+
+  def testCoalescing( self ):
+    cache = ReportCache( 600 )
+    results = []
+    threads = [ threading.Thread( target = lambda: results.append( cache.get( 'a', self.__generator( 'A', 0.2 ) ) ) )
+                for _i in range( 5 ) ]
+    for thr in threads:
+      thr.start()
+    for thr in threads:
+      thr.join()
+    self.assertEqual( self.calls, [ 'A' ] )
+    self.assertEqual( [ result[ 'Value' ] for result in results ], [ 'A' ] * 5 )
+    self.assertEqual( cache.getStats()[ 'coalesced' ], 4 )
+
+  def testLRUSizeLimit( self ):
+    deleted = []
+    cache = ReportCache( 600, maxBytes = 30, deleteFunction = deleted.append, sizeFunction = len )
+    cache.get( 'a', self.__generator( 'x' * 10 ) )
+    cache.get( 'b', self.__generator( 'y' * 10 ) )
+    cache.get( 'a', self.__generator( 'not used' ) )
+    cache.get( 'c', self.__generator( 'z' * 15 ) )
+    # b was the least recently used
+    self.assertEqual( deleted, [ 'y' * 10 ] )
+    stats = cache.getStats()
+    self.assertEqual( ( stats[ 'entries' ], stats[ 'bytes' ], stats[ 'evicted' ] ), ( 2, 25, 1 ) )
+    # Too big to be cached at all
+    cache.get( 'd', self.__generator( 'w' * 40 ) )
+    self.assertEqual( cache.getStats()[ 'entries' ], 2 )
+
+  def testExpiration( self ):
+    cache = ReportCache( 0.1 )
+    cache.get( 'a', self.__generator( 'A' ) )
+    time.sleep( 0.2 )
+    cache.get( 'a', self.__generator( 'B' ) )
+    self.assertEqual( self.calls, [ 'A', 'B' ] )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( ReportCacheTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
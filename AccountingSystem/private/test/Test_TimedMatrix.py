@@ -0,0 +1,126 @@
+""" Tests of the numpy timed matrices against the dict based helpers of DBUtils
+"""
+import copy
+import random
+import unittest
+
+from DIRAC.AccountingSystem.private.DBUtils import DBUtils
+from DIRAC.AccountingSystem.private import TimedMatrix
+
+GRANULARITY = 3600
+START = 1300000000 - 1300000000 % 86400
+
+def generateRows( numFields = 1 ):
+  """ Rows of three groups with buckets of several lengths
+  """
+  random.seed( 15 )
+  rows = []
+  for group in ( 'A', 'B', 'C' ):
+    for iBucket in range( 40 ):
+      if random.random() < 0.3:
+        continue
+      bucketLength = random.choice( [ 900, 3600, 3600, 7200 ] )
+      startTime = START + iBucket * 3600 + random.choice( [ 0, 900, 1800 ] )
+      startTime -= startTime % bucketLength
+      values = [ random.choice( [ None, 1, 5.5, 20 ] ) for _i in range( numFields ) ]
+      rows.append( tuple( [ group, startTime, bucketLength ] + values ) )
+  return rows
+
+class TimedMatrixTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.utils = DBUtils( None, "Test" )
+
+  def __getDict( self, rows, average = False ):
+    dataDict = self.utils._groupByField( 0, [ list( row ) for row in rows ] )
+    for key in dataDict:
+      dataDict[ key ] = self.utils._convertNoneToZero( dataDict[ key ] )
+      if average:
+        dataDict[ key ] = self.utils._averageToGranularity( GRANULARITY, dataDict[ key ] )
+      else:
+        dataDict[ key ] = self.utils._sumToGranularity( GRANULARITY, dataDict[ key ] )
+    return dataDict
+
+  def __assertDictsEqual( self, dict1, dict2 ):
+    self.assertEqual( sorted( dict1 ), sorted( dict2 ) )
+    for key in dict1:
+      self.assertEqual( sorted( dict1[ key ] ), sorted( dict2[ key ] ) )
+      for epoch in dict1[ key ]:
+        values1 = dict1[ key ][ epoch ]
+        values2 = dict2[ key ][ epoch ]
+        if type( values1 ) != type( [] ):
+          values1, values2 = [ values1 ], [ values2 ]
+        for iPos in range( len( values1 ) ):
+          self.assertAlmostEqual( values1[ iPos ], values2[ iPos ] )
+
+  def testFromBucketRows( self ):
+    rows = generateRows( 2 )
+    for average in ( False, True ):
+      dataMatrix = TimedMatrix.fromBucketRows( rows, GRANULARITY, average = average )
+      self.__assertDictsEqual( dataMatrix.toDict(), self.__getDict( rows, average ) )
+
+  def testShaping( self ):
+    rows = generateRows()
+    dataDict = self.__getDict( rows )
+    self.utils.stripDataField( dataDict, 0 )
+    dataMatrix = TimedMatrix.fromBucketRows( rows, GRANULARITY ).getField( 0 )
+    startTime = START - 3 * 3600 + 120
+    endTime = START + 50 * 3600 + 10
+    #Rates
+    rateDict, maxValue = self.utils._divideByFactor( copy.deepcopy( dataDict ), GRANULARITY )
+    rateMatrix = dataMatrix.copy()
+    self.assertAlmostEqual( rateMatrix.divide( GRANULARITY ), maxValue )
+    rateDict = self.utils._fillWithZero( GRANULARITY, startTime, endTime, rateDict )
+    rateMatrix.fillWithZero( startTime, endTime )
+    self.__assertDictsEqual( rateMatrix.toDict(), rateDict )
+    self.assertAlmostEqual( rateMatrix.getAccumulationMaxValue(), self.utils._getAccumulationMaxValue( rateDict ) )
+    #Accumulations
+    dataDict = self.utils._fillWithZero( GRANULARITY, startTime, endTime, dataDict )
+    dataDict = self.utils._accumulate( GRANULARITY, startTime, endTime, dataDict )
+    dataMatrix.fillWithZero( startTime, endTime )
+    dataMatrix.accumulate( startTime, endTime )
+    self.__assertDictsEqual( dataMatrix.toDict(), dataDict )
+    self.assertAlmostEqual( dataMatrix.getAccumulationMaxValue(), self.utils._getAccumulationMaxValue( dataDict ) )
+
+  def testConsolidation( self ):
+    rows = [ row for row in generateRows( 2 ) if row[4] ]
+    dataDict = self.__getDict( rows )
+    for key in dataDict:
+      for epoch in dataDict[ key ]:
+        total, count = dataDict[ key ][ epoch ]
+        dataDict[ key ][ epoch ] = [ 100.0 * total / count ]
+    dataMatrix = TimedMatrix.fromBucketRows( rows, GRANULARITY )
+    dataMatrix.consolidate( TimedMatrix.efficiencyConsolidation )
+    self.__assertDictsEqual( dataMatrix.toDict( fieldsAsList = True ), dataDict )
+    byBin = TimedMatrix.fromBucketRows( rows, GRANULARITY )
+    byBin.consolidateByBin( lambda total, count: 100.0 * total / count )
+    self.__assertDictsEqual( byBin.toDict( fieldsAsList = True ), dataDict )
+
+  def testProportionalGauges( self ):
+    rows = [ row for row in generateRows( 2 ) if row[4] ]
+    dataDict = self.utils._calculateProportionalGauges( self.__getDict( rows ) )
+    dataMatrix = TimedMatrix.fromBucketRows( rows, GRANULARITY ).calculateProportionalGauges()
+    self.__assertDictsEqual( dataMatrix.toDict( fieldsAsList = True ), dataDict )
+
+  def testGroups( self ):
+    dataMatrix = TimedMatrix.fromBucketRows( generateRows( 2 ), GRANULARITY )
+    dataDict = dataMatrix.getField( 0 ).toDict()
+    remaining = dataMatrix.getField( 1 ).sumGroups( 'Rest' )
+    self.assertEqual( remaining.groups, [ 'Rest' ] )
+    dataMatrix = dataMatrix.getField( 0 ).addGroups( remaining )
+    dataDict[ 'Rest' ] = self.utils.stripDataField( self.__getDict( generateRows( 2 ) ), 0 )[0]
+    self.__assertDictsEqual( dataMatrix.toDict(), dataDict )
+
+  def testEmpty( self ):
+    dataMatrix = TimedMatrix.fromBucketRows( [], GRANULARITY )
+    self.assertEqual( dataMatrix.toDict( fieldsAsList = True ), {} )
+    dataMatrix.consolidate( TimedMatrix.averageConsolidation )
+    self.assertEqual( dataMatrix.getAccumulationMaxValue(), 0 )
+    remaining = dataMatrix.getField( 1 ).sumGroups( 'Failed' )
+    dataMatrix = dataMatrix.getField( 0 ).addGroups( remaining )
+    dataMatrix.fillWithZero( START, START + 2 * GRANULARITY )
+    self.assertEqual( dataMatrix.toDict(), { 'Failed' : { START : 0.0, START + GRANULARITY : 0.0 } } )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( TimedMatrixTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
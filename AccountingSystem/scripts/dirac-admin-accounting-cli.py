@@ -210,6 +210,30 @@ class AccountingCLI( cmd.Cmd ):
     except:
       self.showTraceback()
 
+  def do_regenerateRollups( self, args ):
+    """
+    Regenerate the rollups of a type from its buckets.
+      Usage : regenerateRollups <typeName> [<rollupName>]
+    """
+    try:
+      argList = args.split()
+      if argList:
+        typeName = argList[0].strip()
+      else:
+        gLogger.error( "No type name specified" )
+        return
+      rollupName = False
+      if len( argList ) > 1:
+        rollupName = argList[1].strip()
+      acClient = RPCClient( "Accounting/DataStore" )
+      retVal = acClient.regenerateRollups( typeName, rollupName )
+      if retVal[ 'OK' ]:
+        gLogger.info( "Rollups recalculated!" )
+      else:
+        gLogger.error( "Error: %s" % retVal[ 'Message' ] )
+    except:
+      self.showTraceback()
+
   def do_showRegisteredTypes( self, args ):
     """
     Get a list of registered types
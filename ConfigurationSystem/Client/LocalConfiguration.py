@@ -5,10 +5,12 @@ import sys
 import os
 import getopt
 import types
+import time
 
 import DIRAC
 from DIRAC import gLogger
 from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.Utilities import StartupProfiler
 
 from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
@@ -95,6 +97,9 @@ class LocalConfiguration:
                          self.__setDebugMode )
     self.registerCmdOpt( "", "license", "Show DIRAC's LICENSE",
                          self.showLicense )
+    # The profiling itself is enabled when DIRAC is imported
+    self.registerCmdOpt( "", "profile-startup", "Report the time spent importing modules and loading the configuration",
+                         self.__profileStartup )
     self.registerCmdOpt( "h", "help", "Shows this help",
                          self.showHelp )
 
@@ -200,6 +205,7 @@ class LocalConfiguration:
     if self.initialized:
       return S_OK()
     self.initialized = True
+    startTime = time.time()
     try:
       retVal = self.__addUserDataToConfiguration()
 
@@ -219,6 +225,8 @@ class LocalConfiguration:
     except Exception, e:
       gLogger.exception()
       return S_ERROR( str( e ) )
+    finally:
+      StartupProfiler.addPhase( 'Load of the configuration', time.time() - startTime )
     return S_OK()
 
   def __parseCommandLine( self ):
@@ -282,7 +290,9 @@ class LocalConfiguration:
     errorsList = self.__loadCFGFiles()
 
     if gConfigurationData.getServers():
+      startTime = time.time()
       retVal = self.syncRemoteConfiguration()
+      StartupProfiler.addPhase( 'Synchronization with the configuration servers', time.time() - startTime )
       if not retVal[ 'OK' ]:
         return retVal
     else:
@@ -429,6 +439,9 @@ class LocalConfiguration:
     self.__debugMode += 1
     return S_OK()
 
+  def __profileStartup( self, dummy = False ):
+    return S_OK()
+
   def getDebugMode( self ):
     return self.__debugMode
 
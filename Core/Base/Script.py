@@ -5,7 +5,8 @@ import sys
 import os.path
 from DIRAC.ConfigurationSystem.Client.LocalConfiguration import LocalConfiguration
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
-from DIRAC.FrameworkSystem.Client.MonitoringClient import gMonitor
+from DIRAC import gMonitor
+from DIRAC.Core.Utilities import StartupProfiler
 
 localCfg = LocalConfiguration()
 
@@ -53,9 +54,13 @@ def initialize( script = False, ignoreErrors = False, initializeMonitor = False,
     gMonitor.setComponentName( scriptName )
     gMonitor.setComponentLocation( "script" )
     gMonitor.initialize()
-  else:
+  elif 'DIRAC.FrameworkSystem.Client.MonitoringClient' in sys.modules:
+    # Not initialized, the monitoring client does not send anything anyway, so
+    # there is no need to import it just to disable it
     gMonitor.disable()
 
+  StartupProfiler.addPhase( 'Time until %s was initialized' % scriptName, StartupProfiler.getElapsedTime() )
+
   return True
 
 def registerSwitch( showKey, longKey, helpString, callback = False ):
@@ -155,7 +155,15 @@ class RequestHandler( object ):
     if "transfer_%s" % sDirection not in dir( self ):
       self.__trPool.send( self.__trid, S_ERROR( "Service can't transfer files %s" % sDirection ) )
       return
-    retVal = self.__trPool.send( self.__trid, S_OK( "Accepted" ) )
+    #Clients able to stream propose a window, older ones wait for every ack
+    transferWindow = 1
+    accepted = S_OK( "Accepted" )
+    if 'TransferWindow' in retVal:
+      maxWindow = self.srv_getCSOption( "TransferWindow",
+                                        gConfig.getValue( "/DIRAC/Transfer/Window", FileHelper.DEFAULT_WINDOW_SIZE ) )
+      transferWindow = max( 1, min( int( retVal[ 'TransferWindow' ] ), maxWindow ) )
+      accepted[ 'TransferWindow' ] = transferWindow
+    retVal = self.__trPool.send( self.__trid, accepted )
     if not retVal[ 'OK' ]:
       return retVal
     self.__logRemoteQuery( "FileTransfer/%s" % sDirection, fileInfo )
@@ -164,6 +172,10 @@ class RequestHandler( object ):
     try:
       try:
         fileHelper = FileHelper( self.__trPool.get( self.__trid ) )
+        fileHelper.setWindowSize( transferWindow )
+        fileHelper.setPacketSize( self.srv_getCSOption( "TransferChunkSize",
+                                                        gConfig.getValue( "/DIRAC/Transfer/ChunkSize",
+                                                                          FileHelper.DEFAULT_PACKET_SIZE ) ) )
         if sDirection == "fromClient":
           fileHelper.setDirection( "fromClient" )
           uRetVal = self.transfer_fromClient( fileInfo[0], fileInfo[1], fileInfo[2], fileHelper )
@@ -6,9 +6,28 @@ from DIRAC.Core.DISET.private.BaseClient import BaseClient
 from DIRAC.Core.DISET.private.FileHelper import FileHelper
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.Utilities import File
+from DIRAC.ConfigurationSystem.Client.Config import gConfig
 
 class TransferClient( BaseClient ):
 
+  def _getTransferWindow( self ):
+    """
+    Number of chunks to send before waiting for their ack ( /DIRAC/Transfer/Window )
+    """
+    return max( 1, gConfig.getValue( "/DIRAC/Transfer/Window", FileHelper.DEFAULT_WINDOW_SIZE ) )
+
+  def _setupFileHelper( self, fileHelper, transport, headerResult ):
+    """
+    Configure a FileHelper with the chunk size and the window agreed with the server
+
+    @type headerResult: dictionary
+    @param headerResult: Result of _sendTransferHeader
+    """
+    fileHelper.setTransport( transport )
+    fileHelper.setPacketSize( gConfig.getValue( "/DIRAC/Transfer/ChunkSize", FileHelper.DEFAULT_PACKET_SIZE ) )
+    #Servers not knowing about windows do not send it back
+    fileHelper.setWindowSize( headerResult.get( 'TransferWindow', 1 ) )
+
   def _sendTransferHeader( self, actionName, fileInfo ):
     """
     Send the header of the transfer
@@ -17,7 +36,7 @@ class TransferClient( BaseClient ):
     @param actionName: Action to execute
     @type fileInfo: tuple
     @param fileInfo: Information of the target file/bulk
-    @return: S_OK/S_ERROR
+    @return: S_OK( ( trid, transport ) ) with the agreed TransferWindow / S_ERROR
     """
     retVal = self._connect()
     if not retVal[ 'OK' ]:
@@ -28,13 +47,17 @@ class TransferClient( BaseClient ):
       retVal = self._proposeAction( transport, ( "FileTransfer", actionName ) )
       if not retVal[ 'OK' ]:
         return retVal
-      retVal = transport.sendData( S_OK( fileInfo ) )
+      header = S_OK( fileInfo )
+      header[ 'TransferWindow' ] = self._getTransferWindow()
+      retVal = transport.sendData( header )
       if not retVal[ 'OK' ]:
         return retVal
       retVal = transport.receiveData()
       if not retVal[ 'OK' ]:
         return retVal
-      return S_OK( ( trid, transport ) )
+      result = S_OK( ( trid, transport ) )
+      result[ 'TransferWindow' ] = retVal.get( 'TransferWindow', 1 )
+      return result
     except Exception, e:
       self._disconnect( trid )
       return S_ERROR( "Cound not request transfer: %s" % str( e ) )
@@ -63,7 +86,7 @@ class TransferClient( BaseClient ):
       return retVal
     trid, transport = retVal[ 'Value' ]
     try:
-      fileHelper.setTransport( transport )
+      self._setupFileHelper( fileHelper, transport, retVal )
       retVal = fileHelper.FDToNetwork( fd )
       if not retVal[ 'OK' ]:
         return retVal
@@ -97,7 +120,7 @@ class TransferClient( BaseClient ):
       return retVal
     trid, transport = retVal[ 'Value' ]
     try:
-      fileHelper.setTransport( transport )
+      self._setupFileHelper( fileHelper, transport, retVal )
       retVal = fileHelper.networkToDataSink( dS )
       if not retVal[ 'OK' ]:
         return retVal
@@ -143,11 +166,13 @@ class TransferClient( BaseClient ):
       return retVal
     trid, transport = retVal[ 'Value' ]
     try:
-      fileHelper = FileHelper( transport )
+      fileHelper = FileHelper()
+      self._setupFileHelper( fileHelper, transport, retVal )
       retVal = fileHelper.bulkToNetwork( fileList, compress, onthefly )
       if not retVal[ 'OK' ]:
         return retVal
-      retVal = transport.receiveData()      return retVal
+      retVal = transport.receiveData()
+      return retVal
     finally:
       self._disconnect( trid )
 
@@ -176,7 +201,8 @@ class TransferClient( BaseClient ):
       return retVal
     trid, transport = retVal[ 'Value' ]
     try:
-      fileHelper = FileHelper( transport )
+      fileHelper = FileHelper()
+      self._setupFileHelper( fileHelper, transport, retVal )
       retVal = fileHelper.networkToBulk( destDir, compress )
       if not retVal[ 'OK' ]:
         return retVal
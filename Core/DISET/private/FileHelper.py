@@ -18,6 +18,18 @@ from DIRAC.FrameworkSystem.Client.Logger import gLogger
 gLogger = gLogger.getSubLogger( "FileTransmissionHelper" )
 
 class FileHelper:
+  """ Sends and receives files over a DISET transport
+
+      Data goes in chunks of packetSize bytes, and the receiver acknowledges
+      every chunk. The sender waits for the acknowledgement of a chunk only
+      once windowSize chunks are in flight, so with a window bigger than one
+      the round trip time is not paid per chunk. Both peers have to agree on
+      the window, it is negotiated in the transfer header. The MD5 of the data
+      is checked at EOF.
+  """
+
+  DEFAULT_PACKET_SIZE = 4194304
+  DEFAULT_WINDOW_SIZE = 8
 
   __validDirections = ( "toClient", "fromClient", 'receive', 'send' )
   __directionsMapping = { 'toClient' : 'send', 'fromClient' : 'receive' }
@@ -29,7 +41,9 @@ class FileHelper:
     self.bFinishedTransmission = False
     self.bReceivedEOF = False
     self.direction = False
-    self.packetSize = 1048576
+    self.packetSize = FileHelper.DEFAULT_PACKET_SIZE
+    self.__windowSize = 1
+    self.__pendingAcks = 0
     self.__fileBytes = 0
     self.__log = gLogger.getSubLogger( "FileHelper" )
 
@@ -42,6 +56,19 @@ class FileHelper:
   def setTransport( self, oTransport ):
     self.oTransport = oTransport
 
+  def setPacketSize( self, packetSize ):
+    if packetSize > 0:
+      self.packetSize = int( packetSize )
+
+  def setWindowSize( self, windowSize ):
+    """ Max number of chunks sent without having received their ack.
+        1 is the stop-and-wait behaviour older peers expect
+    """
+    self.__windowSize = max( 1, int( windowSize ) )
+
+  def getWindowSize( self ):
+    return self.__windowSize
+
   def setDirection( self, direction ):
     if direction in FileHelper.__validDirections:
       if direction in FileHelper.__directionsMapping:
@@ -58,13 +85,43 @@ class FileHelper:
   def sendData( self, sBuffer ):
     if self.__checkMD5:
       self.__oMD5.update( sBuffer )
+    if self.__pendingAcks >= self.__windowSize:
+      retVal = self.__receiveAck()
+      if not retVal[ 'OK' ] or ( 'AbortTransfer' in retVal and retVal[ 'AbortTransfer' ] ):
+        return retVal
     retVal = self.oTransport.sendData( S_OK( ( True, sBuffer ) ) )
     if not retVal[ 'OK' ]:
       return retVal
+    self.__pendingAcks += 1
+    return S_OK()
+
+  def __receiveAck( self ):
     retVal = self.oTransport.receiveData()
+    self.__pendingAcks -= 1
+    if 'AbortTransfer' in retVal and retVal[ 'AbortTransfer' ]:
+      self.__pendingAcks = 0
+      if self.__windowSize > 1:
+        #The receiver drops the chunks in flight until it gets the terminator
+        abortTrans = S_OK( ( False, "" ) )
+        abortTrans[ 'AbortTransfer' ] = True
+        self.oTransport.sendData( abortTrans )
+      self.__finishedTransmission()
     return retVal
 
+  def __receivePendingAcks( self ):
+    while self.__pendingAcks > 0:
+      retVal = self.__receiveAck()
+      if not retVal[ 'OK' ] or ( 'AbortTransfer' in retVal and retVal[ 'AbortTransfer' ] ):
+        self.__pendingAcks = 0
+        return retVal
+    return S_OK()
+
   def sendEOF( self ):
+    retVal = self.__receivePendingAcks()
+    if not retVal[ 'OK' ]:
+      return retVal
+    if 'AbortTransfer' in retVal and retVal[ 'AbortTransfer' ]:
+      return S_OK()
     retVal = self.oTransport.sendData( S_OK( ( False, self.__oMD5.hexdigest() ) ) )
     if not retVal[ 'OK' ]:
       return retVal
@@ -106,19 +163,32 @@ class FileHelper:
   def markAsTransferred( self ):
     if not self.bFinishedTransmission:
       if self.direction == "receive":
-        self.oTransport.receiveData()
+        retVal = self.oTransport.receiveData()
         abortTrans = S_OK()
         abortTrans[ 'AbortTransfer' ] = True
         self.oTransport.sendData( abortTrans )
+        if self.__windowSize > 1:
+          self.__discardUntilEnd( retVal )
       else:
         abortTrans = S_OK( ( False, "" ) )
         abortTrans[ 'AbortTransfer' ] = True
         retVal = self.oTransport.sendData( abortTrans )
         if not retVal[ 'OK' ]:
           return retVal
-        self.oTransport.receiveData()
+        #Acks of the chunks in flight come before the one of the abort
+        for _i in range( self.__pendingAcks + 1 ):
+          self.oTransport.receiveData()
+        self.__pendingAcks = 0
     self.__finishedTransmission()
 
+  def __discardUntilEnd( self, retVal ):
+    """ Drop the chunks the sender had in flight when we aborted
+    """
+    while retVal[ 'OK' ] and retVal[ 'Value' ] and retVal[ 'Value' ][0]:
+      if 'AbortTransfer' in retVal and retVal[ 'AbortTransfer' ]:
+        break
+      retVal = self.oTransport.receiveData()
+
   def __finishedTransmission( self ):
     self.bFinishedTransmission = True
 
@@ -201,7 +271,9 @@ class FileHelper:
           self.__log.verbose( "Transfer aborted" )
           return S_OK()
         ioffset += iPacketSize
-      self.sendEOF()
+      result = self.sendEOF()
+      if not result[ 'OK' ]:
+        return result
     except Exception, e:
       return S_ERROR( "Error while sending string: %s" % str( e ) )
     try:
@@ -226,7 +298,9 @@ class FileHelper:
           return S_OK()
         sentBytes += len( sBuffer )
         sBuffer = os.read( iFD, iPacketSize )
-      self.sendEOF()
+      result = self.sendEOF()
+      if not result[ 'OK' ]:
+        return result
     except Exception, e:
       gLogger.exception( "Error while sending file" )
       return S_ERROR( "Error while sending file: %s" % str( e ) )
@@ -255,7 +329,9 @@ class FileHelper:
           self.__log.verbose( "Transfer aborted" )
           return S_OK()
         sBuffer = dataSource.read( iPacketSize )
-      self.sendEOF()
+      result = self.sendEOF()
+      if not result[ 'OK' ]:
+        return result
     except Exception, e:
       gLogger.exception( "Error while sending file" )
       return S_ERROR( "Error while sending file: %s" % str( e ) )
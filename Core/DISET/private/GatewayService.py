@@ -286,8 +286,9 @@ class TransferRelay( TransferClient ):
       self.errMsg( "Could not send header", result[ 'Message' ] )
       return result
     self.infoMsg( "Starting to send data to service" )
-    srvTransport = result[ 'Value' ]
-    srvFileHelper = FileHelper( srvTransport )
+    trid, srvTransport = result[ 'Value' ]
+    srvFileHelper = FileHelper()
+    self._setupFileHelper( srvFileHelper, srvTransport, result )
     srvFileHelper.setDirection( "send" )
     result = srvFileHelper.BufferToNetwork( data )
     if not result[ 'OK' ]:
@@ -307,7 +308,8 @@ class TransferRelay( TransferClient ):
       return result
     self.infoMsg( "Starting to receive data from service" )
     trid, srvTransport = result[ 'Value' ]
-    srvFileHelper = FileHelper( srvTransport )
+    srvFileHelper = FileHelper()
+    self._setupFileHelper( srvFileHelper, srvTransport, result )
     srvFileHelper.setDirection( "receive" )
     sIO = cStringIO.StringIO()
     result = srvFileHelper.networkToDataSink( sIO, self.__transferBytesLimit )
@@ -0,0 +1,106 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Tests of the windowed streaming of FileHelper, using an in memory loopback
+     transport instead of sockets
+"""
+import unittest
+import threading
+import Queue
+
+from DIRAC.Core.Utilities import DEncode
+from DIRAC.Core.Utilities.ReturnValues import S_OK
+from DIRAC.Core.DISET.private.FileHelper import FileHelper
+
+class LoopbackTransport:
+  """ One end of an in memory connection. Messages are DEncoded as in the real
+      transports, so nothing is shared between the peers
+  """
+
+  def __init__( self, inQueue, outQueue ):
+    self.inQueue = inQueue
+    self.outQueue = outQueue
+    self.sentMessages = 0
+
+  def sendData( self, uData ):
+    self.sentMessages += 1
+    self.outQueue.put( DEncode.encode( uData ) )
+    return S_OK()
+
+  def receiveData( self, maxBufferSize = 0 ):
+    return DEncode.decode( self.inQueue.get( timeout = 10 ) )[0]
+
+def getTransportPair():
+  q1 = Queue.Queue()
+  q2 = Queue.Queue()
+  return LoopbackTransport( q1, q2 ), LoopbackTransport( q2, q1 )
+
+class FileHelperWindowTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.data = "".join( [ chr( i % 256 ) for i in range( 100000 ) ] )
+    self.senderTransport, self.receiverTransport = getTransportPair()
+
+  def __getHelpers( self, windowSize ):
+    sender = FileHelper( self.senderTransport )
+    sender.setDirection( "send" )
+    sender.setPacketSize( 4096 )
+    sender.setWindowSize( windowSize )
+    receiver = FileHelper( self.receiverTransport )
+    receiver.setDirection( "receive" )
+    receiver.setWindowSize( windowSize )
+    return sender, receiver
+
+  def __sendInThread( self, sender, resultList ):
+    thr = threading.Thread( target = lambda: resultList.append( sender.BufferToNetwork( self.data ) ) )
+    thr.setDaemon( 1 )
+    thr.start()
+    return thr
+
+  def __checkTransfer( self, windowSize ):
+    sender, receiver = self.__getHelpers( windowSize )
+    sendResult = []
+    thr = self.__sendInThread( sender, sendResult )
+    result = receiver.networkToString()
+    thr.join( 10 )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'Value' ], self.data )
+    self.assert_( sendResult[0][ 'OK' ] )
+    self.assert_( sender.finishedTransmission() )
+    self.assert_( receiver.finishedTransmission() )
+    # Every ack has been consumed
+    self.assert_( self.senderTransport.inQueue.empty() )
+    self.assert_( self.receiverTransport.inQueue.empty() )
+
+  def testStopAndWait( self ):
+    self.__checkTransfer( 1 )
+
+  def testWindowed( self ):
+    self.__checkTransfer( 8 )
+
+  def testReceiverAbort( self ):
+    sender, receiver = self.__getHelpers( 4 )
+    sendResult = []
+    thr = self.__sendInThread( sender, sendResult )
+    result = receiver.receiveData()
+    self.assert_( result[ 'OK' ] )
+    receiver.markAsTransferred()
+    thr.join( 10 )
+    self.assert_( sendResult[0][ 'OK' ] )
+    self.assert_( sender.finishedTransmission() )
+    # Both ends are in sync to exchange the final response
+    self.receiverTransport.sendData( S_OK( "Done" ) )
+    self.assertEqual( self.senderTransport.receiveData()[ 'Value' ], "Done" )
+    self.assert_( self.receiverTransport.inQueue.empty() )
+
+  def testWindowIsUsed( self ):
+    sender, receiver = self.__getHelpers( 4 )
+    for _i in range( 4 ):
+      self.assert_( sender.sendData( "x" * 10 )[ 'OK' ] )
+    # Nobody acked yet, but the sender did not block
+    self.assertEqual( self.senderTransport.sentMessages, 4 )
+    for _i in range( 4 ):
+      self.assertEqual( receiver.receiveData()[ 'Value' ], "x" * 10 )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( FileHelperWindowTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
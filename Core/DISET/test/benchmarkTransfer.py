@@ -0,0 +1,77 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the throughput of FileHelper transfers for several windows and
+     chunk sizes over a loopback connection with an injected one way latency.
+     Messages are DEncoded and MD5 summed as in a real transfer, only the
+     network is simulated.
+
+     Usage: python benchmarkTransfer.py [ MiB to send ] [ latencies in ms, comma separated ]
+"""
+import sys
+import time
+import threading
+import Queue
+
+from DIRAC.Core.Utilities import DEncode
+from DIRAC.Core.Utilities.ReturnValues import S_OK
+from DIRAC.Core.DISET.private.FileHelper import FileHelper
+
+class LatencyTransport:
+  """ One end of an in memory connection delivering messages latency seconds
+      after they are sent
+  """
+
+  def __init__( self, inQueue, outQueue, latency ):
+    self.inQueue = inQueue
+    self.outQueue = outQueue
+    self.latency = latency
+
+  def sendData( self, uData ):
+    self.outQueue.put( ( time.time() + self.latency, DEncode.encode( uData ) ) )
+    return S_OK()
+
+  def receiveData( self, maxBufferSize = 0 ):
+    deliveryTime, data = self.inQueue.get()
+    wait = deliveryTime - time.time()
+    if wait > 0:
+      time.sleep( wait )
+    return DEncode.decode( data )[0]
+
+def measure( data, latency, windowSize, packetSize ):
+  q1 = Queue.Queue()
+  q2 = Queue.Queue()
+  sender = FileHelper( LatencyTransport( q1, q2, latency ) )
+  sender.setDirection( "send" )
+  sender.setPacketSize( packetSize )
+  sender.setWindowSize( windowSize )
+  receiver = FileHelper( LatencyTransport( q2, q1, latency ) )
+  receiver.setDirection( "receive" )
+  receiver.setWindowSize( windowSize )
+
+  start = time.time()
+  thr = threading.Thread( target = sender.BufferToNetwork, args = ( data, ) )
+  thr.start()
+  result = receiver.networkToString()
+  thr.join()
+  elapsed = time.time() - start
+  if not result[ 'OK' ] or len( result[ 'Value' ] ) != len( data ):
+    raise RuntimeError( "Transfer failed: %s" % result )
+  return len( data ) / elapsed / 1048576.0
+
+def main( sizeMiB, latencies ):
+  data = "x" * ( sizeMiB * 1048576 )
+  print "%10s %8s %10s %10s" % ( "latency", "window", "chunk KiB", "MiB/s" )
+  for latency in latencies:
+    for packetSize in ( 1048576, FileHelper.DEFAULT_PACKET_SIZE ):
+      for windowSize in ( 1, 4, FileHelper.DEFAULT_WINDOW_SIZE, 16 ):
+        speed = measure( data, latency / 1000.0, windowSize, packetSize )
+        print "%8s ms %8s %10s %10.1f" % ( latency, windowSize, packetSize / 1024, speed )
+
+if __name__ == "__main__":
+  sizeMiB = 64
+  latencies = [ 0, 5, 25, 100 ]
+  if len( sys.argv ) > 1:
+    sizeMiB = int( sys.argv[1] )
+  if len( sys.argv ) > 2:
+    latencies = [ float( l ) for l in sys.argv[2].split( "," ) ]
+  main( sizeMiB, latencies )
@@ -6,13 +6,24 @@ from DIRAC import S_OK, S_ERROR, gConfig, rootPath, gLogger
 import DIRAC.Core.Security.Locations as Locations
 import DIRAC.Core.Security.File as File
 from DIRAC.Core.Security.BaseSecurity import BaseSecurity
-from DIRAC.Core.Security.X509Chain import X509Chain
+from DIRAC.Core.Security.X509Chain import X509Chain, g_X509ChainType
+from DIRAC.Core.Security.X509Certificate import X509Certificate
 from DIRAC.Core.Utilities.Subprocess import shellCall
-from DIRAC.Core.Utilities import List
+from DIRAC.Core.Utilities.DictCache import DictCache
+from DIRAC.Core.Utilities.LockRing import LockRing
+from DIRAC.Core.Utilities import List, Time
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 
 
 class VOMS( BaseSecurity ):
 
+  # Decoded VOMS data of the chains, keyed by the identity of their certificates
+  __vomsDataCache = DictCache()
+  # Known VOMS attributes, recalculated when the configuration changes
+  __validAttrs = []
+  __validAttrsVersion = None
+  __validAttrsLock = LockRing().getLock()
+
   def getVOMSAttributes( self, proxy, switch = "all" ):
     """
     Return VOMS proxy attributes as list elements if switch="all" (default) OR
@@ -23,46 +34,23 @@ class VOMS( BaseSecurity ):
     """
 
     # Get all possible info from voms proxy
-    result = self.getVOMSProxyInfo( proxy, "all" )
+    result = self.__getVOMSData( proxy )
     if not result["OK"]:
       return S_ERROR( 'Failed to extract info from proxy: %s' % result[ 'Message' ] )
-
-    vomsInfoOutput = List.fromChar( result["Value"], "\n" )
+    vomsData = result[ 'Value' ]
 
     #Get a list of known VOMS attributes
-    validVOMSAttrs = []
-    result = gConfig.getOptions( "/Registry/VOMS/Mapping" )
-    if result[ 'OK' ]:
-      for group in result[ 'Value' ]:
-        vA = gConfig.getValue( "/Registry/VOMS/Mapping/%s" % group, "" )
-        if vA and vA not in validVOMSAttrs:
-          validVOMSAttrs.append( vA )
-    result = gConfig.getSections( "/Registry/Groups" )
-    if result[ 'OK' ]:
-      for group in result[ 'Value' ]:
-        vA = gConfig.getValue( "/Registry/Groups/%s/VOMSRole" % group, "" )
-        if vA and vA not in validVOMSAttrs:
-          validVOMSAttrs.append( vA )
-
-    # Parse output of voms-proxy-info command
+    validVOMSAttrs = self.__getValidVOMSAttributes()
+
     attributes = []
-    voName = ''
-    nickName = ''
-    for line in vomsInfoOutput:
-      fields = List.fromChar( line, ":" )
-      key = fields[0]
-      value = " ".join( fields[1:] )
-      if key == "VO":
-        voName = value
-      elif key == "attribute":
-        # Cut off unsupported Capability selection part
-        if value.find( "nickname" ) == 0:
-          nickName = "=".join( List.fromChar( value, "=" )[ 1: ] )
-        else:
-          value = value.replace( "/Capability=NULL" , "" )
-          value = value.replace( "/Role=NULL" , "" )
-          if value and value not in attributes and value in validVOMSAttrs:
-            attributes.append( value )
+    voName = vomsData[ 'vo' ]
+    nickName = vomsData[ 'nickname' ]
+    for value in vomsData[ 'fqan' ]:
+      # Cut off unsupported Capability selection part
+      value = value.replace( "/Capability=NULL" , "" )
+      value = value.replace( "/Role=NULL" , "" )
+      if value and value not in attributes and value in validVOMSAttrs:
+        attributes.append( value )
 
     # Sorting and joining attributes
     if switch == "db":
@@ -81,6 +69,137 @@ class VOMS( BaseSecurity ):
 
     return S_OK( returnValue )
 
+  def __getValidVOMSAttributes( self ):
+    """
+    Get the VOMS attributes known in the Registry. They are only calculated
+    again when the configuration version changes
+    """
+    VOMS.__validAttrsLock.acquire()
+    try:
+      currentVersion = gConfigurationData.getVersion()
+      if currentVersion == VOMS.__validAttrsVersion:
+        return VOMS.__validAttrs
+      validVOMSAttrs = []
+      result = gConfig.getOptions( "/Registry/VOMS/Mapping" )
+      if result[ 'OK' ]:
+        for group in result[ 'Value' ]:
+          vA = gConfig.getValue( "/Registry/VOMS/Mapping/%s" % group, "" )
+          if vA and vA not in validVOMSAttrs:
+            validVOMSAttrs.append( vA )
+      result = gConfig.getSections( "/Registry/Groups" )
+      if result[ 'OK' ]:
+        for group in result[ 'Value' ]:
+          vA = gConfig.getValue( "/Registry/Groups/%s/VOMSRole" % group, "" )
+          if vA and vA not in validVOMSAttrs:
+            validVOMSAttrs.append( vA )
+      VOMS.__validAttrs = validVOMSAttrs
+      VOMS.__validAttrsVersion = currentVersion
+      return validVOMSAttrs
+    finally:
+      VOMS.__validAttrsLock.release()
+
+  def getVOMSTimeLeft( self, proxy ):
+    """
+    Get the seconds left before either the VOMS attributes or the proxy expire
+    """
+    retVal = self.__loadChain( proxy )
+    if not retVal[ 'OK' ]:
+      return retVal
+    chain = retVal[ 'Value' ]
+    retVal = self.__getVOMSData( chain )
+    if retVal[ 'OK' ] and 'notAfter' in retVal[ 'Value' ]:
+      acRemaining = retVal[ 'Value' ][ 'notAfter' ] - Time.dateTime()
+      acSecsLeft = max( 0, acRemaining.days * 86400 + acRemaining.seconds )
+      return S_OK( min( acSecsLeft, chain.getRemainingSecs()[ 'Value' ] ) )
+    secsLeft = []
+    for option in ( 'actimeleft', 'timeleft' ):
+      retVal = self.getVOMSProxyInfo( chain, option )
+      if not retVal[ 'OK' ]:
+        return retVal
+      try:
+        secsLeft.append( int( retVal[ 'Value' ].strip() ) )
+      except Exception, e:
+        return S_ERROR( "Can't parse VOMS time left: %s" % str( e ) )
+    return S_OK( min( secsLeft ) )
+
+  def __loadChain( self, proxy ):
+    """
+    Get the X509Chain for any of the proxy arguments accepted by File.multiProxyArgument
+    """
+    if type( proxy ) == g_X509ChainType:
+      return S_OK( proxy )
+    retVal = File.multiProxyArgument( proxy )
+    if not retVal[ 'OK' ]:
+      return retVal
+    return S_OK( retVal[ 'Value' ][ 'chain' ] )
+
+  def __getVOMSData( self, proxy ):
+    """
+    Get the VOMS data of a proxy: vo, fqan list and nickname. The attribute
+    certificate is decoded in process and the result is kept until the proxy
+    expires. If it can't be decoded, voms-proxy-info is used instead.
+    """
+    retVal = self.__loadChain( proxy )
+    if not retVal[ 'OK' ]:
+      return retVal
+    chain = retVal[ 'Value' ]
+
+    retVal = chain.getCertList()
+    if not retVal[ 'OK' ]:
+      return retVal
+    cacheKey = tuple( [ ( cert.get_subject().one_line(), cert.get_serial_number() ) for cert in retVal[ 'Value' ] ] )
+    vomsData = VOMS.__vomsDataCache.get( cacheKey )
+    if vomsData:
+      return S_OK( vomsData )
+
+    vomsData = False
+    for certObj in retVal[ 'Value' ]:
+      result = X509Certificate( certObj ).getVOMSData()
+      if not result[ 'OK' ]:
+        gLogger.verbose( "Falling back to voms-proxy-info", result[ 'Message' ] )
+        vomsData = False
+        break
+      if result[ 'Value' ]:
+        vomsData = result[ 'Value' ]
+        break
+    else:
+      # No VOMS extension
+      vomsData = { 'vo' : '', 'fqan' : [], 'nickname' : '' }
+
+    if not vomsData:
+      result = self.getVOMSProxyInfo( chain, "all" )
+      if not result[ 'OK' ]:
+        return result
+      vomsData = self.__parseVOMSProxyInfo( result[ 'Value' ] )
+
+    validSecs = chain.getRemainingSecs()
+    if validSecs[ 'OK' ]:
+      validSecs = validSecs[ 'Value' ]
+      if 'notAfter' in vomsData:
+        acRemaining = vomsData[ 'notAfter' ] - Time.dateTime()
+        validSecs = min( validSecs, acRemaining.days * 86400 + acRemaining.seconds )
+      VOMS.__vomsDataCache.purgeExpired()
+      VOMS.__vomsDataCache.add( cacheKey, validSecs, vomsData )
+    return S_OK( vomsData )
+
+  def __parseVOMSProxyInfo( self, output ):
+    """
+    Parse output of voms-proxy-info -all command
+    """
+    vomsData = { 'vo' : '', 'fqan' : [], 'nickname' : '' }
+    for line in List.fromChar( output, "\n" ):
+      fields = List.fromChar( line, ":" )
+      key = fields[0]
+      value = " ".join( fields[1:] )
+      if key == "VO":
+        vomsData[ 'vo' ] = value
+      elif key == "attribute":
+        if value.find( "nickname" ) == 0:
+          vomsData[ 'nickname' ] = "=".join( List.fromChar( value, "=" )[ 1: ] )
+        else:
+          vomsData[ 'fqan' ].append( value )
+    return vomsData
+
   def getVOMSProxyFQAN( self, proxy ):
     """ Get the VOMS proxy fqan attributes
     """
@@ -0,0 +1,169 @@
+########################################################################
+# $HeadURL$
+########################################################################
+""" VOMSExtension decodes the VOMS attribute certificate embedded in a proxy
+
+    The attribute certificate travels DER encoded in the vomsExtensions
+    extension of the proxy. Only the fields voms-proxy-info -all reports and
+    DIRAC uses are decoded: VO, FQANs, nickname and validity. The signature of
+    the attribute certificate is not checked, as voms-proxy-info -dont-verify-ac
+    did not do it either.
+"""
+__RCSID__ = "$Id$"
+
+import datetime
+
+# vomsExtensions certificate extension
+VOMS_EXTENSION_OID = "1.3.6.1.4.1.8005.100.100.5"
+# FQANs attribute of the attribute certificate
+VOMS_FQANS_OID = "1.3.6.1.4.1.8005.100.100.4"
+# Generic attributes extension of the attribute certificate ( nickname )
+VOMS_GENERIC_ATTRS_OID = "1.3.6.1.4.1.8005.100.100.11"
+
+_TAG_OCTET_STRING = 0x04
+_TAG_OID = 0x06
+_TAG_SEQUENCE = 0x30
+_TAG_SET = 0x31
+_TAG_GENERALIZED_TIME = 0x18
+_TAG_EXTENSIONS = 0xa3
+_TAG_URI = 0x86
+
+class DERError( Exception ):
+  pass
+
+def _readTLV( data, pos ):
+  """ Read the element starting at pos
+      Returns ( tag, contents start, contents end )
+  """
+  if pos + 2 > len( data ):
+    raise DERError( "Truncated element at %s" % pos )
+  tag = ord( data[ pos ] )
+  if tag & 0x1f == 0x1f:
+    raise DERError( "Multi byte tags are not supported" )
+  length = ord( data[ pos + 1 ] )
+  pos += 2
+  if length & 0x80:
+    numBytes = length & 0x7f
+    if numBytes == 0 or numBytes > 4:
+      raise DERError( "Invalid length at %s" % pos )
+    length = 0
+    for byte in data[ pos : pos + numBytes ]:
+      length = ( length << 8 ) | ord( byte )
+    pos += numBytes
+  if pos + length > len( data ):
+    raise DERError( "Element at %s goes beyond the end of data" % pos )
+  return tag, pos, pos + length
+
+def _children( data, start, end ):
+  """ Get the elements contained between start and end
+  """
+  elements = []
+  pos = start
+  while pos < end:
+    element = _readTLV( data, pos )
+    elements.append( element )
+    pos = element[2]
+  return elements
+
+def _decodeOID( data, start, end ):
+  values = []
+  current = 0
+  for byte in data[ start : end ]:
+    current = ( current << 7 ) | ( ord( byte ) & 0x7f )
+    if not ord( byte ) & 0x80:
+      values.append( current )
+      current = 0
+  if not values:
+    raise DERError( "Empty OID" )
+  first = min( values[0] / 40, 2 )
+  return ".".join( [ str( v ) for v in [ first, values[0] - first * 40 ] + values[1:] ] )
+
+def _decodeTime( data, start, end ):
+  timeString = data[ start : end ].rstrip( "Z" )
+  return datetime.datetime.strptime( timeString[:14], "%Y%m%d%H%M%S" )
+
+def _checkTag( element, tag ):
+  if element[0] != tag:
+    raise DERError( "Expected tag %02x, found %02x" % ( tag, element[0] ) )
+  return element
+
+def getExtensionValue( certDER, extensionOID = VOMS_EXTENSION_OID ):
+  """ Get the DER value of an extension of a DER encoded certificate
+      Returns the value or None if the certificate does not have it
+  """
+  cert = _checkTag( _readTLV( certDER, 0 ), _TAG_SEQUENCE )
+  tbs = _checkTag( _children( certDER, cert[1], cert[2] )[0], _TAG_SEQUENCE )
+  for element in _children( certDER, tbs[1], tbs[2] ):
+    if element[0] != _TAG_EXTENSIONS:
+      continue
+    extList = _checkTag( _readTLV( certDER, element[1] ), _TAG_SEQUENCE )
+    for ext in _children( certDER, extList[1], extList[2] ):
+      fields = _children( certDER, ext[1], ext[2] )
+      oid = _checkTag( fields[0], _TAG_OID )
+      if _decodeOID( certDER, oid[1], oid[2] ) == extensionOID:
+        value = _checkTag( fields[-1], _TAG_OCTET_STRING )
+        return certDER[ value[1] : value[2] ]
+  return None
+
+def _findNickname( data, start, end ):
+  """ Look for the nickname in the generic attributes: ( name, value, qualifier )
+  """
+  for element in _children( data, start, end ):
+    if element[0] not in ( _TAG_SEQUENCE, _TAG_SET ):
+      continue
+    fields = _children( data, element[1], element[2] )
+    if len( fields ) == 3 and [ f[0] for f in fields ] == [ _TAG_OCTET_STRING ] * 3:
+      if data[ fields[0][1] : fields[0][2] ] == "nickname":
+        return data[ fields[1][1] : fields[1][2] ]
+      continue
+    nickname = _findNickname( data, element[1], element[2] )
+    if nickname:
+      return nickname
+  return ""
+
+def decodeVOMSExtension( extValue ):
+  """ Decode the value of a vomsExtensions extension.
+      Returns a dict with the vo, fqan list, nickname, notBefore and notAfter
+      of the first attribute certificate
+  """
+  acsList = _checkTag( _readTLV( extValue, 0 ), _TAG_SEQUENCE )
+  acs = _checkTag( _children( extValue, acsList[1], acsList[2] )[0], _TAG_SEQUENCE )
+  ac = _checkTag( _children( extValue, acs[1], acs[2] )[0], _TAG_SEQUENCE )
+  acInfo = _checkTag( _children( extValue, ac[1], ac[2] )[0], _TAG_SEQUENCE )
+  # version, holder, issuer, signature, serialNumber, validity, attributes, [ issuerUID ], [ extensions ]
+  acFields = _children( extValue, acInfo[1], acInfo[2] )
+  if len( acFields ) < 7:
+    raise DERError( "Attribute certificate has only %s fields" % len( acFields ) )
+  data = { 'vo' : '', 'fqan' : [], 'nickname' : '' }
+
+  validity = _checkTag( acFields[5], _TAG_SEQUENCE )
+  times = [ _checkTag( t, _TAG_GENERALIZED_TIME ) for t in _children( extValue, validity[1], validity[2] ) ]
+  data[ 'notBefore' ] = _decodeTime( extValue, times[0][1], times[0][2] )
+  data[ 'notAfter' ] = _decodeTime( extValue, times[1][1], times[1][2] )
+
+  attributes = _checkTag( acFields[6], _TAG_SEQUENCE )
+  for attribute in _children( extValue, attributes[1], attributes[2] ):
+    attrType, attrValues = _children( extValue, attribute[1], attribute[2] )[:2]
+    if _decodeOID( extValue, attrType[1], attrType[2] ) != VOMS_FQANS_OID:
+      continue
+    for ietfAttr in _children( extValue, attrValues[1], attrValues[2] ):
+      for field in _children( extValue, ietfAttr[1], ietfAttr[2] ):
+        if field[0] == _TAG_SEQUENCE:
+          # values
+          for value in _children( extValue, field[1], field[2] ):
+            data[ 'fqan' ].append( extValue[ value[1] : value[2] ] )
+        else:
+          # policyAuthority: vo://host:port
+          for generalName in _children( extValue, field[1], field[2] ):
+            if generalName[0] == _TAG_URI and not data[ 'vo' ]:
+              data[ 'vo' ] = extValue[ generalName[1] : generalName[2] ].split( "://" )[0]
+
+  if acFields[-1][0] == _TAG_SEQUENCE and len( acFields ) > 7:
+    for ext in _children( extValue, acFields[-1][1], acFields[-1][2] ):
+      fields = _children( extValue, ext[1], ext[2] )
+      if _decodeOID( extValue, fields[0][1], fields[0][2] ) != VOMS_GENERIC_ATTRS_OID:
+        continue
+      value = _checkTag( fields[-1], _TAG_OCTET_STRING )
+      data[ 'nickname' ] = _findNickname( extValue, value[1], value[2] )
+
+  return data
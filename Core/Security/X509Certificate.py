@@ -173,6 +173,24 @@ class X509Certificate:
         return S_OK( True )
     return S_OK( False )
 
+  def getVOMSData( self ):
+    """
+    Decode the VOMS attribute certificate in process
+    Return : S_OK( dict with vo, fqan, nickname, notBefore and notAfter ) / S_OK( False ) if there is no
+             VOMS extension / S_ERROR
+    """
+    if not self.__valid:
+      return S_ERROR( "No certificate loaded" )
+    from DIRAC.Core.Security import VOMSExtension
+    try:
+      certDER = GSI.crypto.dump_certificate( GSI.crypto.FILETYPE_ASN1, self.__certObj )
+      extValue = VOMSExtension.getExtensionValue( certDER )
+      if extValue is None:
+        return S_OK( False )
+      return S_OK( VOMSExtension.decodeVOMSExtension( extValue ) )
+    except Exception, e:
+      return S_ERROR( "Can't decode VOMS extension: %s" % str( e ) )
+
   def generateProxyRequest( self, bitStrength = 1024, limited = False ):
     """
     Generate a proxy request
@@ -0,0 +1,99 @@
+# $HeadURL$
+''' Test_VOMSExtension
+
+  Unit tests for the in process decoding of VOMS attribute certificates. The
+  DER data is built here with the same layout VOMS servers use.
+
+'''
+
+import datetime
+import unittest
+
+__RCSID__ = '$Id$'
+
+def der( tag, content ):
+  length = len( content )
+  if length < 0x80:
+    header = chr( length )
+  else:
+    lenBytes = ""
+    while length:
+      lenBytes = chr( length & 0xff ) + lenBytes
+      length >>= 8
+    header = chr( 0x80 | len( lenBytes ) ) + lenBytes
+  return chr( tag ) + header + content
+
+def seq( *elements ):
+  return der( 0x30, "".join( elements ) )
+
+def oid( dotted ):
+  values = [ int( v ) for v in dotted.split( "." ) ]
+  encoded = chr( values[0] * 40 + values[1] )
+  for value in values[2:]:
+    chunk = chr( value & 0x7f )
+    value >>= 7
+    while value:
+      chunk = chr( 0x80 | ( value & 0x7f ) ) + chunk
+      value >>= 7
+    encoded += chunk
+  return der( 0x06, encoded )
+
+def octets( data ):
+  return der( 0x04, data )
+
+def vomsExtension( fqans, nickname = "" ):
+  policyAuthority = der( 0xa0, der( 0x86, "lhcb://voms.cern.ch:15003" ) )
+  ietfAttr = seq( policyAuthority, seq( *[ octets( fqan ) for fqan in fqans ] ) )
+  attributes = seq( seq( oid( "1.3.6.1.4.1.8005.100.100.4" ), der( 0x31, ietfAttr ) ) )
+  validity = seq( der( 0x18, "20110101000000Z" ), der( 0x18, "20110102120000Z" ) )
+  acFields = [ der( 0x02, "\x01" ), seq(), der( 0xa0, seq() ), seq( oid( "1.2.840.113549.1.1.5" ) ),
+               der( 0x02, "\x2a" ), validity, attributes ]
+  if nickname:
+    genericAttrs = seq( seq( seq(), seq( seq( octets( "nickname" ), octets( nickname ), octets( "lhcb" ) ) ) ) )
+    acFields.append( seq( seq( oid( "1.3.6.1.4.1.8005.100.100.11" ), octets( genericAttrs ) ) ) )
+  ac = seq( seq( *acFields ), seq( oid( "1.2.840.113549.1.1.5" ) ), der( 0x03, "\x00sig" ) )
+  return seq( seq( ac ) )
+
+def certificate( extensions ):
+  extList = [ seq( oid( extOID ), octets( value ) ) for extOID, value in extensions ]
+  tbs = seq( der( 0xa0, der( 0x02, "\x02" ) ), der( 0x02, "\x05" ), seq(), seq(), seq(), seq(), seq(),
+             der( 0xa3, seq( *extList ) ) )
+  return seq( tbs, seq(), der( 0x03, "\x00" ) )
+
+class VOMSExtension_TestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    from DIRAC.Core.Security import VOMSExtension
+    self.module = VOMSExtension
+
+  def test_getExtensionValue( self ):
+    value = vomsExtension( [ "/lhcb/Role=NULL/Capability=NULL" ] )
+    cert = certificate( [ ( "2.5.29.15", "\x03\x02\x05\xa0" ), ( "1.3.6.1.4.1.8005.100.100.5", value ) ] )
+    self.assertEqual( self.module.getExtensionValue( cert ), value )
+    cert = certificate( [ ( "2.5.29.15", "\x03\x02\x05\xa0" ) ] )
+    self.assertEqual( self.module.getExtensionValue( cert ), None )
+
+  def test_decode( self ):
+    fqans = [ "/lhcb/Role=production/Capability=NULL", "/lhcb/Role=NULL/Capability=NULL" ]
+    data = self.module.decodeVOMSExtension( vomsExtension( fqans, "jdoe" ) )
+    self.assertEqual( data[ 'vo' ], "lhcb" )
+    self.assertEqual( data[ 'fqan' ], fqans )
+    self.assertEqual( data[ 'nickname' ], "jdoe" )
+    self.assertEqual( data[ 'notBefore' ], datetime.datetime( 2011, 1, 1 ) )
+    self.assertEqual( data[ 'notAfter' ], datetime.datetime( 2011, 1, 2, 12 ) )
+
+  def test_decodeLongFQANList( self ):
+    # Forces multi byte lengths
+    fqans = [ "/lhcb/group%s/Role=NULL/Capability=NULL" % i for i in range( 20 ) ]
+    data = self.module.decodeVOMSExtension( vomsExtension( fqans ) )
+    self.assertEqual( data[ 'fqan' ], fqans )
+    self.assertEqual( data[ 'nickname' ], "" )
+
+  def test_corrupted( self ):
+    value = vomsExtension( [ "/lhcb" ] )
+    self.assertRaises( self.module.DERError, self.module.decodeVOMSExtension, value[:-10] )
+    self.assertRaises( self.module.DERError, self.module.decodeVOMSExtension, octets( "garbage" ) )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( VOMSExtension_TestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
@@ -8,96 +8,134 @@
 
 __RCSID__ = "$Id$"
 
+import re
+import threading
+from collections import deque
+
+# Structure characters and string literals, with their escaped quotes, of a JDL. Each
+# match is a single token and no repetition is nested in another one, so that an
+# unclosed quote only fails once instead of making the expression backtrack
+_jdlTokens = re.compile( r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{};]' )
+
+# Attributes of the JDLs parsed lately keyed by the JDL text, the same JDL is
+# analysed several times along the life cycle of a job
+MAX_PARSED_JDLS = 1000
+_parsedJDLs = {}
+_parsedJDLsOrder = deque()
+_parsedJDLsLock = threading.Lock()
+
+def _addParsedJDL( jdl, contents ):
+  """ Keep the attributes of a JDL, forgetting the oldest JDL if the cache is full
+  """
+  _parsedJDLsLock.acquire()
+  try:
+    if jdl in _parsedJDLs:
+      return
+    while len( _parsedJDLsOrder ) >= MAX_PARSED_JDLS:
+      _parsedJDLs.pop( _parsedJDLsOrder.popleft(), None )
+    _parsedJDLs[jdl] = contents
+    _parsedJDLsOrder.append( jdl )
+  finally:
+    _parsedJDLsLock.release()
+
+def clearParsedJDLs():
+  """ Forget all the JDLs parsed so far
+  """
+  _parsedJDLsLock.acquire()
+  try:
+    _parsedJDLs.clear()
+    _parsedJDLsOrder.clear()
+  finally:
+    _parsedJDLsLock.release()
+
 class ClassAd:
 
   def __init__( self, jdl ):
     """ClassAd constructor from a JDL string
     """
     self.contents = {}
-    result = self.__analyse_jdl( jdl )
+    self.__typedValues = {}
+    result = _parsedJDLs.get( jdl )
+    if result is None:
+      result = self.__analyse_jdl( jdl )
+      if result:
+        _addParsedJDL( jdl, result )
     if result:
-      self.contents = result
+      self.contents = dict( result )
 
-  def __analyse_jdl( self, jdl, index = 0 ):
-    """Analyse one [] jdl enclosure
+  def __analyse_jdl( self, jdl ):
+    """Analyse one [] jdl enclosure in a single pass. Most values end at the next
+       ';', the values with string literals or enclosures which could hide it are
+       delimited with the JDL tokens
     """
 
     jdl = jdl.strip()
 
-    # Strip all the blanks first
-    #temp = jdl.replace(' ','').replace('\n','')
-    temp = jdl
-
     result = {}
 
-    if temp[0] != '[' or temp[-1] != ']':
+    if jdl[0:1] != '[' or jdl[-1:] != ']':
       print "Invalid JDL: it should start with [ and end with ]"
       return result
 
-    # Parse the jdl string now
-    body = temp[1:-1]
+    body = jdl[1:-1]
+    length = len( body )
     index = 0
-    namemode = 1
-    valuemode = 0
-    while index < len( body ):
-      if namemode:
-        ind = body.find( "=", index )
-        if ind != -1:
-          name = body[index:ind]
-          index = ind + 1
-          valuemode = 1
-          namemode = 0
-        else:
-          break
-      elif valuemode:
-        ind1 = body.find( "[", index )
-        ind2 = body.find( ";", index )
-        if ind1 != -1 and ind1 < ind2:
-          value, newind = self.__find_subjdl( body, ind1 )
-        elif ind1 == -1 and ind2 == -1:
-          value = body[index:]
-          newind = len( body )
-        else:
-          if index == ind2:
-            return {}
-          else:
-            value = body[index:ind2]
-            newind = ind2 + 1
-
-        result[name.strip()] = value.strip().replace( '\n', '' )
-        index = newind
-        valuemode = 0
-        namemode = 1
+    while index < length:
+      ind = body.find( "=", index )
+      if ind == -1:
+        break
+      name = body[index:ind]
+      index = ind + 1
+      end = body.find( ";", index )
+      if end == -1:
+        end = length
+      value = body[index:end]
+      if value.count( '"' ) % 2 or value.count( '[' ) != value.count( ']' ) or value.count( '{' ) != value.count( '}' ):
+        # A malformed value, like one with an escaped quote, ends at the next ';' as it used to
+        valueEnd = self.__findValueEnd( body, index )
+        if valueEnd != -1:
+          end = valueEnd
+        value = body[index:end]
+      elif end == index:
+        return {}
+      result[name.strip()] = value.strip().replace( '\n', '' )
+      index = end + 1
 
     return result
 
-  def __find_subjdl( self, body, index ):
-    """ Find a full [] enclosure starting from index
+  def __findValueEnd( self, body, index ):
+    """ Find the ';' ending the value starting at index, outside of any string
+        literal, list or nested enclosure. Returns -1 if there is an unclosed
+        string literal or enclosure
     """
-    result = ''
-    if body[index] != '[':
-      return ( result, 0 )
-
     depth = 0
-    ind = index
-    while ( depth < 10 ):
-      ind1 = body.find( ']', ind + 1 )
-      ind2 = body.find( '[', ind + 1 )
-      if ind2 != -1 and ind2 < ind1:
+    tail = index
+    for match in _jdlTokens.finditer( body, index ):
+      tail = match.end()
+      token = match.group()
+      if token[0] == '"':
+        continue
+      if token in '[{':
         depth += 1
-        ind = ind2
-      else:
-        if depth > 0:
-          depth -= 1
-          ind = ind1
-        else:
-          result = body[index:ind1 + 1]
-          if body[ind1 + 1] == ";":
-            return ( result, ind1 + 2 )
-          else:
-            return result, 0
-
-    return result, 0
+      elif token in ']}':
+        depth -= 1
+      elif not depth:
+        return match.start()
+    if depth or body.find( '"', tail ) != -1:
+      return -1
+    return len( body )
+
+  def __getTypedValue( self, kind, name, convert ):
+    """ Get the value of an attribute converted by convert( name ), which is only
+        done once as long as the attribute is not changed
+    """
+    expression = self.contents.get( name )
+    cached = self.__typedValues.get( ( kind, name ) )
+    if cached and cached[0] is expression:
+      return cached[1]
+    value = convert( name )
+    self.__typedValues[( kind, name )] = ( expression, value )
+    return value
 
   def insertAttributeInt( self, name, attribute ):
     """Insert a named integer attribute
@@ -172,6 +210,9 @@ class ClassAd:
   def getListFromExpression( self, name ):
     """ Get a list of strings from a given expression
     """
+    return list( self.__getTypedValue( 'list', name, self.__getListFromExpression ) )
+
+  def __getListFromExpression( self, name ):
 
     tempString = self.get_expression( name ).strip()
     listMode = False
@@ -280,6 +321,9 @@ class ClassAd:
   def getAttributeInt( self, name ):
     """ Get Integer type attribute value
     """
+    return self.__getTypedValue( 'int', name, self.__getAttributeInt )
+
+  def __getAttributeInt( self, name ):
     value = 0
     if self.lookupAttribute( name ):
       try:
@@ -291,6 +335,9 @@ class ClassAd:
   def getAttributeBool( self, name ):
     """ Get Boolean type attribute value
     """
+    return self.__getTypedValue( 'bool', name, self.__getAttributeBool )
+
+  def __getAttributeBool( self, name ):
     if self.lookupAttribute( name ):
       value = self.get_expression( name ).replace( '"', '' )
     else:
@@ -305,6 +352,9 @@ class ClassAd:
   def getAttributeFloat( self, name ):
     """ Get Float type attribute value
     """
+    return self.__getTypedValue( 'float', name, self.__getAttributeFloat )
+
+  def __getAttributeFloat( self, name ):
     value = 0.0
     if self.lookupAttribute( name ):
       try:
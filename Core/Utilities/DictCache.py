@@ -15,15 +15,18 @@ class DictCache( object ):
   simple dict cache
   """
 
-  def __init__( self, deleteFunction = False ):
+  def __init__( self, deleteFunction = False, maxEntries = 0 ):
     """
     Initialize the dict cache.
       If a delete function is specified it will be invoked when deleting a cached object
+      If maxEntries is specified, once the cache is full the records closer to expire
+      are dropped to make room for the new ones
     """
     self.__lock = None
 
     self.__cache = {}
     self.__deleteFunction = deleteFunction
+    self.__maxEntries = maxEntries
 
   @property
   def lock( self ):
@@ -82,12 +85,40 @@ class DictCache( object ):
       return
     self.lock.acquire()
     try:
+      if self.__maxEntries and cKey not in self.__cache and len( self.__cache ) >= self.__maxEntries:
+        self.__makeRoom()
       vD = { 'expirationTime' : datetime.datetime.now() + datetime.timedelta( seconds = validSeconds ),
              'value' : value }
       self.__cache[ cKey ] = vD
     finally:
       self.lock.release()
 
+  def __makeRoom( self ):
+    """
+    Drop expired records and, if still full, the ones closer to expire
+    """
+    self.purgeExpired()
+    excess = len( self.__cache ) - self.__maxEntries + 1
+    if excess <= 0:
+      return
+    expirations = [ ( self.__cache[ cKey ][ 'expirationTime' ], cKey ) for cKey in self.__cache ]
+    expirations.sort()
+    for expTime, cKey in expirations[ :excess ]:
+      self.delete( cKey )
+
+  def deleteMatching( self, matchFunction ):
+    """
+    Delete all the records whose key matches
+      Arguments:
+        - matchFunction : function receiving a key and returning True if it has to be deleted
+    """
+    self.lock.acquire()
+    try:
+      for cKey in [ cKey for cKey in self.__cache if matchFunction( cKey ) ]:
+        self.delete( cKey )
+    finally:
+      self.lock.release()
+
   def get( self, cKey, validSeconds = 0 ):
     """
     Get a record from the cache
@@ -1,6 +1,7 @@
 
 import threading, time, types
 from DIRAC import S_OK, S_ERROR, gLogger
+from DIRAC.FrameworkSystem.Client.Logger import LazyText
 from DIRAC.Core.Utilities.ReturnValues import isReturnStructure
 from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
 
@@ -155,7 +156,7 @@ class ExecutorQueues:
     return [ eType for eType in self.__queues ]
 
   def pushTask( self, eType, taskId, ahead = False ):
-    self.__log.verbose( "Pushing task %s into waiting queue for executor %s" % ( taskId, eType ) )
+    self.__log.verbose( LazyText( "Pushing task %s into waiting queue for executor %s", taskId, eType ) )
     self.__lock.acquire()
     try:
       if taskId in self.__taskInQueue:
@@ -189,7 +190,7 @@ class ExecutorQueues:
         #Found! release and return!
         self.__lock.release()
         self.__lastUse[ eType ] = time.time()
-        self.__log.verbose( "Popped task %s from executor %s waiting queue" % ( taskId, eType ) )
+        self.__log.verbose( LazyText( "Popped task %s from executor %s waiting queue", taskId, eType ) )
         return ( taskId, eType )
       except IndexError:
         continue
@@ -210,7 +211,7 @@ class ExecutorQueues:
     return qInfo
 
   def deleteTask( self, taskId ):
-    self.__log.verbose( "Deleting task %s from waiting queues" % taskId )
+    self.__log.verbose( LazyText( "Deleting task %s from waiting queues", taskId ) )
     self.__lock.acquire()
     try:
       try:
@@ -355,7 +356,7 @@ class ExecutorDispatcher:
     self.__monitor.addMark( "executors", len( self.__idMap ) )
 
   def addExecutor( self, eId, eTypes, maxTasks = 1 ):
-    self.__log.verbose( "Adding new %s executor to the pool %s" % ( eId, ", ".join ( eTypes ) ) )
+    self.__log.verbose( LazyText( "Adding new %s executor to the pool %s", eId, ", ".join ( eTypes ) ) )
     self.__executorsLock.acquire()
     try:
       if eId in self.__idMap:
@@ -381,7 +382,7 @@ class ExecutorDispatcher:
       self.__fillExecutors( eType )
 
   def removeExecutor( self, eId ):
-    self.__log.verbose( "Removing executor %s" % eId )
+    self.__log.verbose( LazyText( "Removing executor %s", eId ) )
     self.__executorsLock.acquire()
     try:
       if eId not in self.__idMap:
@@ -410,7 +411,7 @@ class ExecutorDispatcher:
       self.__fillExecutors( eType )
 
   def __freezeTask( self, taskId, errMsg, eType = False, freezeTime = 60 ):
-    self.__log.verbose( "Freezing task %s" % taskId )
+    self.__log.verbose( LazyText( "Freezing task %s", taskId ) )
     self.__freezerLock.acquire()
     try:
       if taskId in self.__taskFreezer:
@@ -484,17 +485,17 @@ class ExecutorDispatcher:
         self.__freezerLock.release()
       #Out of the lock zone to minimize zone of exclusion
       eTask.frozenTime += time.time() - eTask.frozenSince
-      self.__log.verbose( "Unfreezed task %s" % taskId )
+      self.__log.verbose( LazyText( "Unfreezed task %s", taskId ) )
       self.__dispatchTask( taskId, defrozeIfNeeded = False )
 
   def __addTaskIfNew( self, taskId, taskObj ):
     self.__tasksLock.acquire()
     try:
       if taskId in self.__tasks:
-        self.__log.verbose( "Task %s was already known" % taskId )
+        self.__log.verbose( LazyText( "Task %s was already known", taskId ) )
         return False
       self.__tasks[ taskId ] = ExecutorDispatcher.ETask( taskId, taskObj )
-      self.__log.verbose( "Added task %s" % taskId )
+      self.__log.verbose( LazyText( "Added task %s", taskId ) )
       return True
     finally:
       self.__tasksLock.release()
@@ -506,7 +507,7 @@ class ExecutorDispatcher:
       return None
 
   def __dispatchTask( self, taskId, defrozeIfNeeded = True ):
-    self.__log.verbose( "Dispatching task %s" % taskId )
+    self.__log.verbose( LazyText( "Dispatching task %s", taskId ) )
     #If task already in executor skip
     if self.__states.getExecutorOfTask( taskId ):
       return S_OK()
@@ -527,17 +528,17 @@ class ExecutorDispatcher:
 
     eType = result[ 'Value' ]
     if not eType:
-      self.__log.verbose( "No more executors for task %s" % taskId )
+      self.__log.verbose( LazyText( "No more executors for task %s", taskId ) )
       return self.removeTask( taskId )
 
-    self.__log.verbose( "Next executor type is %s for task %s" % ( eType, taskId ) )
+    self.__log.verbose( LazyText( "Next executor type is %s for task %s", eType, taskId ) )
     if eType not in self.__execTypes:
       if  self.__freezeOnUnknownExecutor:
-        self.__log.verbose( "Executor type %s has not connected. Freezing task %s" % ( eType, taskId ) )
+        self.__log.verbose( LazyText( "Executor type %s has not connected. Freezing task %s", eType, taskId ) )
         self.__freezeTask( taskId, "Unknown executor %s type" % eType,
                            eType = eType, freezeTime = 0 )
         return S_OK()
-      self.__log.verbose( "Executor type %s has not connected. Forgetting task %s" % ( eType, taskId ) )
+      self.__log.verbose( LazyText( "Executor type %s has not connected. Forgetting task %s", eType, taskId ) )
       return self.removeTask( taskId )
 
     self.__queues.pushTask( eType, taskId )
@@ -612,9 +613,9 @@ class ExecutorDispatcher:
     try:
       self.__tasks.pop( taskId )
     except KeyError:
-      self.__log.verbose( "Task %s is already removed" % taskId )
+      self.__log.verbose( LazyText( "Task %s is already removed", taskId ) )
       return S_OK()
-    self.__log.verbose( "Removing task %s" % taskId )
+    self.__log.verbose( LazyText( "Removing task %s", taskId ) )
     eId = self.__states.getExecutorOfTask( taskId )
     self.__queues.deleteTask( taskId )
     self.__states.removeTask( taskId )
@@ -713,7 +714,7 @@ class ExecutorDispatcher:
       self.__log.error( "Task %s seems to have been removed while being processed!" % taskId )
       self.__sendTaskToExecutor( eId, eType )
       return S_OK()
-    self.__log.verbose( "Executor %s processed task %s" % ( eId, taskId ) )
+    self.__log.verbose( LazyText( "Executor %s processed task %s", eId, taskId ) )
     result = self.__dispatchTask( taskId )
     self.__sendTaskToExecutor( eId, eType )
     return result
@@ -727,7 +728,7 @@ class ExecutorDispatcher:
       self.__log.info( "Executor %s says it's processed task %s but it didn't have it" % ( eId, taskId ) )
       self.__sendTaskToExecutor( eId )
       return S_OK()
-    self.__log.verbose( "Executor %s did NOT process task %s, retrying" % ( eId, taskId ) )
+    self.__log.verbose( LazyText( "Executor %s did NOT process task %s, retrying", eId, taskId ) )
     try:
       self.__tasks[ taskId ].retries += 1
     except KeyError:
@@ -737,9 +738,9 @@ class ExecutorDispatcher:
 
   def __fillExecutors( self, eType, defrozeIfNeeded = True ):
     if defrozeIfNeeded:
-      self.__log.verbose( "Unfreezing tasks for %s" % eType )
+      self.__log.verbose( LazyText( "Unfreezing tasks for %s", eType ) )
       self.__unfreezeTasks( eType )
-    self.__log.verbose( "Filling %s executors" % eType )
+    self.__log.verbose( LazyText( "Filling %s executors", eType ) )
     eId = self.__states.getIdleExecutor( eType )
     processedTasks = set()
     while eId:
@@ -750,9 +751,9 @@ class ExecutorDispatcher:
         if not result[ 'Value' ]:
           #No more tasks for eType
           break
-        self.__log.verbose( "Task %s was sent to %s" % ( result[ 'Value'], eId ) )
+        self.__log.verbose( LazyText( "Task %s was sent to %s", result[ 'Value'], eId ) )
       eId = self.__states.getIdleExecutor( eType )
-    self.__log.verbose( "No more idle executors for %s" % eType )
+    self.__log.verbose( LazyText( "No more idle executors for %s", eType ) )
 
   def __sendTaskToExecutor( self, eId, eTypes = False, checkIdle = False ):
     if checkIdle and self.__states.freeSlots( eId ) == 0:
@@ -760,7 +761,7 @@ class ExecutorDispatcher:
     try:
       searchTypes = list( reversed( self.__idMap[ eId ] ) )
     except KeyError:
-      self.__log.verbose( "Executor %s invalid/disconnected" % eId )
+      self.__log.verbose( LazyText( "Executor %s invalid/disconnected", eId ) )
       return S_ERROR( "Invalid executor" )
     if eTypes:
       if type( eTypes ) not in ( types.ListType, types.TupleType ):
@@ -773,10 +774,10 @@ class ExecutorDispatcher:
         searchTypes.append( eType )
     pData = self.__queues.popTask( searchTypes ) 
     if pData == None:
-      self.__log.verbose( "No more tasks for %s" % eTypes )
+      self.__log.verbose( LazyText( "No more tasks for %s", eTypes ) )
       return S_OK()
     taskId, eType = pData
-    self.__log.verbose( "Sending task %s to %s=%s" % ( taskId, eType, eId ) )
+    self.__log.verbose( LazyText( "Sending task %s to %s=%s", taskId, eType, eId ) )
     self.__states.addTask( eId, taskId )
     result = self.__msgTaskToExecutor( taskId, eId, eType )
     if not result[ 'OK' ]:
@@ -0,0 +1,31 @@
+# $HeadURL$
+"""
+  Proxy to an object of a module which is only imported the first time one of
+  the attributes of the object is needed. It allows to export global objects,
+  like gMonitor, without paying the import of their dependencies at start up.
+"""
+__RCSID__ = "$Id$"
+
+class LazyImport( object ):
+
+  def __init__( self, moduleName, objectName ):
+    object.__setattr__( self, '_LazyImport__moduleName', moduleName )
+    object.__setattr__( self, '_LazyImport__objectName', objectName )
+    object.__setattr__( self, '_LazyImport__object', None )
+
+  def __load( self ):
+    if self.__object is None:
+      module = __import__( self.__moduleName, globals(), locals(), [ self.__objectName ] )
+      object.__setattr__( self, '_LazyImport__object', getattr( module, self.__objectName ) )
+    return self.__object
+
+  def __getattr__( self, name ):
+    return getattr( self.__load(), name )
+
+  def __setattr__( self, name, value ):
+    setattr( self.__load(), name, value )
+
+  def __repr__( self ):
+    if self.__object is None:
+      return "<LazyImport of %s.%s>" % ( self.__moduleName, self.__objectName )
+    return repr( self.__object )
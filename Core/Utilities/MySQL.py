@@ -584,10 +584,16 @@ class MySQL:
     it returns an empty tuple if no matching rows are found
     return S_ERROR upon error
     """
+    # Avoid formatting the query and the results if they are not shown
     if debug:
-      self.logger.debug( '_query:', cmd )
+      logShown = self.logger.shown( 'DEBUG' )
     else:
-      if self.logger._minLevel == self.logger._logLevels.getLevelValue( 'DEBUG' ):
+      logShown = self.logger.shown( 'VERBOSE' )
+
+    if debug:
+      self.logger.debug( '_query:', cmd )
+    elif logShown:
+      if self.logger.shown( 'DEBUG' ):
         self.logger.verbose( '_query:', cmd )
       else:
         self.logger.verbose( '_query:', cmd[:min( len( cmd ) , 512 )] )
@@ -608,7 +614,9 @@ class MySQL:
         res = ()
 
       # Log the result limiting it to just 10 records
-      if len( res ) <= 10:
+      if not logShown:
+        pass
+      elif len( res ) <= 10:
         if debug:
           self.logger.debug( '_query: returns', res )
         else:
@@ -645,8 +653,8 @@ class MySQL:
     """
     if debug:
       self.logger.debug( '_update:', cmd )
-    else:
-      if self.logger._minLevel == self.logger._logLevels.getLevelValue( 'DEBUG' ):
+    elif self.logger.shown( 'VERBOSE' ):
+      if self.logger.shown( 'DEBUG' ):
         self.logger.verbose( '_update:', cmd )
       else:
         self.logger.verbose( '_update:', cmd[:min( len( cmd ) , 512 )] )
@@ -13,11 +13,13 @@ import re
 # it fails when going from 2.9 to 2.10,
 # the fix converts the version to a tuple and attempts a numeric comparison
 
-_libc_search = re.compile( r'(__libc_init)'
+# Every alternative starts with a literal so that the regular expression engine
+# skips quickly to the candidates, which makes the scan of libc several times faster
+_libc_search = re.compile( r'__libc_init'
                           '|'
-                          '(GLIBC_([0-9.]+))'
+                          'GLIBC_([0-9.]+)'
                           '|'
-                          '(libc(_\w+)?\.so(?:\.(\d[0-9.]*))?)' )
+                          'libc(_\w+)?\.so(?:\.(\d[0-9.]*))?' )
 
 def libc_ver( executable = sys.executable, lib = '', version = '',
              chunksize = 2048 ):
@@ -47,7 +49,14 @@ def libc_ver( executable = sys.executable, lib = '', version = '',
         break
       pos = 0
       continue
-    libcinit, glibc, glibcversion, so, threads, soversion = m.groups()
+    glibcversion, threads, soversion = m.groups()
+    libcinit = glibc = so = None
+    if glibcversion is not None:
+      glibc = m.group( 0 )
+    elif m.group( 0 ) == '__libc_init':
+      libcinit = m.group( 0 )
+    else:
+      so = m.group( 0 )
     if libcinit and not lib:
       lib = 'libc'
     elif glibc:
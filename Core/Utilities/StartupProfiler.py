@@ -0,0 +1,117 @@
+# $HeadURL$
+"""
+  Profiling of the start up of DIRAC components and scripts. It is enabled when
+  DIRAC is imported with the --profile-startup switch in the command line or
+  with the DIRAC_PROFILE_STARTUP environment variable set, and reports the time
+  spent importing each module and in each of the phases of the start up, like
+  the load of the configuration.
+
+  This module is imported before anything else of DIRAC, so it must not depend
+  on any other DIRAC module.
+"""
+__RCSID__ = "$Id$"
+
+import __builtin__
+import atexit
+import os
+import sys
+import thread
+import time
+
+PROFILE_SWITCH = '--profile-startup'
+PROFILE_ENV = 'DIRAC_PROFILE_STARTUP'
+
+_startTime = time.time()
+_enabled = False
+_reported = False
+_originalImport = None
+_mainThread = None
+# Module name -> [ import time including the imports it triggers, own import time ]
+_importTimes = {}
+# Time spent in the imports triggered by each of the imports in progress
+_childrenTimes = []
+_phases = []
+
+def isRequested():
+  """ The profiling is requested from the command line or the environment
+  """
+  return PROFILE_SWITCH in sys.argv[1:] or bool( os.environ.get( PROFILE_ENV ) )
+
+def isEnabled():
+  return _enabled
+
+def enable():
+  """ Start recording the imports of the main thread, the report is printed at exit
+      if it has not been printed before
+  """
+  global _enabled, _originalImport, _mainThread
+  if _enabled:
+    return
+  _enabled = True
+  _mainThread = thread.get_ident()
+  _originalImport = __builtin__.__import__
+  __builtin__.__import__ = _profiledImport
+  atexit.register( reportStartup )
+
+def disable():
+  """ Stop recording the imports
+  """
+  global _enabled
+  if not _enabled:
+    return
+  _enabled = False
+  if __builtin__.__import__ is _profiledImport:
+    __builtin__.__import__ = _originalImport
+
+def _profiledImport( name, globals = None, locals = None, fromlist = None, level = -1 ):
+  if thread.get_ident() != _mainThread:
+    return _originalImport( name, globals, locals, fromlist, level )
+  loadedModules = len( sys.modules )
+  _childrenTimes.append( 0.0 )
+  startTime = time.time()
+  try:
+    return _originalImport( name, globals, locals, fromlist, level )
+  finally:
+    elapsed = time.time() - startTime
+    childrenTime = _childrenTimes.pop()
+    if _childrenTimes:
+      _childrenTimes[-1] += elapsed
+    # Only the imports that actually loaded something are worth reporting
+    if len( sys.modules ) > loadedModules:
+      times = _importTimes.setdefault( name, [ 0.0, 0.0 ] )
+      times[0] += elapsed
+      times[1] += elapsed - childrenTime
+
+def getElapsedTime():
+  """ Time since the start up, that is since DIRAC was imported
+  """
+  return time.time() - _startTime
+
+def addPhase( phaseName, elapsed ):
+  """ Record the time spent in a phase of the start up
+  """
+  if _enabled:
+    _phases.append( ( phaseName, elapsed ) )
+
+def getReport( maxModules = 25 ):
+  """ Report of the start up as a list of lines, with the slowest modules to import
+  """
+  lines = [ 'Startup profile of %s' % os.path.basename( sys.argv[0] ),
+            '  %-50s %10.1f ms' % ( 'Time since DIRAC was imported', getElapsedTime() * 1000 ) ]
+  for phaseName, elapsed in _phases:
+    lines.append( '  %-50s %10.1f ms' % ( phaseName, elapsed * 1000 ) )
+  lines.append( '  %-50s %10s    %10s' % ( '%d modules imported, slowest ones' % len( _importTimes ),
+                                           'Cumulative', 'Own' ) )
+  importList = sorted( _importTimes.items(), key = lambda item: item[1][1], reverse = True )
+  for moduleName, ( cumulative, own ) in importList[:maxModules]:
+    lines.append( '  %-50s %10.1f ms %10.1f ms' % ( moduleName, cumulative * 1000, own * 1000 ) )
+  return lines
+
+def reportStartup( maxModules = 25 ):
+  """ Print the report once to stderr, components call it when they are ready to work
+  """
+  global _reported
+  if not _enabled or _reported:
+    return
+  _reported = True
+  sys.stderr.write( "\n".join( getReport( maxModules ) ) + "\n" )
@@ -0,0 +1,53 @@
+########################################################################
+# $HeadURL $
+# File: ClassAdTestCase.py
+########################################################################
+
+""".. module:: ClassAdTestCase
+
+Test cases for DIRAC.Core.Utilities.ClassAd.ClassAdLight module.
+
+"""
+
+__RCSID__ = "$Id $"
+
+## imports
+import time
+import unittest
+from DIRAC.Core.Utilities.ClassAd import ClassAdLight
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
+
+########################################################################
+class ClassAdTestCase( unittest.TestCase ):
+  """py:class ClassAdTestCase
+  Test case for the parsing of JDLs.
+  """
+
+  def setUp( self ):
+    ClassAdLight.clearParsedJDLs()
+
+  def testEnclosures( self ):
+    """ ';' in string literals, lists and nested enclosures """
+    classAd = ClassAd( '[ A = "x;y"; B = { "a", "b;c" }; C = [ D = 1; E = "f"; ]; F = 2; ]' )
+    self.assertEqual( classAd.contents, { 'A' : '"x;y"', 'B' : '{ "a", "b;c" }',
+                                          'C' : '[ D = 1; E = "f"; ]', 'F' : '2' } )
+
+  def testEscapedQuote( self ):
+    """ escaped quotes do not end the string literals, and do not make the parsing backtrack """
+    start = time.time()
+    classAd = ClassAd( '[ Arguments = "say \\"hi"; Executable = "%s"; ]' % ( 'x' * 100000 ) )
+    self.assert_( time.time() - start < 1 )
+    self.assertEqual( classAd.contents[ 'Arguments' ], '"say \\"hi"' )
+    self.assertEqual( classAd.contents[ 'Executable' ], '"%s"' % ( 'x' * 100000 ) )
+
+  def testUnclosedQuote( self ):
+    """ a value with an unclosed quote ends at the next ';' """
+    classAd = ClassAd( '[ A = "x; B = 2; ]' )
+    self.assertEqual( classAd.contents, { 'A' : '"x', 'B' : '2' } )
+
+
+## test suite execution
+if __name__ == "__main__":
+  TESTLOADER = unittest.TestLoader()
+  SUITE = TESTLOADER.loadTestsFromTestCase( ClassAdTestCase )
+  unittest.TextTestRunner(verbosity=3).run( SUITE )
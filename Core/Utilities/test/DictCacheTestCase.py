@@ -0,0 +1,60 @@
+########################################################################
+# $HeadURL $
+# File: DictCacheTestCase.py
+########################################################################
+
+""".. module:: DictCacheTestCase
+
+Test cases for DIRAC.Core.Utilities.DictCache module.
+
+"""
+
+__RCSID__ = "$Id $"
+
+## imports
+from DIRAC.Core.Utilities.DictCache import DictCache
+import unittest
+
+########################################################################
+class DictCacheTestCase( unittest.TestCase ):
+  """py:class DictCacheTestCase
+  Test case for DIRAC.Core.Utilities.DictCache module.
+  """
+
+  def testAddGet( self ):
+    """ add and get """
+    cache = DictCache()
+    cache.add( "a", 100, 1 )
+    cache.add( "b", 0, 2 )
+    self.assertEqual( cache.get( "a" ), 1 )
+    self.assertEqual( cache.get( "a", 200 ), False )
+    self.assertEqual( cache.exists( "b" ), False )
+
+  def testMaxEntries( self ):
+    """ records closer to expire are dropped when full """
+    deleted = []
+    cache = DictCache( deleted.append, maxEntries = 3 )
+    for key, validSeconds in ( ( "a", 300 ), ( "b", 100 ), ( "c", 200 ) ):
+      cache.add( key, validSeconds, key )
+    # Updating an existing record does not need room
+    cache.add( "a", 400, "a" )
+    self.assertEqual( deleted, [] )
+    cache.add( "d", 500, "d" )
+    self.assertEqual( deleted, [ "b" ] )
+    self.assertEqual( sorted( cache.getKeys() ), [ "a", "c", "d" ] )
+
+  def testDeleteMatching( self ):
+    """ delete by key """
+    cache = DictCache()
+    for key in ( ( "dn1", "group1", False ), ( "dn1", "group1", "/vo/Role=prod" ), ( "dn1", "group2", False ),
+                 ( "dn2", "group1", False ) ):
+      cache.add( key, 100, True )
+    cache.deleteMatching( lambda key: key[:2] == ( "dn1", "group1" ) )
+    self.assertEqual( sorted( cache.getKeys() ), [ ( "dn1", "group2", False ), ( "dn2", "group1", False ) ] )
+
+
+## test suite execution
+if __name__ == "__main__":
+  TESTLOADER = unittest.TestLoader()
+  SUITE = TESTLOADER.loadTestsFromTestCase( DictCacheTestCase )
+  unittest.TextTestRunner(verbosity=3).run( SUITE )
@@ -0,0 +1,68 @@
+########################################################################
+# $HeadURL $
+# File: StartupProfilerTestCase.py
+########################################################################
+
+""".. module:: StartupProfilerTestCase
+
+Test cases for DIRAC.Core.Utilities.StartupProfiler and
+DIRAC.Core.Utilities.LazyImport modules.
+
+"""
+
+__RCSID__ = "$Id $"
+
+## imports
+import sys
+import unittest
+from DIRAC.Core.Utilities import StartupProfiler
+from DIRAC.Core.Utilities.LazyImport import LazyImport
+
+########################################################################
+class StartupProfilerTestCase( unittest.TestCase ):
+  """py:class StartupProfilerTestCase
+  Test case for the profiling of the start up.
+  """
+
+  def setUp( self ):
+    self.wasEnabled = StartupProfiler.isEnabled()
+    for moduleName in ( 'colorsys', 'DIRAC.Core.Utilities.Adler' ):
+      sys.modules.pop( moduleName, None )
+
+  def tearDown( self ):
+    if not self.wasEnabled:
+      StartupProfiler.disable()
+
+  def testImportTimes( self ):
+    """ new imports are recorded, the ones already loaded are not """
+    StartupProfiler.enable()
+    import colorsys
+    import unittest
+    self.assert_( 'colorsys' in StartupProfiler._importTimes )
+    self.failIf( 'unittest' in StartupProfiler._importTimes )
+    cumulative, own = StartupProfiler._importTimes[ 'colorsys' ]
+    self.assert_( cumulative >= own >= 0 )
+
+  def testReport( self ):
+    """ phases and modules are reported """
+    StartupProfiler.enable()
+    StartupProfiler.addPhase( 'Load of the configuration', 0.25 )
+    import colorsys
+    report = "\n".join( StartupProfiler.getReport() )
+    self.assert_( 'Load of the configuration' in report )
+    self.assert_( '250.0 ms' in report )
+    self.assert_( 'colorsys' in report )
+
+  def testLazyImport( self ):
+    """ the module is only imported when used """
+    adler = LazyImport( 'DIRAC.Core.Utilities.Adler', 'intAdlerToHex' )
+    self.failIf( 'DIRAC.Core.Utilities.Adler' in sys.modules )
+    self.assertEqual( adler.__name__, 'intAdlerToHex' )
+    self.assert_( 'DIRAC.Core.Utilities.Adler' in sys.modules )
+
+
+## test suite execution
+if __name__ == "__main__":
+  TESTLOADER = unittest.TestLoader()
+  SUITE = TESTLOADER.loadTestsFromTestCase( StartupProfilerTestCase )
+  unittest.TextTestRunner(verbosity=3).run( SUITE )
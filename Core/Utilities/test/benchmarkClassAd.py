@@ -0,0 +1,172 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the parsing of job descriptions with ClassAd. The JDLs are read
+     from the files of the given directory, for instance JDLs dumped from the
+     JobJDLs table of a JobDB, or made up like the ones of production jobs if no
+     directory is given. Each JDL is parsed with the previous parser, which
+     looked for the separators with str.find, with the single pass parser and
+     from the cache of parsed JDLs. The attributes found have to be the same.
+
+     Usage: python benchmarkClassAd.py [ jdlDirectory [ rounds ] ]
+"""
+import os
+import sys
+import time
+
+from DIRAC.Core.Utilities.ClassAd import ClassAdLight
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
+
+SAMPLE_JDL = """[
+    Origin = "DIRAC";
+    Executable = "$DIRACROOT/scripts/dirac-jobexec";
+    StdError = "std.err";
+    LogLevel = "info";
+    JobName = "00012345_%(task)08d";
+    Priority = "1";
+    InputSandbox =
+        {
+            "LFN:/vo/production/00012345/InputSandbox.tar.bz2",
+            "jobDescription.xml"
+        };
+    Arguments = "jobDescription.xml -o LogLevel=info";
+    JobGroup = "00012345";
+    OutputSandbox =
+        {
+            "std.err",
+            "std.out"
+        };
+    StdOutput = "std.out";
+    InputData =
+        {
+%(inputData)s
+        };
+    JobType = "MCReconstruction";
+    Site = "ANY";
+    MaxCPUTime = 100000;
+    OwnerGroup = "vo_prod";
+    JobRequirements =
+        [
+            OwnerDN = "/DC=org/DC=vo/CN=production";
+            OwnerGroup = "vo_prod";
+            CPUTime = 100000;
+            Setup = "VO-Production";
+        ];
+]"""
+
+def getSampleJDLs( numJDLs ):
+  jdls = []
+  for task in range( numJDLs ):
+    inputData = ',\n'.join( [ '            "LFN:/vo/data/%08d/%06d.raw"' % ( task, iFile ) for iFile in range( 20 ) ] )
+    jdls.append( SAMPLE_JDL % { 'task' : task, 'inputData' : inputData } )
+  return jdls
+
+def readJDLs( jdlDirectory ):
+  jdls = []
+  for fileName in sorted( os.listdir( jdlDirectory ) ):
+    jdlFile = open( os.path.join( jdlDirectory, fileName ) )
+    jdls.append( jdlFile.read() )
+    jdlFile.close()
+  return jdls
+
+def findSubJDL( body, index ):
+  """ Previous lookup of a [] enclosure starting from index
+  """
+  result = ''
+  if body[index] != '[':
+    return ( result, 0 )
+  depth = 0
+  ind = index
+  while ( depth < 10 ):
+    ind1 = body.find( ']', ind + 1 )
+    ind2 = body.find( '[', ind + 1 )
+    if ind2 != -1 and ind2 < ind1:
+      depth += 1
+      ind = ind2
+    else:
+      if depth > 0:
+        depth -= 1
+        ind = ind1
+      else:
+        result = body[index:ind1 + 1]
+        if body[ind1 + 1] == ";":
+          return ( result, ind1 + 2 )
+        else:
+          return result, 0
+  return result, 0
+
+def analyseWithFind( jdl ):
+  """ Previous ClassAd parser
+  """
+  temp = jdl.strip()
+  result = {}
+  if temp[0] != '[' or temp[-1] != ']':
+    return result
+  body = temp[1:-1]
+  index = 0
+  namemode = 1
+  valuemode = 0
+  while index < len( body ):
+    if namemode:
+      ind = body.find( "=", index )
+      if ind != -1:
+        name = body[index:ind]
+        index = ind + 1
+        valuemode = 1
+        namemode = 0
+      else:
+        break
+    elif valuemode:
+      ind1 = body.find( "[", index )
+      ind2 = body.find( ";", index )
+      if ind1 != -1 and ind1 < ind2:
+        value, newind = findSubJDL( body, ind1 )
+      elif ind1 == -1 and ind2 == -1:
+        value = body[index:]
+        newind = len( body )
+      else:
+        if index == ind2:
+          return {}
+        else:
+          value = body[index:ind2]
+          newind = ind2 + 1
+      result[name.strip()] = value.strip().replace( '\n', '' )
+      index = newind
+      valuemode = 0
+      namemode = 1
+  return result
+
+def main( jdls, rounds ):
+  print "%d JDLs of %d bytes on average" % ( len( jdls ), sum( [ len( jdl ) for jdl in jdls ] ) / max( 1, len( jdls ) ) )
+
+  start = time.time()
+  for _round in range( rounds ):
+    previous = [ analyseWithFind( jdl ) for jdl in jdls ]
+  elapsed = time.time() - start
+  print "%-16s %8.1f JDLs/s" % ( 'str.find parser', rounds * len( jdls ) / max( elapsed, 0.001 ) )
+
+  start = time.time()
+  for _round in range( rounds ):
+    ClassAdLight.clearParsedJDLs()
+    parsed = [ ClassAd( jdl ).contents for jdl in jdls ]
+  elapsed = time.time() - start
+  print "%-16s %8.1f JDLs/s" % ( 'single pass', rounds * len( jdls ) / max( elapsed, 0.001 ) )
+
+  start = time.time()
+  for _round in range( rounds ):
+    cached = [ ClassAd( jdl ).contents for jdl in jdls ]
+  elapsed = time.time() - start
+  print "%-16s %8.1f JDLs/s" % ( 'cached', rounds * len( jdls ) / max( elapsed, 0.001 ) )
+
+  different = [ iJDL for iJDL in range( len( jdls ) ) if previous[ iJDL ] != parsed[ iJDL ] or parsed[ iJDL ] != cached[ iJDL ] ]
+  if different:
+    print "%d JDLs are parsed differently, the first one is number %d" % ( len( different ), different[0] )
+
+if __name__ == "__main__":
+  rounds = 10
+  if len( sys.argv ) > 1:
+    jdls = readJDLs( sys.argv[1] )
+  else:
+    jdls = getSampleJDLs( 500 )
+  if len( sys.argv ) > 2:
+    rounds = int( sys.argv[2] )
+  main( jdls, rounds )
@@ -6,6 +6,22 @@ import os
 
 from DIRAC.Core.Workflow.Parameter import AttributeCollection, ParameterCollection, indent
 
+# Code objects of the module bodies compiled so far, bodies are only compiled once
+# per process whatever the number of workflows using them
+_compiledBodies = {}
+MAX_COMPILED_BODIES = 100
+
+def compileBody( body ):
+  ''' Get the code object of a module body, compiling it on first use
+  '''
+  code = _compiledBodies.get( body )
+  if code is None:
+    code = compile( body, '<string>', 'exec' )
+    if len( _compiledBodies ) >= MAX_COMPILED_BODIES:
+      _compiledBodies.clear()
+    _compiledBodies[body] = code
+  return code
+
 class ModuleDefinition( AttributeCollection ):
 
   def __init__( self, type_ = None, obj = None, parent = None ):
@@ -83,7 +99,7 @@ class ModuleDefinition( AttributeCollection ):
       # A.T.  Use vars() function to inspect local objects instead of playing with
       #       fake modules. We assume that after the body execution there will be
       #       a class with name "self.getType()" defined in the local scope.
-      exec self.getBody()
+      exec compileBody( self.getBody() )
       if vars().has_key( self.getType() ):
         self.main_class_obj = vars()[self.getType()]  # save class object
       else:
@@ -47,6 +47,8 @@ class Workflow( AttributeCollection ):
       self.setName( name )
     self.workflow_commons = {}
     self.workflowStatus = S_OK()
+    # WorkflowTemplate this workflow shares its definitions with, if any
+    self.template = None
 
   def fromWorkflow( self, obj ):
     self.setName( obj.getName() )
@@ -77,9 +79,12 @@ class Workflow( AttributeCollection ):
     ret = '<Workflow>\n'
     ret = ret + AttributeCollection.toXML( self )
     ret = ret + self.parameters.toXML()
-    ret = ret + self.module_definitions.toXML()
-    ret = ret + self.step_definitions.toXML()
-    ret = ret + self.step_instances.toXML()
+    definitionsXML = None
+    if self.template:
+      definitionsXML = self.template.getDefinitionsXML( self )
+    if definitionsXML is None:
+      definitionsXML = self.module_definitions.toXML() + self.step_definitions.toXML() + self.step_instances.toXML()
+    ret = ret + definitionsXML
     ret = ret + '</Workflow>\n'
     return ret
 
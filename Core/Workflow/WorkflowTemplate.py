@@ -0,0 +1,73 @@
+''' WorkflowTemplate - a workflow prepared once to generate many similar ones
+
+    Parametric productions generate thousands of workflows which only differ by
+    their top level parameters ( job name, input data, destination... ). Parsing
+    the description, checking it and serialising the module and step definitions
+    for each of them is the bulk of the generation time. The template does this
+    once and hands out workflows sharing its definitions and step instances, with
+    their own copy of the attributes and parameters. Their XML is produced from
+    the serialised definitions of the template.
+'''
+
+from DIRAC.Core.Workflow.Parameter import ParameterCollection
+from DIRAC.Core.Workflow.Module import compileBody
+from DIRAC.Core.Workflow.Workflow import Workflow
+
+class WorkflowTemplate( object ):
+
+  def __init__( self, obj ):
+    ''' obj can be anything Workflow accepts: an XML string, a file name or a Workflow.
+        Raises TypeError or KeyError if the workflow is not consistent
+    '''
+    if isinstance( obj, Workflow ):
+      # Work on a copy, the workflow given could be changed afterwards
+      obj = obj.toXML()
+    self.workflow = Workflow( obj )
+    self.validate()
+    self.definitionsXML = self.workflow.module_definitions.toXML() + \
+                          self.workflow.step_definitions.toXML() + \
+                          self.workflow.step_instances.toXML()
+
+  def validate( self ):
+    ''' Check that the steps and modules used are all defined and compile the bodies
+        of the modules, which stay cached for their execution
+    '''
+    wf = self.workflow
+    for step_inst in wf.step_instances:
+      if not wf.step_definitions.has_key( step_inst.getType() ):
+        raise KeyError( 'Can not find StepDefinition ' + step_inst.getType() + ' of StepInstance ' + step_inst.getName() )
+    for step_def in wf.step_definitions.values():
+      for module_inst in step_def.module_instances:
+        if not wf.module_definitions.has_key( module_inst.getType() ):
+          raise KeyError( 'Can not find ModuleDefinition ' + module_inst.getType() + ' of ModuleInstance ' + module_inst.getName() )
+    for module_def in wf.module_definitions.values():
+      if not len( module_def.getBody() ):
+        raise TypeError( 'The body of the Module ' + module_def.getType() + ' seems empty' )
+      try:
+        compileBody( module_def.getBody() )
+      except SyntaxError, x:
+        raise TypeError( 'Can not compile the body of the Module ' + module_def.getType() + ': ' + str( x ) )
+
+  def getWorkflow( self ):
+    ''' Get a new workflow with a copy of the attributes and parameters of the template.
+        Its definitions and step instances are the ones of the template and should not
+        be modified
+    '''
+    wf = Workflow()
+    dict.update( wf, self.workflow )
+    wf.parameters = ParameterCollection( self.workflow.parameters )
+    wf.module_definitions = self.workflow.module_definitions
+    wf.step_definitions = self.workflow.step_definitions
+    wf.step_instances = self.workflow.step_instances
+    wf.template = self
+    return wf
+
+  def getDefinitionsXML( self, wf ):
+    ''' XML of the definitions and step instances of wf if they are the ones of the
+        template, None otherwise
+    '''
+    if wf.module_definitions is self.workflow.module_definitions and \
+       wf.step_definitions is self.workflow.step_definitions and \
+       wf.step_instances is self.workflow.step_instances:
+      return self.definitionsXML
+    return None
@@ -0,0 +1,118 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the generation of parametric jobs from a production workflow, as
+     the transformation task managers do it: the per task parameters are set
+     on the workflow, which is serialised for the output data module and read
+     back to make the task object. Jobs are generated either from the XML
+     description, parsing it for each job as before, or from a WorkflowTemplate
+     prepared once. Both ways have to produce the same workflows.
+
+     Usage: python benchmarkWorkflowTemplate.py [ jobs [ modules ] ]
+"""
+import sys
+import time
+
+from DIRAC.Core.Workflow.Parameter import Parameter, AttributeCollection
+from DIRAC.Core.Workflow.Module import ModuleDefinition
+from DIRAC.Core.Workflow.Step import StepDefinition
+from DIRAC.Core.Workflow.Workflow import Workflow
+from DIRAC.Core.Workflow.WorkflowTemplate import WorkflowTemplate
+
+MODULE_BODY = """class %(name)s( object ):
+
+  def __init__( self ):
+    self.enable = True
+    self.inputData = ''
+    self.result = 0
+
+  def execute( self ):
+%(lines)s    return self.result
+"""
+
+def getProductionWorkflow( numModules ):
+  """ Workflow with one step made of numModules modules, similar in size to the
+      production ones
+  """
+  step = StepDefinition( 'ProductionStep' )
+  for iModule in range( numModules ):
+    name = 'Module%d' % iModule
+    lines = ''.join( [ '    self.result = self.result + %d\n' % line for line in range( 100 ) ] )
+    module = ModuleDefinition( name )
+    module.setDescription( 'Module number %d of the production step' % iModule )
+    module.setBody( MODULE_BODY % { 'name' : name, 'lines' : lines } )
+    module.addParameter( Parameter( 'enable', 'True', 'bool', '', '', True, False, 'Enable the module' ) )
+    module.addParameter( Parameter( 'inputData', '', 'string', '', '', True, False, 'Input data' ) )
+    step.addModule( module )
+    step.createModuleInstance( name, 'instance%d' % iModule )
+  step.addParameter( Parameter( 'inputData', '', 'string', '', '', True, False, 'Input data' ) )
+
+  workflow = Workflow( name = 'Production' )
+  workflow.setDescription( 'Synthetic production workflow' )
+  workflow.addStep( step )
+  for iStep in range( 3 ):
+    workflow.createStepInstance( 'ProductionStep', 'Step%d' % iStep )
+  for name, value in [ ( 'JobType', 'MCSimulation' ), ( 'Priority', '1' ), ( 'JobGroup', '' ),
+                       ( 'JobName', '' ), ( 'Site', 'ANY' ), ( 'InputData', '' ),
+                       ( 'PRODUCTION_ID', '00000000' ), ( 'JOB_ID', '00000000' ) ]:
+    workflow.addParameter( Parameter( name, value, 'JDL', '', '', True, False, name ) )
+  return workflow
+
+def setTaskParameters( workflow, taskNumber ):
+  """ Set the parameters the task manager changes for each task
+  """
+  workflow.setValue( 'JobName', '00000001_%08d' % taskNumber )
+  workflow.setValue( 'JOB_ID', '%08d' % taskNumber )
+  workflow.setValue( 'JobGroup', '00000001' )
+  workflow.setValue( 'InputData', 'LFN:/vo/data/00000001/%08d.raw' % taskNumber )
+
+def fromDescription( xml, numJobs ):
+  jobs = []
+  for taskNumber in range( numJobs ):
+    workflow = Workflow( xml )
+    setTaskParameters( workflow, taskNumber )
+    jobs.append( Workflow( workflow.toXML() ).toXML() )
+  return jobs
+
+def fromTemplate( xml, numJobs ):
+  jobs = []
+  template = WorkflowTemplate( xml )
+  for taskNumber in range( numJobs ):
+    workflow = template.getWorkflow()
+    setTaskParameters( workflow, taskNumber )
+    workflow.toXML()
+    jobs.append( workflow.toXML() )
+  return jobs
+
+def getDefinitions( xml ):
+  """ Parts of the XML of a workflow, with the definitions sorted since they are
+      serialised in the order of a dictionary
+  """
+  workflow = Workflow( xml )
+  definitions = []
+  for pool in ( workflow.module_definitions, workflow.step_definitions ):
+    definitions.append( sorted( [ pool[ name ].toXML() for name in pool.keys() ] ) )
+  return ( AttributeCollection.toXML( workflow ), workflow.parameters.toXML(),
+           definitions, workflow.step_instances.toXML() )
+
+def main( numJobs, numModules ):
+  xml = getProductionWorkflow( numModules ).toXML()
+  print "Workflow description of %d bytes" % len( xml )
+  results = {}
+  for name, function in [ ( 'description', fromDescription ), ( 'template', fromTemplate ) ]:
+    start = time.time()
+    results[ name ] = function( xml, numJobs )
+    elapsed = time.time() - start
+    print "From the %-12s %6d jobs in %6.2f s, %8.1f jobs/s" % ( name, numJobs, elapsed, numJobs / max( elapsed, 0.001 ) )
+  for fromXML, templateXML in zip( results[ 'description' ], results[ 'template' ] ):
+    if fromXML != templateXML and getDefinitions( fromXML ) != getDefinitions( templateXML ):
+      print "The jobs generated differ"
+      break
+
+if __name__ == "__main__":
+  numJobs = 1000
+  numModules = 10
+  if len( sys.argv ) > 1:
+    numJobs = int( sys.argv[1] )
+  if len( sys.argv ) > 2:
+    numModules = int( sys.argv[2] )
+  main( numJobs, numModules )
@@ -13,6 +13,7 @@ import sys
 from DIRAC.ConfigurationSystem.Client.LocalConfiguration import LocalConfiguration
 from DIRAC import gLogger, gConfig
 from DIRAC.Core.Base.AgentReactor import AgentReactor
+from DIRAC.Core.Utilities import StartupProfiler
 
 localCfg = LocalConfiguration()
 
@@ -40,6 +41,8 @@ else:
 agentReactor = AgentReactor( mainName )
 result = agentReactor.loadAgentModules( positionalArgs )
 if result[ 'OK' ]:
+  StartupProfiler.addPhase( 'Time until the agents were loaded', StartupProfiler.getElapsedTime() )
+  StartupProfiler.reportStartup()
   agentReactor.go()
 else:
   gLogger.error( "Error while loading agent module", result[ 'Message' ] )
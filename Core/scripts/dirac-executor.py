@@ -14,6 +14,7 @@ import DIRAC
 from DIRAC.ConfigurationSystem.Client.LocalConfiguration import LocalConfiguration
 from DIRAC import gLogger, gConfig
 from DIRAC.Core.Base.ExecutorReactor import ExecutorReactor
+from DIRAC.Core.Utilities import StartupProfiler
 
 localCfg = LocalConfiguration()
 
@@ -43,6 +44,8 @@ if not result[ 'OK' ]:
   gLogger.fatal( "Error while loading executor", result[ 'Message' ] )
   sys.exit( 1 )
 
+StartupProfiler.addPhase( 'Time until the executors were loaded', StartupProfiler.getElapsedTime() )
+StartupProfiler.reportStartup()
 result = executorReactor.go()
 if not result[ 'OK' ]:
   gLogger.fatal( result[ 'Message' ] )
@@ -5,7 +5,7 @@ Compile the externals
 """
 __RCSID__ = "$Id$"
 
-import sys, os, getopt, tarfile, urllib2, imp, signal, re, time, stat, types, shutil
+import sys, os, getopt, tarfile, urllib2, imp, signal, re, time, stat, types, shutil, tempfile, threading, Queue, socket
 
 try:
   import zipfile
@@ -52,6 +52,8 @@ class Params:
     self.installSource = ""
     self.globalDefaults = False
     self.timeout = 300
+    self.cacheDir = os.environ.get( 'DIRAC_INSTALL_CACHE', '' )
+    self.parallelDownloads = 4
 
 cliParams = Params()
 
@@ -783,6 +785,16 @@ def logNOTICE( msg ):
     print "%s UTC dirac-install [NOTICE]  %s" % ( time.strftime( '%Y-%m-%d %H:%M:%S', time.gmtime() ), line )
   sys.stdout.flush()
 
+# Time spent in each phase of the installation
+phaseTimes = []
+phaseStart = [ time.time() ]
+
+def logPhase( phaseName ):
+  now = time.time()
+  phaseTimes.append( ( phaseName, now - phaseStart[0] ) )
+  logNOTICE( "%s done in %.1f s" % ( phaseName, now - phaseStart[0] ) )
+  phaseStart[0] = now
+
 def alarmTimeoutHandler( *args ):
   raise Exception( 'Timeout' )
 
@@ -790,11 +802,15 @@ def urlretrieveTimeout( url, fileName = '', timeout = 0 ):
   """
    Retrieve remote url to local file, with timeout wrapper
   """
-  # NOTE: Not thread-safe, since all threads will catch same alarm.
-  #       This is OK for dirac-install, since there are no threads.
+  # NOTE: The alarm is only used by the main thread, since all threads would
+  #       catch the same alarm. The download threads rely on the default socket
+  #       timeout set by downloadAndExtractTarballs.
   logDEBUG( 'Retrieving remote file "%s"' % url )
 
   urlData = ''
+  inMainThread = threading.currentThread().getName() == 'MainThread'
+  if not inMainThread:
+    timeout = 0
   if timeout:
     signal.signal( signal.SIGALRM, alarmTimeoutHandler )
     # set timeout alarm
@@ -821,7 +837,7 @@ def urlretrieveTimeout( url, fileName = '', timeout = 0 ):
       else:
         urlData += data
       data = remoteFD.read( 16384 )
-      if count % 20 == 0:
+      if count % 20 == 0 and inMainThread:
         print '\033[1D' + ".",
         sys.stdout.flush()
         progressBar = True
@@ -859,79 +875,128 @@ def urlretrieveTimeout( url, fileName = '', timeout = 0 ):
   else:
     return urlData
 
-def downloadAndExtractTarball( tarsURL, pkgName, pkgVer, checkHash = True, cache = False ):
+def getCacheDir( cache = False ):
+  """ Directory of the tarballs cache, created if needed. Several installations
+      can share it, the tarballs checked with their md5 are kept under their md5.
+      Without a shared cache only the tarballs to cache are kept, in the
+      .installCache of the installation
+  """
+  cacheDir = cliParams.cacheDir
+  if not cacheDir:
+    if not cache:
+      return False
+    cacheDir = os.path.join( cliParams.basePath, ".installCache" )
+  if not os.path.isdir( cacheDir ):
+    try:
+      os.makedirs( cacheDir )
+    except OSError:
+      # Maybe created by another installation in the meantime
+      if not os.path.isdir( cacheDir ):
+        return False
+  if not os.access( cacheDir, os.W_OK ):
+    return False
+  return cacheDir
+
+def fileMD5( filePath ):
+  md5Calculated = md5.md5()
+  fd = open( filePath, "rb" )
+  buf = fd.read( 1048576 )
+  while buf:
+    md5Calculated.update( buf )
+    buf = fd.read( 1048576 )
+  fd.close()
+  return md5Calculated.hexdigest()
+
+def fetchTarball( tarsURL, pkgName, pkgVer, checkHash = True, cache = False ):
+  """ Get a tarball from the cache or download it. Returns S_OK( ( tarPath, temporary ) ),
+      temporary tarballs have to be removed once extracted. Errors which have to
+      abort the installation are flagged with Fatal
+  """
   tarName = "%s-%s.tar.gz" % ( pkgName, pkgVer )
-  tarPath = os.path.join( cliParams.targetPath, tarName )
   tarFileURL = "%s/%s" % ( tarsURL, tarName )
-  cacheDir = os.path.join( cliParams.basePath, ".installCache" )
-  tarCachePath = os.path.join( cacheDir, tarName )
-  if cache and os.path.isfile( tarCachePath ):
-    logNOTICE( "Using cached copy of %s" % tarName )
-    shutil.copy( tarCachePath, tarPath )
+  cacheDir = getCacheDir( cache )
+
+  if not checkHash:
+    # Without md5 the tarball can only be cached under its name
+    tarCachePath = cacheDir and os.path.join( cacheDir, tarName )
+    if cache and tarCachePath and os.path.isfile( tarCachePath ):
+      logNOTICE( "Using cached copy of %s" % tarName )
+      return S_OK( ( tarCachePath, False ) )
+    tarPath = os.path.join( cliParams.targetPath, tarName )
+    result = downloadFile( tarFileURL, tarPath, tarName )
+    if not result[ 'OK' ]:
+      return result
+    if cache and tarCachePath:
+      shutil.copy( tarPath, tarCachePath )
+    return S_OK( ( tarPath, True ) )
+
+  md5Name = "%s-%s.md5" % ( pkgName, pkgVer )
+  md5FileURL = "%s/%s" % ( tarsURL, md5Name )
+  logNOTICE( "Retrieving %s" % md5FileURL )
+  try:
+    md5Data = urlretrieveTimeout( md5FileURL, timeout = 60 )
+  except Exception, e:
+    return S_ERROR( "Cannot download %s: %s" % ( md5Name, str( e ) ) )
+  if not md5Data:
+    return S_ERROR( "Cannot download %s" % md5Name )
+  md5Expected = md5Data.strip()
+
+  if cacheDir:
+    # The cache is addressed by content, a tarball is reused whatever its URL
+    tarCachePath = os.path.join( cacheDir, "%s.tar.gz" % md5Expected )
+    if os.path.isfile( tarCachePath ):
+      if fileMD5( tarCachePath ) == md5Expected:
+        logNOTICE( "Using cached copy of %s" % tarName )
+        return S_OK( ( tarCachePath, False ) )
+      logNOTICE( "Cached copy of %s is corrupted, downloading it again" % tarName )
+    fd, tarPath = tempfile.mkstemp( prefix = tarName, dir = cacheDir )
+    os.close( fd )
   else:
-    logNOTICE( "Retrieving %s" % tarFileURL )
-    try:
-      if not urlretrieveTimeout( tarFileURL, tarPath, cliParams.timeout ):
-        logERROR( "Cannot download %s" % tarName )
-        return False
-    except Exception, e:
-      logERROR( "Cannot download %s: %s" % ( tarName, str( e ) ) )
-      sys.exit( 1 )
-  if checkHash:
-    md5Name = "%s-%s.md5" % ( pkgName, pkgVer )
-    md5Path = os.path.join( cliParams.targetPath, md5Name )
-    md5FileURL = "%s/%s" % ( tarsURL, md5Name )
-    md5CachePath = os.path.join( cacheDir, md5Name )
-    if cache and os.path.isfile( md5CachePath ):
-      logNOTICE( "Using cached copy of %s" % md5Name )
-      shutil.copy( md5CachePath, md5Path )
-    else:
-      logNOTICE( "Retrieving %s" % md5FileURL )
-      try:
-        if not urlretrieveTimeout( md5FileURL, md5Path, 60 ):
-          logERROR( "Cannot download %s" % tarName )
-          return False
-      except Exception, e:
-        logERROR( "Cannot download %s: %s" % ( md5Name, str( e ) ) )
-        return False
-    #Read md5
-    fd = open( os.path.join( cliParams.targetPath, md5Name ), "r" )
-    md5Expected = fd.read().strip()
-    fd.close()
-    #Calculate md5
-    md5Calculated = md5.md5()
-    fd = open( os.path.join( cliParams.targetPath, tarName ), "r" )
-    buf = fd.read( 4096 )
-    while buf:
-      md5Calculated.update( buf )
-      buf = fd.read( 4096 )
-    fd.close()
-    #Check
-    if md5Expected != md5Calculated.hexdigest():
-      logERROR( "Oops... md5 for package %s failed!" % pkgVer )
+    tarPath = os.path.join( cliParams.targetPath, tarName )
+
+  result = downloadFile( tarFileURL, tarPath, tarName )
+  if not result[ 'OK' ]:
+    return result
+  if md5Expected != fileMD5( tarPath ):
+    os.unlink( tarPath )
+    result = S_ERROR( "Oops... md5 for package %s failed!" % pkgVer )
+    result[ 'Fatal' ] = True
+    return result
+  if not cacheDir:
+    return S_OK( ( tarPath, True ) )
+  # Atomic, concurrent installations may be adding the same tarball
+  os.rename( tarPath, tarCachePath )
+  return S_OK( ( tarCachePath, False ) )
+
+def downloadFile( url, filePath, name ):
+  logNOTICE( "Retrieving %s" % url )
+  try:
+    if not urlretrieveTimeout( url, filePath, cliParams.timeout ):
+      if os.path.isfile( filePath ):
+        os.unlink( filePath )
+      return S_ERROR( "Cannot download %s" % name )
+  except Exception, e:
+    if os.path.isfile( filePath ):
+      os.unlink( filePath )
+    result = S_ERROR( "Cannot download %s: %s" % ( name, str( e ) ) )
+    result[ 'Fatal' ] = True
+    return result
+  return S_OK()
+
+def extractTarball( pkgName, result ):
+  """ Extract the tarball fetched with result and run its post install script
+  """
+  if not result[ 'OK' ]:
+    logERROR( result[ 'Message' ] )
+    if result.get( 'Fatal' ):
       sys.exit( 1 )
-    #Delete md5 file
-    if cache:
-      if not os.path.isdir( cacheDir ):
-        os.makedirs( cacheDir )
-      os.rename( md5Path, md5CachePath )
-    else:
-      os.unlink( md5Path )
+    return False
+  tarPath, temporary = result[ 'Value' ]
   #Extract
-  #cwd = os.getcwd()
-  #os.chdir(cliParams.targetPath)
-  #tf = tarfile.open( tarPath, "r" )
-  #for member in tf.getmembers():
-  #  tf.extract( member )
-  #os.chdir(cwd)
   tarCmd = "tar xzf '%s' -C '%s'" % ( tarPath, cliParams.targetPath )
   os.system( tarCmd )
   #Delete tar
-  if cache:
-    if not os.path.isdir( cacheDir ):
-      os.makedirs( cacheDir )
-    os.rename( tarPath, tarCachePath )
-  else:
+  if temporary:
     os.unlink( tarPath )
 
   postInstallScript = os.path.join( cliParams.targetPath, pkgName, 'dirac-postInstall.py' )
@@ -945,6 +1010,69 @@ def downloadAndExtractTarball( tarsURL, pkgName, pkgVer, checkHash = True, cache
                                                                        postInstallScript ) )
   return True
 
+def downloadAndExtractTarball( tarsURL, pkgName, pkgVer, checkHash = True, cache = False ):
+  return extractTarball( pkgName, fetchTarball( tarsURL, pkgName, pkgVer, checkHash, cache ) )
+
+def downloadAndExtractTarballs( tarballs ):
+  """ Install the ( tarsURL, pkgName, pkgVer ) tarballs in their order. Up to
+      parallelDownloads tarballs are downloaded at once, each one is extracted as soon
+      as it and the ones before are there
+  """
+  queue = Queue.Queue()
+  for index in range( len( tarballs ) ):
+    queue.put( index )
+  results = {}
+  condition = threading.Condition()
+
+  def fetchWorker():
+    while True:
+      try:
+        index = queue.get_nowait()
+      except Queue.Empty:
+        return
+      tarsURL, pkgName, pkgVer = tarballs[ index ]
+      try:
+        result = fetchTarball( tarsURL, pkgName, pkgVer )
+      except Exception, e:
+        result = S_ERROR( "Cannot download %s-%s: %s" % ( pkgName, pkgVer, str( e ) ) )
+      condition.acquire()
+      results[ index ] = result
+      condition.notify()
+      condition.release()
+
+  # The download threads cannot use the alarm of urlretrieveTimeout, and urlopen
+  # only accepts a timeout from python 2.6
+  defaultTimeout = socket.getdefaulttimeout()
+  if cliParams.timeout:
+    socket.setdefaulttimeout( cliParams.timeout )
+  try:
+    for _i in range( max( 1, min( cliParams.parallelDownloads, len( tarballs ) ) ) ):
+      worker = threading.Thread( target = fetchWorker )
+      worker.setDaemon( True )
+      worker.start()
+    return extractFetchedTarballs( tarballs, results, condition )
+  finally:
+    socket.setdefaulttimeout( defaultTimeout )
+
+def extractFetchedTarballs( tarballs, results, condition ):
+  """ Extract the tarballs in their order, as the download threads fetch them
+  """
+  waitTime = 0.0
+  for index in range( len( tarballs ) ):
+    tarsURL, pkgName, pkgVer = tarballs[ index ]
+    start = time.time()
+    condition.acquire()
+    while index not in results:
+      condition.wait( 1 )
+    result = results.pop( index )
+    condition.release()
+    waitTime += time.time() - start
+    logNOTICE( "Installing %s:%s" % ( pkgName, pkgVer ) )
+    if not extractTarball( pkgName, result ):
+      return False
+  logNOTICE( "%s tarballs installed, %.1f s waiting for downloads" % ( len( tarballs ), waitTime ) )
+  return True
+
 def fixBuildPaths():
   """
   At compilation time many scripts get the building directory inserted,
@@ -1039,7 +1167,9 @@ cmdOpts = ( ( 'r:', 'release=', 'Release version to install' ),
             ( 'X', 'externalsOnly', 'Only install external binaries' ),
             ( 'M:', 'defaultsURL=', 'Where to retrieve the global defaults from' ),
             ( 'h', 'help', 'Show this help' ),
-            ( 'T:', 'Timeout=', 'Timeout for downloads (default = %s)' )
+            ( 'T:', 'Timeout=', 'Timeout for downloads (default = %s)' ),
+            ( 'C:', 'cacheDir=', 'Tarballs cache shared between installations (default $DIRAC_INSTALL_CACHE)' ),
+            ( 'j:', 'parallelDownloads=', 'Number of tarballs downloaded at once (default 4)' )
           )
 
 def usage():
@@ -1100,7 +1230,7 @@ def loadConfiguration():
   for opName in ( 'release', 'externalsType', 'installType', 'pythonVersion',
                   'buildExternals', 'noAutoBuild', 'debug', 'globalDefaults',
                   'lcgVer', 'useVersionsDir', 'targetPath',
-                  'project', 'release', 'extraModules', 'extensions', 'timeout' ):
+                  'project', 'release', 'extraModules', 'extensions', 'timeout', 'cacheDir' ):
     try:
       opVal = releaseConfig.getInstallationConfig( "LocalInstallation/%s" % ( opName[0].upper() + opName[1:] ) )
     except KeyError:
@@ -1159,6 +1289,13 @@ def loadConfiguration():
         cliParams.timeout = min( cliParams.timeout, 3600 )
       except ValueError:
         pass
+    elif o in ( '-C', '--cacheDir' ):
+      cliParams.cacheDir = v
+    elif o in ( '-j', '--parallelDownloads' ):
+      try:
+        cliParams.parallelDownloads = max( 1, int( v ) )
+      except ValueError:
+        pass
 
 
   if not cliParams.release:
@@ -1401,6 +1538,7 @@ def writeDefaultConfiguration():
 if __name__ == "__main__":
   logNOTICE( "Processing installation requirements" )
   result = loadConfiguration()
+  logPhase( "Release configuration" )
   if not result[ 'OK' ]:
     logERROR( result[ 'Message' ] )
     sys.exit( 1 )
@@ -1416,24 +1554,28 @@ if __name__ == "__main__":
       logNOTICE( "Writing down the releases files" )
       releaseConfig.dumpReleasesToPath( cliParams.targetPath )
     logNOTICE( "Installing modules..." )
+    tarballs = []
     for modName in modsOrder:
       tarsURL, modVersion = modsToInstall[ modName ]
       if cliParams.installSource:
         tarsURL = cliParams.installSource
-      logNOTICE( "Installing %s:%s" % ( modName, modVersion ) )
-      if not downloadAndExtractTarball( tarsURL, modName, modVersion ):
-        sys.exit( 1 )
+      tarballs.append( ( tarsURL, modName, modVersion ) )
+    if not downloadAndExtractTarballs( tarballs ):
+      sys.exit( 1 )
+    logPhase( "Modules" )
     logNOTICE( "Deploying scripts..." )
     ddeLocation = os.path.join( cliParams.targetPath, "DIRAC", "Core", "scripts", "dirac-deploy-scripts.py" )
     if os.path.isfile( ddeLocation ):
       os.system( ddeLocation )
     else:
       logDEBUG( "No dirac-deploy-scripts found. This doesn't look good" )
+    logPhase( "Scripts" )
   else:
     logNOTICE( "Skipping installing DIRAC" )
   logNOTICE( "Installing %s externals..." % cliParams.externalsType )
   if not installExternals( releaseConfig ):
     sys.exit( 1 )
+  logPhase( "Externals" )
   fixMySQLScript()
   if not createPermanentDirLinks():
     sys.exit( 1 )
@@ -1444,6 +1586,8 @@ if __name__ == "__main__":
   runExternalsPostInstall()
   writeDefaultConfiguration()
   installExternalRequirements( cliParams.externalsType )
+  logPhase( "Configuration" )
+  logNOTICE( "Time spent: %s" % ", ".join( [ "%s %.1f s" % phase for phase in phaseTimes ] ) )
   logNOTICE( "%s properly installed" % cliParams.installation )
   sys.exit( 0 )
 
@@ -11,6 +11,7 @@ import DIRAC
 from DIRAC.ConfigurationSystem.Client.LocalConfiguration import LocalConfiguration
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
 from DIRAC.Core.DISET.ServiceReactor import ServiceReactor
+from DIRAC.Core.Utilities import StartupProfiler
 
 localCfg = LocalConfiguration()
 
@@ -40,6 +41,8 @@ result = serverToLaunch.initialize( positionalArgs )
 if not result[ 'OK' ]:
   gLogger.error( result[ 'Message' ] )
   sys.exit( 1 )
+StartupProfiler.addPhase( 'Time until the services were initialized', StartupProfiler.getElapsedTime() )
+StartupProfiler.reportStartup()
 result = serverToLaunch.serve()
 if not result[ 'OK' ]:
   gLogger.error( result[ 'Message' ] )
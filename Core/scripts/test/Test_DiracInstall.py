@@ -0,0 +1,139 @@
+""" Tests of the tarball fetching of dirac-install, the tarballs are served by a
+    local HTTP server
+"""
+import os
+import imp
+import socket
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import SimpleHTTPServer
+
+try:
+  import hashlib as md5
+except ImportError:
+  import md5
+
+diracInstall = imp.load_source( 'diracInstall', os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                                                              '..', 'dirac-install.py' ) )
+
+class TarballHandler( SimpleHTTPServer.SimpleHTTPRequestHandler ):
+  """ Serves the current directory, keeping the paths requested
+  """
+  requests = []
+
+  def do_GET( self ):
+    TarballHandler.requests.append( self.path )
+    SimpleHTTPServer.SimpleHTTPRequestHandler.do_GET( self )
+
+  def log_message( self, *args ):
+    pass
+
+class DiracInstallTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.cwd = os.getcwd()
+    self.tmpDir = tempfile.mkdtemp()
+    self.serverDir = os.path.join( self.tmpDir, 'tars' )
+    os.makedirs( self.serverDir )
+    self.tarballs = []
+    for modName in [ 'DIRAC', 'ExtA', 'ExtB' ]:
+      self.__makeTarball( modName, 'v1r0' )
+    # The server serves its current directory
+    os.chdir( self.serverDir )
+    TarballHandler.requests = []
+    self.server = BaseHTTPServer.HTTPServer( ( '127.0.0.1', 0 ), TarballHandler )
+    serverThread = threading.Thread( target = self.server.serve_forever )
+    serverThread.setDaemon( True )
+    serverThread.start()
+    self.tarsURL = 'http://127.0.0.1:%d' % self.server.server_port
+    diracInstall.cliParams.cacheDir = os.path.join( self.tmpDir, 'cache' )
+    diracInstall.cliParams.parallelDownloads = 3
+    self.__setTarget( 'install1' )
+
+  def tearDown( self ):
+    self.server.shutdown()
+    self.server.server_close()
+    os.chdir( self.cwd )
+    shutil.rmtree( self.tmpDir )
+
+  def __makeTarball( self, modName, version ):
+    modDir = os.path.join( self.tmpDir, 'src', modName )
+    os.makedirs( modDir )
+    modFile = open( os.path.join( modDir, '__init__.py' ), 'w' )
+    modFile.write( '# %s %s\n' % ( modName, version ) * 1000 )
+    modFile.close()
+    tarPath = os.path.join( self.serverDir, '%s-%s.tar.gz' % ( modName, version ) )
+    tar = tarfile.open( tarPath, 'w:gz' )
+    tar.add( modDir, modName )
+    tar.close()
+    md5File = open( os.path.join( self.serverDir, '%s-%s.md5' % ( modName, version ) ), 'w' )
+    md5File.write( '%s\n' % md5.md5( open( tarPath, 'rb' ).read() ).hexdigest() )
+    md5File.close()
+    self.tarballs.append( ( modName, version ) )
+
+  def __setTarget( self, name ):
+    targetPath = os.path.join( self.tmpDir, name )
+    os.makedirs( targetPath )
+    diracInstall.cliParams.targetPath = targetPath
+    diracInstall.cliParams.basePath = targetPath
+    return targetPath
+
+  def __install( self ):
+    return diracInstall.downloadAndExtractTarballs( [ ( self.tarsURL, modName, version )
+                                                      for modName, version in self.tarballs ] )
+
+  def __tarballRequests( self ):
+    return [ path for path in TarballHandler.requests if path.endswith( '.tar.gz' ) ]
+
+  def testParallelInstall( self ):
+    self.assert_( self.__install() )
+    for modName, _version in self.tarballs:
+      self.assert_( os.path.isfile( os.path.join( diracInstall.cliParams.targetPath, modName, '__init__.py' ) ) )
+    self.assertEqual( len( self.__tarballRequests() ), 3 )
+    # The cache is addressed by the md5 of the tarballs
+    self.assertEqual( len( [ name for name in os.listdir( diracInstall.cliParams.cacheDir )
+                             if len( name ) == len( '.tar.gz' ) + 32 ] ), 3 )
+
+  def testPrivateCache( self ):
+    # Without a shared cache the tarballs are not kept once extracted
+    diracInstall.cliParams.cacheDir = ''
+    self.assert_( self.__install() )
+    targetPath = diracInstall.cliParams.targetPath
+    self.failIf( os.path.exists( os.path.join( targetPath, '.installCache' ) ) )
+    self.assertEqual( sorted( os.listdir( targetPath ) ), [ 'DIRAC', 'ExtA', 'ExtB' ] )
+    # The timeout of the download threads does not outlive the installation
+    self.assertEqual( socket.getdefaulttimeout(), None )
+
+  def testCacheReused( self ):
+    self.assert_( self.__install() )
+    targetPath = self.__setTarget( 'install2' )
+    self.assert_( self.__install() )
+    self.assertEqual( len( self.__tarballRequests() ), 3 )
+    self.assert_( os.path.isfile( os.path.join( targetPath, 'ExtB', '__init__.py' ) ) )
+
+  def testCorruptedCache( self ):
+    self.assert_( self.__install() )
+    cacheDir = diracInstall.cliParams.cacheDir
+    cachedFile = open( os.path.join( cacheDir, os.listdir( cacheDir )[0] ), 'w' )
+    cachedFile.write( 'corrupted' )
+    cachedFile.close()
+    self.__setTarget( 'install2' )
+    self.assert_( self.__install() )
+    self.assertEqual( len( self.__tarballRequests() ), 4 )
+
+  def testWrongMD5( self ):
+    md5File = open( os.path.join( self.serverDir, 'ExtA-v1r0.md5' ), 'w' )
+    md5File.write( '0' * 32 )
+    md5File.close()
+    result = diracInstall.fetchTarball( self.tarsURL, 'ExtA', 'v1r0' )
+    self.failIf( result['OK'] )
+    self.assert_( result['Fatal'] )
+    self.assertEqual( os.listdir( diracInstall.cliParams.cacheDir ), [] )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( DiracInstallTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
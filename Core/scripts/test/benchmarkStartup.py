@@ -0,0 +1,80 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the cold start of typical DIRAC scripts, each of them is run in a
+     new python interpreter a number of rounds and the median of the wall clock
+     times is reported next to the one of an empty interpreter. The scripts do
+     not contact the configuration servers, so that only the imports and the
+     local configuration are measured.
+
+     With a maximum time in milliseconds the benchmark fails if the start up of
+     any script, on top of the empty interpreter, takes longer, so that it can be
+     used to catch regressions. With --profile-startup the startup profile of
+     the last round of each script is shown.
+
+     Usage: python benchmarkStartup.py [ rounds [ maxTime ] ] [ --profile-startup ]
+"""
+import os
+import sys
+import time
+import subprocess
+
+SCRIPTS = [ ( 'python interpreter', 'pass' ),
+            ( 'import DIRAC', 'import DIRAC' ),
+            ( 'dirac-version', 'import DIRAC; DIRAC.version' ),
+            ( 'Script.parseCommandLine', 'from DIRAC.Core.Base import Script; Script.disableCS(); '
+                                         'Script.parseCommandLine( ignoreErrors = True )' ),
+            ( 'DIRAC API script', 'from DIRAC.Core.Base import Script; Script.disableCS(); '
+                                  'Script.parseCommandLine( ignoreErrors = True ); '
+                                  'from DIRAC.Interfaces.API.Dirac import Dirac' ) ]
+
+def runScript( code, profile = False ):
+  """ Wall clock time of a script run in a new interpreter, with its profile
+  """
+  command = [ sys.executable, '-c', code ]
+  if profile:
+    command.append( '--profile-startup' )
+  start = time.time()
+  process = subprocess.Popen( command, stdout = subprocess.PIPE, stderr = subprocess.PIPE )
+  _stdout, stderr = process.communicate()
+  elapsed = time.time() - start
+  if process.returncode:
+    raise RuntimeError( "%s failed:\n%s" % ( code, stderr ) )
+  return elapsed, stderr
+
+def median( values ):
+  values = sorted( values )
+  return values[ len( values ) / 2 ]
+
+def main( rounds, maxTime, profile ):
+  baseline = None
+  slowScripts = []
+  for name, code in SCRIPTS:
+    times = []
+    for _round in range( rounds ):
+      elapsed, stderr = runScript( code, profile and _round == rounds - 1 )
+      times.append( elapsed * 1000 )
+    startTime = median( times )
+    if baseline is None:
+      baseline = startTime
+      print "%-24s %8.1f ms" % ( name, startTime )
+      continue
+    print "%-24s %8.1f ms %+8.1f ms  (min %.1f ms, max %.1f ms)" % ( name, startTime, startTime - baseline,
+                                                                     min( times ), max( times ) )
+    if profile:
+      print stderr
+    if maxTime and startTime - baseline > maxTime:
+      slowScripts.append( name )
+  if slowScripts:
+    print "Start up slower than %s ms: %s" % ( maxTime, ", ".join( slowScripts ) )
+    return 1
+  return 0
+
+if __name__ == "__main__":
+  args = [ arg for arg in sys.argv[1:] if arg != '--profile-startup' ]
+  rounds = 5
+  maxTime = 0
+  if args:
+    rounds = int( args[0] )
+  if len( args ) > 1:
+    maxTime = float( args[1] )
+  sys.exit( main( rounds, maxTime, '--profile-startup' in sys.argv[1:] ) )
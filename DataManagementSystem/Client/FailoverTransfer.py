@@ -3,6 +3,7 @@
     The failover transfer client exposes the following methods:
     - transferAndRegisterFile()
     - transferAndRegisterFileFailover()
+    - transferAndRegisterFiles()
     - getRequestObject()
 
     Initially these methods were developed inside workflow modules but
@@ -16,13 +17,26 @@
     to the original target SE as well as the removal request for the
     temporary replica.
 
+    The transferAndRegisterFiles() method uploads many files at once with a
+    bounded number of threads, falls back to the failover SEs for the files
+    which could not be uploaded and registers all the files uploaded in the
+    catalog with one bulk call per SE. The requests needed to recover from
+    the failures are set once all the files are processed.
+
     getRequestObject() allows to retrieve the modified request object
     after transfer operations.
 """
 
+import os
+import threading
+import Queue
+
 from DIRAC import S_OK, S_ERROR, gLogger
 
+from DIRAC.Core.Utilities.Adler                         import fileAdler
+from DIRAC.Core.Utilities.File                          import makeGuid, getSize
 from DIRAC.DataManagementSystem.Client.ReplicaManager   import ReplicaManager
+from DIRAC.Resources.Catalog.FileCatalog                import FileCatalog
 from DIRAC.Resources.Storage.StorageElement             import StorageElement
 from DIRAC.RequestManagementSystem.Client.Request       import Request
 from DIRAC.RequestManagementSystem.Client.Operation     import Operation
@@ -140,6 +154,217 @@ class FailoverTransfer( object ):
 
     return S_OK( '%s uploaded to a failover SE' % fileName )
 
+  #############################################################################
+  def transferAndRegisterFiles( self,
+                                fileList,
+                                failoverSEList = None,
+                                fileCatalog = None,
+                                maxThreads = 4 ):
+    """ Upload the files of fileList, a list of dictionaries with the keys FileName,
+        LocalPath, LFN, SEList and Metadata ( as fileMetaDict of transferAndRegisterFile ),
+        with at most maxThreads uploads at once. The files which could not be uploaded
+        to any SE of their SEList are uploaded to failoverSEList, with the requests to
+        replicate them to their first SE. The files uploaded are then registered with
+        one call per SE, registration requests are set for the files which could not
+        be registered.
+
+        Returns S_OK( { 'Successful' : { lfn : metadata }, 'Failed' : { lfn : error } } )
+    """
+    successful = {}
+    failed = {}
+
+    files = {}
+    for fileDict in fileList:
+      fileDict = dict( fileDict )
+      fileDict['Metadata'] = dict( fileDict.get( 'Metadata', {} ) )
+      files[fileDict['LFN']] = fileDict
+    if not files:
+      return S_OK( { 'Successful' : successful, 'Failed' : failed } )
+
+    result = self.__checkDestinations( files, fileCatalog )
+    if not result['OK']:
+      return result
+    for lfn, error in result['Value'].items():
+      self.log.error( error, lfn )
+      failed[lfn] = error
+      del files[lfn]
+
+    uploads = [ ( lfn, fileDict['SEList'] ) for lfn, fileDict in files.items() ]
+    uploaded, notUploaded = self.__uploadFiles( files, uploads, maxThreads )
+
+    failover = {}
+    if notUploaded and failoverSEList:
+      self.log.info( 'Attempting to upload %s files to the failover SEs' % len( notUploaded ) )
+      uploads = [ ( lfn, failoverSEList ) for lfn in notUploaded ]
+      failover, notUploaded = self.__uploadFiles( files, uploads, maxThreads )
+      uploaded.update( failover )
+    for lfn, error in notUploaded.items():
+      self.log.error( 'Failed to upload output data file', '%s: %s' % ( lfn, error ) )
+      failed[lfn] = 'Failed to upload output data file'
+
+    # One bulk registration per SE
+    seFiles = {}
+    for lfn, ( se, pfn ) in uploaded.items():
+      seFiles.setdefault( se, [] ).append( lfn )
+    notRegistered = {}
+    for se, lfns in seFiles.items():
+      fileTuples = []
+      for lfn in lfns:
+        metadata = files[lfn]['Metadata']
+        fileTuples.append( ( lfn, uploaded[lfn][1], metadata['Size'], se, metadata['GUID'], metadata['Checksum'] ) )
+      self.log.info( 'Registering %s files uploaded to %s' % ( len( fileTuples ), se ) )
+      result = self.replicaMgr.registerFile( fileTuples, catalog = fileCatalog )
+      if not result['OK']:
+        self.log.error( 'Failed to register files', '%s: %s' % ( se, result['Message'] ) )
+        for lfn in lfns:
+          notRegistered[lfn] = se
+        continue
+      for lfn in result['Value']['Failed']:
+        notRegistered[lfn] = se
+
+    # The requests to recover from the failures are set in one pass
+    for lfn, ( se, pfn ) in uploaded.items():
+      metadata = files[lfn]['Metadata']
+      fileInfo = { 'filedict' : metadata, 'uploadedSE' : se, 'lfn' : lfn }
+      if lfn in notRegistered:
+        result = self.__setRegistrationRequest( lfn, se, metadata, fileCatalog or '' )
+        if not result['OK']:
+          self.log.error( 'Failed to set registration request for: SE %s and metadata: \n%s' % ( se, metadata ) )
+          failed[lfn] = 'Failed to set registration request'
+          continue
+        fileInfo['registration'] = 'request'
+      if lfn in failover:
+        targetSE = files[lfn]['SEList'][0]
+        result = self.__setFileReplicationRequest( lfn, targetSE, metadata )
+        if result['OK']:
+          self.log.info( 'Attempting to set replica removal request for LFN %s at failover SE %s' % ( lfn, se ) )
+          result = self.__setReplicaRemovalRequest( lfn, se )
+        if not result['OK']:
+          self.log.error( 'Could not set the failover requests', result['Message'] )
+          failed[lfn] = result['Message']
+          continue
+        fileInfo['failover'] = True
+      successful[lfn] = fileInfo
+
+    return S_OK( { 'Successful' : successful, 'Failed' : failed } )
+
+  #############################################################################
+  def __checkDestinations( self, files, fileCatalog ):
+    """ Check in bulk that the LFNs do not exist yet and that their directories
+        can be written, as putAndRegister does for a single file. Returns the errors
+        by LFN
+    """
+    if fileCatalog:
+      catalog = FileCatalog( fileCatalog )
+      if not catalog.isOK():
+        return S_ERROR( "Can't get FileCatalog %s" % fileCatalog )
+    else:
+      catalog = FileCatalog()
+
+    errors = {}
+    directories = list( set( [ os.path.dirname( lfn ) for lfn in files ] ) )
+    result = catalog.getPathPermissions( directories )
+    if not result['OK']:
+      return result
+    for lfn in files:
+      permissions = result['Value']['Successful'].get( os.path.dirname( lfn ), {} )
+      if not permissions.get( 'Write' ):
+        errors[lfn] = 'Write access not permitted for this credential.'
+
+    # GUIDs are needed to find the files existing with another LFN
+    for lfn, fileDict in files.items():
+      if not fileDict['Metadata'].get( 'GUID' ):
+        fileDict['Metadata']['GUID'] = makeGuid( fileDict['LocalPath'] )
+    result = catalog.exists( dict( [ ( lfn, fileDict['Metadata']['GUID'] ) for lfn, fileDict in files.items() ] ) )
+    if not result['OK']:
+      return result
+    for lfn in files:
+      if lfn in errors:
+        continue
+      if lfn not in result['Value']['Successful']:
+        errors[lfn] = 'Failed to determine existence of destination LFN.'
+      elif result['Value']['Successful'][lfn] == lfn:
+        errors[lfn] = 'The supplied LFN already exists in the File Catalog.'
+      elif result['Value']['Successful'][lfn]:
+        errors[lfn] = 'This file GUID already exists for another file %s' % result['Value']['Successful'][lfn]
+    return S_OK( errors )
+
+  def __uploadFiles( self, files, uploads, maxThreads ):
+    """ Upload each LFN of uploads, a list of ( lfn, seList ), to the first SE of its
+        list accepting it, with at most maxThreads uploads at once. Returns the SE
+        and PFN of the files uploaded and the error of the others by LFN
+    """
+    queue = Queue.Queue()
+    for upload in uploads:
+      queue.put( upload )
+    uploaded = {}
+    failed = {}
+    lock = threading.Lock()
+
+    def uploadWorker():
+      # ReplicaManager instances are not shared between threads
+      replicaMgr = ReplicaManager()
+      while True:
+        try:
+          lfn, seList = queue.get_nowait()
+        except Queue.Empty:
+          return
+        try:
+          result = self.__uploadFile( replicaMgr, files[lfn], seList )
+        except Exception, x:
+          self.log.exception( 'Exception while uploading', lfn )
+          result = S_ERROR( str( x ) )
+        lock.acquire()
+        try:
+          if result['OK']:
+            uploaded[lfn] = result['Value']
+          else:
+            failed[lfn] = result['Message']
+        finally:
+          lock.release()
+
+    workers = []
+    for _i in range( max( 1, min( maxThreads, len( uploads ) ) ) ):
+      worker = threading.Thread( target = uploadWorker )
+      worker.setDaemon( True )
+      worker.start()
+      workers.append( worker )
+    for worker in workers:
+      worker.join()
+    return uploaded, failed
+
+  def __uploadFile( self, replicaMgr, fileDict, seList ):
+    """ Upload a file to the first SE of seList accepting it, returning S_OK( ( se, pfn ) )
+    """
+    lfn = fileDict['LFN']
+    localPath = fileDict['LocalPath']
+    metadata = fileDict['Metadata']
+    if not metadata.get( 'Size' ):
+      metadata['Size'] = getSize( localPath )
+    if not metadata.get( 'Checksum' ):
+      metadata['Checksum'] = fileAdler( localPath )
+      metadata['ChecksumType'] = 'Adler32'
+
+    errorList = []
+    for se in seList:
+      self.log.info( 'Attempting rm.put("%s","%s","%s")' % ( lfn, localPath, se ) )
+      result = replicaMgr.put( lfn, localPath, se )
+      if not result['OK']:
+        errorList.append( result['Message'] )
+      elif lfn in result['Value']['Failed']:
+        errorList.append( result['Value']['Failed'][lfn] )
+      else:
+        self.log.info( 'rm.put successfully uploaded %s to %s' % ( fileDict['FileName'], se ) )
+        return S_OK( ( se, result['Value']['Successful'][lfn] ) )
+      self.log.error( 'rm.put failed with message', errorList[-1] )
+    return S_ERROR( 'Failed to upload to %s: %s' % ( ', '.join( seList ), '; '.join( [ str( error ) for error in errorList ] ) ) )
+
+  #############################################################################
+  def getRequestObject( self ):
+    """ Get the request object with the operations set by the transfers
+    """
+    return S_OK( self.request )
+
   #############################################################################
   def __setFileReplicationRequest( self, lfn, se, fileMetaDict ):
     """ Sets a registration request.
@@ -0,0 +1,104 @@
+""" Tests of the bulk upload and registration of FailoverTransfer
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from DIRAC import S_OK
+from DIRAC.DataManagementSystem.Client import FailoverTransfer as FailoverTransferModule
+from DIRAC.DataManagementSystem.Client.FailoverTransfer import FailoverTransfer
+
+class FakeReplicaManager( object ):
+  """ Uploads to any SE but the broken ones, and keeps track of the registrations
+  """
+  brokenSEs = []
+  registrations = []
+  unregistered = []
+
+  def put( self, lfn, fileName, diracSE, path = None ):
+    if diracSE in self.brokenSEs:
+      return S_OK( { 'Successful' : {}, 'Failed' : { lfn : 'SE %s is broken' % diracSE } } )
+    return S_OK( { 'Successful' : { lfn : 'srm://%s%s' % ( diracSE, lfn ) }, 'Failed' : {} } )
+
+  def registerFile( self, fileTuples, catalog = '' ):
+    FakeReplicaManager.registrations.append( fileTuples )
+    failed = dict( [ ( t[0], 'Registration failed' ) for t in fileTuples if t[0] in self.unregistered ] )
+    successful = dict( [ ( t[0], True ) for t in fileTuples if t[0] not in failed ] )
+    return S_OK( { 'Successful' : successful, 'Failed' : failed } )
+
+class BulkTransferTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.tmpDir = tempfile.mkdtemp()
+    self.fileList = []
+    for i in range( 6 ):
+      localPath = os.path.join( self.tmpDir, 'output%d.dst' % i )
+      localFile = open( localPath, 'w' )
+      localFile.write( 'Output %d\n' % i * 100 )
+      localFile.close()
+      self.fileList.append( { 'FileName' : os.path.basename( localPath ),
+                              'LocalPath' : localPath,
+                              'LFN' : '/vo/user/o/owner/1/output%d.dst' % i,
+                              'SEList' : [ 'SE-A', 'SE-B' ],
+                              'Metadata' : { 'GUID' : '6A6C8C2E-0A6B-E211-A2F0-%012d' % i } } )
+    FakeReplicaManager.brokenSEs = []
+    FakeReplicaManager.registrations = []
+    FakeReplicaManager.unregistered = []
+    catalog = mock.Mock()
+    catalog.getPathPermissions.return_value = S_OK( { 'Successful' : { '/vo/user/o/owner/1' : { 'Write' : True } },
+                                                      'Failed' : {} } )
+    catalog.exists.side_effect = lambda lfns: S_OK( { 'Successful' : dict( [ ( lfn, False ) for lfn in lfns ] ),
+                                                      'Failed' : {} } )
+    storageElement = mock.Mock()
+    storageElement.getPfnForLfn.side_effect = lambda lfn: S_OK( 'srm://failover%s' % lfn )
+    self.patchers = [ mock.patch.object( FailoverTransferModule, 'ReplicaManager', FakeReplicaManager ),
+                      mock.patch.object( FailoverTransferModule, 'FileCatalog', mock.Mock( return_value = catalog ) ),
+                      mock.patch.object( FailoverTransferModule, 'StorageElement',
+                                         mock.Mock( return_value = storageElement ) ) ]
+    for patcher in self.patchers:
+      patcher.start()
+    self.transfer = FailoverTransfer()
+
+  def tearDown( self ):
+    for patcher in self.patchers:
+      patcher.stop()
+    shutil.rmtree( self.tmpDir )
+
+  def __operationTypes( self ):
+    return [ operation.Type for operation in self.transfer.getRequestObject()['Value'] ]
+
+  def testOneRegistrationPerSE( self ):
+    result = self.transfer.transferAndRegisterFiles( self.fileList, [ 'FAILOVER' ], maxThreads = 3 )
+    self.assert_( result['OK'] )
+    self.assertEqual( len( result['Value']['Successful'] ), 6 )
+    self.assertEqual( result['Value']['Failed'], {} )
+    self.assertEqual( len( FakeReplicaManager.registrations ), 1 )
+    self.assertEqual( len( FakeReplicaManager.registrations[0] ), 6 )
+    # Checksums are computed by the upload threads
+    self.assert_( all( [ fileTuple[5] for fileTuple in FakeReplicaManager.registrations[0] ] ) )
+    self.assertEqual( self.__operationTypes(), [] )
+
+  def testFailoverAndRegistrationRequests( self ):
+    FakeReplicaManager.brokenSEs = [ 'SE-A', 'SE-B' ]
+    FakeReplicaManager.unregistered = [ self.fileList[0]['LFN'] ]
+    result = self.transfer.transferAndRegisterFiles( self.fileList, [ 'FAILOVER' ] )
+    self.assert_( result['OK'] )
+    self.assertEqual( len( result['Value']['Successful'] ), 6 )
+    self.assert_( result['Value']['Successful'][self.fileList[1]['LFN']]['failover'] )
+    self.assertEqual( self.__operationTypes().count( 'ReplicateAndRegister' ), 6 )
+    self.assertEqual( self.__operationTypes().count( 'RemoveReplica' ), 6 )
+    self.assertEqual( self.__operationTypes().count( 'RegisterFile' ), 1 )
+
+  def testNoFailover( self ):
+    FakeReplicaManager.brokenSEs = [ 'SE-A', 'SE-B' ]
+    result = self.transfer.transferAndRegisterFiles( self.fileList )
+    self.assert_( result['OK'] )
+    self.assertEqual( result['Value']['Successful'], {} )
+    self.assertEqual( len( result['Value']['Failed'] ), 6 )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( BulkTransferTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
@@ -0,0 +1,137 @@
+########################################################################
+# $HeadURL$
+########################################################################
+
+""" DIRAC FileCatalog cache of the directory tree entries
+"""
+
+__RCSID__ = "$Id$"
+
+import threading, time
+
+class DirectoryCache:
+  """ Bounded cache of directories keyed by path, keeping ( DirID, Level, LPATH list )
+      for each of them, with the reverse DirID to path lookup. It is shared by all
+      the threads of the service. Once full, the least recently used tenth of the
+      entries is dropped to make room. Entries expire after lifetime seconds, so
+      that directories removed through other instances of the service are not
+      kept forever.
+  """
+
+  def __init__( self, maxEntries = 100000, lifetime = 300 ):
+    self.__maxEntries = maxEntries
+    self.__lifetime = lifetime
+    self.__lock = threading.Lock()
+    self.__entries = {}
+    self.__paths = {}
+    self.__tick = 0
+    self.__hits = 0
+    self.__misses = 0
+
+  def __lookup( self, path ):
+    """ Get the entry of path marking it as used now, the lock has to be held
+    """
+    entry = self.__entries.get( path )
+    if entry and entry[1] < time.time():
+      self.__remove( path )
+      entry = None
+    if not entry:
+      self.__misses += 1
+      return None
+    self.__tick += 1
+    entry[0] = self.__tick
+    self.__hits += 1
+    return entry[2]
+
+  def get( self, path ):
+    """ Get ( DirID, Level, LPATH list ) of the directory or None if not cached
+    """
+    self.__lock.acquire()
+    try:
+      return self.__lookup( path )
+    finally:
+      self.__lock.release()
+
+  def getByID( self, dirID ):
+    """ Get ( path, Level, LPATH list ) of the directory with the given ID or None
+        if not cached
+    """
+    self.__lock.acquire()
+    try:
+      path = self.__paths.get( dirID )
+      if path is None:
+        self.__misses += 1
+        return None
+      entry = self.__lookup( path )
+      if not entry:
+        return None
+      return ( path, entry[1], entry[2] )
+    finally:
+      self.__lock.release()
+
+  def add( self, path, dirID, level, lpaths ):
+    """ Add or refresh a directory
+    """
+    if not self.__maxEntries:
+      return
+    self.__lock.acquire()
+    try:
+      if path not in self.__entries and len( self.__entries ) >= self.__maxEntries:
+        self.__makeRoom()
+      self.__remove( path )
+      self.__tick += 1
+      self.__entries[ path ] = [ self.__tick, time.time() + self.__lifetime, ( dirID, level, list( lpaths ) ) ]
+      self.__paths[ dirID ] = path
+    finally:
+      self.__lock.release()
+
+  def __makeRoom( self ):
+    """ Drop the least recently used entries, the lock has to be held
+    """
+    usage = [ ( entry[0], path ) for path, entry in self.__entries.items() ]
+    usage.sort()
+    for _tick, path in usage[ :max( 1, self.__maxEntries / 10 ) ]:
+      self.__remove( path )
+
+  def __remove( self, path ):
+    entry = self.__entries.pop( path, None )
+    if entry:
+      self.__paths.pop( entry[2][0], None )
+
+  def delete( self, path = None, dirID = None ):
+    """ Forget a directory given by its path or its ID
+    """
+    self.__lock.acquire()
+    try:
+      if path is None:
+        path = self.__paths.get( dirID )
+      if path is not None:
+        self.__remove( path )
+    finally:
+      self.__lock.release()
+
+  def clear( self ):
+    """ Forget all the directories
+    """
+    self.__lock.acquire()
+    try:
+      self.__entries = {}
+      self.__paths = {}
+    finally:
+      self.__lock.release()
+
+  def getCounters( self ):
+    """ Get the size and usage statistics of the cache
+    """
+    self.__lock.acquire()
+    try:
+      lookups = self.__hits + self.__misses
+      hitRate = 0.
+      if lookups:
+        hitRate = 100. * self.__hits / lookups
+      return { 'Directory Cache Entries' : len( self.__entries ),
+               'Directory Cache Hits' : self.__hits,
+               'Directory Cache Misses' : self.__misses,
+               'Directory Cache Hit Rate (%)' : round( hitRate, 1 ) }
+    finally:
+      self.__lock.release()
@@ -13,8 +13,11 @@ import os
 from types import ListType, StringTypes
 from DIRAC import S_OK, S_ERROR
 from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryTreeBase import DirectoryTreeBase
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryCache import DirectoryCache
 
 MAX_LEVELS = 15
+# Fields selected to fill the directory cache
+DIR_FIELDS = 'DirID,DirName,Level,' + ','.join( [ 'LPATH%d' % ( i + 1 ) for i in range( MAX_LEVELS ) ] )
 
 class DirectoryLevelTree(DirectoryTreeBase):
   """ Class managing Directory Tree as a simple self-linked structure 
@@ -41,6 +44,20 @@ class DirectoryLevelTree(DirectoryTreeBase):
   def __init__(self,database=None):
     DirectoryTreeBase.__init__(self,database)
     self.treeTable = 'FC_DirectoryLevelTree'
+    cacheSize = getattr( database, 'directoryCacheSize', 100000 )
+    cacheLifetime = getattr( database, 'directoryCacheLifetime', 300 )
+    self.dirCache = DirectoryCache( cacheSize, cacheLifetime )
+
+  def __cacheRows(self,rows):
+    """ Add to the cache the directories selected with DIR_FIELDS
+    """
+    for row in rows:
+      dirID, dirName, level = row[:3]
+      lpaths = row[3:3+level]
+      # The last index of a directory being created is still to be set
+      if level and not lpaths[-1]:
+        continue
+      self.dirCache.add( dirName, dirID, level, lpaths )
 
   def getTreeType(self):
     
@@ -51,7 +68,13 @@ class DirectoryLevelTree(DirectoryTreeBase):
     """
     
     dpath = os.path.normpath( path )    
-    req = "SELECT DirID,Level from FC_DirectoryLevelTree WHERE DirName='%s'" % dpath
+    entry = self.dirCache.get( dpath )
+    if entry:
+      res = S_OK( entry[0] )
+      res['Level'] = entry[1]
+      return res
+
+    req = "SELECT %s from FC_DirectoryLevelTree WHERE DirName='%s'" % ( DIR_FIELDS, dpath )
     result = self.db._query(req,connection)
     if not result['OK']:
       return result
@@ -59,21 +82,34 @@ class DirectoryLevelTree(DirectoryTreeBase):
     if not result['Value']:
       return S_OK('')
     
+    self.__cacheRows( result['Value'] )
     res = S_OK(result['Value'][0][0])  
-    res['Level'] = result['Value'][0][1]
+    res['Level'] = result['Value'][0][2]
     return res
   
   def findDirs( self, paths, connection=False ):
     """ Find DirIDs for the given path list
     """
-    dpaths = ','.join( [ "'"+os.path.normpath( path )+"'" for path in paths ] )
-    req = "SELECT DirName,DirID from FC_DirectoryLevelTree WHERE DirName in (%s)" % dpaths
+    dirDict = {}
+    missingPaths = []
+    for path in paths:
+      dpath = os.path.normpath( path )
+      entry = self.dirCache.get( dpath )
+      if entry:
+        dirDict[dpath] = entry[0]
+      else:
+        missingPaths.append( dpath )
+    if not missingPaths:
+      return S_OK( dirDict )
+
+    dpaths = ','.join( [ "'"+dpath+"'" for dpath in missingPaths ] )
+    req = "SELECT %s from FC_DirectoryLevelTree WHERE DirName in (%s)" % ( DIR_FIELDS, dpaths )
     result = self.db._query(req,connection)
     if not result['OK']:
       return result
-    dirDict = {}
-    for dirName, dirID in result['Value']:
-      dirDict[dirName] = dirID
+    self.__cacheRows( result['Value'] )
+    for row in result['Value']:
+      dirDict[row[1]] = row[0]
 
     return S_OK( dirDict )
   
@@ -90,14 +126,26 @@ class DirectoryLevelTree(DirectoryTreeBase):
       return res
     
     dirID = result['Value']
+    # The usage changes not folded yet can no longer be added to the parents
+    # through this directory once it is gone
+    result = self._moveDirectoryUsageToParent( dirID )
+    if not result['OK']:
+      return result
     req = "DELETE FROM FC_DirectoryLevelTree WHERE DirID=%d" % dirID
     result = self.db._update(req)
+    self.dirCache.delete( dirID = dirID )
     result['DirID'] = dirID
     return result
 
   def __getNumericPath(self,dirID,connection=False):
     """ Get the enumerated path of the given directory
     """
+    entry = self.dirCache.getByID( dirID )
+    if entry:
+      result = S_OK( list( entry[2] ) )
+      result['Level'] = entry[1]
+      return result
+
     epathString = ','.join( [ 'LPATH%d' % (i+1) for i in range( MAX_LEVELS ) ] )
     req = 'SELECT LEVEL,%s FROM FC_DirectoryLevelTree WHERE DirID=%d' % (epathString,dirID)
     result = self.db._query(req,connection)
@@ -192,6 +240,7 @@ class DirectoryLevelTree(DirectoryTreeBase):
     else:
       result = self.db._query("UNLOCK TABLES;",conn)     
       
+    self.dirCache.delete( path = os.path.normpath( path ) )
     result = S_OK(dirID)
     result['NewDirectory'] = True
     return result  
@@ -241,14 +290,19 @@ class DirectoryLevelTree(DirectoryTreeBase):
   def getDirectoryPath(self,dirID):
     """ Get directory name by directory ID
     """
-    req = "SELECT DirName FROM FC_DirectoryLevelTree WHERE DirID=%d" % int(dirID)
+    entry = self.dirCache.getByID( int(dirID) )
+    if entry:
+      return S_OK( entry[0] )
+
+    req = "SELECT %s FROM FC_DirectoryLevelTree WHERE DirID=%d" % ( DIR_FIELDS, int(dirID) )
     result = self.db._query(req)
     if not result['OK']:
       return result
     if not result['Value']:
       return S_ERROR('Directory with id %d not found' % int(dirID) )
     
-    return S_OK(result['Value'][0][0])
+    self.__cacheRows( result['Value'] )
+    return S_OK(result['Value'][0][1])
 
   def getDirectoryPaths(self,dirIDList):
     """ Get directory name by directory ID list
@@ -257,16 +311,27 @@ class DirectoryLevelTree(DirectoryTreeBase):
     if type(dirIDList) != ListType:
       dirs = [dirIDList]
       
-    dirListString = ','.join( [ str(dir_) for dir_ in dirs ] )
+    resultDict = {}
+    missingDirs = []
+    for dir_ in dirs:
+      entry = self.dirCache.getByID( int(dir_) )
+      if entry:
+        resultDict[int(dir_)] = entry[0]
+      else:
+        missingDirs.append( dir_ )
+    if not missingDirs:
+      return S_OK(resultDict)
 
-    req = "SELECT DirID,DirName FROM FC_DirectoryLevelTree WHERE DirID in ( %s )" % dirListString
+    dirListString = ','.join( [ str(dir_) for dir_ in missingDirs ] )
+
+    req = "SELECT %s FROM FC_DirectoryLevelTree WHERE DirID in ( %s )" % ( DIR_FIELDS, dirListString )
     result = self.db._query(req)
     if not result['OK']:
       return result
-    if not result['Value']:
+    if not result['Value'] and not resultDict:
       return S_ERROR('Directories not found: %s' % dirListString )
 
-    resultDict = {}
+    self.__cacheRows( result['Value'] )
     for row in result['Value']:
       resultDict[int(row[0])] = row[1]
 
@@ -282,27 +347,49 @@ class DirectoryLevelTree(DirectoryTreeBase):
     
     return S_OK(os.path.basename(result['Value']))
   
+  def __getParentPaths(self,path):
+    """ Get the paths of all the directories in the parent hierarchy of path
+        including itself, from the top one
+    """
+    elements = path.split('/')
+    pelements = [ '/' ]
+    dPath = ''
+    for el in elements[1:]:
+      dPath += '/'+el
+      if dPath != '/':
+        pelements.append(dPath)
+    return pelements
+
+  def __getCachedPathIDs(self,path):
+    """ Get the IDs of the parent hierarchy of path, from the top directory, if
+        all of them are cached, None otherwise
+    """
+    pathIDs = []
+    for dPath in self.__getParentPaths(path):
+      entry = self.dirCache.get( dPath )
+      if not entry:
+        return None
+      pathIDs.append( entry[0] )
+    return pathIDs
+
   def getPathIDs(self,path):
     """ Get IDs of all the directories in the parent hierarchy for a directory
         specified by its path
     """    
     
-    elements = path.split('/')
-    pelements = []
-    dPath = ''
-    for el in elements[1:]:
-      dPath += '/'+el
-      pelements.append(dPath)
-    pelements.append( '/' )  
-      
-    pathString = [ "'"+p+"'" for p in pelements ]
-    req = "SELECT DirID FROM FC_DirectoryLevelTree WHERE DirName in (%s) ORDER BY DirID" % ','.join(pathString)
+    pathIDs = self.__getCachedPathIDs(path)
+    if pathIDs:
+      return S_OK( sorted( pathIDs ) )
+
+    pathString = [ "'"+p+"'" for p in self.__getParentPaths(path) ]
+    req = "SELECT %s FROM FC_DirectoryLevelTree WHERE DirName in (%s) ORDER BY DirID" % ( DIR_FIELDS, ','.join(pathString) )
     result = self.db._query(req)
     if not result['OK']:
       return result
     if not result['Value']:
       return S_ERROR('Directory %s not found' % path)
        
+    self.__cacheRows( result['Value'] )
     return S_OK([ x[0] for x in result['Value'] ])
   
   def getPathIDsByID_old(self,dirID):
@@ -322,9 +409,17 @@ class DirectoryLevelTree(DirectoryTreeBase):
     """ Get IDs of all the directories in the parent hierarchy for a directory
         specified by its ID
     """    
+    entry = self.dirCache.getByID( dirID )
+    if entry:
+      pathIDs = self.__getCachedPathIDs( entry[0] )
+      if pathIDs:
+        return S_OK( pathIDs )
+
     result = self.__getNumericPath( dirID )
     if not result['OK']:
       return result
+    if not 'Level' in result:
+      return S_ERROR( 'Directory with ID %d does not exist' % dirID )
     level = result['Level']
     if level == 0:
       return S_OK( [dirID] )
@@ -454,6 +549,8 @@ class DirectoryLevelTree(DirectoryTreeBase):
   def recoverOrphanDirectories( self, credDict ):
     """ Recover orphan directories
     """
+    # Directory IDs and indexes are rewritten below
+    self.dirCache.clear()
     # Find out orphan directories
     treeTable = 'FC_DirectoryLevelTree'
     req = "SELECT DirID,Parent FROM %s WHERE Parent NOT IN ( SELECT DirID from %s )" % (treeTable,treeTable)
@@ -524,6 +621,7 @@ class DirectoryLevelTree(DirectoryTreeBase):
       result = self.__rebuildLevelIndexes( parentID, connection)
       self.db._query("UNLOCK TABLES", connection )       
       
+    self.dirCache.clear()
     return S_OK()
 
   def _getConnection( self, connection=False ):
@@ -558,7 +656,16 @@ class DirectoryLevelTree(DirectoryTreeBase):
       result = self.db._update( req, connection )
       if not result['OK']:
         return result
+      self.dirCache.delete( dirID = dirID )
       result = self.__rebuildLevelIndexes( dirID, connection )
       
     return S_OK() 
-  
\ No newline at end of file
+  
+
+  def getDirectoryCounters( self, connection = False ):
+    """ Get the total number of directories and the directory cache statistics
+    """
+    result = DirectoryTreeBase.getDirectoryCounters( self, connection )
+    if result['OK']:
+      result['Value'].update( self.dirCache.getCounters() )
+    return result
@@ -494,18 +494,16 @@ class DirectoryMetadata:
 
     return S_OK( selectString )
 
-  def __findSubdirByMeta( self, meta, value, pathSelection = '', subdirFlag = True ):
-    """ Find directories for the given meta datum. If the the meta datum type is a list,
-        combine values in OR. In case the meta datum is 'Any', finds all the subdirectories
-        for which the meta datum is defined at all.
+  def __getMetaDirSelection( self, meta, value, pathSelection = '', selectFields = 'M.DirID' ):
+    """ Get the request selecting the directories where the given meta datum is
+        defined with a conforming value, restricted to the path selection if any
     """
-
     result = self.__createMetaSelection( meta, value, "M." )
     if not result['OK']:
       return result
     selectString = result['Value']
 
-    req = " SELECT M.DirID FROM FC_Meta_%s AS M" % meta
+    req = " SELECT %s FROM FC_Meta_%s AS M" % ( selectFields, meta )
     if pathSelection:
       req += " JOIN ( %s ) AS P WHERE M.DirID=P.DirID" % pathSelection
     if selectString:
@@ -513,6 +511,18 @@ class DirectoryMetadata:
         req += " AND %s" % selectString
       else:
         req += " WHERE %s" % selectString
+    return S_OK( req )
+
+  def __findSubdirByMeta( self, meta, value, pathSelection = '', subdirFlag = True ):
+    """ Find directories for the given meta datum. If the the meta datum type is a list,
+        combine values in OR. In case the meta datum is 'Any', finds all the subdirectories
+        for which the meta datum is defined at all.
+    """
+
+    result = self.__getMetaDirSelection( meta, value, pathSelection )
+    if not result['OK']:
+      return result
+    req = result['Value']
 
     result = self.db._query( req )
     if not result['OK']:
@@ -545,8 +555,10 @@ class DirectoryMetadata:
       return result
     dirList = result['Value']
     table = self.db.dtree.getTreeTable()
-    dirString = ','.join( [ str( x ) for x in dirList ] )
-    req = 'SELECT DirID FROM %s WHERE DirID NOT IN ( %s )' % ( table, dirString )
+    req = 'SELECT DirID FROM %s' % table
+    if dirList:
+      dirString = ','.join( [ str( x ) for x in dirList ] )
+      req += ' WHERE DirID NOT IN ( %s )' % dirString
     result = self.db._query( req )
     if not result['OK']:
       return result
@@ -556,6 +568,67 @@ class DirectoryMetadata:
     dirList = [ x[0] for x in result['Value'] ]
     return S_OK( dirList )
 
+  def __planMetaQuery( self, metaDict, pathSelection = '' ):
+    """ Order the terms of a query from the most to the least selective one. The
+        selectivity of a term is the number of directories defining it inside the
+        path selection, Missing terms select everything else and go last.
+        Returns a list of ( count, meta, value ), count being None for Missing terms
+    """
+    termList = []
+    missingList = []
+    for meta, value in metaDict.items():
+      if value == "Missing":
+        missingList.append( ( None, meta, value ) )
+        continue
+      result = self.__getMetaDirSelection( meta, value, pathSelection, 'COUNT(*)' )
+      if not result['OK']:
+        return result
+      result = self.db._query( result['Value'] )
+      if not result['OK']:
+        return result
+      termList.append( ( int( result['Value'][0][0] ), meta, value ) )
+    termList.sort()
+
+    return S_OK( termList + missingList )
+
+  def __findDirIDsForTerms( self, metaDict, pathSelection = '' ):
+    """ Find the directories satisfying all the terms of metaDict. Terms are evaluated
+        from the most selective one and their results combined as sets, so that the
+        evaluation stops as soon as nothing can match any more
+    """
+    result = self.__planMetaQuery( metaDict, pathSelection )
+    if not result['OK']:
+      return result
+    termList = result['Value']
+
+    dirSet = None
+    for count, meta, value in termList:
+      if count == 0:
+        # No directory defines the term: nothing can match
+        return S_OK( [] )
+      if value == "Missing" and dirSet is not None:
+        # Remove the directories having the meta datum from the candidates rather
+        # than selecting all the others in the whole tree
+        result = self.__findSubdirByMeta( meta, 'Any', pathSelection )
+        if not result['OK']:
+          return result
+        dirSet.difference_update( result['Value'] )
+      else:
+        if value == "Missing":
+          result = self.__findSubdirMissingMeta( meta, pathSelection )
+        else:
+          result = self.__findSubdirByMeta( meta, value, pathSelection )
+        if not result['OK']:
+          return result
+        if dirSet is None:
+          dirSet = set( result['Value'] )
+        else:
+          dirSet.intersection_update( result['Value'] )
+      if not dirSet:
+        return S_OK( [] )
+
+    return S_OK( list( dirSet ) )
+
   def __expandMetaDictionary( self, metaDict, credDict ):
     """ Expand the dictionary with metadata query 
     """
@@ -648,25 +721,10 @@ class DirectoryMetadata:
         if not result['OK']:
           return result
         pathSelection = result['Value']
-      dirList = []
-      first = True
-      for meta, value in finalMetaDict.items():
-        if value == "Missing":
-          result = self.__findSubdirMissingMeta( meta, pathSelection )
-        else:
-          result = self.__findSubdirByMeta( meta, value, pathSelection )
-        if not result['OK']:
-          return result
-        mList = result['Value']
-        if first:
-          dirList = mList
-          first = False
-        else:
-          newList = []
-          for d in dirList:
-            if d in mList:
-              newList.append( d )
-          dirList = newList
+      result = self.__findDirIDsForTerms( finalMetaDict, pathSelection )
+      if not result['OK']:
+        return result
+      dirList = result['Value']
     else:
       if pathDirID:
         result = self.db.dtree.getSubdirectoriesByID( pathDirID, includeParent = True )
@@ -680,7 +738,8 @@ class DirectoryMetadata:
       dirSelect = True
       finalList = dirList
       if pathDirList:
-        finalList = [ d for d in dirList if d in pathDirList ]
+        pathDirSet = set( pathDirList )
+        finalList = [ d for d in dirList if d in pathDirSet ]
     else:
       if pathDirList:
         dirSelect = True
@@ -793,10 +852,8 @@ class DirectoryMetadata:
     # Constrain the output to only those that are present in the input list  
     resDirs = parentDirs + subDirs + selectedDirs
     if fromDirs:
-      resDirs = []
-      for dir_ in parentDirs + subDirs + selectedDirs:
-        if dir_ in fromDirs:
-          resDirs.append( dir_ )
+      fromDirSet = set( fromDirs )
+      resDirs = [ dir_ for dir_ in resDirs if dir_ in fromDirSet ]
 
     return S_OK( resDirs )
 
@@ -31,6 +31,16 @@ class DirectoryTreeBase:
                                                      "SEID": ["SEID"]
                                                    }  
                                        }
+  _base_tables["FC_DirectoryUsageDeltas"] = { "Fields":
+                                              {
+                                                "DeltaID": "BIGINT AUTO_INCREMENT",
+                                                "DirID": "INTEGER NOT NULL",
+                                                "SEID": "INTEGER NOT NULL",
+                                                "SESize": "BIGINT NOT NULL",
+                                                "SEFiles": "BIGINT NOT NULL"
+                                              },
+                                              "PrimaryKey": "DeltaID"
+                                            }
   _base_tables["FC_DirectoryInfo"] = { "Fields": {
                                                     "DirID": "INTEGER NOT NULL",
                                                     "UID": "SMALLINT UNSIGNED NOT NULL DEFAULT 0",
@@ -88,6 +98,19 @@ class DirectoryTreeBase:
   def findDir( self, path ):    
     return S_ERROR( 'Should be implemented in a derived class' )
   
+  def findDirs( self, paths ):
+    """ Find the DirIDs of the given paths, the missing directories are not in the
+        result. Trees able to look them up in one request override it
+    """
+    dirDict = {}
+    for path in paths:
+      result = self.findDir( path )
+      if not result['OK']:
+        return result
+      if result['Value']:
+        dirDict[os.path.normpath( path )] = result['Value']
+    return S_OK( dirDict )
+
   def getChildren( self, path ):    
     return S_ERROR( 'Should be implemented in a derived class' )
     
@@ -717,17 +740,38 @@ class DirectoryTreeBase:
       return result
     connection = result['Value']
 
+    pendingUsage = {}
+    if not rawFileTables:
+      # The folded usage and the pending changes have to be read from the same snapshot
+      result = self.db.transactionStart()
+      if not result['OK']:
+        connection.close()
+        return result
+      result = self._getPendingDirectoryUsage()
+      if not result['OK']:
+        self.db.transactionRollback()
+        connection.close()
+        return result
+      pendingUsage = result['Value']
+
+    result = self.__getDirectorySize( lfns, longOutput, rawFileTables, pendingUsage, connection )
+    if not rawFileTables:
+      self.db.transactionCommit()
+    connection.close()
+    if result['OK']:
+      result['Value']['QueryTime'] = time.time() - start
+    return result
+
+  def __getDirectorySize( self, lfns, longOutput, rawFileTables, pendingUsage, connection ):
     if rawFileTables:
       resultLogical = self._getDirectoryLogicalSize( lfns, connection )
     else:
-      resultLogical = self._getDirectoryLogicalSizeFromUsage( lfns, connection )
+      resultLogical = self._getDirectoryLogicalSizeFromUsage( lfns, connection, pendingUsage )
     if not resultLogical['OK']:
-      connection.close()
       return resultLogical
 
     resultDict = resultLogical['Value']
     if not resultDict['Successful']:
-      connection.close()
       return resultLogical
 
     if longOutput:
@@ -735,21 +779,18 @@ class DirectoryTreeBase:
       if rawFileTables:
         resultPhysical = self._getDirectoryPhysicalSize( resultDict['Successful'], connection )
       else:
-        resultPhysical = self._getDirectoryPhysicalSizeFromUsage( resultDict['Successful'], connection )
+        resultPhysical = self._getDirectoryPhysicalSizeFromUsage( resultDict['Successful'], connection, pendingUsage )
       if not resultPhysical['OK']:
-        resultDict['QueryTime'] = time.time() - start
         result = S_OK( resultDict )
         result['Message'] = "Failed to get the physical size on storage"
-        connection.close()
         return result
       for lfn in resultPhysical['Value']['Successful']:
         resultDict['Successful'][lfn]['PhysicalSize'] = resultPhysical['Value']['Successful'][lfn]
-    connection.close()
-    resultDict['QueryTime'] = time.time() - start
     return S_OK( resultDict )
 
-  def _getDirectoryLogicalSizeFromUsage( self, lfns, connection ):
-    """ Get the total "logical" size of the requested directories
+  def _getDirectoryLogicalSizeFromUsage( self, lfns, connection, pendingUsage = {} ):
+    """ Get the total "logical" size of the requested directories, adding the
+        pending usage changes not folded yet
     """
     paths = lfns.keys()
     successful = {}
@@ -775,18 +816,21 @@ class DirectoryTreeBase:
       result = self.db._query( req, connection )
       if not result['OK']:
         failed[path] = result['Message']
-      elif not result['Value']:
-        successful[path] = {"LogicalSize":0, "LogicalFiles":0, 'LogicalDirectories':0}
-      elif result['Value'][0][0]:
-        successful[path] = {"LogicalSize":int( result['Value'][0][0] ),
-                            "LogicalFiles":int( result['Value'][0][1] )}
+        continue
+      size, files = 0, 0
+      if result['Value']:
+        size, files = result['Value'][0]
+      pendingSize, pendingFiles = pendingUsage.get( ( dirID, 0 ), ( 0, 0 ) )
+      size += pendingSize
+      files += pendingFiles
+      if size:
+        successful[path] = {"LogicalSize":int( size ),
+                            "LogicalFiles":int( files )}
         result = self.db._query( reqDir, connection )
         if result['OK'] and result['Value']:
           successful[path]['LogicalDirectories'] = result['Value'][0][0] - 1
         else:
           successful[path]['LogicalDirectories'] = -1
-
-
       else:
         successful[path] = {"LogicalSize":0, "LogicalFiles":0, 'LogicalDirectories':0}
 
@@ -843,8 +887,9 @@ class DirectoryTreeBase:
 
     return S_OK( {'Successful':successful, 'Failed':failed} )
 
-  def _getDirectoryPhysicalSizeFromUsage( self, lfns, connection ):
-    """ Get the total size of the requested directories
+  def _getDirectoryPhysicalSizeFromUsage( self, lfns, connection, pendingUsage = {} ):
+    """ Get the total size of the requested directories, adding the pending usage
+        changes not folded yet
     """
     paths = lfns.keys()
     successful = {}
@@ -864,30 +909,161 @@ class DirectoryTreeBase:
       result = self.db._query( req, connection )
       if not result['OK']:
         failed[path] = result['Message']
-      elif not result['Value']:
-        successful[path] = {}
-      elif result['Value'][0][0]:
-        seDict = {}
-        totalSize = 0
-        totalFiles = 0
-        for seID, seName, seSize, seFiles in result['Value']:
-          if seSize or seFiles:
-            seDict[seName] = {'Size':seSize, 'Files':seFiles}
-            totalSize += seSize
-            totalFiles += seFiles
-          else:
-            req = 'DELETE FROM FC_DirectoryUsage WHERE SEID=%d AND DirID=%d' % ( seID, dirID )
-            result = self.db._update( req )
-            if not result['OK']:
-              gLogger.error( 'Failed to delete entry from FC_DirectoryUsage', result['Message'] )
+        continue
+      seUsage = {}
+      for seID, seName, seSize, seFiles in result['Value']:
+        seUsage[seID] = [ seName, seSize, seFiles ]
+      for ( pendingDirID, seID ), ( seSize, seFiles ) in pendingUsage.items():
+        if pendingDirID != dirID or not seID:
+          continue
+        if seID not in seUsage:
+          result = self.db.seManager.getSEName( seID )
+          if not result['OK']:
+            continue
+          seUsage[seID] = [ result['Value'], 0, 0 ]
+        seUsage[seID][1] += seSize
+        seUsage[seID][2] += seFiles
+
+      seDict = {}
+      totalSize = 0
+      totalFiles = 0
+      for seName, seSize, seFiles in seUsage.values():
+        if seSize or seFiles:
+          seDict[seName] = {'Size':seSize, 'Files':seFiles}
+          totalSize += seSize
+          totalFiles += seFiles
+      if seDict:
         seDict['TotalSize'] = int( totalSize )
         seDict['TotalFiles'] = int( totalFiles )
-        successful[path] = seDict
-      else:
-        successful[path] = {}
+      successful[path] = seDict
 
     return S_OK( {'Successful':successful, 'Failed':failed} )
 
+  def __addUsageToParents( self, usageRows ):
+    """ Add the usage changes of ( DirID, SEID, size, files ) rows to the directories
+        and all their parents. Returns { ( DirID, SEID ) : [ size, files ] }
+    """
+    usageDict = {}
+    for dirID, seID, size, files in usageRows:
+      result = self.getPathIDsByID( dirID )
+      if not result['OK']:
+        # The changes pending when a directory is removed go to its parent, only the
+        # ones journaled while it was being removed can be left
+        gLogger.warn( "Dropping usage changes of a missing directory", "%s: %s" % ( dirID, result['Message'] ) )
+        continue
+      for parentID in result['Value']:
+        usage = usageDict.setdefault( ( parentID, seID ), [ 0, 0 ] )
+        usage[0] += int( size )
+        usage[1] += int( files )
+    return S_OK( usageDict )
+
+  def _moveDirectoryUsageToParent( self, dirID ):
+    """ Attribute the journaled usage changes of a directory being removed to its
+        parent, so that they are still folded into the usage of all its ancestors,
+        and drop the usage of the directory itself
+    """
+    result = self.getParentID( dirID )
+    if not result['OK']:
+      return result
+    parentID = result['Value']
+    if parentID:
+      req = "UPDATE FC_DirectoryUsageDeltas SET DirID=%d WHERE DirID=%d" % ( parentID, dirID )
+    else:
+      req = "DELETE FROM FC_DirectoryUsageDeltas WHERE DirID=%d" % dirID
+    result = self.db._update( req )
+    if not result['OK']:
+      return result
+    req = "DELETE FROM FC_DirectoryUsage WHERE DirID=%d" % dirID
+    return self.db._update( req )
+
+  def _getPendingDirectoryUsage( self ):
+    """ Get the journaled usage changes not folded yet into FC_DirectoryUsage,
+        as { ( DirID, SEID ) : [ size, files ] } including all the parents
+    """
+    req = "SELECT DirID, SEID, SUM(SESize), SUM(SEFiles) FROM FC_DirectoryUsageDeltas GROUP BY DirID, SEID"
+    result = self.db._query( req )
+    if not result['OK']:
+      return result
+    return self.__addUsageToParents( result['Value'] )
+
+  def foldDirectoryUsage( self, maxDeltas = 10000, rowsPerQuery = 1000 ):
+    """ Fold the journaled usage changes into FC_DirectoryUsage. The changes are
+        aggregated per directory and storage element and added to all the parents
+        with one multi-row request, maxDeltas journal entries per transaction.
+        Returns the number of journal entries folded
+    """
+    folded = 0
+    while True:
+      result = self.db.transactionStart()
+      if not result['OK']:
+        return result
+      result = self.__foldDirectoryUsageDeltas( maxDeltas, rowsPerQuery )
+      if not result['OK']:
+        self.db.transactionRollback()
+        return result
+      numDeltas = result['Value']
+      result = self.db.transactionCommit()
+      if not result['OK']:
+        return result
+      folded += numDeltas
+      if numDeltas < maxDeltas:
+        break
+    if folded:
+      gLogger.verbose( "Folded directory usage changes", folded )
+    return S_OK( folded )
+
+  def __foldDirectoryUsageDeltas( self, maxDeltas, rowsPerQuery ):
+    """ Fold a batch of journal entries, within the transaction opened by the caller
+    """
+    # Locking the entries keeps other service instances from folding them too
+    req = "SELECT DeltaID, DirID, SEID, SESize, SEFiles FROM FC_DirectoryUsageDeltas"
+    req += " ORDER BY DeltaID LIMIT %d FOR UPDATE" % maxDeltas
+    result = self.db._query( req )
+    if not result['OK']:
+      return result
+    deltas = result['Value']
+    if not deltas:
+      return S_OK( 0 )
+
+    dirUsage = {}
+    for _deltaID, dirID, seID, size, files in deltas:
+      usage = dirUsage.setdefault( ( dirID, seID ), [ 0, 0 ] )
+      usage[0] += size
+      usage[1] += files
+    result = self.__addUsageToParents( [ key + tuple( usage ) for key, usage in dirUsage.items() ] )
+    if not result['OK']:
+      return result
+    usageDict = result['Value']
+
+    # Always the same order to avoid dead locks between concurrent folds
+    insertTuples = [ '(%d,%d,%d,%d,UTC_TIMESTAMP())' % ( key + tuple( usageDict[key] ) )
+                     for key in sorted( usageDict ) if usageDict[key] != [ 0, 0 ] ]
+    for i in range( 0, len( insertTuples ), rowsPerQuery ):
+      req = "INSERT INTO FC_DirectoryUsage (DirID,SEID,SESize,SEFiles,LastUpdate) VALUES %s" % \
+            ','.join( insertTuples[i:i + rowsPerQuery] )
+      req += " ON DUPLICATE KEY UPDATE SESize=SESize+VALUES(SESize), SEFiles=SEFiles+VALUES(SEFiles),"
+      req += " LastUpdate=UTC_TIMESTAMP()"
+      result = self.db._update( req )
+      if not result['OK']:
+        return result
+
+    dirIDs = sorted( set( [ key[0] for key in usageDict ] ) )
+    for i in range( 0, len( dirIDs ), rowsPerQuery ):
+      req = "DELETE FROM FC_DirectoryUsage WHERE SESize=0 AND SEFiles=0 AND DirID IN (%s)" % \
+            ','.join( [ str( dirID ) for dirID in dirIDs[i:i + rowsPerQuery] ] )
+      result = self.db._update( req )
+      if not result['OK']:
+        return result
+
+    deltaIDs = [ str( delta[0] ) for delta in deltas ]
+    for i in range( 0, len( deltaIDs ), rowsPerQuery ):
+      req = "DELETE FROM FC_DirectoryUsageDeltas WHERE DeltaID IN (%s)" % ','.join( deltaIDs[i:i + rowsPerQuery] )
+      result = self.db._update( req )
+      if not result['OK']:
+        return result
+
+    return S_OK( len( deltas ) )
+
 
   def _getDirectoryPhysicalSizeFromUsage_old( self, lfns, connection ):
     """ Get the total size of the requested directories
@@ -999,6 +1175,9 @@ class DirectoryTreeBase:
 
     req = "DROP TABLE IF EXISTS FC_DirectoryUsage_backup"
     self.db._update( req )
+    # The rebuilt usage includes all the pending changes
+    req = "DELETE FROM FC_DirectoryUsageDeltas"
+    self.db._update( req )
     req = "RENAME TABLE FC_DirectoryUsage TO FC_DirectoryUsage_backup"
     self.db._update( req )
     
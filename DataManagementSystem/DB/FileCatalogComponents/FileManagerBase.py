@@ -5,7 +5,7 @@
 __RCSID__ = "$Id$"
 
 from DIRAC                                  import S_OK, S_ERROR, gLogger
-from DIRAC.Core.Utilities.List              import intListToString
+from DIRAC.Core.Utilities.List              import intListToString, breakListIntoChunks
 from DIRAC.Core.Utilities.Pfn               import pfnparse, pfnunparse
 
 import os, stat
@@ -132,6 +132,11 @@ class FileManagerBase:
     """
     return S_ERROR( "To be implemented on derived class" )
 
+  def _findFileIDs( self, lfns, connection = False ):
+    """To be implemented on derived class
+    """
+    return S_ERROR( "To be implemented on derived class" )
+
   def _getFileReplicas( self, fileIDs, fields_input = ['PFN'], connection = False ):
     """To be implemented on derived class
     """
@@ -236,7 +241,11 @@ class FileManagerBase:
     return S_OK( {'Successful':successful, 'Failed':failed} )
 
   def _addFiles( self, lfns, credDict, connection = False ):
-    """ Main file adding method
+    """ Main file adding method. The files are registered in stages: existence and
+        GUID uniqueness are checked with set based queries, the directories of all
+        the files are resolved or created in one go, and the files with their
+        ancestors and replicas are inserted chunk by chunk, each chunk in its own
+        transaction
     """
     connection = self._getConnection( connection )
     successful = {}
@@ -258,6 +267,8 @@ class FileManagerBase:
 
     # Check whether the supplied files have been registered already
     existingMetadata, failed = self._getExistingMetadata( masterLfns.keys(), connection = connection )
+    for lfn in failed:
+      masterLfns.pop( lfn, None )
     if existingMetadata:
       success, fail = self._checkExistingMetadata( existingMetadata, masterLfns )
       successful.update( success )
@@ -275,75 +286,32 @@ class FileManagerBase:
     # If we have files left to register
     if masterLfns:
       # Create the directories for the supplied files and store their IDs
-      directories = self._getFileDirectories( masterLfns.keys() )
-      for directory, fileNames in directories.items():
-        res = self.db.dtree.makeDirectories( directory, credDict )
-        for fileName in fileNames:
-          lfn = "%s/%s" % ( directory, fileName )
-          lfn = lfn.replace( '//', '/' )
-          if not res['OK']:
-            failed[lfn] = "Failed to create directory for file"
-            masterLfns.pop( lfn )
-          else:
-            masterLfns[lfn]['DirID'] = res['Value']
-
-    # If we still have files left to register
-    if masterLfns:
-      res = self._insertFiles( masterLfns, uid, gid, connection = connection )
-      if not res['OK']:
-        for lfn in masterLfns.keys():
-          failed[lfn] = res['Message']
-          masterLfns.pop( lfn )
-      else:
-        for lfn, error in res['Value']['Failed'].items():
-          failed[lfn] = error
-          masterLfns.pop( lfn )
-        masterLfns = res['Value']['Successful']
+      failed.update( self.__resolveFileDirectories( masterLfns, credDict ) )
 
-    # Add the ancestors
+    # Resolve the identifiers created on first use before opening the transactions,
+    # rolling them back would leave the in memory caches out of sync
     if masterLfns:
-      res = self._populateFileAncestors( masterLfns, connection = connection )
-      toPurge = []
-      if not res['OK']:
-        for lfn in masterLfns.keys():
-          failed[lfn] = "Failed while registering ancestors"
-          toPurge.append( masterLfns[lfn]['FileID'] )
-      else:
-        failed.update( res['Value']['Failed'] )
-        for lfn, error in res['Value']['Failed'].items():
-          toPurge.append( masterLfns[lfn]['FileID'] )
-      if toPurge:
-        self._removeFileAncestors( toPurge, connection = connection )
-        self._deleteFiles( toPurge, connection = connection )
+      self.__resolveIdentifiers( masterLfns.values() + extraLfns.values() )
+
+    # Register the files, their ancestors and master replicas chunk by chunk
+    success, fail = self.__applyInChunks( self.__registerFiles, masterLfns, uid, gid, connection = connection )
+    successful.update( success )
+    failed.update( fail )
 
-    # Register the replicas
-    newlyRegistered = {}
-    if masterLfns:
-      res = self._insertReplicas( masterLfns, master = True, connection = connection )
-      toPurge = []
-      if not res['OK']:
-        for lfn in masterLfns.keys():
-          failed[lfn] = "Failed while registering replica"
-          toPurge.append( masterLfns[lfn]['FileID'] )
-      else:
-        newlyRegistered = res['Value']['Successful']
-        successful.update( newlyRegistered )
-        failed.update( res['Value']['Failed'] )
-        for lfn, error in res['Value']['Failed'].items():
-          toPurge.append( masterLfns[lfn]['FileID'] )
-      if toPurge:
-        self._removeFileAncestors( toPurge, connection = connection )
-        self._deleteFiles( toPurge, connection = connection )
-   
     # Add extra replicas for successfully registered LFNs
     for lfn in extraLfns.keys():
       if not lfn in successful:
         extraLfns.pop( lfn )
-
-    if extraLfns:
-      res = self._findFiles( extraLfns.keys(), ['FileID','DirID'], connection=connection )
+      elif lfn in masterLfns and 'FileID' in masterLfns[lfn]:
+        # Newly registered, the file IDs are known already
+        extraLfns[lfn]['FileID'] = masterLfns[lfn]['FileID']
+        extraLfns[lfn]['DirID'] = masterLfns[lfn]['DirID']
+
+    toFind = [ lfn for lfn in extraLfns if not 'FileID' in extraLfns[lfn] ]
+    if toFind:
+      res = self._findFiles( toFind, ['FileID','DirID'], connection=connection )
       if not res['OK']:
-        for lfn in lfns.keys():
+        for lfn in toFind:
           failed[lfn] = 'Failed while registering extra replicas'
           successful.pop( lfn )
           extraLfns.pop( lfn )
@@ -355,22 +323,149 @@ class FileManagerBase:
         for lfn,fileDict in res['Value']['Successful'].items():
           extraLfns[lfn]['FileID'] = fileDict['FileID']
           extraLfns[lfn]['DirID'] = fileDict['DirID']
- 
-      if extraLfns:
-        res = self._insertReplicas( extraLfns, master = False, connection = connection )
-        if not res['OK']:
-          for lfn in extraLfns.keys():
-            failed[lfn] = "Failed while registering extra replicas"
-            successful.pop( lfn )
+
+    if extraLfns:
+      success, fail = self.__applyInChunks( self._insertReplicas, extraLfns, False, connection = connection )
+      successful.update( success )
+      failed.update( fail )
+      for lfn in fail:
+        successful.pop( lfn, None )
+
+    return S_OK( {'Successful':successful, 'Failed':failed} )
+
+  def __resolveFileDirectories( self, lfns, credDict ):
+    """ Set the DirID of the given files, creating the missing directories. The
+        existing directories are found with a single request. Returns the failed
+        files, which are removed from lfns
+    """
+    failed = {}
+    directories = self._getFileDirectories( lfns.keys() )
+    result = self.db.dtree.findDirs( directories.keys() )
+    dirIDs = {}
+    if result['OK']:
+      dirIDs = result['Value']
+    # Parents first, so that their subdirectories find them
+    for directory in sorted( directories ):
+      if os.path.normpath( directory ) in dirIDs:
+        continue
+      res = self.db.dtree.makeDirectories( directory, credDict )
+      if res['OK']:
+        dirIDs[os.path.normpath( directory )] = res['Value']
+    for directory, fileNames in directories.items():
+      for fileName in fileNames:
+        lfn = "%s/%s" % ( directory, fileName )
+        lfn = lfn.replace( '//', '/' )
+        dirID = dirIDs.get( os.path.normpath( directory ) )
+        if dirID:
+          lfns[lfn]['DirID'] = dirID
         else:
-          newlyRegistered = res['Value']['Successful']
-          successful.update( newlyRegistered )
-          failed.update( res['Value']['Failed'] )
+          failed[lfn] = "Failed to create directory for file"
+          lfns.pop( lfn )
+    return failed
+
+  def __resolveIdentifiers( self, fileDicts ):
+    """ Look up the status, storage elements and owners used by the files, which
+        registers the new ones and fills the in memory caches of the managers
+    """
+    res = self.db.getStatusInt( 'AprioriGood' )
+    if not res['OK']:
+      gLogger.warn( "Failed to resolve the status of new files", res['Message'] )
+    seNames = set()
+    owners = {}
+    for fileDict in fileDicts:
+      seList = fileDict.get( 'SE', [] )
+      if type( seList ) != ListType:
+        seList = [ seList ]
+      seNames.update( seList )
+      if fileDict.get( 'Owner' ):
+        owners[str( fileDict['Owner'] )] = fileDict['Owner']
+    for seName in seNames:
+      res = self.db.seManager.findSE( seName )
+      if not res['OK']:
+        gLogger.warn( "Failed to resolve storage element", "%s: %s" % ( seName, res['Message'] ) )
+    for owner in owners.values():
+      self.db.ugManager.getUserAndGroupID( owner )
+
+  def __applyInChunks( self, method, lfns, *args, **kwargs ):
+    """ Call method( chunkLfns, *args, connection = connection ) on chunks of the
+        files, each chunk in its own transaction which is rolled back if the method
+        fails. The method returns the usual Successful/Failed dictionaries
+    """
+    connection = kwargs.get( 'connection', False )
+    successful = {}
+    failed = {}
+    chunkSize = getattr( self.db, 'bulkChunkSize', 1000 )
+    lfnList = lfns.keys()
+    lfnList.sort()
+    for i in range( 0, len( lfnList ), chunkSize ):
+      chunkLfns = dict( [ ( lfn, lfns[lfn] ) for lfn in lfnList[i:i + chunkSize] ] )
+      res = self.db.transactionStart()
+      if res['OK']:
+        res = method( chunkLfns, *args, **{ 'connection' : connection } )
+        if res['OK']:
+          commit = self.db.transactionCommit()
+          if not commit['OK']:
+            res = commit
+        else:
+          self.db.transactionRollback()
+      if not res['OK']:
+        gLogger.error( "Failed to register files", res['Message'] )
+        for lfn in chunkLfns:
+          failed[lfn] = res['Message']
+        continue
+      successful.update( res['Value']['Successful'] )
+      failed.update( res['Value']['Failed'] )
+    return successful, failed
+
+  def __registerFiles( self, lfns, uid, gid, connection = False ):
+    """ Insert the files, their ancestors and their master replicas. The files
+        failing any of the steps are removed again
+    """
+    successful = {}
+    failed = {}
+    masterLfns = lfns
+    res = self._insertFiles( masterLfns, uid, gid, connection = connection )
+    if not res['OK']:
+      return res
+    for lfn, error in res['Value']['Failed'].items():
+      failed[lfn] = error
+      masterLfns.pop( lfn, None )
+    masterLfns = res['Value']['Successful']
+
+    # Add the ancestors
+    if masterLfns:
+      res = self._populateFileAncestors( masterLfns, connection = connection )
+      if not res['OK']:
+        return res
+      toPurge = []
+      failed.update( res['Value']['Failed'] )
+      for lfn, error in res['Value']['Failed'].items():
+        toPurge.append( masterLfns.pop( lfn )['FileID'] )
+      if toPurge:
+        self._removeFileAncestors( toPurge, connection = connection )
+        self._deleteFiles( toPurge, connection = connection )
+
+    # Register the replicas
+    if masterLfns:
+      res = self._insertReplicas( masterLfns, master = True, connection = connection )
+      if not res['OK']:
+        return res
+      toPurge = []
+      successful.update( res['Value']['Successful'] )
+      failed.update( res['Value']['Failed'] )
+      for lfn, error in res['Value']['Failed'].items():
+        if lfn in masterLfns:
+          toPurge.append( masterLfns[lfn]['FileID'] )
+      if toPurge:
+        self._removeFileAncestors( toPurge, connection = connection )
+        self._deleteFiles( toPurge, connection = connection )
 
     return S_OK( {'Successful':successful, 'Failed':failed} )
 
   def _updateDirectoryUsage( self, directorySEDict, change, connection = False ):
     connection = self._getConnection( connection )
+    if getattr( self.db, 'deferredDirectoryUsage', False ):
+      return self.__journalDirectoryUsage( directorySEDict, change, connection )
     for directoryID in directorySEDict.keys():
       result = self.db.dtree.getPathIDsByID( directoryID )
       if not result['OK']:
@@ -393,6 +488,27 @@ class FileManagerBase:
         if not res['OK']:
           gLogger.warn( "Failed to update FC_DirectoryUsage", res['Message'] )
     return S_OK()
+
+  def __journalDirectoryUsage( self, directorySEDict, change, connection = False ):
+    """ Append the usage changes of the directories themselves to the journal, they
+        are added to the parent directories when folded into FC_DirectoryUsage
+    """
+    sign = 1
+    if change == '-':
+      sign = -1
+    insertTuples = []
+    for directoryID in sorted( directorySEDict ):
+      dirDict = directorySEDict[directoryID]
+      for seID in sorted( dirDict ):
+        seDict = dirDict[seID]
+        insertTuples.append( '(%d,%d,%d,%d)' % ( directoryID, seID, sign * seDict['Size'], sign * seDict['Files'] ) )
+    if not insertTuples:
+      return S_OK()
+    req = "INSERT INTO FC_DirectoryUsageDeltas (DirID,SEID,SESize,SEFiles) VALUES %s" % ','.join( insertTuples )
+    res = self.db._update( req, connection )
+    if not res['OK']:
+      gLogger.warn( "Failed to journal FC_DirectoryUsage changes", res['Message'] )
+    return res
     
   def _populateFileAncestors( self, lfns, connection = False ):
     connection = self._getConnection( connection )
@@ -581,6 +697,13 @@ class FileManagerBase:
 
   def _getExistingMetadata( self, lfns, connection = False ):
     connection = self._getConnection( connection )
+    # Only the files already registered need their metadata, find them with
+    # set based queries first where the file manager supports it
+    res = self._findFileIDs( lfns, connection = connection )
+    if res['OK']:
+      lfns = res['Value']['Successful'].keys()
+      if not lfns:
+        return {}, {}
     # Check whether the files already exist before adding
     res = self._findFiles( lfns, ['FileID', 'Size', 'Checksum', 'GUID'], connection = connection )
     successful = res['Value']['Successful']
@@ -632,12 +755,18 @@ class FileManagerBase:
     guidLFNs = {}
     failed = {}
     for lfn, fileDict in lfns.items():
-      guidLFNs[fileDict['GUID']] = lfn
-    res = self._getFileIDFromGUID( guidLFNs.keys(), connection = connection )
-    if not res['OK']:
-      return dict.fromkeys( lfns, res['Message'] )
-    for guid, fileID in res['Value'].items():
-      failed[guidLFNs[guid]] = "GUID already registered for another file %s" % fileID # resolve this to LFN
+      guid = fileDict['GUID']
+      # The GUIDs have to be unique within the files being added as well
+      if guid in guidLFNs:
+        failed[lfn] = "GUID already used by another file being registered %s" % guidLFNs[guid]
+      else:
+        guidLFNs[guid] = lfn
+    for guids in breakListIntoChunks( guidLFNs.keys(), 1000 ):
+      res = self._getFileIDFromGUID( guids, connection = connection )
+      if not res['OK']:
+        return dict.fromkeys( lfns, res['Message'] )
+      for guid, fileID in res['Value'].items():
+        failed[guidLFNs[guid]] = "GUID already registered for another file %s" % fileID # resolve this to LFN
     return failed
 
   def removeFile( self, lfns, connection = False ):
@@ -758,13 +887,10 @@ class FileManagerBase:
     lfnFileIDDict = res['Value']['Successful']
     for lfn, fileDict in lfnFileIDDict.items():
       lfns[lfn].update( fileDict )
-    res = self._insertReplicas( lfns, connection = connection )
-    if not res['OK']:
-      for lfn in lfns.keys():
-        failed[lfn] = res['Message']
-    else:
-      successful = res['Value']['Successful']
-      failed.update( res['Value']['Failed'] )
+    if lfns:
+      self.__resolveIdentifiers( lfns.values() )
+    successful, fail = self.__applyInChunks( self._insertReplicas, lfns, False, connection = connection )
+    failed.update( fail )
     return S_OK( {'Successful':successful, 'Failed':failed} )
 
   def removeReplica( self, lfns, connection = False ):
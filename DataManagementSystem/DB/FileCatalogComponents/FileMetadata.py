@@ -389,7 +389,7 @@ class FileMetadata:
         selectString = ' AND '.join( selectList )
     elif type( value ) == types.ListType:
       vString = ','.join( [ "'" + str( x ) + "'" for x in value] )
-      selectString = "%sValue in %s" % ( table, vString )
+      selectString = "%sValue in (%s)" % ( table, vString )
     else:
       if value == "Any":
         selectString = ''
@@ -398,65 +398,37 @@ class FileMetadata:
 
     return S_OK(selectString)
 
-  def __findFilesForMetaValue( self, meta, value, dirList ):
-    """ Find files in the given list of directories corresponding to the given
-        selection criteria
+  def __findFilesByMetadata( self, metaDict, dirList, credDict ):
+    """ Find a list of file IDs meeting the metaDict requirements and belonging
+        to directories in dirList. File metadata is not inherited, so all the terms
+        are intersected in a single request joining the metadata tables on FileID
     """
+    if not metaDict:
+      return S_OK( [] )
 
-    result = self.__createMetaSelection( meta, value, "M." )
-    if not result['OK']:
-      return result
-    selectString = result['Value']
-
-    dirString = ','.join([ str(x) for x in dirList])
+    joinList = []
+    selectList = []
+    for iMeta, ( meta, value ) in enumerate( metaDict.items() ):
+      alias = "M%d" % iMeta
+      result = self.__createMetaSelection( meta, value, "%s." % alias )
+      if not result['OK']:
+        return result
+      joinList.append( "JOIN FC_FileMeta_%s AS %s ON %s.FileID=F.FileID" % ( meta, alias, alias ) )
+      if result['Value']:
+        selectList.append( result['Value'] )
 
-    req = " SELECT F.FileID, F.DirID FROM FC_FileMeta_%s AS M, FC_Files AS F" % meta
-    if dirString:
-      req += " WHERE F.DirID in (%s)" % dirString
-    if selectString:
-      if dirString:
-        req += " AND %s AND F.FileID=M.FileID" % selectString
-      else:
-        req += " WHERE %s AND F.FileID=M.FileID" % selectString
+    if dirList:
+      selectList.append( "F.DirID in (%s)" % ','.join( [ str( x ) for x in dirList ] ) )
 
+    req = "SELECT F.FileID FROM FC_Files AS F %s" % ' '.join( joinList )
+    if selectList:
+      req += " WHERE %s" % ' AND '.join( selectList )
 
     result = self.db._query( req )
     if not result['OK']:
       return result
-    if not result['Value']:
-      return S_OK( [] )
-
-    fileList = []
-    for row in result['Value']:
-      fileID = row[0]
-      fileList.append( fileID )
-
-    return S_OK( fileList )
-
-
-  def __findFilesByMetadata( self,metaDict,dirList,credDict ):
-    """ Find a list of file IDs meeting the metaDict requirements and belonging
-        to directories in dirList 
-    """
-
-    fileList = []
-    first = True    
-    for meta,value in metaDict.items():
-      result = self.__findFilesForMetaValue( meta,value,dirList )
-      if not result['OK']:
-        return result
-      mList = result['Value']
-      if first:
-        fileList = mList
-        first = False
-      else:
-        newList = []
-        for f in fileList:
-          if f in mList:
-            newList.append( f )
-        fileList = newList
 
-    return S_OK(fileList)
+    return S_OK( [ row[0] for row in result['Value'] ] )
 
   @queryTime
   def findFilesByMetadata( self, metaDict, path, credDict, extra = False ):
@@ -71,6 +71,10 @@ class FileCatalogDB(DB):
     self.umask = databaseConfig['DefaultUmask']
     self.visibleStatus = databaseConfig['VisibleStatus']
     self.visibleReplicaStatus = databaseConfig['VisibleReplicaStatus']
+    self.directoryCacheSize = databaseConfig.get( 'DirectoryCacheSize', 100000 )
+    self.directoryCacheLifetime = databaseConfig.get( 'DirectoryCacheLifetime', 300 )
+    self.deferredDirectoryUsage = databaseConfig.get( 'DeferredDirectoryUsage', False )
+    self.bulkChunkSize = databaseConfig.get( 'BulkChunkSize', 1000 )
 
     # Obtain the plugins to be used for DB interaction
     self. objectLoader = ObjectLoader()
@@ -754,6 +758,11 @@ class FileCatalogDB(DB):
   #  Catalog admin methods
   #
 
+  def foldDirectoryUsage( self ):
+    """ Fold the journaled directory usage changes into the directory usage table
+    """
+    return self.dtree.foldDirectoryUsage()
+
   def getCatalogCounters(self,credDict):
     counterDict = {}
     res = self._checkAdminPermission(credDict)
@@ -0,0 +1,55 @@
+""" Unit tests of the FileCatalog directory cache
+"""
+import unittest
+
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryCache import DirectoryCache
+
+class DirectoryCacheTestCase( unittest.TestCase ):
+
+  def test_lookups( self ):
+    cache = DirectoryCache( 10 )
+    cache.add( '/vo/data', 3, 2, [ 1, 4 ] )
+    self.assertEqual( cache.get( '/vo/data' ), ( 3, 2, [ 1, 4 ] ) )
+    self.assertEqual( cache.getByID( 3 ), ( '/vo/data', 2, [ 1, 4 ] ) )
+    self.assertEqual( cache.get( '/vo' ), None )
+    self.assertEqual( cache.getByID( 2 ), None )
+    counters = cache.getCounters()
+    self.assertEqual( counters[ 'Directory Cache Hits' ], 2 )
+    self.assertEqual( counters[ 'Directory Cache Misses' ], 2 )
+    self.assertEqual( counters[ 'Directory Cache Hit Rate (%)' ], 50. )
+
+  def test_invalidation( self ):
+    cache = DirectoryCache( 10 )
+    cache.add( '/vo/data', 3, 2, [ 1, 4 ] )
+    cache.add( '/vo/user', 5, 2, [ 1, 5 ] )
+    cache.delete( dirID = 3 )
+    self.assertEqual( cache.get( '/vo/data' ), None )
+    cache.delete( path = '/vo/user' )
+    self.assertEqual( cache.getByID( 5 ), None )
+    # A path added again with another ID does not keep the old one
+    cache.add( '/vo/data', 3, 2, [ 1, 4 ] )
+    cache.add( '/vo/data', 7, 2, [ 1, 6 ] )
+    self.assertEqual( cache.getByID( 3 ), None )
+    cache.clear()
+    self.assertEqual( cache.getCounters()[ 'Directory Cache Entries' ], 0 )
+
+  def test_expiration( self ):
+    cache = DirectoryCache( 10, lifetime = -1 )
+    cache.add( '/vo', 2, 1, [ 1 ] )
+    self.assertEqual( cache.get( '/vo' ), None )
+    self.assertEqual( cache.getCounters()[ 'Directory Cache Entries' ], 0 )
+
+  def test_leastRecentlyUsed( self ):
+    cache = DirectoryCache( 10 )
+    for dirID in range( 10 ):
+      cache.add( '/dir%d' % dirID, dirID, 1, [ dirID + 1 ] )
+    cache.get( '/dir0' )
+    cache.add( '/dir10', 10, 1, [ 11 ] )
+    self.assertEqual( cache.getCounters()[ 'Directory Cache Entries' ], 10 )
+    self.assertEqual( cache.get( '/dir1' ), None )
+    self.assertEqual( cache.get( '/dir0' ), ( 0, 1, [ 1 ] ) )
+    self.assertEqual( cache.get( '/dir10' ), ( 10, 1, [ 11 ] ) )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( DirectoryCacheTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
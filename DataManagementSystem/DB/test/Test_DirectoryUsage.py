@@ -0,0 +1,141 @@
+""" Unit tests of the journaled directory usage of the FileCatalog, with the few
+    tables involved kept in memory
+"""
+import re
+import unittest
+
+from DIRAC import S_OK
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryLevelTree import DirectoryLevelTree
+
+class FakeDB:
+  """ Executes the requests of the level tree and of the usage journal on
+      dictionaries
+  """
+
+  def __init__( self ):
+    # DirID -> Parent
+    self.parents = {}
+    # ( DirID, SEID ) -> [ SESize, SEFiles ]
+    self.usage = {}
+    # DeltaID -> [ DirID, SEID, SESize, SEFiles ]
+    self.deltas = {}
+    self.lastDeltaID = 0
+    self.transactions = []
+
+  def journal( self, dirID, seID, size, files ):
+    self.lastDeltaID += 1
+    self.deltas[ self.lastDeltaID ] = [ dirID, seID, size, files ]
+
+  def transactionStart( self ):
+    self.transactions.append( 'start' )
+    return S_OK()
+
+  def transactionCommit( self ):
+    self.transactions.append( 'commit' )
+    return S_OK()
+
+  def transactionRollback( self ):
+    self.transactions.append( 'rollback' )
+    return S_OK()
+
+  def _query( self, req, connection = False ):
+    match = re.match( r"SELECT LEVEL,.* FROM FC_DirectoryLevelTree WHERE DirID=(\d+)$", req )
+    if match:
+      # Only asked for the directories which are not cached
+      return S_OK( () )
+    match = re.match( r"SELECT Parent FROM FC_DirectoryLevelTree WHERE DirID=(\d+)$", req )
+    if match:
+      dirID = int( match.group( 1 ) )
+      if dirID in self.parents:
+        return S_OK( ( ( self.parents[ dirID ], ), ) )
+      return S_OK( () )
+    if req.find( "FROM FC_DirectoryUsageDeltas GROUP BY DirID, SEID" ) > -1:
+      pending = {}
+      for dirID, seID, size, files in self.deltas.values():
+        usage = pending.setdefault( ( dirID, seID ), [ 0, 0 ] )
+        usage[0] += size
+        usage[1] += files
+      return S_OK( tuple( [ key + tuple( usage ) for key, usage in pending.items() ] ) )
+    match = re.match( r"SELECT DeltaID, .* FROM FC_DirectoryUsageDeltas ORDER BY DeltaID LIMIT (\d+) FOR UPDATE", req )
+    if match:
+      deltaIDs = sorted( self.deltas )[:int( match.group( 1 ) )]
+      return S_OK( tuple( [ tuple( [ deltaID ] + self.deltas[ deltaID ] ) for deltaID in deltaIDs ] ) )
+    raise AssertionError( "Unexpected query %s" % req )
+
+  def _update( self, req, connection = False ):
+    match = re.match( r"DELETE FROM FC_DirectoryLevelTree WHERE DirID=(\d+)$", req )
+    if match:
+      del self.parents[ int( match.group( 1 ) ) ]
+      return S_OK( 1 )
+    match = re.match( r"UPDATE FC_DirectoryUsageDeltas SET DirID=(\d+) WHERE DirID=(\d+)$", req )
+    if match:
+      for delta in self.deltas.values():
+        if delta[0] == int( match.group( 2 ) ):
+          delta[0] = int( match.group( 1 ) )
+      return S_OK( 1 )
+    match = re.match( r"DELETE FROM FC_DirectoryUsageDeltas WHERE DeltaID IN \(([\d,]+)\)$", req )
+    if match:
+      for deltaID in match.group( 1 ).split( ',' ):
+        del self.deltas[ int( deltaID ) ]
+      return S_OK( 1 )
+    if req.find( "INSERT INTO FC_DirectoryUsage " ) == 0:
+      for dirID, seID, size, files in re.findall( r"\((-?\d+),(-?\d+),(-?\d+),(-?\d+),UTC_TIMESTAMP\(\)\)", req ):
+        usage = self.usage.setdefault( ( int( dirID ), int( seID ) ), [ 0, 0 ] )
+        usage[0] += int( size )
+        usage[1] += int( files )
+      return S_OK( 1 )
+    match = re.match( r"DELETE FROM FC_DirectoryUsage WHERE SESize=0 AND SEFiles=0 AND DirID IN \(([\d,]+)\)$", req )
+    if match:
+      dirIDs = [ int( dirID ) for dirID in match.group( 1 ).split( ',' ) ]
+      for key, usage in self.usage.items():
+        if key[0] in dirIDs and usage == [ 0, 0 ]:
+          del self.usage[ key ]
+      return S_OK( 1 )
+    match = re.match( r"DELETE FROM FC_DirectoryUsage WHERE DirID=(\d+)$", req )
+    if match:
+      for key in self.usage.keys():
+        if key[0] == int( match.group( 1 ) ):
+          del self.usage[ key ]
+      return S_OK( 1 )
+    raise AssertionError( "Unexpected update %s" % req )
+
+class DirectoryUsageTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.db = FakeDB()
+    self.tree = DirectoryLevelTree()
+    self.tree.db = self.db
+    for path, dirID, parentID, lpaths in ( ( '/', 1, 0, [] ), ( '/vo', 2, 1, [ 1 ] ),
+                                           ( '/vo/data', 3, 2, [ 1, 1 ] ), ( '/vo/data/run1', 4, 3, [ 1, 1, 1 ] ) ):
+      self.tree.dirCache.add( path, dirID, len( lpaths ), lpaths )
+      self.db.parents[ dirID ] = parentID
+
+  def test_unknownDirectory( self ):
+    result = self.tree.getPathIDsByID( 10 )
+    self.failIf( result[ 'OK' ] )
+    self.assertEqual( self.tree.getPathIDsByID( 4 )[ 'Value' ], [ 1, 2, 3, 4 ] )
+
+  def test_removedDirectory( self ):
+    # Two files registered in /vo/data/run1 and folded
+    self.db.journal( 4, 1, 300, 2 )
+    self.assertEqual( self.tree.foldDirectoryUsage()[ 'Value' ], 1 )
+    for dirID in ( 1, 2, 3, 4 ):
+      self.assertEqual( self.db.usage[ ( dirID, 1 ) ], [ 300, 2 ] )
+    # The files are removed, then the directory before the next fold
+    self.db.journal( 4, 1, -300, -2 )
+    result = self.tree.removeDir( '/vo/data/run1' )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'DirID' ], 4 )
+    # The pending changes are still accounted for by the remaining directories
+    result = self.tree._getPendingDirectoryUsage()
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'Value' ], { ( 1, 1 ) : [ -300, -2 ], ( 2, 1 ) : [ -300, -2 ],
+                                           ( 3, 1 ) : [ -300, -2 ] } )
+    self.assertEqual( self.tree.foldDirectoryUsage()[ 'Value' ], 1 )
+    self.assertEqual( self.db.deltas, {} )
+    self.assertEqual( self.db.usage, {} )
+    self.failIf( 'rollback' in self.db.transactions )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( DirectoryUsageTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
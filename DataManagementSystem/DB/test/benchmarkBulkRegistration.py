@@ -0,0 +1,94 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the registration of synthetic files in a FileCatalogDB, in the way
+     production jobs upload their outputs: many files spread over a few hundred
+     new directories, each one with two replicas. The catalog is used directly,
+     without the service, so the DataManagement/FileCatalogDB database of the
+     local configuration has to point to a MySQL server that can be filled with
+     test data. Each chunk size registers its own set of files, in a directory
+     tree named after the start time of the benchmark.
+
+     Usage: python benchmarkBulkRegistration.py [ files [ chunkSize1,chunkSize2... ] ]
+"""
+from DIRAC.Core.Base import Script
+Script.parseCommandLine()
+
+import sys
+import time
+
+from DIRAC.DataManagementSystem.DB.FileCatalogDB import FileCatalogDB
+
+FILES_PER_DIRECTORY = 100
+TEST_SES = [ 'BENCH-DISK', 'BENCH-TAPE' ]
+CRED_DICT = { 'username' : 'benchuser', 'group' : 'benchgroup' }
+
+def getCatalog( chunkSize ):
+  """ FileCatalogDB configured as the service does by default
+  """
+  db = FileCatalogDB()
+  databaseConfig = { 'UserGroupManager' : 'UserAndGroupManagerDB',
+                     'SEManager' : 'SEManagerDB',
+                     'SecurityManager' : 'NoSecurityManager',
+                     'DirectoryManager' : 'DirectoryLevelTree',
+                     'FileManager' : 'FileManager',
+                     'DirectoryMetadata' : 'DirectoryMetadata',
+                     'FileMetadata' : 'FileMetadata',
+                     'DatasetManager' : 'DatasetManager',
+                     'UniqueGUID' : True,
+                     'GlobalReadAccess' : True,
+                     'LFNPFNConvention' : 'Strong',
+                     'ResolvePFN' : True,
+                     'DefaultUmask' : 0775,
+                     'VisibleStatus' : [ 'AprioriGood' ],
+                     'VisibleReplicaStatus' : [ 'AprioriGood' ],
+                     'DeferredDirectoryUsage' : True,
+                     'BulkChunkSize' : chunkSize }
+  result = db.setConfig( databaseConfig )
+  if not result['OK']:
+    print "Failed to configure the catalog: %s" % result['Message']
+    sys.exit( 1 )
+  return db
+
+def getSyntheticFiles( basePath, numFiles ):
+  """ LFNs of numFiles production outputs below basePath, with their metadata
+  """
+  lfns = {}
+  for fileNumber in range( numFiles ):
+    lfn = '%s/%04d/%08d_%08d.dst' % ( basePath, fileNumber / FILES_PER_DIRECTORY,
+                                      fileNumber / FILES_PER_DIRECTORY, fileNumber )
+    lfns[ lfn ] = { 'PFN' : 'srm://bench.example.org%s' % lfn,
+                    'SE' : list( TEST_SES ),
+                    'Size' : 1000000 + fileNumber,
+                    'GUID' : '%s-%08d' % ( basePath.replace( '/', '' ), fileNumber ),
+                    'Checksum' : '%08x' % fileNumber }
+  return lfns
+
+def main( numFiles, chunkSizes ):
+  basePath = '/bench/%d' % time.time()
+  for chunkSize in chunkSizes:
+    db = getCatalog( chunkSize )
+    lfns = getSyntheticFiles( '%s/chunk%d' % ( basePath, chunkSize ), numFiles )
+    start = time.time()
+    result = db.addFile( lfns, CRED_DICT )
+    elapsed = time.time() - start
+    if not result['OK']:
+      print "Chunks of %6d: failed: %s" % ( chunkSize, result['Message'] )
+      continue
+    registered = len( result['Value']['Successful'] )
+    print "Chunks of %6d: %8d files registered in %8.1f s, %8.1f files/s, %d failed" % \
+          ( chunkSize, registered, elapsed, registered / max( elapsed, 0.001 ), len( result['Value']['Failed'] ) )
+    # Adding the same files again only checks they exist already
+    start = time.time()
+    result = db.addFile( lfns, CRED_DICT )
+    if result['OK']:
+      print "%-16s %8d files checked again in %6.1f s" % ( '', len( result['Value']['Successful'] ), time.time() - start )
+
+if __name__ == "__main__":
+  numFiles = 10000
+  chunkSizes = [ 100, 1000, 5000 ]
+  args = Script.getPositionalArgs()
+  if len( args ) > 0:
+    numFiles = int( args[0] )
+  if len( args ) > 1:
+    chunkSizes = [ int( chunkSize ) for chunkSize in args[1].split( ',' ) ]
+  main( numFiles, chunkSizes )
@@ -0,0 +1,133 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures DirectoryMetadata.findDirIDsByMetadata on a synthetic catalog kept
+     in memory. The catalog is a tree with the given number of levels and
+     subdirectories per directory, with one meta datum defined on all the
+     directories of each level below the first one. The database only answers
+     the few requests the metadata query does, so the figures show the cost of
+     planning and combining the terms rather than the one of MySQL. The result
+     is checked against a term by term evaluation with lists, as the queries
+     were done before the planner.
+
+     Usage: python benchmarkMetadataQuery.py [ levels [ subdirectories ] ]
+"""
+import re
+import sys
+import time
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryMetadata import DirectoryMetadata
+
+NUM_VALUES = 10
+
+class SyntheticCatalog:
+  """ Directory tree and directory metadata tables of the synthetic catalog,
+      serving both as the database and the directory tree of DirectoryMetadata
+  """
+
+  def __init__( self, levels, subdirs ):
+    self.children = {}
+    self.metaTables = {}
+    self.numDirs = 1
+    self.queries = 0
+    parents = [ 1 ]
+    for level in range( 1, levels ):
+      metaTable = {}
+      self.metaTables[ 'Level%d' % level ] = metaTable
+      newParents = []
+      for parent in parents:
+        childList = range( self.numDirs + 1, self.numDirs + subdirs + 1 )
+        self.numDirs += subdirs
+        self.children[ parent ] = childList
+        for dirID in childList:
+          metaTable[ dirID ] = str( dirID % NUM_VALUES )
+        newParents += childList
+      parents = newParents
+
+  def _createTables( self, tables ):
+    return S_OK( [] )
+
+  def _query( self, req ):
+    self.queries += 1
+    if req.startswith( "SELECT MetaName,MetaType FROM FC_MetaFields" ):
+      return S_OK( [ ( meta, 'VARCHAR(128)' ) for meta in self.metaTables ] )
+    match = re.match( r"\s*SELECT (\S+) FROM FC_Meta_(\w+) AS M(?: WHERE M\.Value='(\w+)'\s*)?(.*)$", req )
+    if not match:
+      return S_ERROR( "Unsupported request: %s" % req )
+    fields, meta, value, rest = match.groups()
+    if rest:
+      # Parent directory checks, there is no metadata above the root
+      return S_OK( [] )
+    metaTable = self.metaTables[ meta ]
+    dirList = [ dirID for dirID in metaTable if value is None or metaTable[ dirID ] == value ]
+    if fields == 'COUNT(*)':
+      return S_OK( [ ( len( dirList ), ) ] )
+    return S_OK( [ ( dirID, ) for dirID in dirList ] )
+
+  def getAllSubdirectoriesByID( self, dirList ):
+    resultList = []
+    parentList = dirList
+    while parentList:
+      self.queries += 1
+      subResult = []
+      for parent in parentList:
+        subResult += self.children.get( parent, [] )
+      resultList += subResult
+      parentList = subResult
+    return S_OK( resultList )
+
+  def getTreeTable( self ):
+    return 'FC_DirectoryLevelTree'
+
+def findDirIDsWithLists( catalog, queryDict ):
+  """ Evaluate the query one term after the other in the order of the dictionary,
+      intersecting the lists of directories of the terms
+  """
+  dirList = None
+  for meta, value in queryDict.items():
+    metaTable = catalog.metaTables[ meta ]
+    mList = [ dirID for dirID in metaTable if metaTable[ dirID ] == value ]
+    mList += catalog.getAllSubdirectoriesByID( mList )['Value']
+    if dirList is None:
+      dirList = mList
+    else:
+      dirList = [ d for d in dirList if d in mList ]
+  return dirList
+
+def main( levels, subdirs ):
+  start = time.time()
+  catalog = SyntheticCatalog( levels, subdirs )
+  print "Synthetic catalog with %d directories built in %.1f s" % ( catalog.numDirs, time.time() - start )
+  dmeta = DirectoryMetadata()
+  dmeta.db = catalog
+  catalog.dtree = catalog
+
+  metas = sorted( catalog.metaTables )
+  queries = [ ( 'one term', { metas[-1] : '3' } ),
+              ( 'all the levels', dict( [ ( meta, '3' ) for meta in metas ] ) ),
+              ( 'no match', { metas[0] : '1', metas[-1] : '10' } ) ]
+  for name, queryDict in queries:
+    catalog.queries = 0
+    start = time.time()
+    result = dmeta.findDirIDsByMetadata( queryDict, '/', {} )
+    if not result['OK']:
+      print "%-20s failed: %s" % ( name, result['Message'] )
+      continue
+    elapsed = time.time() - start
+    print "%-20s %8d directories %8.3f s %6d requests" % ( name, len( result['Value'] ), elapsed, catalog.queries )
+    # The list intersections grow as the square of the directories, check small catalogs only
+    if catalog.numDirs <= 20000:
+      start = time.time()
+      dirList = findDirIDsWithLists( catalog, queryDict )
+      print "%-20s %8d directories %8.3f s with lists" % ( '', len( dirList ), time.time() - start )
+      if sorted( dirList ) != sorted( result['Value'] ):
+        print "%-20s results differ" % ''
+
+if __name__ == "__main__":
+  levels = 5
+  subdirs = 20
+  if len( sys.argv ) > 1:
+    levels = int( sys.argv[1] )
+  if len( sys.argv ) > 2:
+    subdirs = int( sys.argv[2] )
+  main( levels, subdirs )
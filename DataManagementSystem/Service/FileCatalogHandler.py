@@ -19,6 +19,7 @@ from DIRAC.Core.DISET.RequestHandler import RequestHandler, getServiceOption
 from DIRAC import gLogger, S_OK, S_ERROR
 from DIRAC.DataManagementSystem.DB.FileCatalogDB import FileCatalogDB
 from DIRAC.Core.Utilities.List import sortList
+from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
 
 # This is a global instance of the FileCatalogDB class
 gFileCatalogDB = None
@@ -56,13 +57,22 @@ def initializeFileCatalogHandler( serviceInfo ):
                     'ResolvePFN'          : True,
                     'DefaultUmask'        : 0775,
                     'VisibleStatus'       : ['AprioriGood'],
-                    'VisibleReplicaStatus': ['AprioriGood']}
+                    'VisibleReplicaStatus': ['AprioriGood'],
+                    'DirectoryCacheSize'  : 100000,
+                    'DirectoryCacheLifetime' : 300,
+                    'DeferredDirectoryUsage' : True,
+                    'DirectoryUsageFoldPeriod' : 60,
+                    'BulkChunkSize'       : 1000 }
   for configKey in sortList( defaultConfig.keys() ):
     defaultValue = defaultConfig[configKey]
     configValue = getServiceOption( serviceInfo, configKey, defaultValue )
     gLogger.info( "%-20s : %-20s" % ( str( configKey ), str( configValue ) ) )
     databaseConfig[configKey] = configValue
   res = gFileCatalogDB.setConfig( databaseConfig )
+  if not res['OK']:
+    return res
+  if databaseConfig['DeferredDirectoryUsage']:
+    gThreadScheduler.addPeriodicTask( databaseConfig['DirectoryUsageFoldPeriod'], gFileCatalogDB.foldDirectoryUsage )
   return res
 
 class FileCatalogHandler( RequestHandler ):
@@ -1,6 +1,7 @@
 # $HeadURL$
 __RCSID__ = "$Id$"
 from DIRAC.FrameworkSystem.private.logging.Logger import Logger
+from DIRAC.FrameworkSystem.private.logging.Message import LazyText
 
 gLogger = Logger()
 def getLogger():
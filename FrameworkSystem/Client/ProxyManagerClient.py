@@ -24,10 +24,12 @@ gVOMSProxiesSync = ThreadSafe.Synchronizer()
 class ProxyManagerClient:
   __metaclass__ = DIRACSingleton.DIRACSingleton
 
+  __maxCachedProxies = 1000
+
   def __init__( self ):
     self.__usersCache = DictCache()
-    self.__proxiesCache = DictCache()
-    self.__vomsProxiesCache = DictCache()
+    self.__proxiesCache = DictCache( maxEntries = self.__maxCachedProxies )
+    self.__vomsProxiesCache = DictCache( maxEntries = self.__maxCachedProxies )
     self.__pilotProxiesCache = DictCache()
     self.__filesCache = DictCache( self.__deleteTemporalFile )
 
@@ -43,6 +45,15 @@ class ProxyManagerClient:
     self.__vomsProxiesCache.purgeAll()
     self.__pilotProxiesCache.purgeAll()
 
+  def __invalidateProxies( self, userDN, userGroup = False ):
+    """
+    Forget the downloaded proxies of a user, they have been replaced
+    """
+    def matchUser( cacheKey ):
+      return cacheKey[0] == userDN and ( not userGroup or cacheKey[1] == userGroup )
+    self.__proxiesCache.deleteMatching( matchUser )
+    self.__vomsProxiesCache.deleteMatching( matchUser )
+
   def __getSecondsLeftToExpiration( self, expiration, utc = True ):
     if utc:
       td = expiration - datetime.datetime.utcnow()
@@ -180,6 +191,9 @@ class ProxyManagerClient:
     result = rpcClient.completeDelegationUpload( reqDict[ 'id' ], retVal[ 'Value' ] )
     if not result[ 'OK' ]:
       return result
+    retVal = chain.getIssuerCert()
+    if retVal[ 'OK' ]:
+      self.__invalidateProxies( retVal[ 'Value' ].getSubjectDN()[ 'Value' ], diracGroup )
     if 'proxies' in result:
       return S_OK( result[ 'proxies' ] )
     return S_OK()
@@ -191,7 +205,7 @@ class ProxyManagerClient:
     """
     Get a proxy Chain from the proxy management
     """
-    cacheKey = ( userDN, userGroup )
+    cacheKey = ( userDN, userGroup, limited )
     if self.__proxiesCache.exists( cacheKey, requiredTimeLeft ):
       return S_OK( self.__proxiesCache.get( cacheKey ) )
     req = X509Request()
@@ -21,6 +21,7 @@ from DIRAC.Core.Security.X509Chain import X509Chain
 from DIRAC.Core.Security.MyProxy import MyProxy
 from DIRAC.Core.Security.VOMS import VOMS
 from DIRAC.Core.Security import Properties
+from DIRAC.Core.Utilities.DictCache import DictCache
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.FrameworkSystem.Client.NotificationClient import NotificationClient
 
@@ -39,6 +40,8 @@ class ProxyDB( DB ):
     self.__defaultTokenMaxUses = 50
     self.__useMyProxy = useMyProxy
     self._minSecsToAllowStore = 3600
+    #Parsed chains by ( DN, group, VOMS attribute ), so they are not loaded and parsed every time
+    self.__chainsCache = DictCache( maxEntries = 1000 )
     self.__notifClient = NotificationClient()
     retVal = self.__initializeDB()
     if not retVal[ 'OK' ]:
@@ -381,7 +384,9 @@ class ProxyDB( DB ):
       cmd = "UPDATE `ProxyDB_Proxies` SET %s WHERE %s" % ( ", ".join( sqlSet ), " AND ".join( sqlWhere ) )
 
     self.logAction( "store proxy", userDN, userGroup, userDN, userGroup )
-    return self._update( cmd )
+    result = self._update( cmd )
+    self.__invalidateChains( userDN, userGroup )
+    return result
 
   def purgeExpiredProxies( self, sendNotifications = True ):
     """
@@ -409,7 +414,34 @@ class ProxyDB( DB ):
 
     req = "DELETE FROM `ProxyDB_Proxies` WHERE UserDN='%s' AND UserGroup='%s'" % ( userDN,
                                                                                    userGroup )
-    return self._update( req )
+    result = self._update( req )
+    self.__invalidateChains( userDN, userGroup )
+    return result
+
+  def __invalidateChains( self, userDN, userGroup ):
+    """ Forget the parsed chains of a user and group, including the VOMS ones
+    """
+    self.__chainsCache.deleteMatching( lambda cacheKey: cacheKey[:2] == ( userDN, userGroup ) )
+
+  def __getChainAndTimeLeft( self, userDN, userGroup, vomsAttr = False ):
+    """ Get the chain stored for a user and group, and its time left. Parsed chains
+        are kept in memory until they expire
+    """
+    cacheKey = ( userDN, userGroup, vomsAttr )
+    cachedChain = self.__chainsCache.get( cacheKey )
+    if cachedChain:
+      chain, expirationTime = cachedChain
+      return S_OK( ( chain, int( expirationTime - time.time() ) ) )
+    retVal = self.__getPemAndTimeLeft( userDN, userGroup, vomsAttr )
+    if not retVal[ 'OK' ]:
+      return retVal
+    pemData, timeLeft = retVal[ 'Value' ]
+    chain = X509Chain()
+    retVal = chain.loadProxyFromString( pemData )
+    if not retVal[ 'OK' ]:
+      return retVal
+    self.__chainsCache.add( cacheKey, timeLeft, ( chain, time.time() + timeLeft ) )
+    return S_OK( ( chain, timeLeft ) )
 
   def __getPemAndTimeLeft( self, userDN, userGroup = False, vomsAttr = False ):
     if not vomsAttr:
@@ -442,14 +474,10 @@ class ProxyDB( DB ):
       return S_ERROR( "myproxy is disabled" )
     #Get the chain
     if not chain:
-      retVal = self.__getPemAndTimeLeft( userDN, userGroup )
-      if not retVal[ 'OK' ]:
-        return retVal
-      pemData = retVal[ 'Value' ][0]
-      chain = X509Chain()
-      retVal = chain.loadProxyFromString( pemData )
+      retVal = self.__getChainAndTimeLeft( userDN, userGroup )
       if not retVal[ 'OK' ]:
         return retVal
+      chain = retVal[ 'Value' ][0]
 
     originChainLifeTime = chain.getRemainingSecs()[ 'Value' ]
     maxMyProxyLifeTime = self.getMyProxyMaxLifeTime()
@@ -502,15 +530,10 @@ class ProxyDB( DB ):
         in the userGroup
     """
 
-    retVal = self.__getPemAndTimeLeft( userDN, userGroup )
-    if not retVal[ 'OK' ]:
-      return retVal
-    pemData = retVal[ 'Value' ][0]
-    timeLeft = retVal[ 'Value' ][1]
-    chain = X509Chain()
-    retVal = chain.loadProxyFromString( pemData )
+    retVal = self.__getChainAndTimeLeft( userDN, userGroup )
     if not retVal[ 'OK' ]:
       return retVal
+    chain, timeLeft = retVal[ 'Value' ]
     if requiredLifeTime:
       if timeLeft < requiredLifeTime:
         retVal = self.renewFromMyProxy( userDN, userGroup, lifeTime = requiredLifeTime, chain = chain )
@@ -545,18 +568,14 @@ class ProxyDB( DB ):
     vomsVO = retVal[ 'Value' ][ 'VOMSVO' ]
 
     #Look in the cache
-    retVal = self.__getPemAndTimeLeft( userDN, userGroup, vomsAttr )
+    retVal = self.__getChainAndTimeLeft( userDN, userGroup, vomsAttr )
     if retVal[ 'OK' ]:
-      pemData = retVal[ 'Value' ][0]
-      vomsTime = retVal[ 'Value' ][1]
-      chain = X509Chain()
-      retVal = chain.loadProxyFromString( pemData )
+      chain, vomsTime = retVal[ 'Value' ]
+      retVal = chain.getRemainingSecs()
       if retVal[ 'OK' ]:
-        retVal = chain.getRemainingSecs()
-        if retVal[ 'OK' ]:
-          remainingSecs = retVal[ 'Value' ]
-          if requiredLifeTime and requiredLifeTime <= vomsTime and requiredLifeTime <= remainingSecs:
-            return S_OK( ( chain, min( vomsTime, remainingSecs ) ) )
+        remainingSecs = retVal[ 'Value' ]
+        if requiredLifeTime and requiredLifeTime <= vomsTime and requiredLifeTime <= remainingSecs:
+          return S_OK( ( chain, min( vomsTime, remainingSecs ) ) )
 
     retVal = self.getProxy( userDN, userGroup, requiredLifeTime )
     if not retVal[ 'OK' ]:
@@ -598,18 +617,10 @@ class ProxyDB( DB ):
     if not retVal[ 'OK' ]:
       return retVal
     connObj = retVal[ 'Value' ]
-    retVal1 = VOMS().getVOMSProxyInfo( chain, 'actimeleft' )
-    retVal2 = VOMS().getVOMSProxyInfo( chain, 'timeleft' )
-    if not retVal1[ 'OK' ]:
-      return retVal1
-    if not retVal2[ 'OK' ]:
-      return retVal2
-    try:
-      vomsSecsLeft1 = int( retVal1[ 'Value' ].strip() )
-      vomsSecsLeft2 = int( retVal2[ 'Value' ].strip() )
-      vomsSecsLeft = min( vomsSecsLeft1, vomsSecsLeft2 )
-    except Exception, e:
-      return S_ERROR( "Can't parse VOMS time left: %s" % str( e ) )
+    retVal = VOMS().getVOMSTimeLeft( chain )
+    if not retVal[ 'OK' ]:
+      return retVal
+    vomsSecsLeft = retVal[ 'Value' ]
     secsLeft = min( vomsSecsLeft, chain.getRemainingSecs()[ 'Value' ] )
     pemData = chain.dumpAllToString()[ 'Value' ]
     result = Registry.getUsernameForDN( userDN )
@@ -623,6 +634,7 @@ class ProxyDB( DB ):
     result = self._update( cmd, conn = connObj )
     if not result[ 'OK' ]:
       return result
+    self.__chainsCache.add( ( userDN, userGroup, vomsAttr ), secsLeft, ( chain, time.time() + secsLeft ) )
     return S_OK( secsLeft )
 
   def getRemainingTime( self, userDN, userGroup ):
@@ -16,10 +16,24 @@ import DIRAC
 
 DEBUG = 1
 
+_logLevels = LogLevels()
+
 class Logger:
 
   defaultLogLevel = 'NOTICE'
 
+  # Absolute level values, the level is tested against them before building any
+  # message, so that discarded messages cost a comparison
+  _alwaysValue = abs( _logLevels.getLevelValue( _logLevels.always ) )
+  _noticeValue = abs( _logLevels.getLevelValue( _logLevels.notice ) )
+  _infoValue = abs( _logLevels.getLevelValue( _logLevels.info ) )
+  _verboseValue = abs( _logLevels.getLevelValue( _logLevels.verbose ) )
+  _debugValue = abs( _logLevels.getLevelValue( _logLevels.debug ) )
+  _warnValue = abs( _logLevels.getLevelValue( _logLevels.warn ) )
+  _errorValue = abs( _logLevels.getLevelValue( _logLevels.error ) )
+  _exceptionValue = abs( _logLevels.getLevelValue( _logLevels.exception ) )
+  _fatalValue = abs( _logLevels.getLevelValue( _logLevels.fatal ) )
+
   def __init__( self ):
     self._minLevel = 0
     self._showCallingFrame = False
@@ -132,108 +146,87 @@ class Logger:
     return self._logLevels.getLevel( self._minLevel )
 
   def shown( self, levelName ):
-    levelName = levelName.upper()
-    if levelName in self._logLevels.getLevels():
-      return self._logLevels.getLevelValue( levelName ) <= levelName
-    return False
+    """ Returns True if messages of level <levelName> are shown. To be used to
+     skip building expensive messages.
+    """
+    levelValue = self._logLevels.getLevelValue( levelName.upper() )
+    if levelValue is None:
+      return False
+    return abs( levelValue ) >= self._getMinLevel()
+
+  def _getMinLevel( self ):
+    return self._minLevel
 
   def getName( self ):
     return self._systemName
 
   def always( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.always,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._alwaysValue:
+      return True
+    return self._sendMessage( self._logLevels.always, sMsg, sVarMsg )
 
   def notice( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.notice,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._noticeValue:
+      return True
+    return self._sendMessage( self._logLevels.notice, sMsg, sVarMsg )
 
   def info( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.info,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._infoValue:
+      return True
+    return self._sendMessage( self._logLevels.info, sMsg, sVarMsg )
 
   def verbose( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.verbose,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._verboseValue:
+      return True
+    return self._sendMessage( self._logLevels.verbose, sMsg, sVarMsg )
 
   def debug( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.debug,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._debugValue:
+      return True
+    return self._sendMessage( self._logLevels.debug, sMsg, sVarMsg )
 
   def warn( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.warn,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._warnValue:
+      return True
+    return self._sendMessage( self._logLevels.warn, sMsg, sVarMsg )
 
   def error( self, sMsg, sVarMsg = '' ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.error,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    if self._getMinLevel() > self._errorValue:
+      return True
+    return self._sendMessage( self._logLevels.error, sMsg, sVarMsg )
 
   def exception( self, sMsg = "", sVarMsg = '', lException = False, lExcInfo = False ):
+    if self._getMinLevel() > self._exceptionValue:
+      return True
     if sVarMsg:
-      sVarMsg += "\n%s" % self.__getExceptionString( lException, lExcInfo )
+      sVarMsg = "%s\n%s" % ( sVarMsg, self.__getExceptionString( lException, lExcInfo ) )
     else:
       sVarMsg = "\n%s" % self.__getExceptionString( lException, lExcInfo )
-    messageObject = Message( self._systemName,
-                             self._logLevels.exception,
-                             Time.dateTime(),
-                             sMsg,
-                             sVarMsg,
-                             self.__discoverCallingFrame() )
-    return self.processMessage( messageObject )
+    return self._sendMessage( self._logLevels.exception, sMsg, sVarMsg )
 
   def fatal( self, sMsg, sVarMsg = '' ):
+    if self._getMinLevel() > self._fatalValue:
+      return True
+    return self._sendMessage( self._logLevels.fatal, sMsg, sVarMsg )
+
+  def showStack( self ):
+    if self._getMinLevel() > self._debugValue:
+      return
+    self._sendMessage( self._logLevels.debug, "", self.__getStackString() )
+
+  def _sendMessage( self, level, sMsg, sVarMsg ):
+    """ Builds the message and passes it to processMessage. Only called once the
+     level has been checked, sMsg and sVarMsg ( LazyText objects included ) are
+     converted to strings here.
+    """
     messageObject = Message( self._systemName,
-                             self._logLevels.fatal,
+                             level,
                              Time.dateTime(),
                              sMsg,
                              sVarMsg,
                              self.__discoverCallingFrame() )
     return self.processMessage( messageObject )
 
-  def showStack( self ):
-    messageObject = Message( self._systemName,
-                             self._logLevels.debug,
-                             Time.dateTime(),
-                             "",
-                             self.__getStackString(),
-                             self.__discoverCallingFrame() )
-    self.processMessage( messageObject )
-
   def processMessage( self, messageObject ):
     if self.__testLevel( messageObject.getLevel() ):
       if not messageObject.getName():
@@ -283,10 +276,11 @@ class Logger:
 
 
   def __discoverCallingFrame( self ):
-    if self.__testLevel( self._logLevels.debug ) and self._showCallingFrame:
+    if self._showCallingFrame and self._getMinLevel() <= self._debugValue:
       oActualFrame = inspect.currentframe()
       lOuterFrames = inspect.getouterframes( oActualFrame )
-      lCallingFrame = lOuterFrames[2]
+      # Skip __discoverCallingFrame, _sendMessage and the level method
+      lCallingFrame = lOuterFrames[3]
       return "%s:%s" % ( lCallingFrame[1].replace( sys.path[0], "" )[1:], lCallingFrame[2] )
     else:
       return ""
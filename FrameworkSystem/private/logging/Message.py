@@ -8,6 +8,20 @@ def tupleToMessage( varTuple ):
   varList[ 2 ] = Time.fromString( varList[ 2 ] )
   return Message( *varList )
 
+class LazyText:
+  """ Text formatted only if the message is shown, e.g.:
+       gLogger.verbose( LazyText( "Inserting %s records in %s", len( records ), table ) )
+  """
+
+  def __init__( self, textFormat, *args ):
+    self.textFormat = textFormat
+    self.args = args
+
+  def __str__( self ):
+    if not self.args:
+      return str( self.textFormat )
+    return self.textFormat % self.args
+
 class Message:
 
   def __init__( self, systemName, level, time, msgText, variableText, frameInfo, subSystemName = '' ):
@@ -17,6 +17,10 @@ class SubSystemLogger( Logger ):
     self.__masterLogger = masterLogger
     self._subName = subName
 
+  def _getMinLevel( self ):
+    # Messages are filtered by the master logger
+    return self.__masterLogger._getMinLevel()
+
   def processMessage( self, messageObject ):
     if self.__child:
       messageObject.setSubSystemName( self._subName )
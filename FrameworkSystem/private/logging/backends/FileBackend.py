@@ -1,23 +1,64 @@
 # $HeadURL$
 __RCSID__ = "$Id$"
 """  This backend writes the log messages to a file
+
+     Messages are queued and written by a background thread, which opens the
+     file once for all the messages pending, so the caller does not wait for
+     the file system.
 """
+import atexit
+import threading
+import Queue
 from DIRAC.FrameworkSystem.private.logging.backends.BaseBackend import BaseBackend
 
-class FileBackend( BaseBackend ):
+class FileBackend( BaseBackend, threading.Thread ):
+
   def __init__( self, optionsDictionary ):
+    BaseBackend.__init__( self, optionsDictionary )
+    threading.Thread.__init__( self )
     self._backendName = "file"
     self._filename = optionsDictionary[ 'FileName' ]
+    self._messageQueue = Queue.Queue()
+    self._maxBundledMessages = 1000
+    self.setDaemon( 1 )
+    self.start()
+    # Daemon threads are not waited for, write what is left when exiting
+    atexit.register( self.flush )
 
   def doMessage( self, messageObject ):
-    try:
-      self.file=open( self._filename, 'a' )
-    except Exception, v:
-      print 'Could not open file %s ' % self._filename
-      return 
+    # The line is composed by the thread logging it, the one shown with showThreads
+    self._messageQueue.put( self.composeString( messageObject ) )
 
-    self.file.write( "%s\n" % self.composeString( messageObject ) )
-
-    self.file.close()
+  def run( self ):
+    while True:
+      # Block until there is something to write
+      messageList = [ self._messageQueue.get() ]
+      while len( messageList ) < self._maxBundledMessages:
+        try:
+          messageList.append( self._messageQueue.get_nowait() )
+        except Queue.Empty:
+          break
+      try:
+        self._writeMessages( messageList )
+      finally:
+        for _message in messageList:
+          self._messageQueue.task_done()
 
+  def _writeMessages( self, messageList ):
+    try:
+      logFile = open( self._filename, 'a' )
+    except Exception:
+      print 'Could not open file %s ' % self._filename
+      return
+    try:
+      try:
+        logFile.write( "".join( [ "%s\n" % message for message in messageList ] ) )
+      except Exception:
+        print 'Could not write to file %s ' % self._filename
+    finally:
+      logFile.close()
 
+  def flush( self ):
+    # Wait for the messages queued to be written, including the ones taken from
+    # the queue by the writer thread
+    self._messageQueue.join()
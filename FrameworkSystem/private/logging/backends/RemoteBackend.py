@@ -29,7 +29,9 @@ class RemoteBackend( BaseBackend, threading.Thread ):
     self.start()
 
   def doMessage( self, messageObject ):
-    self._messageQueue.put( messageObject )
+    # Only queue what will be sent, the queue is emptied every SleepTime seconds
+    if self._testLevel( messageObject.getLevel() ):
+      self._messageQueue.put( messageObject )
 
   def run( self ):
     import time
@@ -263,6 +263,19 @@ class MonitoringCatalog:
     else:
       return retList[0]
 
+  def findActivities( self, sourceId, acNamesList ):
+    """
+    Find several activities of a source in one query. Returns a dict name -> activity
+    """
+    if not acNamesList:
+      return {}
+    queryDict = { 'sourceId' : sourceId, "name" : list( acNamesList ) }
+    retList = self.__select( "id, name, category, unit, type, description, filename, bucketLength, lastUpdate", "activities", queryDict )
+    acDict = {}
+    for acInfo in retList:
+      acDict[ acInfo[1] ] = acInfo
+    return acDict
+
   def activitiesQuery( self, selDict, sortList, start, limit ):
     fields = [ 'sources.id', 'sources.site', 'sources.componentType', 'sources.componentLocation',
                'sources.componentName', 'activities.id', 'activities.name', 'activities.category',
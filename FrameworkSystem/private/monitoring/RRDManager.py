@@ -157,6 +157,20 @@ class RRDManager:
         self.log.warn( "Error updating rrd file", "%s rrd: %s" % ( rrdFile, retVal[ 'Message' ] ) )
     return S_OK( valuesList[-1][0] )
 
+  def updateBundle( self, updatesList ):
+    """
+    Add marks to several rrds. updatesList contains tuples
+    ( type, rrdFile, bucketLength, valuesList, lastUpdate ).
+    Returns a dict with the last update time of each updated file
+    """
+    updated = {}
+    for type, rrdFile, bucketLength, valuesList, lastUpdate in updatesList:
+      retVal = self.update( type, rrdFile, bucketLength, valuesList, lastUpdate )
+      if not retVal[ 'OK' ]:
+        continue
+      updated[ rrdFile ] = retVal[ 'Value' ]
+    return S_OK( updated )
+
   def __generateName( self, *args, **kwargs ):
     """
     Generate a random name
@@ -3,6 +3,7 @@ __RCSID__ = "$Id$"
 import DIRAC
 from DIRAC import gLogger, rootPath, gConfig
 from DIRAC.FrameworkSystem.private.monitoring.RRDManager import RRDManager
+from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceSection
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.Utilities import DEncode, List
 
@@ -19,8 +20,12 @@ class ServiceInterface:
 
   def __createRRDManager( self ):
     """
-    Generate an RRDManager
+    Generate the manager of the configured backend: RRD or TimeSeries
     """
+    backend = gConfig.getValue( "%s/Backend" % getServiceSection( "Framework/Monitoring" ), "RRD" )
+    if backend == "TimeSeries":
+      from DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager import TimeSeriesManager
+      return TimeSeriesManager( self.rrdPath, self.plotsPath )
     return RRDManager( self.rrdPath, self.plotsPath )
 
   def __createCatalog( self ):
@@ -44,7 +49,7 @@ class ServiceInterface:
     from DIRAC.FrameworkSystem.DB.ComponentMonitoringDB import ComponentMonitoringDB
 
     self.dataPath = dataPath
-    self.plotCache = PlotCache( RRDManager( self.rrdPath, self.plotsPath ) )
+    self.plotCache = PlotCache( self.__createRRDManager() )
     self.srvUp = True
     try:
       self.compmonDB = ComponentMonitoringDB()
@@ -127,9 +132,11 @@ class ServiceInterface:
     acCatalog = self.__createCatalog()
     rrdManager = self.__createRRDManager()
     unregisteredActivities = []
+    acInfoDict = acCatalog.findActivities( sourceId, activitiesDict.keys() )
+    updatesList = []
     for acName in activitiesDict:
       acData = activitiesDict[ acName ]
-      acInfo = acCatalog.findActivity( sourceId, acName )
+      acInfo = acInfoDict.get( acName )
       if not acInfo:
         unregisteredActivities.append( acName )
         gLogger.warn( "Cant find rrd filename", "%s:%s activity" % ( sourceId, acName ) )
@@ -147,11 +154,18 @@ class ServiceInterface:
         entries.append( ( instant , acData[ instant ] ) )
       if len( entries ) > 0:
         gLogger.verbose( "There are %s entries for %s" % ( len( entries ), acName ) )
-        retDict = rrdManager.update( acInfo[4], rrdFile, acInfo[7], entries, long( acInfo[8] ) )
-        if not retDict[ 'OK' ]:
-          gLogger.error( "There was an error updating", "%s:%s activity [%s]" % ( sourceId, acName, rrdFile ) )
+        updatesList.append( ( acName, ( acInfo[4], rrdFile, acInfo[7], entries, long( acInfo[8] ) ) ) )
+    #All the marks of the bundle are written in one go
+    retDict = rrdManager.updateBundle( [ update[1] for update in updatesList ] )
+    if not retDict[ 'OK' ]:
+      gLogger.error( "There was an error updating", "activities of %s: %s" % ( sourceId, retDict[ 'Message' ] ) )
+    else:
+      for acName, update in updatesList:
+        rrdFile = update[1]
+        if rrdFile in retDict[ 'Value' ]:
+          acCatalog.setLastUpdate( sourceId, acName, retDict[ 'Value' ][ rrdFile ] )
         else:
-          acCatalog.setLastUpdate( sourceId, acName, retDict[ 'Value' ] )
+          gLogger.error( "There was an error updating", "%s:%s activity [%s]" % ( sourceId, acName, rrdFile ) )
     if not self.__cmdb_heartbeatComponent( sourceId, componentExtraInfo ):
       for acName in activitiesDict:
         if acName not in unregisteredActivities:
@@ -0,0 +1,333 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Native time series backend for the Monitoring service
+
+     Every activity is stored in a file holding two fixed size ring arrays, one
+     with the start time of each bucket and one with its value. The slot of a
+     bucket is ( bucketTime / bucketLength ) % numBuckets, so writing a mark is a
+     single assignment and old buckets are overwritten once the retention span
+     is over. Slots whose time does not match the requested bucket are unknown,
+     and like in the rrd backend, they are plotted as 0.
+
+     The files are memory mapped with numpy, so marks of a whole MonitoringClient
+     bundle are written without forking any process, and plots consolidate the
+     buckets with array operations before drawing them with the DIRAC Graphs
+     package.
+
+     It exposes the same interface as RRDManager, so both can be used by the
+     ServiceInterface and the PlotCache.
+"""
+import os
+import os.path
+import struct
+try:
+  import hashlib as md5
+except:
+  import md5
+import numpy
+from DIRAC import gLogger, S_OK, S_ERROR
+from DIRAC.Core.Utilities import Time
+
+class TimeSeriesManager:
+
+  # magic, format version, type code, bucket length, number of buckets, last update
+  __headerFormat = "<4sHHIIq"
+  __headerSize = struct.calcsize( __headerFormat )
+  __lastUpdateOffset = __headerSize - struct.calcsize( "<q" )
+  __magic = "DTS1"
+  __formatVersion = 1
+  __typeCodes = { 'mean' : 0, 'sum' : 1, 'acum' : 2, 'rate' : 3 }
+  # Same retention as the rrd files: one year
+  __retention = 31536000
+  __sizesList = [ [ 200, 'thumbnail' ], [ 400, 'small' ], [ 600, 'normal' ], [ 800, 'large' ] ]
+
+  def __init__( self, rrdLocation, graphLocation ):
+    """
+    Initialize TimeSeriesManager
+    """
+    self.rrdLocation = rrdLocation
+    self.graphLocation = graphLocation
+    self.log = gLogger.getSubLogger( "TimeSeriesManager" )
+    for path in ( self.rrdLocation, self.graphLocation ):
+      try:
+        os.makedirs( path )
+      except:
+        pass
+
+  def __getFilePath( self, rrdFile ):
+    """
+    Get the path of the time series file for an activity file name
+    """
+    return "%s/%s.ts" % ( self.rrdLocation, os.path.splitext( rrdFile )[0] )
+
+  def existsRRDFile( self, rrdFile ):
+    return os.path.isfile( self.__getFilePath( rrdFile ) )
+
+  def getGraphLocation( self ):
+    """
+    Set the location for graph files
+    """
+    return self.graphLocation
+
+  def getCurrentBucketTime( self, bucketLength ):
+    """
+    Get current time "bucketized"
+    """
+    return self.bucketize( Time.toEpoch(), bucketLength )
+
+  def bucketize( self, secs, bucketLength ):
+    """
+    Bucketize a time (in secs)
+    """
+    secs = int( secs )
+    return secs - secs % bucketLength
+
+  def create( self, type, rrdFile, bucketLength ):
+    """
+    Create a time series file
+    """
+    filePath = self.__getFilePath( rrdFile )
+    if os.path.isfile( filePath ):
+      return S_OK()
+    if type not in self.__typeCodes:
+      return S_ERROR( "Unknown activity type %s" % type )
+    try:
+      os.makedirs( os.path.dirname( filePath ) )
+    except:
+      pass
+    self.log.info( "Creating time series file %s" % filePath )
+    numBuckets = self.__retention / bucketLength
+    header = struct.pack( self.__headerFormat, self.__magic, self.__formatVersion,
+                          self.__typeCodes[ type ], bucketLength, numBuckets, 0 )
+    #Write to a temporary file so nobody reads a half created one
+    tmpPath = "%s.tmp" % filePath
+    try:
+      fd = file( tmpPath, "wb" )
+      try:
+        fd.write( header )
+        #Sparse file, all times are 0 so all buckets are unknown
+        fd.truncate( self.__headerSize + numBuckets * 16 )
+      finally:
+        fd.close()
+      os.rename( tmpPath, filePath )
+    except Exception, e:
+      return S_ERROR( "Can't create time series file %s: %s" % ( filePath, str( e ) ) )
+    return S_OK()
+
+  def __openSeries( self, rrdFile, mode = "r" ):
+    """
+    Map the ring arrays of a file. Returns ( header dict, times, values )
+    """
+    filePath = self.__getFilePath( rrdFile )
+    try:
+      fd = file( filePath, "rb" )
+      try:
+        data = fd.read( self.__headerSize )
+      finally:
+        fd.close()
+    except Exception, e:
+      return S_ERROR( "Can't read time series file %s: %s" % ( filePath, str( e ) ) )
+    if len( data ) != self.__headerSize:
+      return S_ERROR( "Time series file %s is corrupted" % filePath )
+    magic, version, typeCode, bucketLength, numBuckets, lastUpdate = struct.unpack( self.__headerFormat, data )
+    if magic != self.__magic:
+      return S_ERROR( "%s is not a time series file" % filePath )
+    header = { 'bucketLength' : bucketLength,
+               'numBuckets' : numBuckets,
+               'lastUpdate' : lastUpdate,
+               'path' : filePath }
+    try:
+      times = numpy.memmap( filePath, dtype = "<i8", mode = mode,
+                            offset = self.__headerSize, shape = ( numBuckets, ) )
+      values = numpy.memmap( filePath, dtype = "<f8", mode = mode,
+                             offset = self.__headerSize + numBuckets * 8, shape = ( numBuckets, ) )
+    except Exception, e:
+      return S_ERROR( "Can't map time series file %s: %s" % ( filePath, str( e ) ) )
+    return S_OK( ( header, times, values ) )
+
+  def __writeLastUpdate( self, header, lastUpdate ):
+    fd = file( header[ 'path' ], "r+b" )
+    try:
+      fd.seek( self.__lastUpdateOffset )
+      fd.write( struct.pack( "<q", lastUpdate ) )
+    finally:
+      fd.close()
+
+  def update( self, type, rrdFile, bucketLength, valuesList, lastUpdate = 0 ):
+    """
+    Add marks to a time series file
+    """
+    self.log.info( "Updating time series file", rrdFile )
+    if not valuesList:
+      return S_ERROR( "No marks to add to %s" % rrdFile )
+    retVal = self.__openSeries( rrdFile, "r+" )
+    if not retVal[ 'OK' ]:
+      return retVal
+    header, times, values = retVal[ 'Value' ]
+    if header[ 'bucketLength' ] != bucketLength:
+      return S_ERROR( "Bucket length of %s is %s, not %s" % ( rrdFile, header[ 'bucketLength' ], bucketLength ) )
+    #Unknown buckets are plotted as 0, no need to fill the holes
+    markTimes = numpy.array( [ self.bucketize( entry[0], bucketLength ) for entry in valuesList ], dtype = numpy.int64 )
+    markValues = numpy.array( [ entry[1] for entry in valuesList ], dtype = numpy.float64 )
+    slots = ( markTimes // bucketLength ) % header[ 'numBuckets' ]
+    times[ slots ] = markTimes
+    values[ slots ] = markValues
+    values.flush()
+    times.flush()
+    del( times, values )
+    lastTime = int( max( markTimes.max(), header[ 'lastUpdate' ] ) )
+    try:
+      self.__writeLastUpdate( header, lastTime )
+    except Exception, e:
+      return S_ERROR( "Can't update time series file %s: %s" % ( rrdFile, str( e ) ) )
+    return S_OK( lastTime )
+
+  def updateBundle( self, updatesList ):
+    """
+    Add marks to several activities in one go. updatesList contains tuples
+    ( type, rrdFile, bucketLength, valuesList, lastUpdate ).
+    Returns a dict with the last update time of each updated file
+    """
+    updated = {}
+    for type, rrdFile, bucketLength, valuesList, lastUpdate in updatesList:
+      retVal = self.update( type, rrdFile, bucketLength, valuesList, lastUpdate )
+      if not retVal[ 'OK' ]:
+        self.log.warn( "Error updating time series file", "%s: %s" % ( rrdFile, retVal[ 'Message' ] ) )
+        continue
+      updated[ rrdFile ] = retVal[ 'Value' ]
+    return S_OK( updated )
+
+  def __generateName( self, *args, **kwargs ):
+    """
+    Generate a random name
+    """
+    m = md5.md5()
+    m.update( str( args ) )
+    m.update( str( kwargs ) )
+    return m.hexdigest()
+
+  def __getYScalingFactor( self, timeSpan, bucketLength, plotWidth ):
+    expectedTimeSpan = plotWidth * bucketLength
+    if timeSpan < expectedTimeSpan:
+      return 1
+    else:
+      return float( timeSpan ) / expectedTimeSpan
+
+  def getPlotData( self, fromSecs, toSecs, activity, plotWidth ):
+    """
+    Get the consolidated points to plot for an activity in the same units the
+    rrd backend uses. Returns ( { epoch : value }, seconds per point )
+    """
+    bucketLength = activity.getBucketLength()
+    acType = activity.getType()
+    yScaleFactor = self.__getYScalingFactor( toSecs - fromSecs, bucketLength, plotWidth )
+    activity.setBucketScaleFactor( yScaleFactor )
+    pointBuckets = max( 1, int( round( yScaleFactor ) ) )
+    span = pointBuckets * bucketLength
+    startTime = self.bucketize( fromSecs, span )
+    numPoints = max( 1, ( toSecs - startTime + span - 1 ) / span )
+    bucketTimes = numpy.arange( startTime, startTime + numPoints * span, bucketLength, dtype = numpy.int64 )
+    retVal = self.__openSeries( activity.getFile() )
+    if not retVal[ 'OK' ]:
+      return retVal
+    header, times, values = retVal[ 'Value' ]
+    slots = ( bucketTimes // bucketLength ) % header[ 'numBuckets' ]
+    #Buckets not written or overwritten by newer ones are unknown, and count as 0
+    points = numpy.where( times[ slots ] == bucketTimes, values[ slots ], 0.0 )
+    points = numpy.nan_to_num( points ).reshape( numPoints, pointBuckets )
+    del( times, values )
+    if acType == "mean":
+      points = points.mean( axis = 1 )
+    elif acType == "rate":
+      points = points.mean( axis = 1 ) / bucketLength
+    elif acType == "sum":
+      points = points.sum( axis = 1 )
+    elif acType == "acum":
+      points = points.sum( axis = 1 ).cumsum()
+    pointTimes = numpy.arange( startTime, startTime + numPoints * span, span, dtype = numpy.int64 )
+    return S_OK( ( dict( zip( pointTimes.tolist(), points.tolist() ) ), span ) )
+
+  def __drawPlot( self, fromSecs, toSecs, plotData, span, stackActivities, size, graphFilename, metadata ):
+    """
+    Draw the plot using the DIRAC Graphs package
+    """
+    try:
+      from DIRAC.Core.Utilities.Graphs import lineGraph, curveGraph
+    except Exception, e:
+      return S_ERROR( "Missing plotting lib: %s" % str( e ) )
+    metadata[ 'starttime' ] = fromSecs
+    metadata[ 'endtime' ] = toSecs
+    metadata[ 'span' ] = span
+    metadata[ 'graph_size' ] = self.__sizesList[ size ][1]
+    metadata[ 'limit_labels' ] = 9999999
+    graphPath = "%s/%s" % ( self.graphLocation, graphFilename )
+    try:
+      fd = file( graphPath, "wb" )
+    except Exception, e:
+      return S_ERROR( "Can't open %s: %s" % ( graphPath, str( e ) ) )
+    try:
+      try:
+        if stackActivities:
+          lineGraph( plotData, fd, **metadata )
+        else:
+          curveGraph( plotData, fd, **metadata )
+      except Exception, e:
+        self.log.exception( "Error drawing plot %s" % graphFilename )
+        return S_ERROR( "Error drawing plot: %s" % str( e ) )
+    finally:
+      fd.close()
+    return S_OK( graphFilename )
+
+  def groupPlot( self, fromSecs, toSecs, activitiesList, stackActivities, size, graphFilename = "" ):
+    """
+    Generate a group plot
+    """
+    if not graphFilename:
+      graphFilename = "%s.png" % self.__generateName( fromSecs,
+                                                    toSecs,
+                                                    activitiesList,
+                                                    stackActivities
+                                                    )
+    activitiesList.sort()
+    plotData = {}
+    span = 0
+    for activity in activitiesList:
+      retVal = self.getPlotData( fromSecs, toSecs, activity, self.__sizesList[ size ][0] )
+      if not retVal[ 'OK' ]:
+        return retVal
+      label = activity.getLabel()
+      #Labels may be repeated, sum them instead of dropping any
+      if label in plotData:
+        for epoch, value in retVal[ 'Value' ][0].items():
+          plotData[ label ][ epoch ] = plotData[ label ].get( epoch, 0 ) + value
+      else:
+        plotData[ label ] = retVal[ 'Value' ][0]
+      span = max( span, retVal[ 'Value' ][1] )
+    metadata = { 'title' : activitiesList[ 0 ].getGroupLabel() }
+    return self.__drawPlot( fromSecs, toSecs, plotData, span, stackActivities, size, graphFilename, metadata )
+
+  def plot( self, fromSecs, toSecs, activity, stackActivities , size, graphFilename = "" ):
+    """
+    Generate a non grouped plot
+    """
+    if not graphFilename:
+      graphFilename = "%s.png" % self.__generateName( fromSecs,
+                                                    toSecs,
+                                                    activity,
+                                                    stackActivities
+                                                    )
+    retVal = self.getPlotData( fromSecs, toSecs, activity, self.__sizesList[ size ][0] )
+    if not retVal[ 'OK' ]:
+      return retVal
+    plotData, span = retVal[ 'Value' ]
+    metadata = { 'title' : activity.getLabel(),
+                 'ylabel' : activity.getUnit(),
+                 'legend' : False }
+    return self.__drawPlot( fromSecs, toSecs, { activity.getLabel() : plotData }, span,
+                            stackActivities, size, graphFilename, metadata )
+
+  def deleteRRD( self, rrdFile ):
+    try:
+      os.unlink( self.__getFilePath( rrdFile ) )
+    except Exception, e:
+      self.log.error( "Could not delete time series file %s: %s" % ( rrdFile, str( e ) ) )
@@ -0,0 +1,100 @@
+# $HeadURL$
+''' Test_TimeSeriesManager
+
+  Unit tests for the native time series backend of the Monitoring service.
+
+'''
+
+import shutil
+import tempfile
+import unittest
+
+__RCSID__ = '$Id$'
+
+class FakeActivity:
+  ''' Minimal Activity, only what the manager uses '''
+
+  def __init__( self, fileName, acType, bucketLength ):
+    self.fileName = fileName
+    self.acType = acType
+    self.bucketLength = bucketLength
+    self.scaleFactor = 1
+
+  def getFile( self ):
+    return self.fileName
+
+  def getType( self ):
+    return self.acType
+
+  def getBucketLength( self ):
+    return self.bucketLength
+
+  def setBucketScaleFactor( self, scaleFactor ):
+    self.scaleFactor = scaleFactor
+
+class TimeSeriesManager_TestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    from DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager import TimeSeriesManager
+    self.dataPath = tempfile.mkdtemp()
+    self.manager = TimeSeriesManager( "%s/rrd" % self.dataPath, "%s/plots" % self.dataPath )
+    self.start = 1300000000 - 1300000000 % 600
+
+  def tearDown( self ):
+    shutil.rmtree( self.dataPath )
+
+  def test_create( self ):
+    res = self.manager.create( 'sum', 'ab/abcdef.rrd', 60 )
+    self.assertEqual( res[ 'OK' ], True )
+    self.assertEqual( self.manager.existsRRDFile( 'ab/abcdef.rrd' ), True )
+    self.assertEqual( self.manager.existsRRDFile( 'ab/other.rrd' ), False )
+    res = self.manager.create( 'unknown', 'ab/other.rrd', 60 )
+    self.assertEqual( res[ 'OK' ], False )
+
+  def test_updateBundle( self ):
+    self.manager.create( 'mean', 'ab/mean.rrd', 60 )
+    self.manager.create( 'sum', 'ab/sum.rrd', 60 )
+    res = self.manager.updateBundle( [ ( 'mean', 'ab/mean.rrd', 60, [ ( self.start, 2 ), ( self.start + 60, 4 ) ], 0 ),
+                                       ( 'sum', 'ab/sum.rrd', 60, [ ( self.start + 120, 5 ) ], 0 ),
+                                       ( 'sum', 'ab/missing.rrd', 60, [ ( self.start, 1 ) ], 0 ) ] )
+    self.assertEqual( res[ 'OK' ], True )
+    self.assertEqual( res[ 'Value' ], { 'ab/mean.rrd' : self.start + 60, 'ab/sum.rrd' : self.start + 120 } )
+
+  def test_getPlotData( self ):
+    self.manager.create( 'sum', 'ab/sum.rrd', 60 )
+    self.manager.update( 'sum', 'ab/sum.rrd', 60, [ ( self.start, 1 ), ( self.start + 60, 2 ), ( self.start + 240, 3 ) ] )
+
+    # One point per bucket, holes are 0
+    res = self.manager.getPlotData( self.start, self.start + 300, FakeActivity( 'ab/sum.rrd', 'sum', 60 ), 200 )
+    self.assertEqual( res[ 'OK' ], True )
+    points, span = res[ 'Value' ]
+    self.assertEqual( span, 60 )
+    self.assertEqual( [ points[ self.start + i * 60 ] for i in range( 5 ) ], [ 1, 2, 0, 0, 3 ] )
+
+    # Several buckets per point are added
+    res = self.manager.getPlotData( self.start, self.start + 600, FakeActivity( 'ab/sum.rrd', 'sum', 60 ), 2 )
+    points, span = res[ 'Value' ]
+    self.assertEqual( span, 300 )
+    self.assertEqual( points, { self.start : 6, self.start + 300 : 0 } )
+
+    # Cumulative and averaged types
+    res = self.manager.getPlotData( self.start, self.start + 300, FakeActivity( 'ab/sum.rrd', 'acum', 60 ), 200 )
+    self.assertEqual( [ res[ 'Value' ][0][ self.start + i * 60 ] for i in range( 5 ) ], [ 1, 3, 3, 3, 6 ] )
+    res = self.manager.getPlotData( self.start, self.start + 600, FakeActivity( 'ab/sum.rrd', 'mean', 60 ), 2 )
+    self.assertEqual( res[ 'Value' ][0][ self.start ], 1.2 )
+
+  def test_ringOverwrite( self ):
+    self.manager.create( 'mean', 'ab/mean.rrd', 60 )
+    oneYear = 31536000
+    self.manager.update( 'mean', 'ab/mean.rrd', 60, [ ( self.start, 1 ) ] )
+    self.manager.update( 'mean', 'ab/mean.rrd', 60, [ ( self.start + oneYear, 7 ) ] )
+    # The old bucket shares the slot with the new one, it is not there any more
+    res = self.manager.getPlotData( self.start, self.start + 60, FakeActivity( 'ab/mean.rrd', 'mean', 60 ), 200 )
+    self.assertEqual( res[ 'Value' ][0], { self.start : 0 } )
+    res = self.manager.getPlotData( self.start + oneYear, self.start + oneYear + 60,
+                                    FakeActivity( 'ab/mean.rrd', 'mean', 60 ), 200 )
+    self.assertEqual( res[ 'Value' ][0], { self.start + oneYear : 7 } )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( TimeSeriesManager_TestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
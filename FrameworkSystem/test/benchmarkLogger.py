@@ -0,0 +1,62 @@
+# $HeadURL$
+__RCSID__ = "$Id$"
+"""  Measures the per call overhead of the logger for suppressed and emitted
+     messages. Emitted messages are written by the file backend to a temporary
+     file, so the figures do not include the terminal.
+
+     Usage: python benchmarkLogger.py [ iterations ]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from DIRAC.FrameworkSystem.private.logging.Logger import Logger
+from DIRAC.FrameworkSystem.Client.Logger import LazyText
+from DIRAC.FrameworkSystem.private.logging.backends.FileBackend import FileBackend
+
+def timeCalls( method, iterations, *args ):
+  start = time.time()
+  for _i in xrange( iterations ):
+    method( *args )
+  return ( time.time() - start ) / iterations
+
+def main( iterations ):
+  logFile = tempfile.mktemp( suffix = '.log' )
+
+  logger = Logger()
+  logger.registerBackends( [] )
+  logger._backendsDict[ 'file' ] = FileBackend( { 'FileName' : logFile,
+                                                  'showHeaders' : True,
+                                                  'showThreads' : False,
+                                                  'Color' : False } )
+  subLogger = logger.getSubLogger( 'Benchmark' )
+  bigDict = dict( [ ( str( i ), range( 10 ) ) for i in range( 50 ) ] )
+
+  results = []
+  logger.setLevel( 'NOTICE' )
+  results.append( ( 'suppressed verbose', timeCalls( logger.verbose, iterations, 'Some message', 'var' ) ) )
+  results.append( ( 'suppressed verbose (sublogger)', timeCalls( subLogger.verbose, iterations, 'Some message', 'var' ) ) )
+  results.append( ( 'suppressed verbose, eager %',
+                    timeCalls( lambda: subLogger.verbose( 'Dict %s' % bigDict ), iterations ) ) )
+  results.append( ( 'suppressed verbose, LazyText',
+                    timeCalls( lambda: subLogger.verbose( LazyText( 'Dict %s', bigDict ) ), iterations ) ) )
+
+  logger.setLevel( 'VERBOSE' )
+  results.append( ( 'emitted verbose', timeCalls( logger.verbose, iterations, 'Some message', 'var' ) ) )
+  results.append( ( 'emitted verbose (sublogger)', timeCalls( subLogger.verbose, iterations, 'Some message', 'var' ) ) )
+  start = time.time()
+  logger.flushAllMessages( 0 )
+  results.append( ( 'final flush (per message)', ( time.time() - start ) / ( 2 * iterations ) ) )
+
+  for name, seconds in results:
+    print "%-35s %8.3f us/call" % ( name, seconds * 1000000 )
+
+  if os.path.exists( logFile ):
+    os.unlink( logFile )
+
+if __name__ == "__main__":
+  iterations = 100000
+  if len( sys.argv ) > 1:
+    iterations = int( sys.argv[1] )
+  main( iterations )
@@ -29,6 +29,7 @@ import re, os, types, urllib
 from DIRAC                                                    import S_OK, S_ERROR, gLogger
 from DIRAC.Core.Workflow.Parameter                            import Parameter
 from DIRAC.Core.Workflow.Workflow                             import Workflow
+from DIRAC.Core.Workflow.WorkflowTemplate                     import WorkflowTemplate
 from DIRAC.Core.Base.API                                      import API
 from DIRAC.Core.Utilities.ClassAd.ClassAdLight                import ClassAd
 from DIRAC.ConfigurationSystem.Client.Config                  import gConfig
@@ -91,7 +92,14 @@ class Job( API ):
     ##Add member to handle Parametric jobs
     self.parametric = {}
     self.script = script
-    if not script:
+    if isinstance( script, WorkflowTemplate ):
+      # Parametric jobs get their workflow from a template prepared once
+      self.script = None
+      self.workflow = script.getWorkflow()
+    elif isinstance( script, Workflow ):
+      self.script = None
+      self.workflow = script
+    elif not script:
       self.workflow = Workflow()
       self.__setJobDefaults()
     else:
@@ -7,6 +7,7 @@
 
 import datetime
 import Queue
+import threading
 
 from DIRAC                                                      import S_OK
 from DIRAC.Core.Base.AgentModule                                import AgentModule
@@ -14,6 +15,7 @@ from DIRAC.Core.Utilities.ThreadPool                            import ThreadPoo
 
 from DIRAC.ResourceStatusSystem.Client.ResourceStatusClient     import ResourceStatusClient
 from DIRAC.ResourceStatusSystem.Client.ResourceManagementClient import ResourceManagementClient
+from DIRAC.ResourceStatusSystem.Command.CommandResultCache      import CommandResultCache
 from DIRAC.ResourceStatusSystem.PolicySystem.PEP                import PEP
 from DIRAC.WorkloadManagementSystem.DB.PilotAgentsDB            import PilotAgentsDB
 
@@ -44,6 +46,10 @@ class ElementInspectorAgent( AgentModule ):
                      }
   # queue size limit to stop feeding
   __limitQueueFeeder = 15
+  # Max number of policies evaluated concurrently per element
+  __maxPolicyThreads = 4
+  # Whether commands supporting it read the cache for all elements at once
+  __prefetchCommands = True
   
   def __init__( self, *args, **kwargs ):
     ''' c'tor
@@ -57,11 +63,18 @@ class ElementInspectorAgent( AgentModule ):
     self.elementType        = self.__elementType
     self.checkingFreqs      = self.__checkingFreqs
     self.limitQueueFeeder   = self.__limitQueueFeeder
+    self.maxPolicyThreads   = self.__maxPolicyThreads
+    self.prefetchCommands   = self.__prefetchCommands
     
     self.elementsToBeChecked = None
     self.threadPool          = None
     self.rsClient            = None
     self.clients             = {}
+    self.commandResults      = None
+    
+    # Per policy number of evaluations and seconds spent, reset every cycle
+    self.policyStats         = {}
+    self.policyStatsLock     = threading.Lock()
 
   def initialize( self ):
     ''' Standard initialize.
@@ -72,6 +85,8 @@ class ElementInspectorAgent( AgentModule ):
     self.elementType        = self.am_getOption( 'elementType',        self.elementType )
     self.checkingFreqs      = self.am_getOption( 'checkingFreqs',      self.checkingFreqs )
     self.limitQueueFeeder   = self.am_getOption( 'limitQueueFeeder',   self.limitQueueFeeder )      
+    self.maxPolicyThreads   = self.am_getOption( 'maxPolicyThreads',   self.maxPolicyThreads )
+    self.prefetchCommands   = self.am_getOption( 'prefetchCommands',   self.prefetchCommands )
     
     self.elementsToBeChecked = Queue.Queue()
     self.threadPool          = ThreadPool( self.maxNumberOfThreads,
@@ -83,10 +98,17 @@ class ElementInspectorAgent( AgentModule ):
     self.clients[ 'ResourceManagementClient' ] = ResourceManagementClient()
     self.clients[ 'PilotsDB' ]                 = PilotAgentsDB() 
 
+    # Command results shared by all the threads, reset on every cycle
+    self.commandResults = CommandResultCache( prefetch = self.prefetchCommands )
+
     return S_OK()
   
   def execute( self ):
     
+    # Report what happened since the previous cycle, and start a new one with
+    # fresh command results
+    self.__logCycleStats()
+    
     # If there are elements in the queue to be processed, we wait ( we know how
     # many elements in total we can have, so if there are more than 15% of them
     # on the queue, we do not add anything ), but the threads are running and
@@ -192,7 +214,8 @@ class ElementInspectorAgent( AgentModule ):
     
     self.log.info( '%s UP' % tHeader )
     
-    pep = PEP( clients = self.clients )
+    pep = PEP( clients = self.clients, commandResults = self.commandResults,
+               maxPolicyThreads = self.maxPolicyThreads )
     
     while True:
     
@@ -214,6 +237,8 @@ class ElementInspectorAgent( AgentModule ):
       
       resEnforce = resEnforce[ 'Value' ]  
       
+      self.__addPolicyTimes( element[ 'name' ], resEnforce[ 'policyTimes' ] )
+      
       oldStatus  = resEnforce[ 'decissionParams' ][ 'status' ]
       statusType = resEnforce[ 'decissionParams' ][ 'statusType' ]
       newStatus  = resEnforce[ 'policyCombinedResult' ][ 'Status' ]
@@ -233,5 +258,45 @@ class ElementInspectorAgent( AgentModule ):
 
     return S_OK()
 
+  def __addPolicyTimes( self, elementName, policyTimes ):
+    '''
+      Accumulates the time spent by each policy on the cycle stats.
+    '''
+    
+    for policyName, policyTime in policyTimes.items():
+      self.log.verbose( '%s: policy %s took %.3f s' % ( elementName, policyName, policyTime ) )
+    
+    self.policyStatsLock.acquire()
+    try:
+      for policyName, policyTime in policyTimes.items():
+        stats = self.policyStats.setdefault( policyName, [ 0, 0. ] )
+        stats[ 0 ] += 1
+        stats[ 1 ] += policyTime
+    finally:
+      self.policyStatsLock.release()
+      
+  def __logCycleStats( self ):
+    '''
+      Logs the policies timing and the command results cache counters of the
+      previous cycle, and resets them.
+    '''
+    
+    self.policyStatsLock.acquire()
+    try:
+      policyStats      = self.policyStats
+      self.policyStats = {}
+    finally:
+      self.policyStatsLock.release()
+    
+    for policyName in sorted( policyStats ):
+      evaluations, totalTime = policyStats[ policyName ]
+      self.log.info( 'Policy %s: %d evaluations, %.3f s total, %.3f s average' % ( policyName,
+                                                                                   evaluations,
+                                                                                   totalTime,
+                                                                                   totalTime / evaluations ) )
+    
+    commandStats = self.commandResults.reset()[ 'Value' ]
+    self.log.info( 'Command results: %(hits)d hits, %(misses)d misses, %(prefetched)d prefetched' % commandStats )
+
 ################################################################################
 #EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF
@@ -40,6 +40,13 @@ class Command( object ):
     ''' To be extended by real commands
     '''
     return S_OK( self.metrics )   
+
+  def doPrefetch( self ):
+    ''' To be extended by real commands able to read the cache for all elements
+    in one go. Must return S_OK( { elementName : doCache value, ... } ), or 
+    S_OK( None ) if not supported.
+    '''
+    return S_OK( None )
       
   def doCommand( self ):
     ''' To be extended by real commands
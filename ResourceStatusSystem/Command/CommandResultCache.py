@@ -0,0 +1,222 @@
+# $HeadURL:  $
+''' CommandResultCache
+
+  Module with the memo used to share command results between policies. Several
+  policies use the same command with the same arguments ( e.g. all the Job
+  policies use JobCommand on a given site ), so for every element checked the
+  command would be executed once per policy and statusType. The memo keeps the
+  results for the duration of an agent cycle, and is reset afterwards.
+
+  Commands can also implement a bulk `doPrefetch` method, which retrieves from
+  the cache tables the results for all elements in one query. If so, the first
+  element asking for such command triggers the prefetch, and the rest of the
+  elements are served from memory.
+
+'''
+
+import copy
+import threading
+
+from DIRAC import gLogger, S_OK, S_ERROR
+
+__RCSID__ = '$Id:  $'
+
+class CommandResultCache( object ):
+  '''
+  Thread safe memo of command results, keyed by ( commandTuple, args ). If two
+  threads ask for the same key at the same time, only one executes the command
+  and the other one waits for its result.
+  '''
+
+  # Decision parameters describing the state of the element rather than the
+  # element itself. They are not used by the commands, so they are not part of
+  # the key: this way all statusTypes of an element share the command results.
+  __ignoredArgs = ( 'status', 'statusType', 'reason', 'tokenOwner', 'active',
+                    'lastCheckTime', 'dateEffective' )
+
+  def __init__( self, prefetch = True ):
+    '''
+    Constructor
+
+    :Parameters:
+      **prefetch** - `bool`
+        if True, commands implementing doPrefetch are asked for all the elements
+        in one go.
+    '''
+
+    self.log      = gLogger.getSubLogger( self.__class__.__name__ )
+    self.prefetch = prefetch
+
+    self.__lock    = threading.Lock()
+    self.__results = {}
+    self.__running = {}
+    self.__stats   = { 'hits' : 0, 'misses' : 0, 'prefetched' : 0 }
+
+  def reset( self ):
+    '''
+    Drops all results, to be called at the beginning of every cycle. Commands
+    being executed at the moment keep their waiters, and their results will be
+    the first ones of the new cycle.
+
+    :return: S_OK( stats of the previous cycle )
+    '''
+
+    self.__lock.acquire()
+    try:
+      stats = self.__stats
+      self.__results = {}
+      self.__stats   = { 'hits' : 0, 'misses' : 0, 'prefetched' : 0 }
+    finally:
+      self.__lock.release()
+
+    return S_OK( stats )
+
+  def getStats( self ):
+    '''
+    Returns the hits / misses / prefetched counters of the current cycle.
+
+    :return: dict
+    '''
+
+    self.__lock.acquire()
+    try:
+      return dict( self.__stats )
+    finally:
+      self.__lock.release()
+
+  def getKey( self, commandTuple, args, ignoredArgs = () ):
+    '''
+    Computes a hashable key for a command and its arguments. Argument values may
+    be unhashable ( lists, dicts ), so we use their representation.
+
+    :Parameters:
+      **commandTuple** - `tuple`
+        ( commandModule, commandClass )
+      **args** - `dict`
+        arguments of the command object
+      **ignoredArgs** - `tuple`
+        extra arguments to leave out of the key
+
+    :return: tuple
+    '''
+
+    ignored = self.__ignoredArgs + tuple( ignoredArgs )
+    argsKey = [ ( argName, repr( argValue ) ) for argName, argValue in args.iteritems()
+                if not argName in ignored ]
+    argsKey.sort()
+
+    return ( tuple( commandTuple ), tuple( argsKey ) )
+
+  def doCommand( self, commandTuple, commandObject ):
+    '''
+    Returns the result of commandObject.doCommand(), either from the prefetched
+    results, from a previous execution with the same key, or executing it.
+
+    :Parameters:
+      **commandTuple** - `tuple`
+        ( commandModule, commandClass ) used to load commandObject
+      **commandObject** - `Command`
+        command to be executed if needed
+
+    :return: S_OK() || S_ERROR()
+    '''
+
+    if self.prefetch:
+      result = self.__getPrefetched( commandTuple, commandObject )
+      if result is not None:
+        return result
+
+    key = self.getKey( commandTuple, commandObject.args )
+    return self.__singleFlight( key, commandObject.doCommand )
+
+  #.............................................................................
+  # Private methods
+
+  def __getPrefetched( self, commandTuple, commandObject ):
+    '''
+    Looks for the element on the result of the bulk prefetch of the command. The
+    prefetch returns what doCache would, so it can be used if it is not empty or
+    if the command only reads from the cache. Otherwise, returns None.
+    '''
+
+    # Commands not supporting it return S_OK( None ), we only ask once per cycle
+    familyKey = ( 'prefetch', self.getKey( commandTuple, commandObject.args, ( 'name', ) ) )
+    family    = self.__singleFlight( familyKey, commandObject.doPrefetch, count = False )
+    if not family[ 'OK' ] or not family[ 'Value' ]:
+      return None
+
+    elementName = commandObject.args.get( 'name' )
+    if not elementName in family[ 'Value' ]:
+      return None
+
+    result = family[ 'Value' ][ elementName ]
+    if not result and not commandObject.args.get( 'onlyCache' ):
+      return None
+
+    self.__lock.acquire()
+    try:
+      self.__stats[ 'prefetched' ] += 1
+    finally:
+      self.__lock.release()
+
+    return S_OK( copy.deepcopy( result ) )
+
+  def __singleFlight( self, key, func, count = True ):
+    '''
+    Executes func only once per key, threads asking for a key being computed
+    wait for the result. Results are deep copied, so policies cannot modify
+    each other inputs.
+    '''
+
+    self.__lock.acquire()
+    try:
+      if key in self.__results:
+        if count:
+          self.__stats[ 'hits' ] += 1
+        return copy.deepcopy( self.__results[ key ] )
+
+      event = self.__running.get( key )
+      owner = event is None
+      if owner:
+        event = threading.Event()
+        self.__running[ key ] = event
+        if count:
+          self.__stats[ 'misses' ] += 1
+    finally:
+      self.__lock.release()
+
+    if not owner:
+      event.wait()
+      self.__lock.acquire()
+      try:
+        if key in self.__results:
+          if count:
+            self.__stats[ 'hits' ] += 1
+          return copy.deepcopy( self.__results[ key ] )
+      finally:
+        self.__lock.release()
+      # Should not happen, but just in case, we do it ourselves
+      return func()
+
+    result = None
+    try:
+      try:
+        result = func()
+      except Exception, e:
+        self.log.exception( 'Exception running command' )
+        result = S_ERROR( 'Exception running command: %s' % e )
+    finally:
+      self.__lock.acquire()
+      try:
+        if result is not None and self.__running.get( key ) is event:
+          self.__results[ key ] = copy.deepcopy( result )
+        if self.__running.get( key ) is event:
+          del self.__running[ key ]
+      finally:
+        self.__lock.release()
+      event.set()
+
+    return result
+
+################################################################################
+#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF
@@ -150,6 +150,24 @@ class JobCommand( Command ):
       result = S_OK( [ dict( zip( result[ 'Columns' ], res ) ) for res in result[ 'Value' ] ] )
       
     return result
+
+
+  def doPrefetch( self ):
+    '''
+    Method that reads the whole cache table in one query, and returns the rows
+    grouped by site, as doCache would return them for each site.
+    '''
+    
+    result = self.rmClient.selectJobCache()
+    if not result[ 'OK' ]:
+      return result
+    
+    siteResults = {}
+    for res in result[ 'Value' ]:
+      jobDict = dict( zip( result[ 'Columns' ], res ) )
+      siteResults.setdefault( jobDict[ 'Site' ], [] ).append( jobDict )
+    
+    return S_OK( siteResults )
          
              
   def doMaster( self ):
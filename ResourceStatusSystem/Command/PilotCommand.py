@@ -170,6 +170,32 @@ class PilotCommand( Command ):
       
     return result    
 
+  def doPrefetch( self ):
+    """ doPrefetch reads the database for all the CEs in one query. Returns the
+    records grouped by CE, as doCache would return them for each CE.
+    
+    :return: S_OK( dict( list( dict ) ) ) / S_ERROR
+    """
+    
+    if not 'timespan' in self.args:
+      return S_ERROR( '"timespan" not found in self.args' )
+    timespan = self.args[ 'timespan' ]
+    
+    # Make sure the records we obtain are NOT out of date
+    lastValidRecord = datetime.utcnow() - timedelta( seconds = timespan )
+    
+    result = self.rmClient.selectPilotCache( timespan = timespan,
+                                             meta = { 'older' : ( 'LastCheckTime', lastValidRecord ) } )
+    if not result[ 'OK' ]:
+      return result
+    
+    ceResults = {}
+    for res in result[ 'Value' ]:
+      pilotDict = dict( zip( result[ 'Columns' ], res ) )
+      ceResults.setdefault( pilotDict[ 'CE' ], [] ).append( pilotDict )
+    
+    return S_OK( ceResults )
+
   def doMaster( self ):
     """ Master method, asks for all information in the database for the given 
     timespan ( see _prepareCommand ).
@@ -0,0 +1,135 @@
+# $HeadURL:  $
+''' Test_RSS_Command_CommandResultCache
+
+'''
+
+import mock
+import unittest
+
+import DIRAC.ResourceStatusSystem.Command.CommandResultCache as moduleTested 
+
+__RCSID__ = '$Id:  $'
+
+################################################################################
+
+class CommandResultCache_TestCase( unittest.TestCase ):
+  
+  def setUp( self ):
+    '''
+    Setup
+    '''
+    
+    self.commandTuple = ( 'JobCommand', 'JobCommand' )
+    
+    # Command object, its prefetch is not supported by default
+    mock_command = mock.Mock()
+    mock_command.args = { 'name' : 'Site1', 'timespan' : 1800, 'onlyCache' : True,
+                          'statusType' : 'all', 'status' : 'Active' }
+    mock_command.doCommand.return_value  = { 'OK' : True, 'Value' : [ { 'Done' : 1 } ] }
+    mock_command.doPrefetch.return_value = { 'OK' : True, 'Value' : None }
+    self.mock_command = mock_command
+    
+    self.moduleTested = moduleTested
+    self.testClass    = self.moduleTested.CommandResultCache
+    
+  def tearDown( self ):
+    '''
+    TearDown
+    '''
+    del self.testClass
+    del self.moduleTested
+    del self.mock_command
+      
+################################################################################
+# Tests
+
+class CommandResultCache_Success( CommandResultCache_TestCase ):
+  
+  def test_getKey( self ):
+    ''' tests that element state parameters are not part of the key
+    '''
+    
+    cache = self.testClass()
+    
+    key1 = cache.getKey( self.commandTuple, { 'name' : 'Site1', 'statusType' : 'A', 'hours' : [ 1 ] } )
+    key2 = cache.getKey( self.commandTuple, { 'name' : 'Site1', 'statusType' : 'B', 'hours' : [ 1 ] } )
+    key3 = cache.getKey( self.commandTuple, { 'name' : 'Site2', 'statusType' : 'A', 'hours' : [ 1 ] } )
+    self.assertEqual( key1, key2 )
+    self.assertNotEqual( key1, key3 )
+    
+  def test_doCommand( self ):
+    ''' tests that the command is executed once per key
+    '''
+    
+    cache = self.testClass()
+    
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( True, res[ 'OK' ] )
+    self.assertEqual( [ { 'Done' : 1 } ], res[ 'Value' ] )
+    
+    # Policies can modify their input, it is not shared 
+    res[ 'Value' ].append( 'Rubbish' )
+    
+    self.mock_command.args[ 'statusType' ] = 'other'
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( [ { 'Done' : 1 } ], res[ 'Value' ] )
+    
+    self.assertEqual( 1, self.mock_command.doCommand.call_count )
+    self.assertEqual( { 'hits' : 1, 'misses' : 1, 'prefetched' : 0 }, cache.getStats() )
+    
+    stats = cache.reset()
+    self.assertEqual( 1, stats[ 'Value' ][ 'hits' ] )
+    
+    cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( 2, self.mock_command.doCommand.call_count )
+    
+  def test_doCommandError( self ):
+    ''' tests that exceptions on the command are returned as errors
+    '''
+    
+    self.mock_command.doCommand.side_effect = Exception( 'Boom' )
+    
+    cache = self.testClass()
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( False, res[ 'OK' ] )
+    
+  def test_prefetch( self ):
+    ''' tests the prefetch of the results for all elements
+    '''
+    
+    self.mock_command.doPrefetch.return_value = { 'OK' : True, 
+                                                  'Value' : { 'Site1' : [ { 'Done' : 2 } ],
+                                                              'Site2' : [] } }
+    
+    cache = self.testClass()
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( [ { 'Done' : 2 } ], res[ 'Value' ] )
+    
+    self.mock_command.args[ 'name' ] = 'Site2'
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( [], res[ 'Value' ] )
+    
+    # Not in the prefetched results, the command is executed
+    self.mock_command.args[ 'name' ] = 'Site3'
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( [ { 'Done' : 1 } ], res[ 'Value' ] )
+    
+    self.assertEqual( 1, self.mock_command.doPrefetch.call_count )
+    self.assertEqual( 1, self.mock_command.doCommand.call_count )
+    
+    # Without onlyCache, empty results are not good enough
+    self.mock_command.args[ 'name' ]      = 'Site2'
+    self.mock_command.args[ 'onlyCache' ] = False
+    res = cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( [ { 'Done' : 1 } ], res[ 'Value' ] )
+
+  def test_noPrefetch( self ):
+    ''' tests that prefetch can be disabled
+    '''
+    
+    cache = self.testClass( prefetch = False )
+    cache.doCommand( self.commandTuple, self.mock_command )
+    self.assertEqual( 0, self.mock_command.doPrefetch.call_count )
+      
+################################################################################
+#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF
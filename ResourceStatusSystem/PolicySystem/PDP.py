@@ -8,6 +8,9 @@
 
 """
 
+import threading
+import time
+
 from DIRAC                                                import gLogger, S_OK, S_ERROR 
 from DIRAC.ResourceStatusSystem.PolicySystem.PolicyCaller import PolicyCaller
 from DIRAC.ResourceStatusSystem.PolicySystem.StateMachine import RSSMachine
@@ -20,18 +23,24 @@ class PDP:
   """ PDP ( Policy Decision Point )
   """
 
-  def __init__( self, clients = None ):
+  def __init__( self, clients = None, commandResults = None, maxThreads = 1 ):
     """ Constructor. 
     
     examples:
       >>> pdp  = PDP( None )
       >>> pdp1 = PDP( {} )
       >>> pdp2 = PDP( { 'Client1' : Client1Object } )
+      >>> pdp3 = PDP( { 'Client1' : Client1Object }, CommandResultCache(), 4 )
       
     :Parameters:
       **clients** - [ None, `dict` ]
         dictionary with Clients to be used in the Commands. If None, the Commands
         will create their own clients.
+      **commandResults** - [ None, `CommandResultCache` ]
+        memo shared by the policies to avoid running the same command several 
+        times. If None, every policy runs its own command.
+      **maxThreads** - `int`
+        maximum number of policies evaluated concurrently for an element.  
          
     """
 
@@ -40,7 +49,11 @@ class PDP:
 
     # Helpers to discover policies and RSS metadata in CS
     self.iGetter         = InfoGetter()    
-    self.pCaller         = PolicyCaller( clients )
+    self.pCaller         = PolicyCaller( clients, commandResults )
+    
+    self.maxThreads      = max( 1, maxThreads )
+    # Seconds spent by each policy on the last takeDecision
+    self.policyTimes     = {}
   
     # RSS State Machine, used to calculate most penalizing state while merging them
     self.rssMachine      = RSSMachine( 'Unknown' )
@@ -123,7 +136,8 @@ class PDP:
     
     :return: S_OK( { 'singlePolicyResults'  : `list`, 
                      'policyCombinedResult' : `dict`, 
-                     'decissionParams'      : `dict` } ) / S_ERROR
+                     'decissionParams'      : `dict`,
+                     'policyTimes'          : `dict` } ) / S_ERROR
         
     """
     
@@ -163,7 +177,8 @@ class PDP:
                 { 
                  'singlePolicyResults'  : singlePolicyResults,
                  'policyCombinedResult' : policyCombinedResults,
-                 'decissionParams'      : self.decisionParams 
+                 'decissionParams'      : self.decisionParams,
+                 'policyTimes'          : self.policyTimes 
                  }
                 )
 
@@ -199,12 +214,12 @@ class PDP:
     # that RSS does not understand.
     validStatus = self.rssMachine.getStates()
     
-    for policyDict in policies:
+    # Load and evaluate policies described in <policies> for element described
+    # in <self.decisionParams>. Results keep the order of <policies>.
+    invocationResults = self._invokePolicies( policies )
+    
+    for policyInvocationResult in invocationResults:
       
-      # Load and evaluate policy described in <policyDict> for element described
-      # in <self.decisionParams> 
-      policyInvocationResult = self.pCaller.policyInvocation( self.decisionParams,
-                                                              policyDict ) 
       if not policyInvocationResult[ 'OK' ]:
         # We should never enter this line ! Just in case there are policies
         # missconfigured !
@@ -233,6 +248,62 @@ class PDP:
       policyInvocationResults.append( policyInvocationResult )
       
     return S_OK( policyInvocationResults )   
+
+
+  def _invokePolicies( self, policies ):
+    """ Invokes the policies using up to <self.maxThreads> threads. Policies are
+    independent from each other, the only shared bits are the command results, 
+    which are protected by the CommandResultCache. The time spent on each policy
+    is stored in <self.policyTimes>.
+    
+    :Parameters:
+      **policies** - `list( dict )`
+        list of dictionaries containing the policies selected to be run.
+    
+    :return: `list` with the S_OK / S_ERROR of each policy, same order as policies
+    
+    """
+    
+    self.policyTimes = {}
+    
+    results   = [ None ] * len( policies )
+    indexes   = range( len( policies ) )
+    indexLock = threading.Lock()
+    
+    def invoke( index ):
+      policyDict = policies[ index ]
+      startTime  = time.time()
+      try:
+        result = self.pCaller.policyInvocation( self.decisionParams, policyDict )
+      except Exception, e:
+        gLogger.exception( 'Exception evaluating policy %s' % policyDict.get( 'name' ) )
+        result = S_ERROR( 'Exception evaluating policy: %s' % e )
+      results[ index ] = result
+      self.policyTimes[ policyDict.get( 'name' ) ] = time.time() - startTime
+    
+    def worker():
+      while True:
+        indexLock.acquire()
+        try:
+          if not indexes:
+            return
+          index = indexes.pop( 0 )
+        finally:
+          indexLock.release()
+        invoke( index )
+    
+    threadsToStart = min( self.maxThreads, len( policies ) )
+    if threadsToStart <= 1:
+      worker()
+      return results
+    
+    threads = [ threading.Thread( target = worker ) for _x in xrange( threadsToStart ) ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    
+    return results
     
 
   def _combineSinglePolicyResults( self, singlePolicyRes ):
@@ -24,19 +24,24 @@ class PEP:
   """ PEP ( Policy Enforcement Point )
   """
 
-  def __init__( self, clients = None ):
+  def __init__( self, clients = None, commandResults = None, maxPolicyThreads = 1 ):
     """ Constructor
     
     examples:
       >>> pep = PEP()
       >>> pep1 = PEP( { 'ResourceStatusClient' : ResourceStatusClient() } )
       >>> pep2 = PEP( { 'ResourceStatusClient' : ResourceStatusClient(), 'ClientY' : None } )
+      >>> pep3 = PEP( clients, CommandResultCache(), 4 )
     
     :Parameters:
       **clients** - [ None, `dict` ]
         dictionary with clients to be used in the commands issued by the policies.
         If not defined, the commands will import them. It is a measure to avoid
         opening the same connection every time a policy is evaluated.
+      **commandResults** - [ None, `CommandResultCache` ]
+        memo of command results, shared by all policies ( and all PEPs using it ).
+      **maxPolicyThreads** - `int`
+        maximum number of policies evaluated concurrently by the PDP.
         
     """
    
@@ -55,7 +60,7 @@ class PEP:
 
     self.clients = clients
     # Pass to the PDP the clients that are going to be used on the Commands
-    self.pdp     = PDP( clients )   
+    self.pdp     = PDP( clients, commandResults, maxPolicyThreads )   
 
 
   def enforce( self, decisionParams ):
@@ -17,9 +17,13 @@ class PolicyCaller:
     PolicyCaller loads policies, sets commands and runs them.
   '''
   
-  def __init__( self, clients = None ):
+  def __init__( self, clients = None, commandResults = None ):
     '''
       Constructor
+      
+      If commandResults ( CommandResultCache ) is given, the results of the
+      commands are shared between all policies using the same command with the
+      same arguments.
     '''
 
     self.cCaller = CommandCaller  
@@ -28,6 +32,8 @@ class PolicyCaller:
     if clients is not None: 
       self.clients = clients       
 
+    self.commandResults = commandResults
+
   def policyInvocation( self, decissionParams, policyDict ):  
     '''
     Invokes a policy:
@@ -72,6 +78,9 @@ class PolicyCaller:
       return command
     command = command[ 'Value' ]
     
+    if command is not None and self.commandResults is not None:
+      command = _MemoizedCommand( pCommand, command, self.commandResults )
+    
     evaluationResult = self.policyEvaluation( policy, command )
     
     if evaluationResult[ 'OK' ]:
@@ -91,5 +100,25 @@ class PolicyCaller:
     
     return evaluationResult    
 
+#...............................................................................
+
+class _MemoizedCommand( object ):
+  '''
+    Wraps a command object, so that the policy gets its result from the
+    CommandResultCache instead of executing it.
+  '''
+  
+  def __init__( self, commandTuple, command, commandResults ):
+    
+    self.commandTuple   = commandTuple
+    self.command        = command
+    self.commandResults = commandResults
+    
+  def __getattr__( self, name ):
+    return getattr( self.command, name )
+  
+  def doCommand( self ):
+    return self.commandResults.doCommand( self.commandTuple, self.command )
+
 ################################################################################
 #EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF
\ No newline at end of file
@@ -6,11 +6,15 @@ This cache features a lazy update method. It will only be updated if it is
 empty and there is a new query. If not, it will remain in its previous state.
 However, Cache class internal cache: DictCache sets a validity to its entries.
 After that, the cache is empty.
+
+RSSCache keeps its entries in a StatusSnapshot instead, an immutable object
+indexed by element and by statusType that is swapped on every refresh. Reading
+a valid snapshot does not require any lock.
         
 """
 
-import itertools
 import random
+import time
 
 from DIRAC                                                 import gLogger, S_OK, S_ERROR 
 from DIRAC.Core.Utilities.DictCache                        import DictCache
@@ -162,6 +166,88 @@ class Cache( object ):
 
 #...............................................................................
 
+class StatusSnapshot( object ):
+  """
+  Immutable picture of the RSSCache contents at a given refresh. It is built
+  once per refresh and never modified afterwards, so that readers can use it
+  without holding any lock. RSSCache swaps the whole object when it refreshes.
+  
+  It keeps two indexes over the same data:
+    * byElement    : { elementName : { statusType : status, ... }, ... }
+    * byStatusType : { statusType : { elementName : status, ... }, ... }
+  
+  The version number increases with every refresh, which allows clients to
+  skip recomputing anything they derived from a previous snapshot.
+  """
+  
+  __slots__ = ( 'version', 'expirationTime', 'byElement', 'byStatusType' )
+  
+  def __init__( self, version, lifeTime, cacheDict ):
+    """
+    Constructor
+    
+    :Parameters:
+      **version** - `int`
+        version number of the snapshot
+      **lifeTime** - `int`
+        lifetime of the snapshot ( seconds ! )
+      **cacheDict** - `dict`
+        dictionary of the form { ( elementName, statusType ) : status, ... }
+    """
+    
+    byElement    = {}
+    byStatusType = {}
+    
+    for ( elementName, statusType ), status in cacheDict.iteritems():
+      byElement.setdefault( elementName, {} )[ statusType ] = status
+      byStatusType.setdefault( statusType, {} )[ elementName ] = status
+    
+    self.version        = version
+    self.expirationTime = time.time() + lifeTime
+    self.byElement      = byElement
+    self.byStatusType   = byStatusType
+    
+  def isValid( self, validSeconds = 0 ):
+    """
+    Returns True if the snapshot will still be valid in <validSeconds>.
+    
+    :Parameters:
+      **validSeconds** - `int`
+        seconds the snapshot has to be valid for
+    
+    :return: bool
+    """
+    
+    return self.expirationTime > time.time() + validSeconds
+  
+  def getStatus( self, elementName, statusType ):
+    """
+    Returns the status of ( elementName, statusType ) or None if not present.
+    
+    :Parameters:
+      **elementName** - `string`
+        name of the element
+      **statusType** - `string`
+        name of the statusType
+    
+    :return: `string` | None
+    """
+    
+    return self.byElement.get( elementName, {} ).get( statusType )
+  
+  def keys( self ):
+    """
+    Returns the cache keys held in the snapshot.
+    
+    :return: list of tuples ( elementName, statusType )
+    """
+    
+    return [ ( elementName, statusType ) 
+             for elementName, statusDict in self.byElement.iteritems() 
+               for statusType in statusDict ]
+
+#...............................................................................
+
 class RSSCache( Cache ):
   """
   The RSSCache is an extension of Cache in which the cache keys are pairs of the
@@ -170,8 +256,12 @@ class RSSCache( Cache ):
   When instantiating one object of RSSCache, we need to specify the RSS elementType
   it applies, e.g. : StorageElement, ComputingElement, Queue, ...
   
-  It provides a unique public method `match` which is thread safe. All other 
-  methods are not !!
+  The contents are kept in a StatusSnapshot, replaced atomically on every refresh.
+  Lookups on a valid snapshot are plain dictionary reads and do not take the
+  lock, which is only acquired to refresh an expired snapshot.
+  
+  It provides a public method `match` which is thread safe. All other methods
+  are not, unless stated otherwise !!
   """
   
   def __init__( self, elementType, lifeTime, updateFunc ):
@@ -194,16 +284,61 @@ class RSSCache( Cache ):
     
     super( RSSCache, self ).__init__( lifeTime, updateFunc )
     
+    # Same bias and validity as the Cache base class
+    self.__lifeTime     = lifeTime * ( 1 + 0.2 * random.random() )
+    self.__updateFunc   = updateFunc
+    self.__validSeconds = 30
+    
+    # Empty and expired, the first match will trigger a refresh
+    self.__snapshot     = StatusSnapshot( 0, -1, {} )
+    
     self.allStatusTypes = RssConfiguration().getConfigStatusType( elementType = elementType )
   
+  #.............................................................................
+  # snapshot getters, thread safe
+  
+  @property
+  def version( self ):
+    """
+    Version of the current snapshot. It changes every time the cache is refreshed.
+    """
+    
+    return self.__snapshot.version
+  
+  def getSnapshot( self ):
+    """
+    Returns a valid StatusSnapshot, refreshing the cache if needed. The returned
+    object is never modified, it can be kept and compared by version.
+    
+    :return: S_OK( StatusSnapshot ) || S_ERROR()
+    """
+    
+    snapshot = self.__snapshot
+    if snapshot.isValid( self.__validSeconds ):
+      return S_OK( snapshot )
+    
+    self.acquireLock()
+    try:
+      # Somebody else may have refreshed it while we were waiting for the lock
+      snapshot = self.__snapshot
+      if snapshot.isValid( self.__validSeconds ):
+        return S_OK( snapshot )
+      
+      refresh = self.refreshCache()
+      if not refresh[ 'OK' ]:
+        return refresh
+      return S_OK( self.__snapshot )
+    finally:
+      # Release lock, no matter what !
+      self.releaseLock()
+  
   def match( self, elementNames, statusTypes ):  
     """
     In first instance, if the cache is invalid, it will request a new one from
     the server.
-    It make the Cartesian product of elementNames x statusTypes to generate a key
-    set that will be compared against the cache set. If the first is included in 
-    the second, we have a positive match and a dictionary will be returned. Otherwise,
-    we have a cache miss.
+    It checks every pair of elementNames x statusTypes against the current
+    snapshot. If all of them are present, we have a positive match and a dictionary
+    will be returned. Otherwise, we have a cache miss.
     
     However, arguments ( elementNames or statusTypes ) can have a None value. If 
     that is the case, they are considered wildcards.
@@ -217,96 +352,88 @@ class RSSCache( Cache ):
     :return: S_OK() || S_ERROR()      
     """
     
-    self.acquireLock()
-    try:
-      match = self._match( elementNames, statusTypes )
-        
-      if not match[ 'OK' ]:
-        self.log.error( match[ 'Message' ] )
-      return match  
-    finally:
-      # Release lock, no matter what !
-      self.releaseLock()  
-    
+    match = self._match( elementNames, statusTypes )
+    if not match[ 'OK' ]:
+      self.log.error( match[ 'Message' ] )
+    return match  
+  
   #.............................................................................
-  # Private methods: NOT THREAD SAFE !!
+  # Cache overrides, the snapshot replaces the DictCache of the base class
   
-  def _match( self, elementNames, statusTypes ):
+  def cacheKeys( self ):
     """
-    Method doing the actual work. It must be wrapped around locks to ensure no
-    disaster happens.
-    
-    :Parameters:
-      **elementNames** - [ None, `string`, `list` ]
-        name(s) of the elements to be matched
-      **statusTypes** - [ None, `string`, `list` ]
-        name(s) of the statusTypes to be matched
-    
-    :return: S_OK() || S_ERROR() 
+    Cache keys getter
+      
+    :returns: list with valid keys on the cache
     """
     
-    # Gets the entire cache or a new one if it is empty / invalid
-    validCache = self.__getValidCache()
-    if not validCache[ 'OK' ]:
-      return validCache
-    validCache = validCache[ 'Value' ]
-    
-    # Gets matched keys
-    matchKeys = self.__match( validCache, elementNames, statusTypes )
-    
-    if not matchKeys[ 'OK' ]:
-      return matchKeys
-    matchKeys = matchKeys[ 'Value' ]
-    
-    # Gets objects for matched keys. It will return S_ERROR if the cache value
-    # has expired in between. It has 10 valid seconds, which means something was
-    # extremely slow above.
-    cacheMatches = self.get( matchKeys )
-    if not cacheMatches[ 'OK' ]:
-      return cacheMatches  
-       
-    cacheMatches = cacheMatches[ 'Value' ]
-    if not cacheMatches:
-      return S_ERROR( 'Empty cache for: %s, %s' % ( elementNames, statusTypes ) )
-        
-    # We undo the key into <elementName> and <statusType>
-    cacheMatchesDict = self.__getDictFromCacheMatches( cacheMatches )
-    return S_OK( cacheMatchesDict )
+    snapshot = self.__snapshot
+    if not snapshot.isValid( self.__validSeconds ):
+      return []
+    return snapshot.keys()
   
-  def __getValidCache( self ):
+  def get( self, cacheKeys ):
     """
-    Obtains the keys on the cache which are valid. If any, returns the complete 
-    valid dictionary. If the list is empty, we assume the cache is invalid or
-    not filled, so we issue a cache refresh and return its data.
+    Gets values for cacheKeys given, if all are found ( present on the cache and
+    valid ), returns S_OK with the results. If any is not neither present not
+    valid, returns S_ERROR. 
     
-    :return: { ( elementName, statusType ) : status, ... } 
+    :Parameters:
+      **cacheKeys** - `list`
+        list of keys to be extracted from the cache
+        
+    :return: S_OK | S_ERROR
     """
     
-    cacheKeys = self.cacheKeys()   
-    # If cache is empty, we refresh it.
-    if not cacheKeys:
-      cache = self.refreshCache()
-    else:
-      cache = self.get( cacheKeys )  
+    snapshot = self.__snapshot
+    if not snapshot.isValid( self.__validSeconds ):
+      return S_ERROR( 'Cache expired' )
     
-    return cache
-
-  def __match( self, validCache, elementNames, statusTypes ):
+    result = {}
+    for cacheKey in cacheKeys:
+      status = snapshot.getStatus( *cacheKey )
+      if status is None:
+        self.log.error( str( cacheKey ) )
+        return S_ERROR( 'Cannot get %s' % str( cacheKey ) )
+      result[ cacheKey ] = status
+    
+    return S_OK( result )
+  
+  def refreshCache( self ):
+    """     
+    Gets fresh data from the update function and replaces the snapshot with a
+    new one, with the next version number. On error, the current snapshot is
+    kept.
+    
+    :return: S_OK | S_ERROR. If the first, its content is the new cache.    
     """
-    Obtains all keys on the cache ( should not be empty ! ).
+
+    self.log.verbose( 'refreshing...' )
     
-    Gets the sets ( no duplicates ) of elementNames and statusTypes. There is a 
-    slight distinction. A priori we cannot know which are all the elementNames.
-    So, if elementNames is None, we will consider all elementNames in the cacheKeys.
-    However, if statusTypes is None, we will get the standard list from the 
-    ResourceStatus configuration in the CS. 
+    newCache = self.__updateFunc()
+    if not newCache[ 'OK' ]:
+      self.log.error( newCache[ 'Message' ] )
+      return newCache
+    newCache = newCache[ 'Value' ]
     
-    If the cartesian product of our sets is on the cacheKeys set, we have a 
-    positive match.
+    # Single assignment, readers see either the old or the new snapshot
+    self.__snapshot = StatusSnapshot( self.__snapshot.version + 1, self.__lifeTime, 
+                                      newCache )
+    
+    self.log.verbose( 'refreshed' )
+    
+    return S_OK( newCache )
+  
+  #.............................................................................
+  # Private methods
+  
+  def _match( self, elementNames, statusTypes ):
+    """
+    Method doing the actual work. It only reads the snapshot, which is never
+    modified, so it does not need the lock unless the snapshot has to be
+    refreshed.
     
     :Parameters:
-      **validCache** - `dict`
-        cache dictionary
       **elementNames** - [ None, `string`, `list` ]
         name(s) of the elements to be matched
       **statusTypes** - [ None, `string`, `list` ]
@@ -314,62 +441,48 @@ class RSSCache( Cache ):
     
     :return: S_OK() || S_ERROR() 
     """
-
-    cacheKeys = validCache.keys()
-
+    
+    # Gets the current snapshot or a new one if it is empty / invalid
+    snapshot = self.getSnapshot()
+    if not snapshot[ 'OK' ]:
+      return snapshot
+    snapshot = snapshot[ 'Value' ]
+    
+    byElement = snapshot.byElement
+    
     if isinstance( elementNames, str ):       
-      elementNames = [ elementNames ]
+      elementNames = ( elementNames, )
     elif elementNames is None:
-      elementNames = [ cacheKey[0] for cacheKey in cacheKeys ]  
-    # Remove duplicates, makes Cartesian product faster
-    elementNamesSet = set( elementNames )
+      elementNames = byElement.keys()
     
     if isinstance( statusTypes, str ):
-      statusTypes = [ statusTypes ]
+      statusTypes = ( statusTypes, )
     elif statusTypes is None:
       statusTypes = self.allStatusTypes
-    # Remove duplicates, makes Cartesian product faster
-    statusTypesSet = set( statusTypes )
-
-    cartesianProduct = set( itertools.product( elementNamesSet, statusTypesSet ) )
-
-    # Some users find funny sending empty lists, which will make the cartesianProduct
-    # be []. Problem: [] is always subset, no matter what !
     
-    if not cartesianProduct:
+    # Some users find funny sending empty lists, which would make a positive
+    # match on nothing.
+    if not elementNames or not statusTypes:
       self.log.warn( 'Empty cartesian product' )
       return S_ERROR( 'Empty cartesian product' )
     
-    notInCache = list( cartesianProduct.difference( set( cacheKeys ) ) )  
+    result     = {}
+    notInCache = []
+    
+    for elementName in elementNames:
+      elementDict = byElement.get( elementName, {} )
+      matchDict   = result.setdefault( elementName, {} )
+      for statusType in statusTypes:
+        try:
+          matchDict[ statusType ] = elementDict[ statusType ]
+        except KeyError:
+          notInCache.append( ( elementName, statusType ) )
+    
     if notInCache:
       self.log.warn( 'Cache misses: %s' % notInCache )
       return S_ERROR( 'Cache misses: %s' % notInCache )
     
-    return S_OK( cartesianProduct )
-    
-  @staticmethod  
-  def __getDictFromCacheMatches( cacheMatches ):
-    """
-    Formats the cacheMatches to a format expected by the RSS helpers clients.
-    
-    :Parameters:
-      **cacheMatches** - `dict`
-        cache dictionary of the form { ( elementName, statusType ) : status, ... }
-      
-    
-    :return: dict of the form { elementName : { statusType : status, ... }, ... }        
-    """
-    
-    result = {}
-    
-    for cacheKey, cacheValue in cacheMatches.iteritems():
-      elementName, statusType = cacheKey
-      
-      if not result.has_key( elementName ):
-        result[ elementName ] = {}
-      result[ elementName ][ statusType ] = cacheValue
-    
-    return result
+    return S_OK( result )
      
 #...............................................................................
 #EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF    
\ No newline at end of file
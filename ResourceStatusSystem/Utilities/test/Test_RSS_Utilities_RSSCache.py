@@ -0,0 +1,127 @@
+# $HeadURL:  $
+''' Test_RSS_Utilities_RSSCache
+'''
+
+import mock
+import unittest
+
+import DIRAC.ResourceStatusSystem.Utilities.RSSCache as moduleTested
+
+__RCSID__ = '$Id: $'
+
+_cacheDict = { ( 'A', 'ReadAccess' )  : 'Active',
+               ( 'A', 'WriteAccess' ) : 'Banned',
+               ( 'B', 'ReadAccess' )  : 'Active',
+               ( 'B', 'WriteAccess' ) : 'Degraded' }
+
+################################################################################
+
+class RSSCache_TestCase( unittest.TestCase ):
+  
+  def setUp( self ):
+    '''
+    Setup
+    '''
+    
+    self.moduleTested = moduleTested
+    self.testClass    = self.moduleTested.RSSCache
+    
+    mock_RssConfiguration = mock.Mock()
+    mock_RssConfiguration.return_value.getConfigStatusType.return_value = [ 'ReadAccess',
+                                                                            'WriteAccess' ]
+    self.moduleTested.RssConfiguration = mock_RssConfiguration
+    
+    self.updateFunc = mock.Mock()
+    self.updateFunc.return_value = { 'OK' : True, 'Value' : dict( _cacheDict ) }
+    
+  def tearDown( self ):
+    '''
+    TearDown
+    '''
+    del self.testClass
+    del self.moduleTested
+        
+################################################################################
+# Tests
+
+class StatusSnapshot_Success( RSSCache_TestCase ):
+  
+  def test_indexes( self ):
+    ''' tests both indexes of the snapshot
+    '''
+    
+    snapshot = self.moduleTested.StatusSnapshot( 3, 300, _cacheDict )
+    self.assertEqual( 3, snapshot.version )
+    self.assertEqual( True, snapshot.isValid( 30 ) )
+    self.assertEqual( { 'ReadAccess' : 'Active', 'WriteAccess' : 'Banned' }, 
+                      snapshot.byElement[ 'A' ] )
+    self.assertEqual( { 'A' : 'Banned', 'B' : 'Degraded' }, 
+                      snapshot.byStatusType[ 'WriteAccess' ] )
+    self.assertEqual( 'Degraded', snapshot.getStatus( 'B', 'WriteAccess' ) )
+    self.assertEqual( None, snapshot.getStatus( 'C', 'WriteAccess' ) )
+    self.assertEqual( sorted( _cacheDict.keys() ), sorted( snapshot.keys() ) )
+    
+  def test_expired( self ):
+    ''' tests an expired snapshot
+    '''
+    
+    snapshot = self.moduleTested.StatusSnapshot( 0, -1, {} )
+    self.assertEqual( False, snapshot.isValid() )
+
+class RSSCache_Success( RSSCache_TestCase ):
+  
+  def test_match( self ):
+    ''' tests the match method
+    '''
+    
+    cache = self.testClass( 'Storage', 300, self.updateFunc )
+    self.assertEqual( 0, cache.version )
+    
+    res = cache.match( 'A', None )
+    self.assertEqual( True, res[ 'OK' ] )
+    self.assertEqual( { 'A' : { 'ReadAccess' : 'Active', 'WriteAccess' : 'Banned' } }, 
+                      res[ 'Value' ] )
+    self.assertEqual( 1, cache.version )
+
+    res = cache.match( None, 'WriteAccess' )
+    self.assertEqual( True, res[ 'OK' ] )
+    self.assertEqual( { 'A' : { 'WriteAccess' : 'Banned' }, 
+                        'B' : { 'WriteAccess' : 'Degraded' } }, res[ 'Value' ] )
+    
+    res = cache.match( [ 'A', 'C' ], 'ReadAccess' )
+    self.assertEqual( False, res[ 'OK' ] )
+    
+    res = cache.match( [], 'ReadAccess' )
+    self.assertEqual( False, res[ 'OK' ] )
+    
+    # The snapshot is still valid, no further refresh
+    self.assertEqual( 1, self.updateFunc.call_count )
+    self.assertEqual( 1, cache.version )
+
+  def test_refreshError( self ):
+    ''' tests the match method when the update function fails
+    '''
+    
+    self.updateFunc.return_value = { 'OK' : False, 'Message' : 'Grumpy server' }
+    
+    cache = self.testClass( 'Storage', 300, self.updateFunc )
+    res = cache.match( 'A', None )
+    self.assertEqual( False, res[ 'OK' ] )
+    self.assertEqual( 'Grumpy server', res[ 'Message' ] )
+    self.assertEqual( 0, cache.version )
+    
+  def test_getSnapshot( self ):
+    ''' tests that the snapshot is kept until it expires
+    '''
+    
+    cache = self.testClass( 'Storage', 300, self.updateFunc )
+    first = cache.getSnapshot()[ 'Value' ]
+    self.assertEqual( True, first is cache.getSnapshot()[ 'Value' ] )
+    
+    cache.refreshCache()
+    second = cache.getSnapshot()[ 'Value' ]
+    self.assertEqual( first.version + 1, second.version )
+    self.assertEqual( False, first is second )
+        
+################################################################################
+#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF#EOF
@@ -10,6 +10,7 @@ from DIRAC                                                      import S_OK, S_E
 from DIRAC.Core.Security.ProxyInfo                              import getProxyInfo
 from DIRAC.Core.Utilities.List                                  import fromChar
 from DIRAC.Core.Utilities.ModuleFactory                         import ModuleFactory
+from DIRAC.Core.Workflow.WorkflowTemplate                       import WorkflowTemplate
 from DIRAC.Interfaces.API.Job                                   import Job
 from DIRAC.RequestManagementSystem.Client.ReqClient             import ReqClient
 from DIRAC.RequestManagementSystem.Client.Request               import Request
@@ -296,9 +297,16 @@ class WorkflowTasks( TaskBase ):
       owner = proxyInfo['username']
       ownerGroup = proxyInfo['group']
 
+    # The workflow is parsed and checked once, the jobs only differ by their parameters
+    jobDescription = transBody
+    if transBody:
+      try:
+        jobDescription = WorkflowTemplate( transBody )
+      except Exception, x:
+        self.log.warn( "Failed to prepare the workflow template, using the description for each task", str( x ) )
 
     for taskNumber in sorted( taskDict ):
-      oJob = self.jobClass( transBody )
+      oJob = self.jobClass( jobDescription )
       paramsDict = taskDict[taskNumber]
       site = oJob.workflow.findParameter( 'Site' ).getValue()
       paramsDict['Site'] = site
@@ -348,7 +356,7 @@ class WorkflowTasks( TaskBase ):
           continue
         for name, output in res['Value'].items():
           oJob._addJDLParameter( name, ';'.join( output ) )
-      taskDict[taskNumber]['TaskObject'] = self.jobClass( oJob._toXML() )
+      taskDict[taskNumber]['TaskObject'] = self.jobClass( oJob.workflow )
     return S_OK( taskDict )
 
   #############################################################################
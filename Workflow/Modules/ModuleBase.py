@@ -524,15 +524,16 @@ class ModuleBase( object ):
   def generateFailoverFile( self ):
     """ Retrieve the accumulated reporting request, and produce a JSON file that is consumed by the JobWrapper
     """
-    reportRequest = None
-    result = self.jobReport.generateForwardDISET()
+    reportRequests = []
+    result = self.jobReport.generateForwardDISETOperations()
     if not result['OK']:
       self.log.warn( "Could not generate Operation for job report with result:\n%s" % ( result ) )
     else:
-      reportRequest = result['Value']
-    if reportRequest:
+      reportRequests = [ reportRequest for reportRequest in result['Value'] if reportRequest ]
+    if reportRequests:
       self.log.info( "Populating request with job report information" )
-      self.request.addOperation( reportRequest )
+      for reportRequest in reportRequests:
+        self.request.addOperation( reportRequest )
 
     accountingReport = None
     if self.workflow_commons.has_key( 'AccountingReport' ):
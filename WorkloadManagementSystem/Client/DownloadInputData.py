@@ -15,11 +15,33 @@ from DIRAC.Core.DISET.RPCClient                                     import RPCCl
 from DIRAC.DataManagementSystem.Client.ReplicaManager               import ReplicaManager
 from DIRAC.Resources.Storage.StorageElement                         import StorageElement
 from DIRAC.Core.Utilities.Os                                        import getDiskSpace
+from DIRAC.Core.Utilities.Adler                                     import fileAdler, compareAdler
 from DIRAC                                                          import S_OK, S_ERROR, gLogger
 
-import os, tempfile, random
+import os, tempfile, random, threading, Queue
 
 COMPONENT_NAME = 'DownloadInputData'
+# File listing the input data already downloaded, one "LFN path" line per file,
+# for payloads started before the end of the downloads
+READY_FILE = 'InputDataReady.txt'
+
+# Downloads still running after the payload was started
+_pendingDownloads = []
+
+def waitForDownloads():
+  """ Wait for the input data downloads left running in streaming mode, returning
+      the files downloaded and failed since the payload was started
+  """
+  successful = {}
+  failed = []
+  while _pendingDownloads:
+    result = _pendingDownloads.pop( 0 ).waitForDownloads()
+    successful.update( result['Successful'] )
+    failed.extend( result['Failed'] )
+  result = S_OK()
+  result['Successful'] = successful
+  result['Failed'] = failed
+  return result
 
 class DownloadInputData:
   """
@@ -40,6 +62,24 @@ class DownloadInputData:
     self.jobID = None
     self.replicaManager = ReplicaManager()
     self.counter = 1
+    # The payload can start once this number of files is downloaded, 0 waits for all of them
+    try:
+      self.streamingThreshold = int( argumentsDict.get( 'Job', {} ).get( 'InputDataStreaming', 0 ) )
+    except ValueError:
+      self.streamingThreshold = 0
+    self.maxParallelDownloads = max( 1, int( self.configuration.get( 'MaxParallelDownloads', 4 ) ) )
+    self.maxDownloadsPerSE = max( 1, int( self.configuration.get( 'MaxDownloadsPerSE', 2 ) ) )
+    self.__counterLock = threading.Lock()
+    self.__condition = threading.Condition()
+    self.__queue = Queue.Queue()
+    self.__seSlots = {}
+    self.__pending = []
+    self.__resolvedData = {}
+    self.__failedDownloads = []
+    self.__reported = {}
+    self.__localSECount = 0
+    self.__tapeSEs = []
+    self.__downloadReplicas = {}
 
   #############################################################################
   def execute( self, dataToResolve = None ):
@@ -96,7 +136,11 @@ class DownloadInputData:
 
       size = reps['Size']
       guid = reps['GUID' ]
-      downloadReplicas[lfn] = {'SE':[], 'Size':size, 'GUID':guid}
+      # Only Adler32 checksums are verified after the download
+      checksum = ''
+      if ( reps.get( 'ChecksumType' ) or 'Adler32' ).lower() in ( 'adler32', 'ad', 'adler' ):
+        checksum = reps.get( 'Checksum', '' )
+      downloadReplicas[lfn] = {'SE':[], 'Size':size, 'GUID':guid, 'Checksum':checksum}
       for seName in diskSEs:
         if seName in reps:
           downloadReplicas[lfn]['SE'].append( ( seName, reps[seName] ) )
@@ -153,85 +197,211 @@ class DownloadInputData:
       result['Successful'] = {}
       return result
 
+    # Files are downloaded in the order of the input data, the payload is likely
+    # to process them in this order
+    self.__tapeSEs = tapeSEs
+    self.__downloadReplicas = downloadReplicas
+    self.__pending = [ lfn for lfn in self.inputData if lfn in downloadReplicas ]
+    self.__startDownloads()
+
+    if self.streamingThreshold and self.streamingThreshold < len( self.__pending ):
+      self.log.info( 'Payload can start after %s of %s files are downloaded' % ( self.streamingThreshold,
+                                                                                len( self.__pending ) ) )
+      self.__waitForFiles( self.streamingThreshold )
+    else:
+      self.__waitForFiles()
+
+    self.__condition.acquire()
+    try:
+      resolvedData = dict( self.__resolvedData )
+      failedReplicas.extend( self.__failedDownloads )
+      pending = list( self.__pending )
+    finally:
+      self.__condition.release()
+
+    if pending:
+      self.log.info( '%s files are still being downloaded' % len( pending ) )
+      _pendingDownloads.append( self )
+    self.__reportDownloads( resolvedData, failedReplicas )
+
+    result = S_OK()
+    result['Successful'] = resolvedData
+    result['Failed'] = failedReplicas  # lfn list to be passed to another resolution mechanism
+    result['Pending'] = pending
+    return result
+
+  #############################################################################
+  def waitForDownloads( self ):
+    """ Wait for the downloads still running and report the files downloaded since
+        the last report
+    """
+    self.__waitForFiles()
     resolvedData = {}
-    localSECount = 0
-    for lfn in downloadReplicas.keys():
-      pfn = downloadReplicas[lfn]['PFN']
-      seName = downloadReplicas[lfn]['SE']
-      guid = downloadReplicas[lfn]['GUID']
-      result = self.replicaManager.getStorageFileMetadata( [pfn], seName )
+    for lfn, fileDict in self.__resolvedData.items():
+      if lfn not in self.__reported:
+        resolvedData[lfn] = fileDict
+    failedReplicas = [ lfn for lfn in self.__failedDownloads if lfn not in self.__reported ]
+    self.__reportDownloads( resolvedData, failedReplicas )
+    result = S_OK()
+    result['Successful'] = resolvedData
+    result['Failed'] = failedReplicas
+    return result
+
+  def __reportDownloads( self, resolvedData, failedReplicas ):
+    """ Report the datasets downloaded and the ones that could not be
+    """
+    for lfn in resolvedData.keys() + failedReplicas:
+      self.__reported[lfn] = True
+
+    report = ''
+    if failedReplicas:
+      report = 'The following LFN(s) could not be downloaded to the WN:\n'
+      for lfn in failedReplicas:
+        report += '%s\n' % ( lfn )
+      self.log.warn( report )
+
+    if resolvedData:
+      report = 'Successfully downloaded LFN(s):\n'
+      for lfn in resolvedData:
+        report += '%s\n' % ( lfn )
+      totalLFNs = len( self.__resolvedData )
+      report += '\nDownloaded %s / %s files from local Storage Elements on first attempt.' % ( self.__localSECount, totalLFNs )
+      self.__setJobParam( COMPONENT_NAME, report )
+
+  #############################################################################
+  def __startDownloads( self ):
+    """ Start the threads downloading the files pending, at most maxParallelDownloads
+        at once and maxDownloadsPerSE from the same Storage Element
+    """
+    for lfn in self.__pending:
+      seName = self.__downloadReplicas[lfn]['SE']
+      if seName not in self.__seSlots:
+        self.__seSlots[seName] = threading.Semaphore( self.maxDownloadsPerSE )
+      self.__queue.put( lfn )
+    if self.streamingThreshold:
+      readyFile = open( READY_FILE, 'w' )
+      readyFile.close()
+    for _i in range( min( self.maxParallelDownloads, len( self.__pending ) ) ):
+      # Each thread has its own ReplicaManager, they keep state of the last calls
+      worker = threading.Thread( target = self.__downloadWorker, args = ( ReplicaManager(), ) )
+      worker.setDaemon( True )
+      worker.start()
+
+  def __waitForFiles( self, numFiles = 0 ):
+    """ Wait until numFiles files are downloaded, or all of them if numFiles is 0.
+        Failed downloads are waited for as well
+    """
+    self.__condition.acquire()
+    try:
+      while self.__pending and ( not numFiles or len( self.__resolvedData ) < numFiles ):
+        # Waiting with a timeout keeps the thread responsive to signals
+        self.__condition.wait( 5 )
+    finally:
+      self.__condition.release()
+
+  def __downloadWorker( self, replicaManager ):
+    """ Download the files in the queue until it is empty
+    """
+    while True:
+      try:
+        lfn = self.__queue.get_nowait()
+      except Queue.Empty:
+        return
+      try:
+        result, fromLocalSE = self.__downloadFile( replicaManager, lfn )
+      except Exception, x:
+        self.log.exception( 'Exception while downloading', lfn )
+        result, fromLocalSE = S_ERROR( str( x ) ), False
+      self.__condition.acquire()
+      try:
+        if result['OK']:
+          self.__resolvedData[lfn] = result['Value']
+          if fromLocalSE:
+            self.__localSECount += 1
+          if self.streamingThreshold:
+            readyFile = open( READY_FILE, 'a' )
+            readyFile.write( '%s %s\n' % ( lfn, result['Value']['path'] ) )
+            readyFile.close()
+        else:
+          self.__failedDownloads.append( lfn )
+        self.__pending.remove( lfn )
+        self.__condition.notifyAll()
+      finally:
+        self.__condition.release()
+
+  def __downloadFile( self, replicaManager, lfn ):
+    """ Check the replica selected for lfn and download it, from anywhere if the local
+        one can not be downloaded. Returns the result and whether the file came from
+        the local SE
+    """
+    pfn = self.__downloadReplicas[lfn]['PFN']
+    seName = self.__downloadReplicas[lfn]['SE']
+    guid = self.__downloadReplicas[lfn]['GUID']
+    checksum = self.__downloadReplicas[lfn]['Checksum']
+    fromLocalSE = False
+
+    slot = self.__seSlots[seName]
+    slot.acquire()
+    try:
+      result = replicaManager.getStorageFileMetadata( [pfn], seName )
       if not result['OK']:
         self.log.error( result['Message'] )
-        failedReplicas.append( lfn )
-        continue
+        return result, fromLocalSE
       if result['Value']['Failed']:
         error = 'Could not get Storage Metadata from %s' % seName
         self.log.error( error )
-        failedReplicas.append( lfn )
-        continue
+        return S_ERROR( error ), fromLocalSE
       metadata = result['Value']['Successful'][pfn]
       if metadata['Lost']:
         error = "PFN has been Lost by the StorageElement"
         self.log.error( error , pfn )
-        failedReplicas.append( lfn )
-        continue
+        return S_ERROR( error ), fromLocalSE
       elif metadata['Unavailable']:
         error = "PFN is declared Unavailable by the StorageElement"
         self.log.error( error, pfn )
-        failedReplicas.append( lfn )
-        continue
-      elif seName in tapeSEs and not metadata['Cached']:
+        return S_ERROR( error ), fromLocalSE
+      elif seName in self.__tapeSEs and not metadata['Cached']:
         error = "PFN is no longer in StorageElement Cache"
         self.log.error( error, pfn )
-        failedReplicas.append( lfn )
-        continue
+        return S_ERROR( error ), fromLocalSE
 
       self.log.info( 'Preliminary checks OK, download from LocalSE:', pfn )
-      result = self.__downloadPFN( pfn, seName, guid )
-      if not result['OK']:
-        self.log.warn( 'Download from localSE failed with message:\n%s' % ( result ) )
-        # if the replica was NOT on a Tape SE attempt a download from elsewhere
-        if seName not in tapeSEs:
-          self.log.info( 'Trying to download from any SE:', pfn )
-          result = self.__downloadLFN( lfn, pfn, seName, guid )
-          if not result['OK']:
-            self.log.warn( 'Download from any SE failed with message:\n%s' % ( result ) )
-            failedReplicas.append( lfn )
-        else:
-          failedReplicas.append( lfn )
-      else:
-        localSECount += 1
-      if result['OK']:
-        # Rename file if downloaded FileName does not match the LFN
-        lfnName = os.path.basename( lfn )
-        oldPath = result['Value']['path']
-        fileName = os.path.basename( oldPath )
-        if lfnName != fileName:
-          newPath = os.path.join( os.path.dirname( oldPath, lfnName ) )
-          os.rename( oldPath, newPath )
-          result['Value']['path'] = newPath
-        resolvedData[lfn] = result['Value']
-
-    # Report datasets that could not be downloaded
-    report = ''
-    if failedReplicas:
-      report = 'The following LFN(s) could not be downloaded to the WN:\n'
-      for lfn in failedReplicas:
-        report += '%s\n' % ( lfn )
-        self.log.warn( report )
+      result = self.__downloadPFN( replicaManager, pfn, seName, guid )
+    finally:
+      slot.release()
 
-    if resolvedData:
-      report = 'Successfully downloaded LFN(s):\n'
-      for lfn, reps in resolvedData.items():
-        report += '%s\n' % ( lfn )
-      totalLFNs = len( resolvedData.keys() )
-      report += '\nDownloaded %s / %s files from local Storage Elements on first attempt.' % ( localSECount, totalLFNs )
-      self.__setJobParam( COMPONENT_NAME, report )
-
-    result = S_OK()
-    result['Successful'] = resolvedData
-    result['Failed'] = failedReplicas  # lfn list to be passed to another resolution mechanism
-    return result
+    if not result['OK']:
+      self.log.warn( 'Download from localSE failed with message:\n%s' % ( result ) )
+      # if the replica was NOT on a Tape SE attempt a download from elsewhere
+      if seName in self.__tapeSEs:
+        return result, fromLocalSE
+      self.log.info( 'Trying to download from any SE:', pfn )
+      result = self.__downloadLFN( replicaManager, lfn, pfn, seName, guid )
+      if not result['OK']:
+        self.log.warn( 'Download from any SE failed with message:\n%s' % ( result ) )
+        return result, fromLocalSE
+    else:
+      fromLocalSE = True
+
+    # Rename file if downloaded FileName does not match the LFN
+    lfnName = os.path.basename( lfn )
+    oldPath = result['Value']['path']
+    fileName = os.path.basename( oldPath )
+    if lfnName != fileName:
+      newPath = os.path.join( os.path.dirname( oldPath ), lfnName )
+      os.rename( oldPath, newPath )
+      result['Value']['path'] = newPath
+
+    if checksum:
+      localChecksum = fileAdler( result['Value']['path'] )
+      if not localChecksum or not compareAdler( localChecksum, checksum ):
+        error = 'Checksum of the downloaded file %s does not match the catalog %s' % ( localChecksum, checksum )
+        self.log.error( error, lfn )
+        if result['Value']['protocol'] == 'Downloaded':
+          os.remove( result['Value']['path'] )
+        return S_ERROR( error ), False
+
+    return result, fromLocalSE
 
   #############################################################################
   def __checkDiskSpace( self, totalSize ):
@@ -255,23 +425,28 @@ class DownloadInputData:
 
   def __getDownloadDir( self, incrementCounter = True ):
     if self.inputDataDirectory == "PerFile":
-      if incrementCounter:
-        self.counter += 1
-      return tempfile.mkdtemp( prefix = 'InputData_%s' % ( self.counter ), dir = os.getcwd() )
+      self.__counterLock.acquire()
+      try:
+        if incrementCounter:
+          self.counter += 1
+        counter = self.counter
+      finally:
+        self.__counterLock.release()
+      return tempfile.mkdtemp( prefix = 'InputData_%s' % ( counter ), dir = os.getcwd() )
     elif self.inputDataDirectory == "CWD":
       return os.getcwd()
     else:
       return self.inputDataDirectory
 
   #############################################################################
-  def __downloadLFN( self, lfn, pfn, seName, guid ):
+  def __downloadLFN( self, replicaManager, lfn, pfn, seName, guid ):
     """ Download a local copy of a single LFN from the specified Storage Element.
         This is used as a last resort to attempt to retrieve the file.  The Replica
         Manager will perform an LFC lookup to refresh the stored result.
     """
     downloadDir = self.__getDownloadDir()
     self.log.verbose( 'Attempting to ReplicaManager.getFile for %s in %s' % ( lfn, downloadDir ) )
-    result = self.replicaManager.getFile( lfn, destinationDir = downloadDir )
+    result = replicaManager.getFile( lfn, destinationDir = downloadDir )
     if not result['OK']:
       return result
     self.log.verbose( result )
@@ -290,7 +465,7 @@ class DownloadInputData:
       return S_ERROR( 'OK download result but file missing in current directory' )
 
   #############################################################################
-  def __downloadPFN( self, pfn, seName, guid ):
+  def __downloadPFN( self, replicaManager, pfn, seName, guid ):
     """ Download a local copy of a single PFN from the specified Storage Element.
     """
     if not pfn:
@@ -309,7 +484,7 @@ class DownloadInputData:
 
     downloadDir = self.__getDownloadDir()
 
-    result = self.replicaManager.getStorageFile( pfn, seName, localPath = downloadDir, singleFile = True )
+    result = replicaManager.getStorageFile( pfn, seName, localPath = downloadDir, singleFile = True )
     if not result['OK']:
       self.log.warn( 'Problem getting PFN %s:\n%s' % ( pfn, result ) )
       return result
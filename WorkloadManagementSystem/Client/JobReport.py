@@ -5,17 +5,27 @@
 
 __RCSID__ = "$Id$"
 
-from DIRAC import S_OK, S_ERROR, Time
-from DIRAC.Core.Utilities import DEncode
+import threading
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.Utilities import DEncode, Time
 from DIRAC.Core.DISET.RPCClient import RPCClient
 from DIRAC.RequestManagementSystem.Client.Operation import Operation
 
+# Job statuses sent as soon as they are set, even when the updates are coalesced
+FINAL_STATES = [ 'Completed', 'Done', 'Failed', 'Killed', 'Stalled' ]
+
 class JobReport( object ):
   """
     .. class:: JobReport
+
+    With a flushInterval ( in seconds ), the reports are coalesced: the updates to
+    send are kept and sent together by a background thread every flushInterval
+    seconds, a status or application status superseded before being sent is
+    dropped. Changes of the major status are still sent right away.
   """
 
-  def __init__( self, jobid, source = '' ):
+  def __init__( self, jobid, source = '', flushInterval = 0 ):
     """ c'tor
 
 
@@ -27,12 +37,41 @@ class JobReport( object ):
     self.source = source
     if not source:
       self.source = 'Job_%d' % self.jobID
+    self.flushInterval = flushInterval
+    self.__lock = threading.RLock()
+    self.__lastStatus = ''
+    self.__stopFlushing = threading.Event()
+    self.__flushThread = None
+    if self.flushInterval > 0 and self.jobID:
+      self.__flushThread = threading.Thread( target = self.__flushLoop )
+      self.__flushThread.setDaemon( True )
+      self.__flushThread.start()
 
   def setJob( self, jobID ):
     """ Set the job ID for which to send reports
     """
     self.jobID = jobID
 
+  def __flushLoop( self ):
+    """ Send the coalesced reports every flushInterval seconds
+    """
+    while True:
+      self.__stopFlushing.wait( self.flushInterval )
+      if self.__stopFlushing.isSet():
+        return
+      self.commit()
+
+  def stopFlushing( self ):
+    """ Stop the background sending of the coalesced reports, the reports still kept
+        have to be sent with commit() or generateForwardDISET()
+    """
+    self.__stopFlushing.set()
+    if self.__flushThread and self.__flushThread is not threading.currentThread():
+      self.__flushThread.join()
+    self.__flushThread = None
+    # Later reports are sent as they come
+    self.flushInterval = 0
+
   def setJobStatus( self, status = '', minor = '', application = '', sendFlag = True ):
     """ Send job status information to the JobState service for jobID
     """
@@ -40,13 +79,27 @@ class JobReport( object ):
       return S_OK( 'Local execution, jobID is null.' )
 
     timeStamp = Time.toString()
-    # add job status record
-    self.jobStatusInfo.append( ( status.replace( "'", '' ), minor.replace( "'", '' ), timeStamp ) )
-    if application:
-      self.appStatusInfo.append( ( application.replace( "'", '' ), timeStamp ) )
-    if sendFlag:
-      # and send
-      return self.sendStoredStatusInfo()
+    status = status.replace( "'", '' )
+    self.__lock.acquire()
+    try:
+      # A change of the major status is sent right away
+      important = status and ( status != self.__lastStatus or status in FINAL_STATES )
+      if status:
+        self.__lastStatus = status
+      # add job status record
+      record = ( status, minor.replace( "'", '' ), timeStamp )
+      if self.flushInterval and self.jobStatusInfo and self.jobStatusInfo[-1][0] == status:
+        # The status is not sent yet and only its minor status changes
+        self.jobStatusInfo[-1] = record
+      else:
+        self.jobStatusInfo.append( record )
+      if application:
+        self.__addApplicationStatus( application.replace( "'", '' ), timeStamp )
+      if sendFlag and ( not self.flushInterval or important ):
+        # and send
+        return self.sendStoredStatusInfo()
+    finally:
+      self.__lock.release()
 
     return S_OK()
 
@@ -57,14 +110,26 @@ class JobReport( object ):
       return S_OK( 'Local execution, jobID is null.' )
 
     timeStamp = Time.toString()
-    # add Application status record
-    self.appStatusInfo.append( ( appStatus.replace( "'", '' ), timeStamp ) )
-    if sendFlag:
-      # and send
-      return self.sendStoredStatusInfo()
+    self.__lock.acquire()
+    try:
+      # add Application status record
+      self.__addApplicationStatus( appStatus.replace( "'", '' ), timeStamp )
+      if sendFlag and not self.flushInterval:
+        # and send
+        return self.sendStoredStatusInfo()
+    finally:
+      self.__lock.release()
 
     return S_OK()
 
+  def __addApplicationStatus( self, appStatus, timeStamp ):
+    """ Keep an application status, replacing the one not sent yet if coalescing
+    """
+    if self.flushInterval and self.appStatusInfo:
+      self.appStatusInfo[-1] = ( appStatus, timeStamp )
+    else:
+      self.appStatusInfo.append( ( appStatus, timeStamp ) )
+
   def setJobParameter( self, par_name, par_value, sendFlag = True ):
     """ Send job parameter for jobID
     """
@@ -72,11 +137,15 @@ class JobReport( object ):
       return S_OK( 'Local execution, jobID is null.' )
 
     timeStamp = Time.toString()
-    # add job parameter record
-    self.jobParameters[par_name] = ( par_value, timeStamp )
-    if sendFlag:
-      # and send
-      return self.sendStoredJobParameters()
+    self.__lock.acquire()
+    try:
+      # add job parameter record
+      self.jobParameters[par_name] = ( par_value, timeStamp )
+      if sendFlag and not self.flushInterval:
+        # and send
+        return self.sendStoredJobParameters()
+    finally:
+      self.__lock.release()
 
     return S_OK()
 
@@ -87,19 +156,32 @@ class JobReport( object ):
       return S_OK( 'Local execution, jobID is null.' )
 
     timeStamp = Time.toString()
-    # add job parameter record
-    for pname, pvalue in parameters:
-      self.jobParameters[pname] = ( pvalue, timeStamp )
-
-    if sendFlag:
-      # and send
-      return self.sendStoredJobParameters()
+    self.__lock.acquire()
+    try:
+      # add job parameter record
+      for pname, pvalue in parameters:
+        self.jobParameters[pname] = ( pvalue, timeStamp )
+
+      if sendFlag and not self.flushInterval:
+        # and send
+        return self.sendStoredJobParameters()
+    finally:
+      self.__lock.release()
 
     return S_OK()
 
   def sendStoredStatusInfo( self ):
     """ Send the job status information stored in the internal cache
     """
+    self.__lock.acquire()
+    try:
+      return self.__sendStoredStatusInfo()
+    finally:
+      self.__lock.release()
+
+  def __sendStoredStatusInfo( self ):
+    """ Send the job status information, the lock being held
+    """
 
     statusDict = {}
     for status, minor, dtime in self.jobStatusInfo:
@@ -132,6 +214,15 @@ class JobReport( object ):
   def sendStoredJobParameters( self ):
     """ Send the job parameters stored in the internal cache
     """
+    self.__lock.acquire()
+    try:
+      return self.__sendStoredJobParameters()
+    finally:
+      self.__lock.release()
+
+  def __sendStoredJobParameters( self ):
+    """ Send the job parameters, the lock being held
+    """
 
     parameters = []
     for pname, value in self.jobParameters.items():
@@ -186,21 +277,38 @@ class JobReport( object ):
       print pname.ljust( 20 ), pvalue.ljust( 30 ), timeStamp
 
   def generateForwardDISET( self ):
-    """ Generate and return failover requests for the operations in the internal cache
+    """ Generate and return a failover request for the job status information in the
+        internal cache. The job parameters which could not be sent stay in the cache,
+        use generateForwardDISETOperations to get the failover requests for both
     """
-    fowardDISETOp = None
-
-    result = self.sendStoredStatusInfo()
+    result = self.generateForwardDISETOperations()
     if not result['OK']:
-      if 'rpcStub' in result:
+      return result
+    statusOp, _parametersOp = result['Value']
+    return S_OK( statusOp )
 
-        rpcStub = result['rpcStub']
+  def generateForwardDISETOperations( self ):
+    """ Generate and return the failover requests for the job status information and
+        for the job parameters in the internal cache, as a ( status, parameters ) tuple
+        of operations, None when there was nothing left to forward
+    """
+    # This is the last report of the job, with coalescing the parameters set with
+    # sendFlag are only sent now
+    self.stopFlushing()
+    operations = []
+    for result in ( self.sendStoredStatusInfo(), self.sendStoredJobParameters() ):
+      forwardDISETOp = None
+      if not result['OK']:
+        if 'rpcStub' in result:
 
-        forwardDISETOp = Operation()
-        forwardDISETOp.Type = "ForwardDISET"
-        forwardDISETOp.Arguments = DEncode.encode( rpcStub )
+          rpcStub = result['rpcStub']
 
-      else:
-        return S_ERROR( 'Could not create ForwardDISET operation' )
+          forwardDISETOp = Operation()
+          forwardDISETOp.Type = "ForwardDISET"
+          forwardDISETOp.Arguments = DEncode.encode( rpcStub )
+
+        else:
+          return S_ERROR( 'Could not create ForwardDISET operation' )
+      operations.append( forwardDISETOp )
 
-    return S_OK( fowardDISETOp )
+    return S_OK( tuple( operations ) )
@@ -1,13 +1,22 @@
 
+from hashlib import md5
+
 from DIRAC import S_OK, S_ERROR, gConfig
 from DIRAC.ConfigurationSystem.Client.PathFinder import getAgentSection
 from DIRAC.Core.Utilities.CFG import CFG
 from DIRAC.Core.Utilities import List
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.Utilities.JDL import loadJDLAsCFG, dumpCFGAsJDL
+from DIRAC.Core.Utilities.DictCache import DictCache
 
 class JobManifest( object ):
 
+  # Manifests loaded lately from JDL keyed by the digest of the JDL. It is shared by
+  # all the executors dispatched by the optimization mind, which load the same
+  # manifest several times
+  __parsedJDLs = DictCache( maxEntries = 1000 )
+  __parsedJDLLifetime = 3600
+
   def __init__( self, manifest = "" ):
     self.__manifest = CFG()
     self.__dirty = False
@@ -40,11 +49,23 @@ class JobManifest( object ):
     """
     Load job manifest from JDL format
     """
-    result = loadJDLAsCFG( jdlString.strip() )
-    if not result[ 'OK' ]:
-      self.__manifest = CFG()
-      return result
-    self.__manifest = result[ 'Value' ][0]
+    jdlString = jdlString.strip()
+    try:
+      jdlKey = md5( jdlString ).hexdigest()
+    except UnicodeError:
+      jdlKey = None
+    manifest = jdlKey and self.__parsedJDLs.get( jdlKey )
+    if not manifest:
+      result = loadJDLAsCFG( jdlString )
+      if not result[ 'OK' ]:
+        self.__manifest = CFG()
+        return result
+      manifest = result[ 'Value' ][0]
+      if jdlKey:
+        self.__parsedJDLs.add( jdlKey, self.__parsedJDLLifetime, manifest.clone() )
+      self.__manifest = manifest
+    else:
+      self.__manifest = manifest.clone()
     return S_OK()
 
   def loadCFG( self, cfgString ):
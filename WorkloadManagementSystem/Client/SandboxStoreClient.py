@@ -3,6 +3,8 @@
 ########################################################################
 
 import os
+import sys
+import gzip
 import tarfile
 try:
   import hashlib as md5
@@ -17,9 +19,28 @@ from DIRAC.DataManagementSystem.Client.ReplicaManager import ReplicaManager
 from DIRAC.Core.Utilities.File import getGlobbedTotalSize
 from DIRAC import gLogger, S_OK, S_ERROR, gConfig
 
+class _MD5File:
+  """ File wrapper computing the MD5 of the data written through it
+  """
+
+  def __init__( self, fileObj ):
+    self.__file = fileObj
+    self.__md5 = md5.md5()
+
+  def write( self, data ):
+    self.__md5.update( data )
+    self.__file.write( data )
+
+  def close( self ):
+    self.__file.close()
+
+  def hexdigest( self ):
+    return self.__md5.hexdigest()
+
 class SandboxStoreClient:
 
   __validSandboxTypes = ( 'Input', 'Output' )
+  __compressionExtensions = { 'bz2' : 'tar.bz2', 'gz' : 'tar.gz', 'none' : 'tar' }
   __smdb = None
 
   def __init__( self, rpcClient = None, transferClient = None, **kwargs ):
@@ -66,12 +87,15 @@ class SandboxStoreClient:
 
   #Upload generic sandbox
 
-  def uploadFilesAsSandbox( self, fileList, sizeLimit = 0, assignTo = {} ):
+  def uploadFilesAsSandbox( self, fileList, sizeLimit = 0, assignTo = {}, compression = None ):
     """ Send files in the fileList to a Sandbox service for the given jobID.
         This is the preferable method to upload sandboxes. fileList can contain
         both files and directories
         Parameters:
           - assignTo : Dict containing { 'Job:<jobid>' : '<sbType>', ... }
+          - compression : bz2, gz or none. By default /DIRAC/Sandbox/Compression ( bz2 )
+        If the service already has a sandbox with the same contents, it is
+        reused and nothing is transferred
     """
     errorFiles = []
     files2Upload = []
@@ -83,6 +107,11 @@ class SandboxStoreClient:
     if type( fileList ) not in ( types.TupleType, types.ListType ):
       return S_ERROR( "fileList must be a tuple!" )
 
+    if compression is None:
+      compression = gConfig.getValue( "/DIRAC/Sandbox/Compression", "bz2" )
+    if compression not in self.__compressionExtensions:
+      return S_ERROR( "Invalid sandbox compression %s" % compression )
+
     for file in fileList:
       if re.search( '^lfn:', file ) or re.search( '^LFN:', file ):
         pass
@@ -101,10 +130,29 @@ class SandboxStoreClient:
     except Exception, e:
       return S_ERROR( "Cannot create temporal file: %s" % str( e ) )
 
-    tf = tarfile.open( name = tmpFilePath, mode = "w|bz2" )
+    # The hash is computed while the tarball is written, no need to read it again
+    hashFile = _MD5File( open( tmpFilePath, "wb" ) )
+    if compression == "gz":
+      # tarfile would put the current time in the gzip header, and the same
+      # files have to give the same hash. The mtime can only be set since python 2.7
+      gzipArgs = {}
+      if sys.version_info >= ( 2, 7 ):
+        gzipArgs[ 'mtime' ] = 0
+      outFile = gzip.GzipFile( filename = "", mode = "wb", compresslevel = 6, fileobj = hashFile, **gzipArgs )
+      tarMode = "w|"
+    elif compression == "bz2":
+      outFile = hashFile
+      tarMode = "w|bz2"
+    else:
+      outFile = hashFile
+      tarMode = "w|"
+    tf = tarfile.open( mode = tarMode, fileobj = outFile )
     for file in files2Upload:
       tf.add( os.path.realpath( file ), os.path.basename( file ), recursive = True )
     tf.close()
+    if outFile is not hashFile:
+      outFile.close()
+    hashFile.close()
 
     if sizeLimit > 0:
       # Evaluate the compressed size of the sandbox
@@ -113,16 +161,16 @@ class SandboxStoreClient:
         result[ 'SandboxFileName' ] = tmpFilePath
         return result
 
-    oMD5 = md5.md5()
-    fd = open( tmpFilePath, "rb" )
-    bData = fd.read( 10240 )
-    while bData:
-      oMD5.update( bData )
-      bData = fd.read( 10240 )
-    fd.close()
-
-    transferClient = self.__getTransferClient()
-    result = transferClient.sendFile( tmpFilePath, ( "%s.tar.bz2" % oMD5.hexdigest(), assignTo ) )
+    fileId = "%s.%s" % ( hashFile.hexdigest(), self.__compressionExtensions[ compression ] )
+    # Many jobs share the same sandbox, ask the service before sending it
+    result = self.__getRPCClient().getSandboxForHash( fileId, assignTo )
+    if result[ 'OK' ] and result[ 'Value' ]:
+      gLogger.verbose( "Sandbox already in the store", result[ 'Value' ] )
+    else:
+      if not result[ 'OK' ]:
+        gLogger.verbose( "Could not check if the sandbox exists", result[ 'Message' ] )
+      transferClient = self.__getTransferClient()
+      result = transferClient.sendFile( tmpFilePath, ( fileId, assignTo ) )
     result[ 'SandboxFileName' ] = tmpFilePath
     try:
       os.unlink( tmpFilePath )
@@ -0,0 +1,126 @@
+""" Tests of the concurrent downloads of DownloadInputData
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+
+import mock
+
+from DIRAC import S_OK
+from DIRAC.WorkloadManagementSystem.Client import DownloadInputData as DownloadModule
+
+class FakeReplicaManager( object ):
+  """ Writes the files requested in the download directory, keeping track of the
+      downloads running at the same time
+  """
+  lock = threading.Lock()
+  running = 0
+  maxRunning = 0
+  delay = 0.05
+
+  def getStorageFileMetadata( self, pfns, seName ):
+    metadata = { 'Lost' : False, 'Unavailable' : False, 'Cached' : True }
+    return S_OK( { 'Successful' : dict( [ ( pfn, metadata ) for pfn in pfns ] ), 'Failed' : {} } )
+
+  def getStorageFile( self, pfn, seName, localPath = None, singleFile = True ):
+    cls = FakeReplicaManager
+    cls.lock.acquire()
+    cls.running += 1
+    cls.maxRunning = max( cls.maxRunning, cls.running )
+    cls.lock.release()
+    time.sleep( cls.delay )
+    localFile = open( os.path.join( localPath, os.path.basename( pfn ) ), 'w' )
+    localFile.write( 'Content of %s' % pfn )
+    localFile.close()
+    cls.lock.acquire()
+    cls.running -= 1
+    cls.lock.release()
+    return S_OK( pfn )
+
+def adler( pfn ):
+  return '%08x' % ( zlib.adler32( 'Content of %s' % pfn ) & 0xffffffff )
+
+class DownloadInputDataTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.cwd = os.getcwd()
+    self.tmpDir = tempfile.mkdtemp()
+    os.chdir( self.tmpDir )
+    FakeReplicaManager.maxRunning = 0
+    seStatus = mock.Mock()
+    seStatus.getStatus.return_value = S_OK( { 'Read' : True, 'DiskSE' : True, 'TapeSE' : False } )
+    self.patchers = [ mock.patch.object( DownloadModule, 'ReplicaManager', FakeReplicaManager ),
+                      mock.patch.object( DownloadModule, 'StorageElement', mock.Mock( return_value = seStatus ) ),
+                      mock.patch.object( DownloadModule.DownloadInputData, '_DownloadInputData__checkDiskSpace',
+                                         mock.Mock( return_value = S_OK( 'Enough disk space' ) ) ) ]
+    for patcher in self.patchers:
+      patcher.start()
+
+  def tearDown( self ):
+    for patcher in self.patchers:
+      patcher.stop()
+    os.chdir( self.cwd )
+    shutil.rmtree( self.tmpDir )
+
+  def __getModule( self, numFiles, jobArgs = None, badChecksums = () ):
+    lfns = [ '/vo/data/file%d.raw' % i for i in range( numFiles ) ]
+    replicas = {}
+    for i, lfn in enumerate( lfns ):
+      seName = 'SE%d-disk' % ( i % 2 )
+      pfn = 'srm://se%d.example.org%s' % ( i % 2, lfn )
+      checksum = adler( pfn )
+      if lfn in badChecksums:
+        checksum = '00000001'
+      replicas[lfn] = { seName : pfn, 'Size' : 10, 'GUID' : 'GUID%d' % i, 'Checksum' : checksum }
+    argumentsDict = { 'InputData' : lfns,
+                      'Configuration' : { 'LocalSEList' : [ 'SE0-disk', 'SE1-disk' ],
+                                          'MaxParallelDownloads' : 4,
+                                          'MaxDownloadsPerSE' : 1 },
+                      'FileCatalog' : S_OK( { 'Successful' : replicas, 'Failed' : {} } ),
+                      'Job' : jobArgs or {} }
+    return lfns, DownloadModule.DownloadInputData( argumentsDict )
+
+  def testParallelDownloads( self ):
+    lfns, module = self.__getModule( 10 )
+    result = module.execute()
+    self.assert_( result['OK'] )
+    self.assertEqual( sorted( result['Successful'] ), sorted( lfns ) )
+    self.assertEqual( result['Failed'], [] )
+    # One download at a time from each of the two SEs
+    self.assertEqual( FakeReplicaManager.maxRunning, 2 )
+    for lfn, fileDict in result['Successful'].items():
+      self.assertEqual( os.path.basename( fileDict['path'] ), os.path.basename( lfn ) )
+
+  def testChecksumMismatch( self ):
+    lfns, module = self.__getModule( 4, badChecksums = [ '/vo/data/file2.raw' ] )
+    result = module.execute()
+    self.assert_( result['OK'] )
+    self.assertEqual( result['Failed'], [ '/vo/data/file2.raw' ] )
+    self.assertEqual( len( result['Successful'] ), 3 )
+
+  def testStreaming( self ):
+    FakeReplicaManager.delay = 0.2
+    try:
+      lfns, module = self.__getModule( 8, jobArgs = { 'InputDataStreaming' : '2' } )
+      result = module.execute()
+      self.assert_( result['OK'] )
+      self.assert_( len( result['Successful'] ) >= 2 )
+      self.assert_( result['Pending'] )
+      self.assertEqual( len( result['Successful'] ) + len( result['Pending'] ), 8 )
+      firstFiles = result['Successful'].keys()
+      result = DownloadModule.waitForDownloads()
+      self.assertEqual( result['Failed'], [] )
+      self.assertEqual( sorted( firstFiles + result['Successful'].keys() ), sorted( lfns ) )
+      readyFile = open( DownloadModule.READY_FILE )
+      self.assertEqual( sorted( [ line.split()[0] for line in readyFile ] ), sorted( lfns ) )
+      readyFile.close()
+    finally:
+      FakeReplicaManager.delay = 0.05
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( DownloadInputDataTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
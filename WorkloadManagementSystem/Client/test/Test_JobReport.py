@@ -0,0 +1,96 @@
+""" Tests of the coalesced reports of JobReport
+"""
+import time
+import unittest
+
+import mock
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.WorkloadManagementSystem.Client import JobReport as JobReportModule
+from DIRAC.WorkloadManagementSystem.Client.JobReport import JobReport
+
+class JobReportTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.rpcClient = mock.Mock()
+    self.rpcClient.setJobStatusBulk.return_value = S_OK()
+    self.rpcClient.setJobParameters.return_value = S_OK()
+    self.patcher = mock.patch.object( JobReportModule, 'RPCClient', mock.Mock( return_value = self.rpcClient ) )
+    self.patcher.start()
+
+  def tearDown( self ):
+    self.patcher.stop()
+
+  def __runModules( self, jobReport ):
+    jobReport.setJobStatus( 'Running', 'Application', sendFlag = True )
+    for step in range( 10 ):
+      jobReport.setApplicationStatus( 'Step %d started' % step )
+      jobReport.setJobParameter( 'Step %d' % step, 'OK' )
+      jobReport.setApplicationStatus( 'Step %d done' % step )
+
+  def testImmediateReports( self ):
+    self.__runModules( JobReport( 1 ) )
+    self.assertEqual( self.rpcClient.setJobStatusBulk.call_count, 21 )
+    self.assertEqual( self.rpcClient.setJobParameters.call_count, 10 )
+
+  def testCoalescedReports( self ):
+    jobReport = JobReport( 1, flushInterval = 3600 )
+    self.__runModules( jobReport )
+    # Only the change to Running is sent right away
+    self.assertEqual( self.rpcClient.setJobStatusBulk.call_count, 1 )
+    self.assertEqual( self.rpcClient.setJobParameters.call_count, 0 )
+    self.assertEqual( len( jobReport.appStatusInfo ), 1 )
+    self.assert_( jobReport.commit()['OK'] )
+    self.assertEqual( self.rpcClient.setJobStatusBulk.call_count, 2 )
+    statusDict = self.rpcClient.setJobStatusBulk.call_args[0][1]
+    self.assertEqual( [ status['ApplicationStatus'] for status in statusDict.values() ], [ 'Step 9 done' ] )
+    self.assertEqual( len( self.rpcClient.setJobParameters.call_args[0][1] ), 10 )
+    jobReport.stopFlushing()
+
+  def testSupersededMinorStatus( self ):
+    jobReport = JobReport( 1, flushInterval = 3600 )
+    jobReport.setJobStatus( 'Running', 'Application' )
+    jobReport.setJobStatus( 'Running', 'Step 1' )
+    jobReport.setJobStatus( 'Running', 'Step 2' )
+    self.assertEqual( jobReport.jobStatusInfo[-1][:2], ( 'Running', 'Step 2' ) )
+    self.assertEqual( len( jobReport.jobStatusInfo ), 1 )
+    jobReport.setJobStatus( 'Completed', 'Application Finished Successfully' )
+    self.assertEqual( self.rpcClient.setJobStatusBulk.call_count, 2 )
+    jobReport.stopFlushing()
+
+  def testBackgroundFlush( self ):
+    jobReport = JobReport( 1, flushInterval = 0.1 )
+    jobReport.setApplicationStatus( 'Running step' )
+    time.sleep( 0.5 )
+    jobReport.stopFlushing()
+    self.assertEqual( self.rpcClient.setJobStatusBulk.call_count, 1 )
+    self.assertEqual( jobReport.appStatusInfo, [] )
+
+  def testForwardDISETOnFailure( self ):
+    failed = S_ERROR( 'Service unavailable' )
+    failed['rpcStub'] = ( ( 'WorkloadManagement/JobStateUpdate', {} ), 'setJobStatusBulk', ( 1, {} ) )
+    self.rpcClient.setJobStatusBulk.return_value = failed
+    jobReport = JobReport( 1, flushInterval = 3600 )
+    jobReport.setApplicationStatus( 'Running step' )
+    result = jobReport.generateForwardDISET()
+    self.assert_( result['OK'] )
+    self.assertEqual( result['Value'].Type, 'ForwardDISET' )
+    # Once the failover request is generated the reports are not coalesced anymore
+    self.assertEqual( jobReport.flushInterval, 0 )
+
+  def testForwardDISETOfParameters( self ):
+    failed = S_ERROR( 'Service unavailable' )
+    failed['rpcStub'] = ( ( 'WorkloadManagement/JobStateUpdate', {} ), 'setJobParameters', ( 1, [] ) )
+    self.rpcClient.setJobParameters.return_value = failed
+    jobReport = JobReport( 1, flushInterval = 3600 )
+    jobReport.setJobParameter( 'Step 1', 'OK', sendFlag = True )
+    result = jobReport.generateForwardDISETOperations()
+    self.assert_( result['OK'] )
+    statusOp, parametersOp = result['Value']
+    self.assertEqual( statusOp, None )
+    self.assertEqual( parametersOp.Type, 'ForwardDISET' )
+    self.assertEqual( self.rpcClient.setJobParameters.call_count, 1 )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( JobReportTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
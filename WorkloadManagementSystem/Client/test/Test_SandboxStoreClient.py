@@ -0,0 +1,75 @@
+""" Tests of the sandbox upload of SandboxStoreClient
+"""
+import os
+import hashlib
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from DIRAC import S_OK
+from DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient import SandboxStoreClient
+
+class SandboxUploadTestCase( unittest.TestCase ):
+
+  def setUp( self ):
+    self.tmpDir = tempfile.mkdtemp()
+    self.fileList = []
+    for i in range( 3 ):
+      fileName = os.path.join( self.tmpDir, "file%s.txt" % i )
+      f = open( fileName, "w" )
+      f.write( "Some data %s\n" % i * 1000 )
+      f.close()
+      self.fileList.append( fileName )
+    self.rpcClient = mock.Mock()
+    self.transferClient = mock.Mock()
+    self.transferClient.sendFile.return_value = S_OK( "SB:SE|/new" )
+    self.client = SandboxStoreClient( rpcClient = self.rpcClient, transferClient = self.transferClient )
+
+  def tearDown( self ):
+    shutil.rmtree( self.tmpDir )
+
+  def __uploadedFileIds( self ):
+    return [ call[0][1][0] for call in self.transferClient.sendFile.call_args_list ]
+
+  def testUploadIfUnknown( self ):
+    self.rpcClient.getSandboxForHash.return_value = S_OK( False )
+    sentHashes = []
+    def sendFile( fileName, fileId ):
+      sentHashes.append( hashlib.md5( open( fileName, "rb" ).read() ).hexdigest() )
+      return S_OK( "SB:SE|/new" )
+    self.transferClient.sendFile.side_effect = sendFile
+    result = self.client.uploadFilesAsSandbox( self.fileList, assignTo = { 'Job:1' : 'Input' } )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'Value' ], "SB:SE|/new" )
+    fileId = self.__uploadedFileIds()[0]
+    self.assertEqual( fileId, "%s.tar.bz2" % sentHashes[0] )
+    self.assertEqual( self.rpcClient.getSandboxForHash.call_args[0], ( fileId, { 'Job:1' : 'Input' } ) )
+
+  def testSkipKnownSandbox( self ):
+    self.rpcClient.getSandboxForHash.return_value = S_OK( "SB:SE|/existing" )
+    result = self.client.uploadFilesAsSandbox( self.fileList )
+    self.assert_( result[ 'OK' ] )
+    self.assertEqual( result[ 'Value' ], "SB:SE|/existing" )
+    self.failIf( self.transferClient.sendFile.called )
+
+  def testSameFilesSameHash( self ):
+    self.rpcClient.getSandboxForHash.return_value = S_OK( False )
+    for compression in ( 'bz2', 'gz', 'none' ):
+      self.client.uploadFilesAsSandbox( self.fileList, compression = compression )
+      self.client.uploadFilesAsSandbox( self.fileList, compression = compression )
+    fileIds = self.__uploadedFileIds()
+    self.assertEqual( fileIds[0], fileIds[1] )
+    self.assertEqual( fileIds[2], fileIds[3] )
+    self.assert_( fileIds[2].endswith( ".tar.gz" ) )
+    self.assertEqual( fileIds[4], fileIds[5] )
+    self.assert_( fileIds[4].endswith( ".tar" ) )
+
+  def testInvalidCompression( self ):
+    result = self.client.uploadFilesAsSandbox( self.fileList, compression = 'zip' )
+    self.failIf( result[ 'OK' ] )
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase( SandboxUploadTestCase )
+  unittest.TextTestRunner( verbosity = 2 ).run( suite )
@@ -10,6 +10,7 @@ import types
 import random
 import time
 from DIRAC  import gConfig, gLogger, S_OK, S_ERROR
+from DIRAC.FrameworkSystem.Client.Logger import LazyText
 from DIRAC.WorkloadManagementSystem.private.SharesCorrector import SharesCorrector
 from DIRAC.WorkloadManagementSystem.private.Queues import maxCPUSegments
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
@@ -383,14 +384,15 @@ class TaskQueueDB( DB ):
         return retVal
       tqDefDict = retVal[ 'Value' ]
     tqDefDict[ 'CPUTime' ] = self.fitCPUTimeToSegments( tqDefDict[ 'CPUTime' ] )
-    self.log.info( "Inserting job %s with requirements: %s" % ( jobId, self.__strDict( tqDefDict ) ) )
+    if self.log.shown( 'INFO' ):
+      self.log.info( "Inserting job %s with requirements: %s" % ( jobId, self.__strDict( tqDefDict ) ) )
     retVal = self.__findAndDisableTaskQueue( tqDefDict, skipDefinitionCheck = True, connObj = connObj )
     if not retVal[ 'OK' ]:
       return retVal
     tqInfo = retVal[ 'Value' ]
     newTQ = False
     if not tqInfo[ 'found' ]:
-      self.log.info( "Creating a TQ for job %s" % jobId )
+      self.log.info( LazyText( "Creating a TQ for job %s", jobId ) )
       retVal = self.__createTaskQueue( tqDefDict, 1, connObj = connObj )
       if not retVal[ 'OK' ]:
         return retVal
@@ -398,7 +400,7 @@ class TaskQueueDB( DB ):
       newTQ = True
     else:
       tqId = tqInfo[ 'tqId' ]
-      self.log.info( "Found TQ %s for job %s requirements" % ( tqId, jobId ) )
+      self.log.info( LazyText( "Found TQ %s for job %s requirements", tqId, jobId ) )
     try:
       result = self.__insertJobInTaskQueue( jobId, tqId, int( jobPriority ), checkTQExists = False, connObj = connObj )
       if not result[ 'OK' ]:
@@ -414,7 +416,7 @@ class TaskQueueDB( DB ):
     """
     Insert a job in a given task queue
     """
-    self.log.info( "Inserting job %s in TQ %s with priority %s" % ( jobId, tqId, jobPriority ) )
+    self.log.info( LazyText( "Inserting job %s in TQ %s with priority %s", jobId, tqId, jobPriority ) )
     if not connObj:
       result = self._getConnection()
       if not result[ 'OK' ]:
@@ -505,7 +507,8 @@ class TaskQueueDB( DB ):
     """
     #Make a copy to avoid modification of original if escaping needs to be done
     tqMatchDict = dict( tqMatchDict )
-    self.log.info( "Starting match for requirements", self.__strDict( tqMatchDict ) )
+    if self.log.shown( 'INFO' ):
+      self.log.info( "Starting match for requirements", self.__strDict( tqMatchDict ) )
     retVal = self._checkMatchDefinition( tqMatchDict )
     if not retVal[ 'OK' ]:
       self.log.error( "TQ match request check failed", retVal[ 'Message' ] )
@@ -535,7 +538,7 @@ class TaskQueueDB( DB ):
         self.log.info( "No TQ matches requirements" )
         return S_OK( { 'matchFound' : False, 'tqMatch' : tqMatchDict } )
       for tqId, tqOwnerDN, tqOwnerGroup in tqList:
-        self.log.info( "Trying to extract jobs from TQ %s" % tqId )
+        self.log.info( LazyText( "Trying to extract jobs from TQ %s", tqId ) )
         retVal = self._query( prioSQL % tqId, conn = connObj )
         if not retVal[ 'OK' ]:
           return S_ERROR( "Can't retrieve winning priority for matching job: %s" % retVal[ 'Message' ] )
@@ -551,7 +554,7 @@ class TaskQueueDB( DB ):
           self.__deleteTQWithDelay.add( tqId, 300, ( tqId, tqOwnerDN, tqOwnerGroup ) )
         while len( jobTQList ) > 0:
           jobId, tqId = jobTQList.pop( random.randint( 0, len( jobTQList ) - 1 ) )
-          self.log.info( "Trying to extract job %s from TQ %s" % ( jobId, tqId ) )
+          self.log.info( LazyText( "Trying to extract job %s from TQ %s", jobId, tqId ) )
           retVal = self.deleteJob( jobId, connObj = connObj )
           if not retVal[ 'OK' ]:
             msgFix = "Could not take job"
@@ -559,9 +562,9 @@ class TaskQueueDB( DB ):
             self.log.error( msgFix, msgVar )
             return S_ERROR( msgFix + msgVar )
           if retVal[ 'Value' ] == True :
-            self.log.info( "Extracted job %s with prio %s from TQ %s" % ( jobId, prio, tqId ) )
+            self.log.info( LazyText( "Extracted job %s with prio %s from TQ %s", jobId, prio, tqId ) )
             return S_OK( { 'matchFound' : True, 'jobId' : jobId, 'taskQueueId' : tqId, 'tqMatch' : tqMatchDict } )
-        self.log.info( "No jobs could be extracted from TQ %s" % tqId )
+        self.log.info( LazyText( "No jobs could be extracted from TQ %s", tqId ) )
     self.log.info( "Could not find a match after %s match retries" % self.__maxMatchRetry )
     return S_ERROR( "Could not find a match after %s match retries" % self.__maxMatchRetry )
 
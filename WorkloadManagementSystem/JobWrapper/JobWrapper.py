@@ -18,6 +18,7 @@ from DIRAC.RequestManagementSystem.Client.ReqClient                 import ReqCl
 from DIRAC.RequestManagementSystem.private.RequestValidator         import gRequestValidator
 from DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient       import SandboxStoreClient
 from DIRAC.WorkloadManagementSystem.JobWrapper.WatchdogFactory      import WatchdogFactory
+from DIRAC.WorkloadManagementSystem.Client.DownloadInputData        import waitForDownloads
 from DIRAC.AccountingSystem.Client.Types.Job                        import Job as AccountingJob
 from DIRAC.ConfigurationSystem.Client.PathFinder                    import getSystemSection
 from DIRAC.ConfigurationSystem.Client.Helpers.Registry              import getVOForGroup
@@ -30,7 +31,6 @@ from DIRAC.Core.Utilities.Subprocess                                import syste
 from DIRAC.Core.Utilities.Subprocess                                import Subprocess
 from DIRAC.Core.Utilities.File                                      import getGlobbedTotalSize, getGlobbedFiles
 from DIRAC.Core.Utilities.Version                                   import getCurrentVersion
-from DIRAC.Core.Utilities.Adler                                     import fileAdler
 from DIRAC.Core.Utilities                                           import List, Time
 from DIRAC.Core.Utilities                                           import DEncode
 from DIRAC                                                          import S_OK, S_ERROR, gConfig, gLogger, Time
@@ -105,7 +105,11 @@ class JobWrapper:
     self.defaultCatalog = gConfig.getValue( self.section + '/DefaultCatalog', [] )
     self.defaultFailoverSE = gConfig.getValue( '/Resources/StorageElementGroups/Tier1-Failover', [] )
     self.defaultOutputPath = ''
+    self.maxParallelDownloads = gConfig.getValue( self.section + '/MaxParallelDownloads', 4 )
+    self.maxParallelUploads = gConfig.getValue( self.section + '/MaxParallelUploads', 4 )
+    self.maxDownloadsPerSE = gConfig.getValue( self.section + '/MaxDownloadsPerSE', 2 )
     self.rm = ReplicaManager()
+    self.failoverTransfer = FailoverTransfer()
     self.log.verbose( '===========================================================================' )
     self.log.verbose( 'SVN version %s' % ( __RCSID__ ) )
     self.log.verbose( self.diracVersion )
@@ -414,6 +418,18 @@ class JobWrapper:
           EXECUTION_RESULT['CPU'][0] = 0
           EXECUTION_RESULT['CPU'][0] = watchdog.currentStats['LastUpdateCPU(s)']
 
+    # Input data still downloaded when the payload was started in streaming mode,
+    # the payload ran without some of its input so the job is failed like for the
+    # input data not available before the execution
+    result = waitForDownloads()
+    inputDataError = None
+    if result['Failed']:
+      inputDataError = 'Input Data Not Available'
+      param = '\n'.join( result['Failed'] )
+      self.log.warn( 'Input data could not be downloaded during the execution:\n%s' % param )
+      self.__setJobParam( 'MissingLFNs', param, sendFlag = True )
+      self.__report( 'Failed', inputDataError, sendFlag = True )
+
     if watchdog.currentStats:
       self.log.info( 'Statistics collected by the Watchdog:\n ',
                         '\n  '.join( ['%s: %s' % items for items in watchdog.currentStats.items() ] ) )
@@ -424,11 +440,12 @@ class JobWrapper:
       self.__sendFinalStdOut( exeThread )
       self.log.verbose( 'Execution thread status = %s' % ( status ) )
 
-      if not watchdog.checkError and not status:
-        self.failedFlag = False
-        self.__report( 'Completed', 'Application Finished Successfully', sendFlag = True )
-      elif not watchdog.checkError:
-        self.__report( 'Completed', 'Application Finished With Errors', sendFlag = True )
+      if not watchdog.checkError and not inputDataError:
+        if not status:
+          self.failedFlag = False
+          self.__report( 'Completed', 'Application Finished Successfully', sendFlag = True )
+        else:
+          self.__report( 'Completed', 'Application Finished With Errors', sendFlag = True )
 
     else:
       return S_ERROR( 'No outputs generated from job execution' )
@@ -592,7 +609,8 @@ class JobWrapper:
             self.log.info( 'File size for LFN:%s was not a long integer, setting size to 0' % ( lfn ) )
         self.inputDataSize += lfnSize
 
-    configDict = {'JobID':self.jobID, 'LocalSEList':localSEList, 'DiskSEList':self.diskSE, 'TapeSEList':self.tapeSE}
+    configDict = {'JobID':self.jobID, 'LocalSEList':localSEList, 'DiskSEList':self.diskSE, 'TapeSEList':self.tapeSE,
+                  'MaxParallelDownloads':self.maxParallelDownloads, 'MaxDownloadsPerSE':self.maxDownloadsPerSE}
     self.log.info( configDict )
     argumentsDict = {'FileCatalog':resolvedData, 'Configuration':configDict, 'InputData':lfns, 'Job':self.jobArgs}
     self.log.info( argumentsDict )
@@ -858,9 +876,7 @@ class JobWrapper:
     else:
       pfnGUID = result['Value']
 
-    # Instantiate the failover transfer client
-    failoverTransfer = FailoverTransfer()
-
+    fileList = []
     for outputFile in outputData:
       ( lfn, localfile ) = self.__getLFNfromOutputFile( outputFile, outputPath )
       if not os.path.exists( localfile ):
@@ -870,7 +886,7 @@ class JobWrapper:
       # # file size
       localfileSize = getGlobbedTotalSize( localfile )
 
-      self.outputDataSize += getGlobbedTotalSize( localfile )
+      self.outputDataSize += localfileSize
 
       outputFilePath = os.path.join( os.getcwd(), localfile )
 
@@ -879,55 +895,51 @@ class JobWrapper:
       if fileGUID:
         self.log.verbose( 'Found GUID for file from POOL XML catalogue %s' % localfile )
 
-      # #  file checksum
-      cksm = fileAdler( outputFilePath )
-
+      # # the checksum is computed by the upload threads
       fileMetaDict = { "Size": localfileSize,
                        "LFN" : lfn,
                        "ChecksumType" : "Adler32",
-                       "Checksum": cksm,
+                       "Checksum": None,
                        "GUID" : fileGUID }
 
-      outputSEList = self.__getSortedSEList( outputSE )
-      upload = failoverTransfer.transferAndRegisterFile( localfile,
-                                                         outputFilePath,
-                                                         lfn,
-                                                         outputSEList,
-                                                         fileMetaDict,
-                                                         self.defaultCatalog )
-      if upload['OK']:
-        self.log.info( '"%s" successfully uploaded to "%s" as "LFN:%s"' % ( localfile,
-                                                                            upload['Value']['uploadedSE'],
-                                                                            lfn ) )
-        uploaded.append( lfn )
-        continue
+      fileList.append( { 'FileName' : localfile,
+                         'LocalPath' : outputFilePath,
+                         'LFN' : lfn,
+                         'SEList' : self.__getSortedSEList( outputSE ),
+                         'Metadata' : fileMetaDict,
+                         'OutputFile' : outputFile } )
 
-      self.log.error( 'Could not putAndRegister file',
-                      '%s with LFN %s to %s with GUID %s trying failover storage' % ( localfile, lfn,
-                                                                                      ', '.join( outputSEList ),
-                                                                                      fileGUID ) )
-      if not self.defaultFailoverSE:
-        self.log.info( 'No failover SEs defined for JobWrapper,',
-                       'cannot try to upload output file %s anywhere else.' % outputFile )
-        missing.append( outputFile )
-        continue
+    if not self.defaultFailoverSE:
+      self.log.info( 'No failover SEs defined for JobWrapper,',
+                     'cannot try to upload output files anywhere else than the output SEs.' )
 
-      failoverSEs = self.__getSortedSEList( self.defaultFailoverSE )
-      targetSE = outputSEList[0]
-      result = failoverTransfer.transferAndRegisterFileFailover( localfile,
-                                                                 outputFilePath,
-                                                                 lfn,
-                                                                 targetSE,
-                                                                 failoverSEs,
-                                                                 fileMetaDict,
-                                                                 self.defaultCatalog )
-      if not result['OK']:
-        self.log.error( 'Completely failed to upload file to failover SEs with result:\n%s' % result )
-        missing.append( outputFile )
-      else:
+    # The operations set to recover from failures go to the job failover request
+    start = time.time()
+    result = self.failoverTransfer.transferAndRegisterFiles( fileList,
+                                                             self.__getSortedSEList( self.defaultFailoverSE ),
+                                                             self.defaultCatalog,
+                                                             self.maxParallelUploads )
+    uploadTime = time.time() - start
+    self.log.info( 'Output data upload time: %.1f seconds' % uploadTime )
+    self.jobReport.setJobParameter( 'OutputDataUploadTime', '%.1f' % uploadTime, sendFlag = False )
+    if not result['OK']:
+      self.log.error( 'Failed to upload the output data files', result['Message'] )
+      successful = {}
+    else:
+      successful = result['Value']['Successful']
+
+    for fileDict in fileList:
+      lfn = fileDict['LFN']
+      if lfn not in successful:
+        missing.append( fileDict['OutputFile'] )
+      elif successful[lfn].get( 'failover' ):
         self.log.info( 'File %s successfully uploaded to failover storage element' % lfn )
         uploaded.append( lfn )
-
+      else:
+        self.log.info( '"%s" successfully uploaded to "%s" as "LFN:%s"' % ( fileDict['FileName'],
+                                                                            successful[lfn]['uploadedSE'],
+                                                                            lfn ) )
+        uploaded.append( lfn )
 
     # For files correctly uploaded must report LFNs to job parameters
     if uploaded:
@@ -1193,10 +1205,11 @@ class JobWrapper:
     request.SourceComponent = "Job_%s" % self.jobID
 
     # JobReport part first
-    result = self.jobReport.generateForwardDISET()
+    result = self.jobReport.generateForwardDISETOperations()
     if result['OK']:
-      if result["Value"]:
-        request.addOperation( result["Value"] )
+      for forwardDISETOp in result["Value"]:
+        if forwardDISETOp:
+          request.addOperation( forwardDISETOp )
 
     # Accounting part
     if not self.jobID:
@@ -1214,6 +1227,12 @@ class JobWrapper:
         else:
           self.log.warn( 'No rpcStub found to construct failover request for WMS accounting report' )
 
+    # Operations set by the output data upload
+    result = self.failoverTransfer.getRequestObject()
+    if result['OK']:
+      for transferOperation in result['Value']:
+        request.addOperation( transferOperation )
+
     # Any other requests in the current directory
     rfiles = self.__getRequestFiles()
     for rfname in rfiles:
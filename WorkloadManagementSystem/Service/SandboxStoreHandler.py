@@ -89,33 +89,19 @@ class SandboxStoreHandler( RequestHandler ):
     else:
       assignTo = {}
 
-    extPos = fileId.find( ".tar" )
-    if extPos > -1:
-      extension = fileId[ extPos + 1: ]
-      aHash = fileId[ :extPos ]
-    else:
-      extension = ""
-      aHash = fileId
+    aHash, extension = self.__splitFileId( fileId )
     gLogger.info( "Upload requested for %s [%s]" % ( aHash, extension ) )
 
     credDict = self.getRemoteCredentials()
     sbPath = self.__getSandboxPath( "%s.%s" % ( aHash, extension ) )
-    # Generate the location
-    result = self.__generateLocation( sbPath )
+    result = self.__assignExistingSandbox( sbPath, assignTo )
     if not result[ 'OK' ]:
+      fileHelper.markAsTransferred()
       return result
-    seName, sePFN = result[ 'Value' ]
-
-    result = sandboxDB.getSandboxId( seName, sePFN, credDict[ 'username' ], credDict[ 'group' ] )
-    if result[ 'OK' ]:
+    if result[ 'Value' ]:
       gLogger.info( "Sandbox already exists. Skipping upload" )
       fileHelper.markAsTransferred()
-      sbURL = "SB:%s|%s" % ( seName, sePFN )
-      assignTo = dict( [ ( key, [ ( sbURL, assignTo[ key ] ) ] ) for key in assignTo ] )
-      result = self.export_assignSandboxesToEntities( assignTo )
-      if not result[ 'OK' ]:
-        return result
-      return S_OK( sbURL )
+      return result
 
     if self.__useLocalStorage:
       hdPath = self.__sbToHDPath( sbPath )
@@ -156,6 +142,43 @@ class SandboxStoreHandler( RequestHandler ):
       return result
     return S_OK( sbURL )
 
+  def __splitFileId( self, fileId ):
+    """ Get the hash and the extension of a sandbox file name
+    """
+    extPos = fileId.find( ".tar" )
+    if extPos > -1:
+      return fileId[ :extPos ], fileId[ extPos + 1: ]
+    return fileId, ""
+
+  def __assignExistingSandbox( self, sbPath, assignTo ):
+    """ If the requester already uploaded the sandbox, assign it to the entities
+        Returns S_OK( sbURL ) if it exists, S_OK( False ) if not
+    """
+    # Generate the location
+    result = self.__generateLocation( sbPath )
+    if not result[ 'OK' ]:
+      return result
+    seName, sePFN = result[ 'Value' ]
+    credDict = self.getRemoteCredentials()
+    result = sandboxDB.getSandboxId( seName, sePFN, credDict[ 'username' ], credDict[ 'group' ] )
+    if not result[ 'OK' ]:
+      return S_OK( False )
+    sbURL = "SB:%s|%s" % ( seName, sePFN )
+    assignTo = dict( [ ( key, [ ( sbURL, assignTo[ key ] ) ] ) for key in assignTo ] )
+    result = self.export_assignSandboxesToEntities( assignTo )
+    if not result[ 'OK' ]:
+      return result
+    return S_OK( sbURL )
+
+  types_getSandboxForHash = [ types.StringType, types.DictType ]
+  def export_getSandboxForHash( self, fileId, assignTo ):
+    """ Check if a sandbox with the given name ( <md5>.<extension> ) is already
+        stored for the requester. If so, assign it as in an upload and return its
+        URL, so the client does not need to send it. Otherwise return S_OK( False )
+    """
+    aHash, extension = self.__splitFileId( fileId )
+    return self.__assignExistingSandbox( self.__getSandboxPath( "%s.%s" % ( aHash, extension ) ), assignTo )
+
   def transfer_bulkFromClient( self, fileId, token, fileSize, fileHelper ):
     """ Receive files packed into a tar archive by the fileHelper logic.
         token is used for access rights confirmation.
@@ -50,7 +50,10 @@ def jobexec( jobxml, wfParameters = {} ):
     jobID = os.environ['JOBID']
     gLogger.info( 'DIRAC JobID %s is running at site %s' % ( jobID, DIRAC.siteName() ) )
 
-  workflow.addTool( 'JobReport', JobReport( jobID ) )
+  # The status updates of the modules are sent together every flushInterval seconds
+  flushInterval = gConfig.getValue( '/LocalSite/JobReportFlushInterval', 60 )
+  jobReport = JobReport( jobID, flushInterval = flushInterval )
+  workflow.addTool( 'JobReport', jobReport )
   workflow.addTool( 'AccountingReport', DataStoreClient() )
   workflow.addTool( 'Request', Request() )
 
@@ -59,6 +62,10 @@ def jobexec( jobxml, wfParameters = {} ):
     workflow.setValue( name, value )
 
   result = workflow.execute()
+  jobReport.stopFlushing()
+  commit = jobReport.commit()
+  if not commit['OK']:
+    gLogger.warn( 'Failed to send the last job reports', commit['Message'] )
   return result
 
 positionalArgs = Script.getPositionalArgs()
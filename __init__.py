@@ -54,7 +54,13 @@
     - S_ERROR:        ERROR return structure
     - gLogger:        global Logger object
     - gConfig:        global Config object
-    - gMonitor:       global Monitor object
+    - gMonitor:       global Monitor object, the monitoring client is only
+                      imported when it is first used
+
+    DIRAC imported with the --profile-startup switch in the command line (or
+    the DIRAC_PROFILE_STARTUP environment variable set) reports the time spent
+    importing each module and loading the configuration, see
+    DIRAC.Core.Utilities.StartupProfiler
 
     It defines the following functions:
     - abort:          aborts execution
@@ -70,6 +76,11 @@ __path__ = extend_path( __path__, __name__ )
 import platform as pyPlatform
 import sys, os
 
+# Profile the start up before anything else is imported
+from DIRAC.Core.Utilities import StartupProfiler
+if StartupProfiler.isRequested():
+  StartupProfiler.enable()
+
 
 # Define Version
 
@@ -121,8 +132,10 @@ from DIRAC.FrameworkSystem.Client.Logger import gLogger
 #Configuration client
 from DIRAC.ConfigurationSystem.Client.Config import gConfig
 
-#Monitoring client
-from DIRAC.FrameworkSystem.Client.MonitoringClient import gMonitor
+#Monitoring client, importing it brings DISET and starts the thread scheduler,
+#which most scripts never need
+from DIRAC.Core.Utilities.LazyImport import LazyImport
+gMonitor = LazyImport( 'DIRAC.FrameworkSystem.Client.MonitoringClient', 'gMonitor' )
 
 __siteName = False
 
@@ -157,6 +170,8 @@ from DIRAC.Core.Utilities.Platform import getPlatformString
 platform = getPlatformString()
 platformTuple = tuple( platform.split( '_' ) )
 
+StartupProfiler.addPhase( 'Import of DIRAC', StartupProfiler.getElapsedTime() )
+
 def exit( exitCode = 0 ):
   """
   Finish execution using callbacks